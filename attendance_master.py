@@ -103,7 +103,7 @@ class AttendanceMasterCog(commands.Cog):
 
         db = self.db_cog.get_manager(guild_id)
         
-        if not db.get_user(user_id):
+        if not db.is_registered(user_id):
             embed = discord.Embed(
                 title="❌ 미등록 사용자",
                 description="먼저 `/등록` 명령어로 명단에 등록을 해주세요!",
@@ -273,7 +273,7 @@ class AttendanceMasterCog(commands.Cog):
 
         db = self.db_cog.get_manager(guild_id)
         
-        if not db.get_user(user_id):
+        if not db.is_registered(user_id):
             embed = discord.Embed(
                 title="❌ 미등록 사용자",
                 description="먼저 `/등록` 명령어로 명단에 등록을 해주세요!",
@@ -1,15 +1,29 @@
 # backup_cog.py - [시스템] 백업
+"""
+증분 백업입니다.
+
+- SQLite 파일(data/guilds/*.db 등)은 sqlite3 온라인 백업 API로 한 시점의 스냅샷을 떠서 보관합니다.
+  (WAL 모드라 스냅샷 중에도 봇의 쓰기가 막히지 않고, 쓰기 도중의 반쯤 기록된 파일이 백업되지 않음)
+- 파일 내용은 SHA-256 기준으로 backups/objects/에 한 번만 압축 저장하며, 백업 하나는 "경로 → 해시" 목록(manifest)입니다.
+  직전 백업 이후 크기/수정 시각(WAL 포함)이 그대로인 파일은 스냅샷과 해시 계산도 건너뜁니다.
+- 압축은 작업자 수가 제한된 스레드 풀에서 실행하고, 객체별 검증 결과는 verify_cache.json에 캐시합니다.
+
+복원 (봇을 멈춘 상태에서):
+    python backup_cog.py restore backup_20250101_120000.json            # backups/restore/<백업 이름>/ 아래에 풀기
+    python backup_cog.py restore backup_20250101_120000.json .          # 원래 위치에 덮어쓰기
+"""
 from __future__ import annotations
 import os
 import shutil
-import zipfile
+import gzip
+import sqlite3
+import tempfile
+import fnmatch
 import logging
 import threading
-import time
 import json
 import hashlib
-import signal
-import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Tuple
 
@@ -23,14 +37,20 @@ from discord.ext import commands
 
 # ✅ 백업 설정
 BACKUP_CONFIG = {
-    "backup_interval_hours": 6,
-    "max_backups": 30,
+    "backup_interval_hours": 1,
+    "max_backups": 72,
     "compress": True,
+    "compress_level": 6,
+    "compress_workers": 1,          # 압축에 쓰는 최대 스레드 수 (봇이 쓸 CPU를 남겨 둠)
     "verify_backups": True,
     "backup_on_startup": True,
+    "retry_minutes": 10,            # 자동 백업 실패 시 첫 재시도까지 대기 (실패가 이어지면 두 배씩, 최대 백업 주기)
     "exclude_patterns": [
         "*.tmp", "*.temp", "__pycache__", "*.pyc"
     ],
+    "database_globs": [
+        "data/guilds/*.db"
+    ],
     "source_files": [
         "data/dotori_bot.db",
         "data/point_data.json",
@@ -41,6 +61,10 @@ BACKUP_CONFIG = {
     ]
 }
 
+MANIFEST_VERSION = "3.0"
+HASH_CHUNK_SIZE = 1024 * 1024
+SQLITE_HEADER = b"SQLite format 3\x00"
+
 # ✅ 로깅 설정
 def setup_logging():
     """데이터베이스 매니저 전용 로깅 설정"""
@@ -78,32 +102,44 @@ class BackupSystem:
         self.config = config or BACKUP_CONFIG
         self.logger = setup_logging()
         self.base_dir = Path(os.getcwd())
-        # FIX 1: Define paths correctly
         self.backup_dir = self.base_dir / 'backups'
+        self.objects_dir = self.backup_dir / 'objects'
         self.config_file = self.base_dir / 'backup_config.json'
-        
+        self.verify_cache_file = self.backup_dir / 'verify_cache.json'
+
         # ✅ 변경된 부분: 설정 파일에서 백업 대상 파일 목록을 가져옴
         self.source_files = [self.base_dir / f for f in self.config.get('source_files', [])]
 
-        self.backup_dir.mkdir(exist_ok=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
         self.is_running = False
-        
+
         # 스레드 관련
         self.running = False
         self.backup_thread = None
-        self.scheduler_thread = None
-        
+        self._stop_event = threading.Event()
+        # 백업 생성과 검증 캐시(self._verified, verify_cache.json) 변경을 직렬화 (백업 중 검증을 호출하므로 재진입 가능)
+        self._backup_lock = threading.RLock()
+        self._compress_pool = ThreadPoolExecutor(
+            max_workers=max(1, int(self.config.get("compress_workers", 1))),
+            thread_name_prefix="backup-compress"
+        )
+
+        # 검증 캐시 {객체 이름: [크기, 수정 시각(ns)]} - 검증 이후 바뀌지 않은 객체는 다시 읽지 않음
+        self._verified: Dict[str, List[int]] = self._load_verify_cache()
+
         # 통계
         self.stats = {
             "total_backups": 0,
             "successful_backups": 0,
             "failed_backups": 0,
             "last_backup_time": None,
-            "last_backup_size": 0
+            "last_backup_size": 0,
+            "last_new_files": 0,
+            "last_skipped_files": 0
         }
-        
+
         self.logger.info("🛡️ 백업 시스템 초기화 완료")
-        
+
     def _load_config(self) -> Dict:
         """설정 파일 로드"""
         try:
@@ -129,146 +165,394 @@ class BackupSystem:
             self.logger.error(f"설정 저장 실패: {e}")
             return False
             
-    def create_backup(self, backup_name: Optional[str] = None) -> Tuple[bool, str]:
-        """백업 생성"""
+    # ==================== 대상 파일 ====================
+    def _collect_sources(self) -> List[Path]:
+        """백업 대상 (source_files + database_globs, exclude_patterns 제외)"""
+        files = {f for f in self.source_files if f.is_file()}
+        for pattern in self.config.get("database_globs", []):
+            files.update(p for p in self.base_dir.glob(pattern) if p.is_file())
+        excludes = self.config.get("exclude_patterns", [])
+        return sorted(f for f in files if not any(fnmatch.fnmatch(f.name, pat) for pat in excludes))
+
+    def _relpath(self, path: Path) -> str:
         try:
-            self.stats["total_backups"] += 1
-            timestamp = datetime.now(KST).strftime("%Y%m%d_%H%M%S")
-            filename = f"{backup_name}_{timestamp}.zip" if backup_name else f"backup_{timestamp}.zip"
-            backup_path = self.backup_dir / filename
-            
-            self.logger.info(f"백업 생성 시작: {filename}")
-            
-            files_to_backup = [f for f in self.source_files if f.exists()]
-            if not files_to_backup:
+            return path.relative_to(self.base_dir).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    @staticmethod
+    def _is_sqlite(path: Path) -> bool:
+        try:
+            with open(path, 'rb') as f:
+                return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+        except OSError:
+            return False
+
+    @staticmethod
+    def _signature(path: Path) -> List[int]:
+        """변경 감지용 (크기, 수정 시각) - SQLite는 커밋이 WAL 파일에 먼저 쌓이므로 WAL도 포함"""
+        st = path.stat()
+        signature = [st.st_size, st.st_mtime_ns]
+        wal = path.with_name(path.name + "-wal")
+        if wal.exists():
+            wst = wal.stat()
+            signature += [wst.st_size, wst.st_mtime_ns]
+        return signature
+
+    # ==================== 스냅샷 / 객체 저장 ====================
+    @staticmethod
+    def _snapshot_sqlite(src_path: Path, dst_path: Path):
+        """온라인 백업 API로 한 번에 복사 (하나의 읽기 트랜잭션 = 한 시점의 일관된 사본)"""
+        src = sqlite3.connect(str(src_path), timeout=30)
+        dst = sqlite3.connect(str(dst_path))
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+
+    @staticmethod
+    def _hash_file(path: Path) -> Tuple[str, int]:
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _object_path(self, sha256: str) -> Path:
+        suffix = ".gz" if self.config.get("compress", True) else ""
+        return self.objects_dir / sha256[:2] / f"{sha256}{suffix}"
+
+    def _store_object(self, src: Path, dst: Path) -> int:
+        """압축 스레드 풀에서 실행: 임시 파일에 쓴 뒤 교체하므로 중단되어도 반쯤 쓴 객체가 남지 않음"""
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        part = dst.with_name(dst.name + ".part")
+        with open(src, 'rb') as fin:
+            if dst.suffix == ".gz":
+                with gzip.open(part, 'wb', compresslevel=int(self.config.get("compress_level", 6))) as fout:
+                    shutil.copyfileobj(fin, fout, HASH_CHUNK_SIZE)
+            else:
+                with open(part, 'wb') as fout:
+                    shutil.copyfileobj(fin, fout, HASH_CHUNK_SIZE)
+        os.replace(part, dst)
+        return dst.stat().st_size
+
+    # ==================== 백업 ====================
+    def create_backup(self, backup_name: Optional[str] = None) -> Tuple[bool, str]:
+        """백업 생성 (바뀐 파일만 새로 저장)"""
+        with self._backup_lock:
+            try:
+                return self._create_backup(backup_name)
+            except Exception as e:
                 self.stats["failed_backups"] += 1
-                return False, "백업할 파일이 없습니다."
-            
-            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                backup_info = {
-                    "timestamp": datetime.now(KST).isoformat(),
-                    "backup_type": "manual" if backup_name else "auto",
-                    "backup_version": "2.0",
-                    "total_files": len(files_to_backup),
-                    "files": [str(f) for f in files_to_backup]
-                }
-                zipf.writestr("backup_info.json", json.dumps(backup_info, indent=2))
-                
-                for file_path in files_to_backup:
-                    try:
-                        zipf.write(file_path, file_path)
-                        self.logger.info(f"파일 추가 완료: {file_path}")
-                    except Exception as e:
-                        self.logger.error(f"파일 추가 실패: {file_path} - {e}")
-            
-            if self.config.get("verify_backups", True):
-                if not self._verify_backup(str(backup_path), [str(f) for f in files_to_backup]):
-                    self.stats["failed_backups"] += 1
-                    return False, "백업 검증 실패"
-            
-            backup_size = backup_path.stat().st_size
-            self.stats["successful_backups"] += 1
-            self.stats["last_backup_time"] = datetime.now(KST).isoformat()
-            self.stats["last_backup_size"] = backup_size
-            
-            self.cleanup_old_backups()
-            
-            self.logger.info(f"✅ 백업 생성 완료: {filename} ({self.format_size(backup_size)})")
-            return True, f"백업 생성 완료: {filename} ({self.format_size(backup_size)})"
-            
-        except Exception as e:
+                self.logger.error(f"백업 생성 실패: {traceback.format_exc()}")
+                return False, f"백업 생성 실패: {str(e)}"
+
+    def _create_backup(self, backup_name: Optional[str]) -> Tuple[bool, str]:
+        self.stats["total_backups"] += 1
+        timestamp = datetime.now(KST).strftime("%Y%m%d_%H%M%S")
+        stem = f"{backup_name}_{timestamp}" if backup_name else f"backup_{timestamp}"
+        # 같은 초에 백업이 두 번 생기면(수동 + 자동) 번호를 붙여 서로 덮어쓰지 않게 함 (잠금 안이라 경쟁 없음)
+        filename = f"{stem}.json"
+        suffix = 1
+        while (self.backup_dir / filename).exists():
+            suffix += 1
+            filename = f"{stem}_{suffix}.json"
+        manifest_path = self.backup_dir / filename
+
+        self.logger.info(f"백업 생성 시작: {filename}")
+
+        files_to_backup = self._collect_sources()
+        if not files_to_backup:
+            self.stats["failed_backups"] += 1
+            return False, "백업할 파일이 없습니다."
+
+        latest = self._latest_manifest()
+        previous = latest.get("files", {}) if latest else {}
+        entries: Dict[str, Dict] = {}
+        pending = []
+        skipped = 0
+
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp_dir:
+            for index, file_path in enumerate(files_to_backup):
+                rel = self._relpath(file_path)
+                try:
+                    signature = self._signature(file_path)
+                    prev = previous.get(rel)
+                    # 바뀌지 않은 파일도 객체가 손상/누락되었으면 다시 저장 (검증 캐시 덕분에 보통은 stat 한 번)
+                    if prev and prev.get("signature") == signature and self._verify_object(prev["sha256"]):
+                        entries[rel] = prev
+                        skipped += 1
+                        continue
+
+                    # 스냅샷/복사본 기준으로 해시와 압축을 하므로 그 사이 원본이 바뀌어도 둘이 어긋나지 않음
+                    snapshot = Path(tmp_dir) / f"{index}{file_path.suffix}"
+                    if self._is_sqlite(file_path):
+                        self._snapshot_sqlite(file_path, snapshot)
+                    else:
+                        shutil.copyfile(file_path, snapshot)
+                    sha256, size = self._hash_file(snapshot)
+                    entries[rel] = {"sha256": sha256, "size": size, "signature": signature}
+
+                    obj = self._object_path(sha256)
+                    if obj.exists() and self._verify_object(sha256):
+                        skipped += 1
+                    else:
+                        pending.append((rel, self._compress_pool.submit(self._store_object, snapshot, obj)))
+                except Exception as e:
+                    self.logger.error(f"파일 추가 실패: {file_path} - {e}")
+
+            stored_size = 0
+            for rel, future in pending:
+                try:
+                    stored_size += future.result()
+                except Exception as e:
+                    self.logger.error(f"파일 압축 실패: {rel} - {e}")
+                    entries.pop(rel, None)
+
+        if not entries:
             self.stats["failed_backups"] += 1
-            self.logger.error(f"백업 생성 실패: {traceback.format_exc()}")
-            return False, f"백업 생성 실패: {str(e)}"
+            return False, "백업할 파일이 없습니다."
+
+        manifest = {
+            "timestamp": datetime.now(KST).isoformat(),
+            "backup_type": "manual" if backup_name else "auto",
+            "backup_version": MANIFEST_VERSION,
+            "total_files": len(entries),
+            "new_files": len(pending),
+            "stored_size": stored_size,
+            "files": entries
+        }
+
+        if self.config.get("verify_backups", True) and not self._verify_backup(manifest):
+            self.stats["failed_backups"] += 1
+            return False, "백업 검증 실패"
+
+        part = manifest_path.with_name(manifest_path.name + ".part")
+        part.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(part, manifest_path)
+
+        self.stats["successful_backups"] += 1
+        self.stats["last_backup_time"] = manifest["timestamp"]
+        self.stats["last_backup_size"] = stored_size
+        self.stats["last_new_files"] = len(pending)
+        self.stats["last_skipped_files"] = skipped
+
+        self.cleanup_old_backups()
+
+        summary = f"{filename} (파일 {len(entries)}개 중 {len(pending)}개 새로 저장, {self.format_size(stored_size)})"
+        self.logger.info(f"✅ 백업 생성 완료: {summary}")
+        return True, f"백업 생성 완료: {summary}"
+
+    # ==================== 검증 ====================
+    def _load_verify_cache(self) -> Dict[str, List[int]]:
+        try:
+            if self.verify_cache_file.exists():
+                data = json.loads(self.verify_cache_file.read_text(encoding='utf-8'))
+                if isinstance(data, dict):
+                    return data
+        except Exception as e:
+            self.logger.warning(f"검증 캐시 로드 실패 (다시 검증합니다): {e}")
+        return {}
 
-    def _verify_backup(self, backup_path: str, expected_files: List[str]) -> bool:
-        """백업 파일 검증"""
+    def _save_verify_cache(self):
+        # 호출자는 _backup_lock을 잡고 있어야 함
         try:
-            with zipfile.ZipFile(backup_path, 'r') as zipf:
-                bad_file = zipf.testzip()
-                if bad_file:
-                    self.logger.error(f"손상된 파일 발견: {bad_file}")
-                    return False
-                
-                zip_files = zipf.namelist()
-                for expected_file in expected_files:
-                    if expected_file not in zip_files:
-                        self.logger.error(f"예상 파일 누락: {expected_file}")
-                        return False
-                
-                return True
+            part = self.verify_cache_file.with_name(self.verify_cache_file.name + ".part")
+            part.write_text(json.dumps(self._verified), encoding='utf-8')
+            os.replace(part, self.verify_cache_file)
+        except Exception as e:
+            self.logger.error(f"검증 캐시 저장 실패: {e}")
+
+    def _verify_object(self, sha256: str) -> bool:
+        """객체를 풀어 해시를 다시 계산합니다. (검증 이후 바뀌지 않은 객체는 캐시로 통과, 호출자는 _backup_lock을 잡고 있어야 함)"""
+        obj = self._object_path(sha256)
+        try:
+            st = obj.stat()
+        except OSError:
+            self.logger.error(f"예상 파일 누락: {obj.name}")
+            return False
+        stamp = [st.st_size, st.st_mtime_ns]
+        if self._verified.get(obj.name) == stamp:
+            return True
+
+        digest = hashlib.sha256()
+        try:
+            opener = gzip.open if obj.suffix == ".gz" else open
+            with opener(obj, 'rb') as f:
+                while chunk := f.read(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+        except (OSError, EOFError) as e:
+            self.logger.error(f"손상된 파일 발견: {obj.name} - {e}")
+            return False
+        if digest.hexdigest() != sha256:
+            self.logger.error(f"손상된 파일 발견: {obj.name} (해시 불일치)")
+            return False
+        self._verified[obj.name] = stamp
+        return True
+
+    def _verify_backup(self, manifest: Dict) -> bool:
+        """백업(manifest)이 가리키는 모든 객체 검증"""
+        try:
+            with self._backup_lock:
+                before = len(self._verified)
+                valid = all(self._verify_object(entry["sha256"]) for entry in manifest.get("files", {}).values())
+                if len(self._verified) != before:
+                    self._save_verify_cache()
+                return valid
         except Exception as e:
             self.logger.error(f"백업 검증 실패: {e}")
             return False
 
+    # ==================== 목록 / 정리 ====================
+    def _manifest_paths(self) -> List[Path]:
+        if not self.backup_dir.exists():
+            return []
+        return [f for f in self.backup_dir.iterdir() if f.suffix == '.json' and f != self.verify_cache_file]
+
+    def _latest_manifest(self) -> Optional[Dict]:
+        latest = None
+        for path in self._manifest_paths():
+            info = self.get_backup_info(path.name)
+            if info and (latest is None or info.get("timestamp", "") > latest.get("timestamp", "")):
+                latest = info
+        return latest
+
     def list_backups(self) -> List[Dict]:
-        """백업 목록 조회"""
+        """백업 목록 조회 (예전 zip 백업은 검증 없이 표시)"""
         backups = []
-        
-        if not self.backup_dir.exists():
-            return backups
-        
-        for file in self.backup_dir.iterdir():
-            if file.suffix == '.zip':
-                try:
-                    stat = file.stat()
-                    info = self.get_backup_info(file.name)
-                    
-                    backups.append({
-                        "name": file.name,
-                        "size": stat.st_size,
-                        "creation_time": datetime.fromtimestamp(stat.st_ctime),
-                        "type": info.get("backup_type", "unknown") if info else "unknown",
-                        "file_count": info.get("total_files", 0) if info else 0,
-                        "valid": self._verify_backup(str(file), info.get("files", []) if info else [])
-                    })
-                except Exception as e:
-                    self.logger.error(f"백업 정보 조회 실패: {file.name} - {e}")
-        
+
+        for file in self._manifest_paths():
+            info = self.get_backup_info(file.name)
+            if not info:
+                continue
+            backups.append({
+                "name": file.name,
+                "size": sum(entry.get("size", 0) for entry in info.get("files", {}).values()),
+                "creation_time": datetime.fromisoformat(info["timestamp"]),
+                "type": info.get("backup_type", "unknown"),
+                "file_count": info.get("total_files", 0),
+                "valid": self._verify_backup(info)
+            })
+
+        if self.backup_dir.exists():
+            for file in self.backup_dir.glob("*.zip"):
+                stat = file.stat()
+                backups.append({
+                    "name": file.name,
+                    "size": stat.st_size,
+                    "creation_time": datetime.fromtimestamp(stat.st_mtime, KST),
+                    "type": "legacy",
+                    "file_count": 0,
+                    "valid": None
+                })
+
         backups.sort(key=lambda x: x["creation_time"], reverse=True)
         return backups
 
     def get_backup_info(self, backup_name: str) -> Optional[Dict]:
-        """백업 정보 조회"""
+        """백업 정보(manifest) 조회"""
         backup_path = self.backup_dir / backup_name
-        
+
         try:
-            with zipfile.ZipFile(backup_path, 'r') as zipf:
-                if "backup_info.json" in zipf.namelist():
-                    info_data = zipf.read("backup_info.json")
-                    return json.loads(info_data.decode('utf-8'))
+            info = json.loads(backup_path.read_text(encoding='utf-8'))
+            if isinstance(info, dict) and "files" in info and "timestamp" in info:
+                return info
         except Exception as e:
             self.logger.error(f"백업 정보 읽기 실패: {e}")
-        
+
         return None
 
     def cleanup_old_backups(self) -> int:
-        """오래된 백업 정리"""
+        """오래된 백업 정리 후 어떤 백업도 참조하지 않는 객체 삭제"""
         try:
-            backups = self.list_backups()
-            max_backups = self.config.get("max_backups", 30)
-            
+            manifests = []
+            for path in self._manifest_paths():
+                info = self.get_backup_info(path.name)
+                if info:
+                    manifests.append((info["timestamp"], path, info))
+            legacy = [(datetime.fromtimestamp(p.stat().st_mtime, KST).isoformat(), p, None) for p in self.backup_dir.glob("*.zip")]
+            backups = sorted(manifests + legacy, key=lambda x: x[0], reverse=True)
+            max_backups = self.config.get("max_backups", 72)
+
             if len(backups) <= max_backups:
                 return 0
-            
-            backups_to_delete = backups[max_backups:]
+
             deleted_count = 0
-            
-            for backup in backups_to_delete:
+            for _, path, _ in backups[max_backups:]:
                 try:
-                    backup_path = self.backup_dir / backup["name"]
-                    backup_path.unlink()
+                    path.unlink()
                     deleted_count += 1
-                    self.logger.info(f"오래된 백업 삭제: {backup['name']}")
+                    self.logger.info(f"오래된 백업 삭제: {path.name}")
                 except Exception as e:
-                    self.logger.error(f"백업 삭제 실패: {backup['name']} - {e}")
-            
+                    self.logger.error(f"백업 삭제 실패: {path.name} - {e}")
+
+            referenced = {
+                self._object_path(entry["sha256"]).name
+                for _, _, info in backups[:max_backups] if info
+                for entry in info.get("files", {}).values()
+            }
+            with self._backup_lock:
+                for obj in self.objects_dir.glob("*/*"):
+                    if obj.name not in referenced:
+                        obj.unlink(missing_ok=True)
+                        self._verified.pop(obj.name, None)
+                self._save_verify_cache()
+
             return deleted_count
-            
+
         except Exception as e:
             self.logger.error(f"백업 정리 실패: {e}")
             return 0
 
+    # ==================== 복원 ====================
+    def restore_backup(self, backup_name: str, target_dir: Optional[Path] = None) -> Tuple[bool, str]:
+        """
+        백업(manifest)의 파일을 target_dir 아래 원래 상대 경로로 풀어 놓습니다.
+        target_dir이 없으면 backups/restore/<백업 이름>/ 에 풀며, 원래 위치(기본 디렉터리)로 복원할 때는 봇을 멈춘 뒤 실행해야 합니다.
+        """
+        manifest = self.get_backup_info(backup_name)
+        if not manifest:
+            return False, f"백업을 찾을 수 없습니다: {backup_name}"
+        target = Path(target_dir) if target_dir is not None else self.backup_dir / "restore" / Path(backup_name).stem
+
+        restored = 0
+        for rel, entry in manifest["files"].items():
+            dst = (target / rel).resolve()
+            if not dst.is_relative_to(target.resolve()):
+                return False, f"잘못된 경로가 포함된 백업입니다: {rel}"
+            obj = self._object_path(entry["sha256"])
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            part = dst.with_name(dst.name + ".part")
+            digest = hashlib.sha256()
+            try:
+                opener = gzip.open if obj.suffix == ".gz" else open
+                with opener(obj, 'rb') as fin, open(part, 'wb') as fout:
+                    while chunk := fin.read(HASH_CHUNK_SIZE):
+                        digest.update(chunk)
+                        fout.write(chunk)
+            except (OSError, EOFError) as e:
+                part.unlink(missing_ok=True)
+                return False, f"복원 실패: {rel} ({obj.name}) - {e} (파일 {restored}개 복원됨)"
+            if digest.hexdigest() != entry["sha256"]:
+                part.unlink(missing_ok=True)
+                return False, f"복원 실패: {rel} 해시 불일치 (파일 {restored}개 복원됨)"
+            # 스냅샷은 WAL이 합쳐진 단일 파일이므로 남아 있는 예전 WAL/SHM이 복원본 위에 재생되지 않도록 제거
+            for leftover in (dst.with_name(dst.name + "-wal"), dst.with_name(dst.name + "-shm")):
+                leftover.unlink(missing_ok=True)
+            os.replace(part, dst)
+            restored += 1
+
+        self.logger.info(f"✅ 백업 복원 완료: {backup_name} → {target} (파일 {restored}개)")
+        return True, f"백업 복원 완료: {target} (파일 {restored}개)"
+
+    def close(self):
+        """자동 백업을 멈추고 압축 스레드 풀을 정리합니다. (진행 중인 압축은 끝까지 기다림)"""
+        self.stop_auto_backup()
+        self._compress_pool.shutdown(wait=True)
+
     def format_size(self, size_bytes: int) -> str:
         """파일 크기 포맷팅"""
         if size_bytes < 1024:
@@ -292,56 +576,64 @@ class BackupSystem:
         """자동 백업 시작"""
         if self.running:
             return False
-        
+
         self.running = True
+        self._stop_event.clear()
         self.backup_thread = threading.Thread(target=self._auto_backup_loop, daemon=True)
         self.backup_thread.start()
-        
+
         self.logger.info("🚀 자동 백업 시작됨")
         return True
 
     def _auto_backup_loop(self):
-        """자동 백업 루프"""
-        interval_seconds = self.config.get("backup_interval_hours", 6) * 3600
-        
+        """자동 백업 루프 (다음 백업 예정 시각까지 대기)"""
+        interval_seconds = self.config.get("backup_interval_hours", 1) * 3600
+        retry_seconds = self.config.get("retry_minutes", 10) * 60
+        failures = 0
+
         if self.config.get("backup_on_startup", True):
-            self.create_backup("startup")
-        
+            failures = 0 if self.create_backup("startup")[0] else 1
+
         while self.running:
             try:
-                time.sleep(60)
-                if not self.running:
-                    break
-                
-                if self.stats["last_backup_time"]:
-                    last_backup_str = self.stats["last_backup_time"]
-                    last_backup = datetime.fromisoformat(last_backup_str)
+                wait_seconds = interval_seconds
+                if failures:
+                    # 실패하면 last_backup_time이 그대로라 대기 시간이 0이 되므로 재시도 간격을 따로 둠
+                    wait_seconds = min(interval_seconds, retry_seconds * 2 ** (failures - 1))
+                    self.logger.warning(f"자동 백업 실패 {failures}회 - {wait_seconds / 60:.0f}분 후 재시도")
+                elif self.stats["last_backup_time"]:
+                    last_backup = datetime.fromisoformat(self.stats["last_backup_time"])
                     if last_backup.tzinfo is None:
                         last_backup = last_backup.replace(tzinfo=KST)
-                    else:
-                        last_backup = last_backup.astimezone(KST)
-                    if datetime.now(KST) - last_backup < timedelta(seconds=interval_seconds):
-                        continue
-                
-                self.create_backup()
-                
+                    elapsed = (datetime.now(KST) - last_backup).total_seconds()
+                    wait_seconds = max(0, interval_seconds - elapsed)
+
+                if self._stop_event.wait(wait_seconds) or not self.running:
+                    break
+
+                success, _ = self.create_backup()
+                failures = 0 if success else min(failures + 1, 16)
+
             except Exception as e:
                 self.logger.error(f"자동 백업 루프 오류: {e}")
+                if self._stop_event.wait(60):
+                    break
 
     def stop_auto_backup(self) -> bool:
         """자동 백업 중지"""
         if not self.running:
             return False
-        
+
         self.logger.info("자동 백업 중지 중...")
         self.running = False
-        
+        self._stop_event.set()
+
         if self.backup_thread and self.backup_thread.is_alive():
             self.backup_thread.join(timeout=10)
             if self.backup_thread.is_alive():
                 self.logger.warning("백업 스레드가 정상적으로 종료되지 않았습니다.")
                 return False
-        
+
         self.logger.info("✅ 자동 백업 중지됨")
         return True
 
@@ -351,7 +643,26 @@ class BackupCog(commands.Cog):
         self.bot = bot
         self.backup_system = backup_system
 
+    def cog_unload(self):
+        self.backup_system.close()
+
 async def setup(bot: commands.Bot):
     backup_system_instance = BackupSystem()
     await bot.add_cog(BackupCog(bot, backup_system_instance))
-    backup_system_instance.start_auto_backup()
\ No newline at end of file
+    backup_system_instance.start_auto_backup()
+
+# ==================== 복원 명령 ====================
+if __name__ == "__main__":
+    # python backup_cog.py restore <manifest 이름> [복원 위치]  (봇 실행 디렉터리에서, 봇을 멈춘 상태로)
+    import sys
+
+    if len(sys.argv) not in (3, 4) or sys.argv[1] != "restore":
+        print("사용법: python backup_cog.py restore <backup_YYYYMMDD_HHMMSS.json> [복원 위치]")
+        sys.exit(2)
+    system = BackupSystem()
+    try:
+        ok, message = system.restore_backup(sys.argv[2], Path(sys.argv[3]) if len(sys.argv) == 4 else None)
+    finally:
+        system.close()
+    print(("✅ " if ok else "❌ ") + message)
+    sys.exit(0 if ok else 1)
\ No newline at end of file
@@ -64,52 +64,15 @@ class BirthdayCog(commands.Cog):
             for guild in self.bot.guilds:
                 db = db_cog.get_manager(guild.id)
                 if db:
-                    db.create_table(
-                        "user_birthdays",
-                        """
-                        user_id TEXT NOT NULL,
-                        year INTEGER,
-                        month INTEGER,
-                        day INTEGER,
-                        is_public INTEGER,
-                        PRIMARY KEY (user_id)
-                        """
-                    )
-                    db.create_table(
-                        "birthday_config",
-                        """
-                        key TEXT PRIMARY KEY,
-                        value TEXT
-                        """
-                    )
+                    db.apply_migrations("birthday")
 
     def get_db(self, guild_id: int):
-        """프로젝트 표준 규격에 맞춘 안전한 길드 컨텍스트 DB 매니저 획득 + 실시간 인프라 보장"""
+        """프로젝트 표준 규격에 맞춘 안전한 길드 컨텍스트 DB 매니저 획득 (스키마는 매니저 생성 시 마이그레이션으로 보장)"""
         db_cog = self.bot.get_cog("DatabaseManager")
         if not db_cog:
             return None
             
-        db = db_cog.get_manager(guild_id)
-        if db:
-            db.create_table(
-                "user_birthdays",
-                """
-                user_id TEXT NOT NULL,
-                year INTEGER,
-                month INTEGER,
-                day INTEGER,
-                is_public INTEGER,
-                PRIMARY KEY (user_id)
-                """
-            )
-            db.create_table(
-                "birthday_config",
-                """
-                key TEXT PRIMARY KEY,
-                value TEXT
-                """
-            )
-        return db
+        return db_cog.get_manager(guild_id)
 
     def cog_unload(self):
         self.birthday_check_loop.cancel()
@@ -166,7 +129,7 @@ class BirthdayCog(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def set_birthday_channel(self, interaction: discord.Interaction):
         db = self.get_db(interaction.guild_id)
-        if not db or not db.get_user(str(interaction.user.id)):
+        if not db or not db.is_registered(str(interaction.user.id)):
             return await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             
         await interaction.response.defer(ephemeral=True)
@@ -199,7 +162,7 @@ class BirthdayCog(commands.Cog):
         공개유무: bool
     ):
         db = self.get_db(interaction.guild_id)
-        if not db or not db.get_user(str(interaction.user.id)):
+        if not db or not db.is_registered(str(interaction.user.id)):
             return await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             
         await interaction.response.defer(ephemeral=True)
@@ -15,11 +15,7 @@ try:
 except ImportError:
     STATS_AVAILABLE = False
 
-try:
-    import point_manager
-    POINT_MANAGER_AVAILABLE = True
-except ImportError:
-    POINT_MANAGER_AVAILABLE = False
+from point_service import point_service
 
 # 상수 설정
 MAX_BET = 6000              # 최대 배팅금: 6천 원
@@ -43,10 +39,10 @@ CARD_DECK = {
 }
 CARD_BACK = ('???')
 
-def record_blackjack_game(user_id: str, username: str, bet: int, payout: int, is_win: bool):
+def record_blackjack_game(guild_id, user_id: str, username: str, bet: int, payout: int, is_win: bool, is_multi: bool = False):
     if STATS_AVAILABLE:
         try:
-            stats_manager.record_game(user_id, username, "blackjack", bet, payout, is_win)
+            stats_manager.record_game(user_id, username, "blackjack", bet, payout, is_win, guild_id=guild_id, is_multi=is_multi)
         except: pass
 
 class BlackjackGame:
@@ -140,17 +136,14 @@ class BlackjackModeSelectView(View):
 
     @discord.ui.button(label="🤖 싱글 모드", style=discord.ButtonStyle.secondary, emoji="👤")
     async def single_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if POINT_MANAGER_AVAILABLE:
-            p_bal = await point_manager.get_point(self.bot, interaction.guild_id, str(self.user.id))
-            if p_bal < self.bet:
-                self.cog.processing_users.discard(self.user.id)
-                return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
-            
-            # 실제 포인트 차감 수행
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), -self.bet)
+        # 배팅 홀드 (배팅금은 여기서 바로 차감, 실패 시 환불)
+        hold = await point_service.reserve_bet(interaction.guild_id, self.user.id, self.bet, "블랙잭")
+        if not hold:
+            self.cog.processing_users.discard(self.user.id)
+            return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
     
         # 게임 뷰 생성 및 시작
-        view = BlackjackView(self.cog, self.user, self.bet, self.bot)
+        view = BlackjackView(self.cog, self.user, self.bet, self.bot, hold)
         embed = view.create_game_embed()
 
         if view.game.is_blackjack(view.game.player_cards):
@@ -201,41 +194,34 @@ class MultiSetupView(View):
             if target.id in self.cog.processing_users:
                 return await inter.response.send_message("❌ 상대방이 이미 다른 게임을 진행 중입니다.", ephemeral=True)
             
-            # 두 명 포인트 선차감 (먹튀 방지)
-            if POINT_MANAGER_AVAILABLE:
-                p1_bal = await point_manager.get_point(self.bot, inter.guild_id, str(self.user.id))
-                p2_bal = await point_manager.get_point(self.bot, inter.guild_id, str(target.id))
-                
-                # --- 수정된 부분: None 값을 0으로 변환 ---
-                p1_bal = p1_bal if p1_bal is not None else 0
-                p2_bal = p2_bal if p2_bal is not None else 0
-                # --------------------------------------
-
-                if p1_bal < self.bet or p2_bal < self.bet:
-                    # 에러 발생 시 processing_users에서 사용자 제거
-                    self.cog.processing_users.discard(self.user.id)
-                    return await inter.response.send_message("❌ 참가자 중 잔액이 부족한 사람이 있습니다.", ephemeral=True)
-                
-                await point_manager.add_point(self.bot, inter.guild_id, str(self.user.id), -self.bet)
-                
-                # 타겟도 게임 시작 전에 processing_users에 추가
-                self.cog.processing_users.add(target.id)
-                await point_manager.add_point(self.bot, inter.guild_id, str(target.id), -self.bet)
-
-            await self.start_game(inter, target)
+            # 두 명 배팅 홀드 (먹튀 방지)
+            p1_hold = await point_service.reserve_bet(inter.guild_id, self.user.id, self.bet, "블랙잭")
+            p2_hold = await point_service.reserve_bet(inter.guild_id, target.id, self.bet, "블랙잭") if p1_hold else None
+            if not p1_hold or not p2_hold:
+                # 에러 발생 시 processing_users에서 사용자 제거
+                await point_service.refund(p1_hold)
+                self.cog.processing_users.discard(self.user.id)
+                return await inter.response.send_message("❌ 참가자 중 잔액이 부족한 사람이 있습니다.", ephemeral=True)
+            
+            # 타겟도 게임 시작 전에 processing_users에 추가
+            self.cog.processing_users.add(target.id)
+
+            await self.start_game(inter, target, [p1_hold, p2_hold])
         
         view = View(); user_select.callback = callback; view.add_item(user_select)
         await interaction.response.edit_message(content="상대를 지목해주세요.", embed=None, view=view)
 
     @discord.ui.button(label="🔓 공개 대전 (아무나)", style=discord.ButtonStyle.success)
     async def public_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # 방장 포인트만 먼저 차감
-        if POINT_MANAGER_AVAILABLE:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), -self.bet)
-        await self.start_game(interaction, None)
-
-    async def start_game(self, interaction, target):
-        view = MultiBlackjackView(self.cog, self.bot, self.user, self.bet, target)
+        # 방장 배팅만 먼저 홀드
+        p1_hold = await point_service.reserve_bet(interaction.guild_id, self.user.id, self.bet, "블랙잭")
+        if not p1_hold:
+            self.cog.processing_users.discard(self.user.id)
+            return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
+        await self.start_game(interaction, None, [p1_hold])
+
+    async def start_game(self, interaction, target, holds):
+        view = MultiBlackjackView(self.cog, self.bot, self.user, self.bet, target, holds)
         embed = discord.Embed(title="🃏 1:1 블랙잭 대결", color=discord.Color.gold())
         embed.add_field(name="P1", value=self.user.mention); embed.add_field(name="P2", value=target.mention if target else "대기 중...")
         embed.set_footer(text="참가자는 아래 버튼을 눌러 게임을 진행하세요!")
@@ -249,7 +235,7 @@ class MultiSetupView(View):
             return await interaction.response.send_message("❌ 당신은 이 게임의 상대방이 아닙니다.", ephemeral=True)
 
         # 2. [핵심] 수락한 사람의 잔액을 실시간으로 확인
-        p2_bal = await point_manager.get_point(self.bot, interaction.guild_id, str(self.p2.id))
+        p2_bal = await point_service.get_balance(interaction.guild_id, self.p2.id)
     
         if p2_bal < self.bet:
             # 돈이 부족하면 게임을 시작하지 않고 종료
@@ -265,9 +251,10 @@ class MultiSetupView(View):
 
 # 멀티 블랙잭 View
 class MultiBlackjackView(View):
-    def __init__(self, cog, bot, p1, bet, p2=None):
+    def __init__(self, cog, bot, p1, bet, p2=None, holds=None):
         super().__init__(timeout=60)
         self.cog, self.bot, self.p1, self.bet, self.p2 = cog, bot, p1, bet, p2
+        self.holds = list(holds or [])  # 참가자별 배팅 홀드
         self.game_completed = False
         self.game = BlackjackGame(bet) 
         self.p1_cards = [self.game.draw_card(), self.game.draw_card()]
@@ -282,11 +269,11 @@ class MultiBlackjackView(View):
         self.cog.processing_users.discard(self.p1.id)
         if self.p2: self.cog.processing_users.discard(self.p2.id)
         
-        if POINT_MANAGER_AVAILABLE and self.message:
+        # 타임아웃 시 배팅 홀드 해제 (수수료 없이 100% 환불)
+        for hold in self.holds:
+            await point_service.refund(hold)
+        if self.message:
             try:
-                # 타임아웃 시 배팅금 환불 (수수료 없이 100% 환불)
-                await point_manager.add_point(self.bot, self.message.guild.id, str(self.p1.id), self.bet)
-                if self.p2: await point_manager.add_point(self.bot, self.message.guild.id, str(self.p2.id), self.bet)
                 await self.message.edit(content="⏰ 시간 초과로 게임이 무효화되어 환불되었습니다.", embed=None, view=None)
             except: pass
         self.stop()
@@ -304,13 +291,12 @@ class MultiBlackjackView(View):
                 await interaction.response.send_message("❌ 이미 다른 게임을 진행 중입니다.", ephemeral=True)
                 return False
 
-            if POINT_MANAGER_AVAILABLE:
-                bal = await point_manager.get_point(self.bot, interaction.guild_id, str(user.id))
-                if (bal or 0) < self.bet:
-                    await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
-                    return False
-                await point_manager.add_point(self.bot, interaction.guild_id, str(user.id), -self.bet)
+            hold = await point_service.reserve_bet(interaction.guild_id, user.id, self.bet, "블랙잭")
+            if not hold:
+                await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
+                return False
         
+            self.holds.append(hold)
             self.p2 = user
             self.p2_cards = [self.game.draw_card(), self.game.draw_card()]
             self.cog.processing_users.add(user.id)
@@ -374,7 +360,6 @@ class MultiBlackjackView(View):
         self.game_completed = True
         v1 = self.game.calculate_hand_value(self.p1_cards)
         v2 = self.game.calculate_hand_value(self.p2_cards)
-        guild_id = self.message.guild.id
         
         winner, p1_payout, p2_payout = None, 0, 0
         
@@ -388,21 +373,21 @@ class MultiBlackjackView(View):
 
         if winner:
             reward = int((self.bet * 2) * WINNER_RETENTION)
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, guild_id, str(winner.id), reward)
             reward_msg = f"💰 {winner.mention} 승리! **{reward:,}원** 획득!\n*20%의 딜러비가 차감된 후 지급됩니다."
             if winner.id == self.p1.id: p1_payout = reward
             else: p2_payout = reward
         else:
             refund = int(self.bet * PUSH_RETENTION)
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, guild_id, str(self.p1.id), refund)
-                await point_manager.add_point(self.bot, guild_id, str(self.p2.id), refund)
             reward_msg = f"🤝 무승부! **{refund:,}원**이 환불되었습니다.\n*20%의 딜러비가 차감된 후 지급됩니다."
             p1_payout = p2_payout = refund
 
-        record_blackjack_game(str(self.p1.id), self.p1.display_name, self.bet, p1_payout, winner == self.p1)
-        record_blackjack_game(str(self.p2.id), self.p2.display_name, self.bet, p2_payout, winner == self.p2)
+        # 두 참가자 정산을 한 트랜잭션으로 기록
+        payouts = {str(self.p1.id): p1_payout, str(self.p2.id): p2_payout}
+        await point_service.settle_round([(h, payouts[h.user_id]) for h in self.holds], f"블랙잭 멀티 ({v1} vs {v2})")
+
+        guild_id = self.p1.guild.id
+        record_blackjack_game(guild_id, str(self.p1.id), self.p1.display_name, self.bet, p1_payout, winner == self.p1, is_multi=True)
+        record_blackjack_game(guild_id, str(self.p2.id), self.p2.display_name, self.bet, p2_payout, winner == self.p2, is_multi=True)
 
         final_embed = discord.Embed(title="🏁 게임 종료", description=f"**{result}**\n{reward_msg}\n\n"
                                                                   f"{self.p1.mention}: {v1}점\n{self.p2.mention}: {v2}점", 
@@ -416,10 +401,11 @@ class MultiBlackjackView(View):
 
 # 싱글 블랙잭 View
 class BlackjackView(View):
-    def __init__(self, cog, user: discord.User, bet: int, bot: commands.Bot):
+    def __init__(self, cog, user: discord.User, bet: int, bot: commands.Bot, hold=None):
         super().__init__(timeout=120)
         self.cog = cog  
         self.user, self.bet, self.bot = user, bet, bot
+        self.hold = hold
         self.game = BlackjackGame(bet)
         self.message = None
 
@@ -431,10 +417,10 @@ class BlackjackView(View):
         # 1. 중복 방지 세션 해제
         self.cog.processing_users.discard(self.user.id)
         
-        # 2. 타임아웃 시 배팅금 환불
-        if POINT_MANAGER_AVAILABLE and self.message:
+        # 2. 타임아웃 시 배팅 홀드 해제
+        await point_service.refund(self.hold)
+        if self.message:
             try:
-                await point_manager.add_point(self.bot, self.message.guild.id, str(self.user.id), self.bet)
                 await self.message.edit(content=f"⏰ 시간 초과로 게임이 무효화되어 **{self.bet:,}원**이 환불되었습니다.", embed=None, view=None)
             except: pass
         self.stop()
@@ -488,11 +474,10 @@ class BlackjackView(View):
             # 무승부 (배팅금 그대로 환불받고 싶다면 PUSH_RETENTION을 1.0으로 수정 필요)
             payout = int(self.bet * PUSH_RETENTION)
 
-        # 3. 포인트 지급 (실제 지급은 여기서 딱 한 번만!)
-        if POINT_MANAGER_AVAILABLE and payout > 0:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), payout)
+        # 3. 정산 (배팅금은 홀드 때 이미 차감, 지급액만 여기서 한 번 기록)
+        await point_service.settle(self.hold, payout, f"블랙잭 {self.game.result}")
 
-        record_blackjack_game(str(self.user.id), self.user.display_name, self.bet, payout, is_win)
+        record_blackjack_game(self.hold.guild_id, str(self.user.id), self.user.display_name, self.bet, payout, is_win)
 
         final_embed = self.create_game_embed(final=True)
         result_text = f"{self.game.result.upper()} (정산: {payout:,}원)\n*20%의 딜러비가 차감된 후 지급됩니다."
@@ -527,7 +512,7 @@ class BlackjackCog(commands.Cog):
         db_cog = self.bot.get_cog("DatabaseManager")
         db = db_cog.get_manager(interaction.guild.id) if db_cog else None
         
-        if not db or not db.get_user(str(interaction.user.id)):
+        if not db or not db.is_registered(str(interaction.user.id)):
             return await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             
         # 1. 중앙 설정 Cog(ChannelConfig) 가져오기
@@ -555,7 +540,7 @@ class BlackjackCog(commands.Cog):
             return await interaction.response.send_message("❌ 이미 블랙잭 게임을 플레이 중입니다.", ephemeral=True)
         
         # 잔액 체크
-        balance = await point_manager.get_point(self.bot, interaction.guild_id, str(user_id))
+        balance = await point_service.get_balance(interaction.guild_id, user_id)
         if balance < 배팅:
             return await interaction.response.send_message(f"❌ 잔액이 부족합니다. (보유: {balance:,}원)", ephemeral=True)
 
@@ -3,16 +3,33 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
-from database_manager import DatabaseManager
+from typing import Dict, FrozenSet
+from database_manager import DatabaseManager, get_guild_db_manager
 
 logger = logging.getLogger("channel_config")
 
 class ChannelConfig(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    def get_db(self, guild_id: int):
-        return DatabaseManager(f"database/{guild_id}.db")
+        # 길드별 {기능: 허용 채널 ID 집합} (최초 조회 시 한 번 로드, 설정 변경 시 무효화)
+        self._permission_cache: Dict[str, Dict[str, FrozenSet[str]]] = {}
+
+    def get_db(self, guild_id: int) -> DatabaseManager:
+        return get_guild_db_manager(guild_id)
+
+    def _load_permissions(self, guild_id: int) -> Dict[str, FrozenSet[str]]:
+        """channel_configs 전체를 한 번 읽어 기능별 허용 채널 집합을 만듭니다."""
+        rows = self.get_db(guild_id).execute_query("SELECT channel_id, feature_type FROM channel_configs", (), 'all') or []
+        grouped: Dict[str, set] = {}
+        for row in rows:
+            grouped.setdefault(row['feature_type'], set()).add(str(row['channel_id']))
+        permissions = {feature: frozenset(channels) for feature, channels in grouped.items()}
+        self._permission_cache[str(guild_id)] = permissions
+        return permissions
+
+    def invalidate_permissions(self, guild_id: int):
+        """채널 설정이 바뀐 길드의 캐시를 버립니다. (다음 조회 시 다시 로드)"""
+        self._permission_cache.pop(str(guild_id), None)
 
     # 공통 선택지 정의
     feature_choices = [
@@ -56,6 +73,7 @@ class ChannelConfig(commands.Cog):
             else:
                 db.execute_query("DELETE FROM channel_configs WHERE channel_id = ? AND feature_type = ?", (str(target_ch.id), 기능.value))
                 msg = f"❌ {target_ch.mention}에서 더 이상 **{기능.name}** 기능을 사용할 수 없습니다."
+            self.invalidate_permissions(interaction.guild.id)
             
             await interaction.response.send_message(msg, ephemeral=True)
         except Exception as e:
@@ -86,6 +104,7 @@ class ChannelConfig(commands.Cog):
                     db.execute_query("DELETE FROM channel_configs WHERE channel_id = ? AND feature_type = ?", (str(channel.id), 기능.value))
                 count += 1
             except: continue
+        self.invalidate_permissions(interaction.guild.id)
 
         action = "활성화" if 상태 else "비활성화"
         await interaction.followup.send(f"📂 **{카테고리.name}** 카테고리 내 {count}개 채널에 **{기능.name}** 기능을 {action}했습니다.")
@@ -119,10 +138,11 @@ class ChannelConfig(commands.Cog):
 
         # --- 2. 초기화 버튼 뷰 정의 ---
         class ResetControlView(discord.ui.View):
-            def __init__(self, db_manager, original_user):
+            def __init__(self, db_manager, original_user, on_reset):
                 super().__init__(timeout=60)
                 self.db = db_manager
                 self.original_user = original_user
+                self.on_reset = on_reset
 
             @discord.ui.button(label="전체 초기화", style=discord.ButtonStyle.danger, emoji="⚠️")
             async def reset_button(self, btn_interaction: discord.Interaction, button: discord.ui.Button):
@@ -133,6 +153,7 @@ class ChannelConfig(commands.Cog):
                 try:
                     # 해당 서버의 모든 설정 삭제
                     self.db.execute_query("DELETE FROM channel_configs")
+                    self.on_reset()
                     await btn_interaction.response.edit_message(
                         content="✅ **서버 설정 초기화 완료**\n이제 모든 채널에서 기능을 사용할 수 있습니다.", 
                         embed=None, 
@@ -143,27 +164,84 @@ class ChannelConfig(commands.Cog):
                     await btn_interaction.response.edit_message(content="❌ 초기화 중 데이터베이스 오류가 발생했습니다.", view=None)
 
         # 뷰 생성 시 DB 매니저와 유저 정보 전달
-        view = ResetControlView(db, interaction.user)
+        view = ResetControlView(db, interaction.user, lambda: self.invalidate_permissions(interaction.guild.id))
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     async def check_permission(self, channel_id: int, feature_type: str, guild_id: int) -> bool:
-        db = self.get_db(guild_id)
-        # 1. 해당 서버에 이 기능에 대해 등록된 채널이 하나라도 있는지 확인
-        total_setup = db.execute_query(
-            "SELECT COUNT(*) FROM channel_configs WHERE feature_type = ?", 
-            (feature_type,), 'one'
-        )[0]
-    
-        # 2. 등록된 채널이 0개라면 "모든 채널 허용"으로 간주하여 True 반환
-        if total_setup == 0:
-            return True
-        
-        # 3. 등록된 채널이 있다면, 현재 채널이 그 중 하나인지 확인
-        result = db.execute_query(
-            "SELECT 1 FROM channel_configs WHERE channel_id = ? AND feature_type = ?", 
-            (str(channel_id), feature_type), 'one'
-        )
-        return bool(result)
+        permissions = self._permission_cache.get(str(guild_id))
+        if permissions is None:
+            permissions = self._load_permissions(guild_id)
+
+        # 등록된 채널이 0개라면 "모든 채널 허용", 있다면 현재 채널이 그 중 하나인지 확인
+        allowed = permissions.get(feature_type)
+        return not allowed or str(channel_id) in allowed
 
 async def setup(bot):
-    await bot.add_cog(ChannelConfig(bot))
\ No newline at end of file
+    await bot.add_cog(ChannelConfig(bot))
+
+# ==================== 벤치마크 ====================
+if __name__ == "__main__":
+    # python channel_config.py  →  명령어 1회당 권한 확인 비용 비교 (임시 디렉터리에서 실행)
+    import asyncio
+    import os
+    import sqlite3
+    import tempfile
+    import timeit
+
+    os.chdir(tempfile.mkdtemp(prefix="channel_config_bench_"))
+    guild_id = 1234
+    cog = ChannelConfig(bot=None)
+    db = cog.get_db(guild_id)
+    for i in range(200):
+        db.execute_query("INSERT OR IGNORE INTO channel_configs (channel_id, feature_type) VALUES (?, ?)", (str(1000 + i), "slot" if i % 2 else "dice"))
+
+    # 이전 구현은 설정도 엉뚱한 파일(data/guilds/database/<id>.db.db)에 쓰고 읽었으므로 같은 행을 그 파일에 둠
+    # (지금의 DatabaseManager는 마이그레이션 확인을 프로세스당 한 번만 하므로 이전 비용을 재현하지 못함)
+    legacy_path = os.path.join("data", "guilds", "database", f"{guild_id}.db.db")
+    os.makedirs(os.path.dirname(legacy_path), exist_ok=True)
+    with sqlite3.connect(legacy_path) as seed:
+        seed.execute("CREATE TABLE IF NOT EXISTS channel_configs (channel_id TEXT NOT NULL, feature_type TEXT NOT NULL, PRIMARY KEY (channel_id, feature_type))")
+        seed.executemany("INSERT OR IGNORE INTO channel_configs (channel_id, feature_type) VALUES (?, ?)",
+                         [(str(1000 + i), "slot" if i % 2 else "dice") for i in range(200)])
+    # 이전 DatabaseManager 생성자가 매번 실행하던 20개 테이블의 CREATE TABLE IF NOT EXISTS (테이블마다 커밋)
+    legacy_tables = ["users", "settings", "attendance", "enhancement", "point_history", "user_xp", "leaderboard_settings",
+                     "voice_time", "voice_time_log", "levelup_channels", "log_settings", "exit_logs", "server_settings",
+                     "anonymous_messages", "channel_configs", "fishing_ground", "fishing_inventory", "fishing_gear",
+                     "fishing_facilities", "sticky_memos"]
+    with sqlite3.connect(db.db_path) as schema_conn:
+        schema = dict(schema_conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+    legacy_ddl = [schema[t].replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1) for t in legacy_tables if t in schema]
+
+    def legacy_check(channel_id: int, feature_type: str) -> bool:
+        # 이전 구현 재현: 호출마다 새 연결 + 스키마 생성/컬럼 확인(PRAGMA table_info) + COUNT(*) + 단건 조회
+        # (생성자가 남기던 로그 21줄은 빠져 있으므로 실제 이전 비용보다 작게 나옴)
+        conn = sqlite3.connect(legacy_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                conn.execute("PRAGMA foreign_keys = ON")
+            for ddl in legacy_ddl:
+                with conn:
+                    conn.execute(ddl)
+                    conn.commit()
+            with conn:
+                conn.execute("PRAGMA table_info(users)").fetchall()
+                conn.execute("PRAGMA table_info(user_xp)").fetchall()
+                conn.commit()
+            with conn:
+                total = conn.execute("SELECT COUNT(*) FROM channel_configs WHERE feature_type = ?", (feature_type,)).fetchone()[0]
+            if total == 0:
+                return True
+            with conn:
+                return bool(conn.execute("SELECT 1 FROM channel_configs WHERE channel_id = ? AND feature_type = ?", (str(channel_id), feature_type)).fetchone())
+        finally:
+            conn.close()
+
+    loop = asyncio.new_event_loop()
+    cached_check = lambda: loop.run_until_complete(cog.check_permission(1001, "slot", guild_id))
+    cached_check()  # 캐시 적재
+
+    for name, func, number in (("이전 (매번 DB)", lambda: legacy_check(1001, "slot"), 200), ("캐시 (set 조회)", cached_check, 20000)):
+        per_call = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print(f"⏱️ {name}: {per_call * 1e6:,.1f} µs/회")
+    loop.close()
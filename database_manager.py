@@ -4,11 +4,17 @@ import sqlite3
 import os
 import logging
 import threading
-from typing import Dict, List, Optional, Literal, Union
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Literal, Set, Union
 import math
 from datetime import date, timedelta
 from pathlib import Path
-from discord.ext import commands
+from discord.ext import commands, tasks
+import schema_migrations
+import ledger
 
 # ✅ 기본 리더보드 설정 (다른 모듈에서 참조 가능)
 DEFAULT_LEADERBOARD_SETTINGS = {
@@ -26,6 +32,19 @@ DEFAULT_LEADERBOARD_SETTINGS = {
     "last_leaderboard_update": None    # 마지막 업데이트 시간 (ISO 형식)
 }
 
+# ✅ SQLite 연결 설정 (data/guilds/<id>.db 공통)
+SQLITE_BUSY_TIMEOUT = 5.0              # 잠금 충돌(SQLITE_BUSY) 시 즉시 실패하지 않고 대기할 시간(초)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",             # 읽기(리더보드)와 쓰기(음성 XP)가 서로를 막지 않음
+    "synchronous": "NORMAL",           # WAL 모드에서는 NORMAL로도 안전하며 커밋마다 fsync 하지 않음
+    "busy_timeout": int(SQLITE_BUSY_TIMEOUT * 1000),
+    "cache_size": -8000,               # 페이지 캐시 약 8MB (음수 = KiB 단위)
+    "mmap_size": 64 * 1024 * 1024,     # 64MB 메모리 맵 읽기
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+IDLE_CONNECTION_SECONDS = 600          # 이 시간 동안 쓰이지 않은 길드 연결은 정리
+
 # ✅ 로깅 설정
 def setup_logging():
     """데이터베이스 매니저 전용 로깅 설정"""
@@ -59,13 +78,22 @@ class DatabaseManager:
         self.guild_id = guild_id
         self.db_path = self._get_db_path(guild_id)
         self.thread_local = threading.local()
+        # 스레드별 연결 추적 (레지스트리 통계 및 종료 시 정리용)
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        self._last_used = time.monotonic()
+        # 비동기 API 전용 워커 스레드 (첫 호출 시 생성, 자체 스레드-로컬 연결 사용)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # 등록 사용자 인덱스 (최초 조회 시 users 테이블에서 한 번 로드, create_user/delete_user가 갱신)
+        self._registered_users: Optional[Set[str]] = None
+        self._registered_lock = threading.Lock()
+        self._registered_lookups = 0
+        self._registered_loads = 0
         
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        # 데이터베이스 초기화 및 테이블 생성
-        with self.get_connection() as conn:
-            conn.execute('PRAGMA foreign_keys = ON')
-        
+        # 데이터베이스 초기화 및 테이블 생성 (연결 설정은 get_connection에서 적용)
         self._create_tables()
         logger.info(f"✅ 데이터베이스 매니저 초기화 완료: {self.db_path}")
 
@@ -80,15 +108,90 @@ class DatabaseManager:
         ✅ 스레드 안전성을 위한 스레드-로컬 데이터베이스 연결을 가져옵니다.
         연결이 없으면 새로 생성하고, 있으면 기존 연결을 반환합니다.
         """
+        self._last_used = time.monotonic()
         if not hasattr(self.thread_local, 'conn') or self.thread_local.conn is None:
             try:
-                self.thread_local.conn = sqlite3.connect(self.db_path)
-                self.thread_local.conn.row_factory = sqlite3.Row
+                # check_same_thread=False: 종료된 스레드가 남긴 연결을 다른 스레드에서 정리하기 위함 (공유 사용은 하지 않음)
+                conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                self._configure_connection(conn)
+                self.thread_local.conn = conn
+                with self._connections_lock:
+                    self._connections[threading.get_ident()] = conn
                 logger.debug(f"새로운 DB 연결 생성: {self.db_path} (스레드: {threading.get_ident()})")
             except sqlite3.Error as e:
                 logger.error(f"❌ DB 연결 실패: {e}", exc_info=True)
                 raise  # 연결 실패 시 예외를 다시 발생시켜 호출자에게 알림
         return self.thread_local.conn
+
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """WAL 모드 및 성능 관련 PRAGMA 적용"""
+        for pragma, value in SQLITE_PRAGMAS.items():
+            try:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ PRAGMA {pragma} 적용 실패 ({self.db_path}): {e}")
+
+    def close_connection(self):
+        """현재 스레드의 연결을 닫습니다. (다음 사용 시 자동으로 다시 열림)"""
+        conn = getattr(self.thread_local, 'conn', None)
+        if conn is None:
+            return
+        self.thread_local.conn = None
+        with self._connections_lock:
+            self._connections.pop(threading.get_ident(), None)
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ DB 연결 종료 실패 ({self.db_path}): {e}")
+
+    def _close_dead_thread_connections(self):
+        """종료된 스레드가 남긴 연결 정리"""
+        alive = {t.ident for t in threading.enumerate()}
+        with self._connections_lock:
+            dead = [tid for tid in self._connections if tid not in alive]
+            conns = [self._connections.pop(tid) for tid in dead]
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def checkpoint(self, mode: str = "TRUNCATE"):
+        """WAL 내용을 본 DB 파일에 반영합니다."""
+        try:
+            self.get_connection().execute(f"PRAGMA wal_checkpoint({mode})")
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ WAL 체크포인트 실패 ({self.db_path}): {e}")
+
+    def close_all_connections(self, checkpoint: bool = False):
+        """
+        ✅ 이 매니저의 모든 연결을 닫습니다. (이벤트 루프 스레드에서 호출)
+        워커 스레드의 연결은 워커 안에서 닫히도록 작업을 넘깁니다.
+        """
+        if checkpoint:
+            self.checkpoint()
+        with self._executor_lock:
+            executor = self._executor
+        if executor is not None:
+            try:
+                executor.submit(self.close_connection)
+            except RuntimeError:
+                pass  # 이미 종료된 실행기
+        self.close_connection()
+        self._close_dead_thread_connections()
+
+    def close_if_idle(self, idle_seconds: float = IDLE_CONNECTION_SECONDS) -> bool:
+        """마지막 사용 후 idle_seconds가 지났으면 연결을 정리합니다."""
+        if self.get_connection_count() == 0 or time.monotonic() - self._last_used < idle_seconds:
+            return False
+        self.close_all_connections()
+        return True
+
+    def get_connection_count(self) -> int:
+        """현재 열려 있는 스레드별 연결 수"""
+        with self._connections_lock:
+            return len(self._connections)
     
     def create_table(self, table_name: str, schema: str):
         """
@@ -105,305 +208,27 @@ class DatabaseManager:
             return False
 
     def _create_tables(self):
-        """테이블 생성 및 스키마 표준화 완료 (중복 및 인덴트 오류 완벽 제거)"""
-        
-        # 1. 시스템 핵심 테이블 생성
-        self.create_table(
-            "users",
-            """
-            user_id TEXT NOT NULL,
-            guild_id TEXT NOT NULL,
-            username TEXT DEFAULT '',
-            display_name TEXT DEFAULT '',
-            cash INTEGER DEFAULT 0,
-            bank INTEGER DEFAULT 0,
-            fishing_reputation INTEGER DEFAULT 0,
-            max_fish_length REAL DEFAULT 0.0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (user_id, guild_id)
-            """
-        )
-
-        self.create_table(
-            "settings",
-            """
-            key TEXT PRIMARY KEY,
-            value TEXT
-            """
-        )
-
-        self.create_table(
-            "attendance",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            attendance_date DATE NOT NULL,
-            streak_count INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, attendance_date)
-            """
-        )
-
-        self.create_table(
-            "enhancement",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            level INTEGER DEFAULT 0,
-            success_count INTEGER DEFAULT 0,
-            fail_count INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id)
-            """
-        )
-
-        self.create_table(
-            "point_history",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            transaction_type TEXT NOT NULL,
-            amount INTEGER NOT NULL,
-            balance_after INTEGER NOT NULL,
-            description TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "user_xp",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            guild_id TEXT NOT NULL,
-            xp INTEGER DEFAULT 0,
-            level INTEGER DEFAULT 1,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, guild_id)
-            """
-        )
-
-        self.create_table(
-            "leaderboard_settings",
-            """
-            guild_id TEXT NOT NULL PRIMARY KEY,
-            attendance_cash INTEGER DEFAULT 3000,
-            attendance_xp INTEGER DEFAULT 100,
-            streak_cash_per_day INTEGER DEFAULT 100,
-            streak_xp_per_day INTEGER DEFAULT 10,
-            max_streak_bonus_days INTEGER DEFAULT 30,
-            weekly_cash_bonus INTEGER DEFAULT 1000,
-            weekly_xp_bonus INTEGER DEFAULT 500,
-            monthly_cash_bonus INTEGER DEFAULT 10000,
-            monthly_xp_bonus INTEGER DEFAULT 5000,
-            gift_fee_rate REAL DEFAULT 0.1,
-            auto_update_level_channel TEXT,
-            auto_update_cash_channel TEXT,
-            last_leaderboard_update TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "voice_time",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            total_time INTEGER DEFAULT 0,
-            last_join TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id)
-            """
-        )
-
-        self.create_table(
-            "voice_time_log",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            join_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            leave_time TIMESTAMP,
-            duration_minutes INTEGER DEFAULT 0,
-            is_speaking INTEGER DEFAULT 0
-            """
-        )
-
-        self.create_table(
-            "levelup_channels",
-            """
-            channel_id TEXT NOT NULL,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "log_settings",
-            """
-            guild_id TEXT NOT NULL PRIMARY KEY,
-            channel_id TEXT NOT NULL,
-            enabled INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "exit_logs",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            guild_id TEXT NOT NULL,
-            user_id TEXT NOT NULL,
-            username TEXT,
-            display_name TEXT,
-            joined_at TEXT,
-            left_at TEXT NOT NULL,
-            server_time TEXT,
-            avatar_url TEXT,
-            is_bot INTEGER DEFAULT 0,
-            roles TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "server_settings",
-            """
-            key TEXT PRIMARY KEY,
-            value TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "anonymous_messages",
-            """
-            msg_id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            user_name TEXT NOT NULL,
-            content TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-
-        self.create_table(
-            "channel_configs",
-            """
-            channel_id TEXT NOT NULL,
-            feature_type TEXT NOT NULL,
-            PRIMARY KEY (channel_id, feature_type)
-            """
-        )
-
-        # 2. 🎣 낚시 시스템 테이블 규격 생성
-        self.create_table(
-            "fishing_ground",
-            """
-            channel_id TEXT NOT NULL,
-            guild_id TEXT NOT NULL,
-            channel_name TEXT DEFAULT '',
-            owner_id TEXT,                    
-            ground_type TEXT DEFAULT '호수',
-            ground_price INTEGER DEFAULT 100000, 
-            entry_fee INTEGER DEFAULT 0,
-            usage_time_limit INTEGER DEFAULT 1,
-            is_public INTEGER DEFAULT 1,
-            pollution INTEGER DEFAULT 0,       
-            ground_reputation INTEGER DEFAULT 0, 
-            tier INTEGER DEFAULT 1,            
-            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (channel_id, guild_id)
-            """
-        )
-
-        self.create_table(
-            "fishing_inventory",
-            """
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            guild_id TEXT NOT NULL,
-            fish_name TEXT NOT NULL,
-            length REAL NOT NULL,
-            price_per_cm INTEGER DEFAULT 100,
-            caught_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """
-        )
-        
-        self.create_table(
-            "fishing_gear",
-            """
-            user_id TEXT NOT NULL,
-            guild_id TEXT NOT NULL,
-            rod_level INTEGER DEFAULT 0,
-            rod_durability INTEGER DEFAULT 100,
-            bait_level INTEGER DEFAULT 0,
-            bait_count INTEGER DEFAULT 0,
-            PRIMARY KEY (user_id, guild_id)
-            """
-        )
+        """등록된 모든 모듈의 스키마를 버전 기반 마이그레이션으로 최신화합니다. (이미 적용된 버전은 건너뜀)"""
+        for module in schema_migrations.MIGRATIONS:
+            self.apply_migrations(module)
 
-        self.create_table(
-            "fishing_facilities",
-            """
-            channel_id TEXT NOT NULL,
-            guild_id TEXT NOT NULL,
-            facility_name TEXT NOT NULL,
-            PRIMARY KEY (channel_id, guild_id, facility_name)
-            """
-        )
-        
-        self.create_table(
-            "sticky_memos",
-            """
-            channel_id TEXT NOT NULL,
-            title TEXT,
-            content TEXT,
-            use_embed INTEGER,
-            last_msg_id TEXT,
-            PRIMARY KEY (channel_id)
-            """
-        )
+    def apply_migrations(self, module: str, dry_run: bool = False) -> List[str]:
+        """
+        ✅ 모듈의 대기 중인 스키마 마이그레이션을 적용합니다. (시작/길드 참여 시 호출)
+        한 프로세스에서 모듈별로 한 번만 DB를 확인하므로 명령어 처리 경로에서 호출해도 비용이 없습니다.
+        """
+        try:
+            migrations = schema_migrations.apply_migrations(
+                self.get_connection(), self.db_path, module, guild_id=self.guild_id, dry_run=dry_run
+            )
+            return [f"v{m.version}: {m.description}" for m in migrations]
+        except Exception as e:
+            logger.error(f"❌ [{module}] 스키마 마이그레이션 중 오류 발생: {e}")
+            return []
 
-        # 3. 데이터베이스 통합 안전 마이그레이션 검증 (구조 최적화 완료)
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            try:
-                # [users 테이블 검증]
-                cursor.execute("PRAGMA table_info(users)")
-                columns = [col[1] for col in cursor.fetchall()]
-                
-                if 'display_name' not in columns:
-                    cursor.execute("ALTER TABLE users ADD COLUMN display_name TEXT DEFAULT ''")
-                if 'cash' not in columns:
-                    cursor.execute("ALTER TABLE users ADD COLUMN cash INTEGER DEFAULT 0")
-                if 'bank' not in columns:
-                    cursor.execute("ALTER TABLE users ADD COLUMN bank INTEGER DEFAULT 0")
-                if 'fishing_reputation' not in columns:
-                    cursor.execute("ALTER TABLE users ADD COLUMN fishing_reputation INTEGER DEFAULT 0")
-                if 'max_fish_length' not in columns:
-                    cursor.execute("ALTER TABLE users ADD COLUMN max_fish_length REAL DEFAULT 0.0")
-                if 'pet_rank_score' not in columns:
-                    cursor.execute("ALTER TABLE users ADD COLUMN pet_rank_score INTEGER DEFAULT 1000")
-
-                # [user_xp 테이블 검증]
-                cursor.execute("PRAGMA table_info(user_xp)")
-                user_xp_columns = [col[1] for col in cursor.fetchall()]
-                if 'guild_id' not in user_xp_columns:
-                    cursor.execute("ALTER TABLE user_xp ADD COLUMN guild_id TEXT")
-                    cursor.execute("UPDATE user_xp SET guild_id = ? WHERE guild_id IS NULL", (self.guild_id,))
-                    try:
-                        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_user_xp_unique ON user_xp (user_id, guild_id)")
-                    except sqlite3.IntegrityError:
-                        logger.warning("⚠️ user_xp 테이블에 기존 중복 데이터가 있어 UNIQUE 제약 조건 추가를 건너뜁니다.")
-                
-                conn.commit()
-                logger.info("✅ 모든 테이블 인프라 구축 및 안전 마이그레이션 통합 검증 완료.")
-            except sqlite3.Error as e:
-                conn.rollback()
-                logger.error(f"❌ 데이터베이스 마이그레이션 초기화 중 치명적 오류 발생: {e}")
+    def get_migration_report(self) -> Dict[str, Dict]:
+        """모듈별 스키마 버전 및 대기 중인 마이그레이션 보고 (dry-run)"""
+        return schema_migrations.migration_report(self.get_connection())
 
     def get_ranked_opponents(self, guild_id, current_user_id, min_score, max_score):
         """현재 점수 범위 내의 다른 유저들을 랜덤으로 가져옴"""
@@ -442,8 +267,7 @@ class DatabaseManager:
 
             try:
                 # 사용자 조회
-                user_data = self.get_user(user_id)
-                if user_data:
+                if self.is_registered(user_id):
                     return True # 사용자가 이미 존재하면 True 반환
 
                 # 사용자 생성 (기본값으로)
@@ -482,21 +306,108 @@ class DatabaseManager:
             logger.error(f"❌ DB 쿼리 오류: {e} - 쿼리: {query}", exc_info=True)
             return None
     
+    # ==================== 비동기 실행기 ====================
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """길드 전용 DB 워커 스레드를 가져옵니다. (SQLite 쓰기 직렬화를 위해 단일 스레드)"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"db-{self.guild_id}")
+        return self._executor
+
+    async def run_in_executor(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        ✅ 동기 DB 메서드를 워커 스레드에서 실행하고 결과를 기다립니다.
+        예: `await db.run_in_executor(db.get_user, user_id)`
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+
+    async def execute(self, query: str, params: tuple = (), fetch_type: Literal['one', 'all', 'none', 'rowcount', 'count'] = 'none') -> Optional[Union[sqlite3.Row, List[sqlite3.Row], int]]:
+        """execute_query의 비동기 버전 (fetch_type 의미 동일, 이벤트 루프를 막지 않음)"""
+        return await self.run_in_executor(self.execute_query, query, params, fetch_type)
+
+    async def fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        """단일 행 조회 (비동기)"""
+        return await self.execute(query, params, 'one')
+
+    async def fetch_all(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """전체 행 조회 (비동기)"""
+        return await self.execute(query, params, 'all') or []
+
+    def shutdown_executor(self, wait: bool = True):
+        """워커 스레드를 종료합니다. 대기 중인 작업은 모두 처리된 뒤 종료됩니다."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    # ==================== 등록 사용자 인덱스 ====================
+    def _load_registered_users(self) -> Set[str]:
+        rows = self.execute_query('SELECT user_id FROM users WHERE guild_id = ?', (self.guild_id,), 'all')
+        self._registered_loads += 1
+        return {row['user_id'] for row in rows} if rows else set()
+
+    def is_registered(self, user_id: Union[str, int]) -> bool:
+        """사용자 등록 여부 확인 (메모리 인덱스 조회)"""
+        if not self.guild_id:
+            return False
+        registered = self._registered_users
+        if registered is None:
+            with self._registered_lock:
+                if self._registered_users is None:
+                    self._registered_users = self._load_registered_users()
+                registered = self._registered_users
+        self._registered_lookups += 1
+        return str(user_id) in registered
+
+    def _mark_registered(self, user_id: str, registered: bool):
+        """인덱스가 로드된 경우에만 갱신 (미로드 상태면 다음 조회 시 DB에서 로드됨)"""
+        with self._registered_lock:
+            if self._registered_users is None:
+                return
+            if registered:
+                self._registered_users.add(str(user_id))
+            else:
+                self._registered_users.discard(str(user_id))
+
+    def invalidate_registered_users(self):
+        """users 테이블을 직접 수정한 경우 인덱스를 버리고 다음 조회 시 다시 로드"""
+        with self._registered_lock:
+            self._registered_users = None
+
+    def get_registration_stats(self) -> Dict[str, Any]:
+        """등록 인덱스 통계 (크기, 조회 수, 적중률)"""
+        lookups = self._registered_lookups
+        loads = self._registered_loads
+        registered = self._registered_users
+        return {
+            'size': len(registered) if registered is not None else 0,
+            'loaded': registered is not None,
+            'lookups': lookups,
+            'loads': loads,
+            'hit_rate': (lookups - loads) / lookups if lookups else 0.0,
+        }
+
     # ==================== 사용자 관리 ====================
     def create_user(self, user_id: str, username: str = '', display_name: str = '', initial_cash: int = 0):
         if not self.guild_id:
             logger.error("❌ create_user: guild_id가 설정되지 않았습니다.")
             return False
         try:
-            self.execute_query('''
+            # execute_query는 오류를 기록하고 None을 반환하므로 삽입된 행 수로 성공 여부를 판단
+            inserted = self.execute_query('''
             INSERT INTO users (user_id, guild_id, username, display_name, cash)
             VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, self.guild_id, username, display_name, initial_cash))
-            # 예외가 없으면 성공
-            logger.info(f"[DB] 사용자 생성 성공: {user_id} - {display_name} ({initial_cash}원) (Guild: {self.guild_id})")
-            return True
-        except sqlite3.IntegrityError:
-            logger.warning(f"[DB] 이미 존재하는 사용자: {user_id} (Guild: {self.guild_id})")
+            ''', (user_id, self.guild_id, username, display_name, initial_cash), 'rowcount')
+            if inserted:
+                self._mark_registered(user_id, True)
+                logger.info(f"[DB] 사용자 생성 성공: {user_id} - {display_name} ({initial_cash}원) (Guild: {self.guild_id})")
+                return True
+            # 실패 원인 구분: 이미 있는 사용자면 색인만 맞춰 둠
+            if self.execute_query('SELECT 1 FROM users WHERE user_id = ? AND guild_id = ?', (user_id, self.guild_id), 'one'):
+                self._mark_registered(user_id, True)
+                logger.warning(f"[DB] 이미 존재하는 사용자: {user_id} (Guild: {self.guild_id})")
             return False
         except Exception as e:
             logger.error(f"[DB] 사용자 생성 중 오류: {e}")
@@ -522,18 +433,31 @@ class DatabaseManager:
         ''', (new_cash, user_id, self.guild_id))
     
     def add_user_cash(self, user_id: str, amount: int):
-        """사용자에게 현금 추가"""
+        """사용자에게 현금 추가 (증감과 결과 조회를 한 문장으로 처리하여 동시 갱신 유실 방지)"""
         if not self.guild_id:
             logger.error("❌ add_user_cash: guild_id가 설정되지 않았습니다.")
             return None
-        current_cash = self.get_user_cash(user_id)
-        if current_cash is None:
+        try:
+            with ledger.atomic(self) as conn:
+                if ledger.SUPPORTS_RETURNING:
+                    row = conn.execute(
+                        "UPDATE users SET cash = cash + ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND guild_id = ? RETURNING cash",
+                        (amount, user_id, self.guild_id)
+                    ).fetchone()
+                else:
+                    conn.execute(
+                        "UPDATE users SET cash = cash + ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND guild_id = ?",
+                        (amount, user_id, self.guild_id)
+                    )
+                    row = conn.execute("SELECT cash FROM users WHERE user_id = ? AND guild_id = ?", (user_id, self.guild_id)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"❌ add_user_cash 오류: {e}")
+            return None
+        if row is None:
             # 사용자가 없으면 생성하고 현금 추가
             self.create_user(user_id, initial_cash=amount)
             return amount
-        new_cash = current_cash + amount
-        self.update_user_cash(user_id, new_cash)
-        return new_cash
+        return row[0]
 
     def get_user_cash(self, user_id: str) -> Optional[int]:
         """사용자 현금 조회"""
@@ -573,8 +497,9 @@ class DatabaseManager:
         with self.get_connection() as conn:
             # users 테이블은 guild_id와 user_id로 삭제
             deleted_counts['users'] = self._delete_from_table(conn, 'users', user_id, self.guild_id)
+            self._mark_registered(user_id, False)
             # 나머지 테이블은 user_id로 삭제 (현재 DB가 이미 길드별로 분리되어 있으므로 guild_id는 필요 없음)
-            for table in ['user_xp', 'attendance', 'enhancement', 'point_history', 'voice_time', 'voice_time_log', 'levelup_channels']:
+            for table in ['user_xp', 'attendance', 'enhancement', 'point_history', 'voice_time', 'voice_time_log', 'voice_daily', 'levelup_channels']:
                 deleted_counts[table] = self._delete_from_table(conn, table, user_id)
         return deleted_counts
 
@@ -685,17 +610,28 @@ class DatabaseManager:
             (user_id, minutes_to_add, minutes_to_add, user_id), 'none'
         )
     
-    def log_completed_voice_session(self, user_id: str, join_time: str, leave_time: str, duration_minutes: int):
-        """세션이 종료되었을 때 한 번만 통화 기록 로그를 추가합니다."""
+    def log_completed_voice_session(self, user_id: str, join_time: str, leave_time: str, duration_minutes: int,
+                                    daily_minutes: Optional[Dict[str, int]] = None):
+        """
+        세션이 종료되었을 때 한 번만 통화 기록 로그를 추가하고 일별 집계(voice_daily)를 갱신합니다.
+        daily_minutes는 {KST 날짜: 분} 형태이며, 없으면 전체 시간을 세션 시작일에 반영합니다.
+        """
         if not self.guild_id:
             logger.error("❌ log_completed_voice_session: guild_id가 설정되지 않았습니다.")
             return False
+        if not daily_minutes:
+            daily_minutes = {schema_migrations.voice_day(join_time): duration_minutes}
+        start_day = min(daily_minutes)
         try:
             with self.get_connection() as conn:
                 conn.execute('''
-                    INSERT INTO voice_time_log (user_id, join_time, leave_time, duration_minutes)
-                    VALUES (?, ?, ?, ?)
+                    INSERT INTO voice_time_log (user_id, join_time, leave_time, duration_minutes, is_speaking)
+                    VALUES (?, ?, ?, ?, 1)
                 ''', (user_id, join_time, leave_time, duration_minutes))
+                conn.executemany('''
+                    INSERT INTO voice_daily (user_id, day, minutes, sessions) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id, day) DO UPDATE SET minutes = minutes + excluded.minutes, sessions = sessions + excluded.sessions
+                ''', [(user_id, day, minutes, 1 if day == start_day else 0) for day, minutes in daily_minutes.items()])
                 conn.commit()
                 logger.info(f"✅ 음성 세션 기록 성공: user_id={user_id}, {duration_minutes}분 (Guild: {self.guild_id})")
                 return True
@@ -883,15 +819,12 @@ class DatabaseManager:
             logger.error("❌ add_transaction: guild_id가 설정되지 않았습니다.")
             return None
             
-        balance_after = self.get_user_cash(user_id)
-        if balance_after is None:
-            balance_after = 0
-            
+        # 잔액은 같은 INSERT 안에서 서브쿼리로 채웁니다. (별도 조회 왕복 제거)
         return self.execute_query('''
             INSERT INTO point_history 
             (user_id, transaction_type, amount, balance_after, description)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, transaction_type, amount, balance_after, description))
+            VALUES (?, ?, ?, COALESCE((SELECT cash FROM users WHERE user_id = ? AND guild_id = ?), 0), ?)
+        ''', (user_id, transaction_type, amount, user_id, self.guild_id, description))
 
     def get_user_transactions(self, user_id: str, limit: int = 10) -> List[Dict]:
         """사용자 거래 내역 조회"""
@@ -1035,10 +968,58 @@ class DatabaseManager:
 
 # (기존 DatabaseManager 클래스 및 메서드들은 그대로 둡니다...)
 
+# ==================== 매니저 레지스트리 ====================
+# 프로세스 전역에서 길드당 하나의 DatabaseManager만 유지합니다. (스키마 초기화는 길드별 최초 1회)
+_manager_registry: Dict[str, DatabaseManager] = {}
+_registry_lock = threading.Lock()
+
+def get_guild_db_manager(guild_id: Union[str, int]) -> DatabaseManager:
+    """특정 길드에 대한 공유 DatabaseManager 인스턴스를 반환합니다. (없으면 지연 생성)"""
+    gid_str = str(guild_id)
+    db = _manager_registry.get(gid_str)
+    if db is None:
+        with _registry_lock:
+            db = _manager_registry.get(gid_str)
+            if db is None:
+                db = DatabaseManager(guild_id=gid_str)
+                _manager_registry[gid_str] = db
+    return db
+
+def get_loaded_managers() -> Dict[str, DatabaseManager]:
+    """현재 로드된 길드별 매니저의 스냅샷을 반환합니다."""
+    with _registry_lock:
+        return dict(_manager_registry)
+
+def get_registry_stats() -> Dict[str, Any]:
+    """레지스트리 통계 (로드된 매니저 수, 열린 연결 수, 등록 인덱스 크기/적중률)"""
+    managers = get_loaded_managers()
+    registration = [db.get_registration_stats() for db in managers.values()]
+    lookups = sum(r['lookups'] for r in registration)
+    loads = sum(r['loads'] for r in registration)
+    return {
+        'managers': len(managers),
+        'connections': sum(db.get_connection_count() for db in managers.values()),
+        'registered_users': sum(r['size'] for r in registration),
+        'registration_lookups': lookups,
+        'registration_hit_rate': (lookups - loads) / lookups if lookups else 0.0,
+    }
+
+def close_idle_managers(idle_seconds: float = IDLE_CONNECTION_SECONDS) -> int:
+    """오래 쓰이지 않은 길드의 연결을 닫고 정리한 길드 수를 반환합니다."""
+    return sum(1 for db in get_loaded_managers().values() if db.close_if_idle(idle_seconds))
+
+def shutdown_all_managers():
+    """봇 종료 시 호출: 모든 길드 DB를 체크포인트하고 연결 및 워커 스레드를 정리합니다."""
+    for gid, db in get_loaded_managers().items():
+        try:
+            db.close_all_connections(checkpoint=True)
+            db.shutdown_executor(wait=True)
+            db._close_dead_thread_connections()
+        except Exception as e:
+            logger.error(f"❌ 길드 {gid} DB 종료 처리 실패: {e}")
+    logger.info("✅ 모든 길드 DB 연결 정리 및 체크포인트 완료")
+
 # ==================== 호환성 함수들 ====================
-def get_guild_db_manager(guild_id: str) -> DatabaseManager:
-    """특정 길드에 대한 DatabaseManager 인스턴스를 반환합니다."""
-    return DatabaseManager(guild_id=guild_id)
 
 def load_points(guild_id: str) -> Dict[str, int]:
     db = get_guild_db_manager(guild_id)
@@ -1060,20 +1041,41 @@ def get_point(guild_id: str, user_id: str) -> Optional[int]:
 
 def is_registered(guild_id: str, user_id: str) -> bool:
     db = get_guild_db_manager(guild_id)
-    return db.get_user(user_id) is not None
+    return db.is_registered(user_id)
 
 
 # 1. Cog 클래스 정의
 class DatabaseCog(commands.Cog, name="DatabaseManager"):
     def __init__(self, bot):
         self.bot = bot
-        self._managers: Dict[str, DatabaseManager] = {}
+
+    async def cog_load(self):
+        self.idle_connection_reaper.start()
+
+    async def cog_unload(self):
+        self.idle_connection_reaper.cancel()
+
+    @tasks.loop(minutes=5)
+    async def idle_connection_reaper(self):
+        """유휴 길드 DB 연결 정리"""
+        closed = close_idle_managers()
+        if closed:
+            logger.info(f"🧹 유휴 DB 연결 정리: {closed}개 길드")
 
     def get_manager(self, guild_id: Union[str, int]) -> DatabaseManager:
-        gid_str = str(guild_id)
-        if gid_str not in self._managers:
-            self._managers[gid_str] = DatabaseManager(gid_str)
-        return self._managers[gid_str]
+        """공유 레지스트리에서 길드 매니저를 가져옵니다."""
+        return get_guild_db_manager(guild_id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """시작 시 모든 길드 매니저를 미리 생성하여 스키마 마이그레이션을 적용합니다."""
+        for guild in self.bot.guilds:
+            self.get_manager(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        """새 길드 참여 시 스키마 마이그레이션 적용"""
+        self.get_manager(guild.id)
     
 # 2. 봇이 확장 프로그램으로 로드할 때 사용하는 셋업 함수 (중복 제거 완료)
 async def setup(bot):
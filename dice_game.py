@@ -7,11 +7,8 @@ import random
 import asyncio
 
 # --- 시스템 연동부 ---
-try:
-    import point_manager
-    POINT_MANAGER_AVAILABLE = True
-except ImportError:
-    POINT_MANAGER_AVAILABLE = False
+from point_service import point_service
+from frame_scheduler import frame_scheduler
 
 try:
     from statistics_system import stats_manager
@@ -32,14 +29,14 @@ async def play_dice_animation(message: discord.InteractionMessage, base_embed: d
     for _ in range(3):
         current_face = random.choice(dice_faces)
         base_embed.description = f"🎲 **주사위를 굴리는 중...** {current_face}"
-        await message.edit(embed=base_embed)
+        await frame_scheduler.push(message, embed=base_embed.copy())
         await asyncio.sleep(0.5)
 
 # 통계 기록 헬퍼 함수
-def record_dice_game(user_id: str, username: str, bet: int, payout: int, is_win: bool):
+def record_dice_game(guild_id, user_id: str, username: str, bet: int, payout: int, is_win: bool, is_multi: bool = False):
     if STATS_AVAILABLE:
         try:
-            stats_manager.record_game(user_id, username, "dice_game", bet, payout, is_win)
+            stats_manager.record_game(user_id, username, "dice_game", bet, payout, is_win, guild_id=guild_id, is_multi=is_multi)
         except Exception as e:
             print(f"통계 기록 오류: {e}")
 
@@ -60,12 +57,10 @@ class DiceModeSelectView(View):
         await interaction.response.defer()
         message = await interaction.original_response()
         
-        # 포인트 차감
-        if POINT_MANAGER_AVAILABLE:
-            balance = await point_manager.get_point(self.bot, interaction.guild_id, str(self.user.id))
-            if balance < self.bet:
-                return await interaction.followup.send("❌ 잔액이 부족합니다.", ephemeral=True)
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), -self.bet)
+        # 배팅 홀드 (배팅금은 여기서 바로 차감, 실패 시 환불)
+        hold = await point_service.reserve_bet(interaction.guild_id, self.user.id, self.bet, "주사위")
+        if not hold:
+            return await interaction.followup.send("❌ 잔액이 부족합니다.", ephemeral=True)
 
         # 애니메이션 실행
         anim_embed = discord.Embed(title="🤖 주사위: 싱글 모드 (vs 봇)", color=discord.Color.blue())
@@ -87,11 +82,10 @@ class DiceModeSelectView(View):
             res_msg = "🤝 무승부!"
             payout = int(self.bet * PUSH_RETENTION) # 무승부 환불 로직 적용
 
-        # 5. 포인트 지급 및 통계 기록
-        if POINT_MANAGER_AVAILABLE and payout > 0:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), payout)
+        # 5. 정산 및 통계 기록
+        await point_service.settle(hold, payout, f"주사위 싱글 {res_msg}")
 
-        record_dice_game(str(self.user.id), self.user.display_name, self.bet, payout, is_win)
+        record_dice_game(hold.guild_id, str(self.user.id), self.user.display_name, self.bet, payout, is_win)
 
         # 6. 최종 결과 표시
         result_embed = discord.Embed(title="🎲 주사위 결과", color=discord.Color.gold() if is_win else discord.Color.red())
@@ -99,7 +93,7 @@ class DiceModeSelectView(View):
         result_embed.add_field(name=f"👤 {self.user.display_name}", value=f"{DICE_EMOJIS[user_roll]} ({user_roll})", inline=True)
         result_embed.add_field(name="🤖 봇", value=f"{DICE_EMOJIS[bot_roll]} ({bot_roll})", inline=True)
 
-        await message.edit(embed=result_embed, view=None)
+        await frame_scheduler.push(message, final=True, embed=result_embed, view=None)
 
     @discord.ui.button(label="👥 멀티 모드", style=discord.ButtonStyle.primary, emoji="⚔️")
     async def multi_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -120,22 +114,27 @@ class MultiSetupView(View):
             if target.id == self.user.id or target.bot:
                 return await inter.response.send_message("❌ 올바른 상대를 선택하세요.", ephemeral=True)
             
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, inter.guild_id, str(self.user.id), -self.bet)
-                await point_manager.add_point(self.bot, inter.guild_id, str(target.id), -self.bet)
-            await self.start_multi(inter, target)
+            p1_hold = await point_service.reserve_bet(inter.guild_id, self.user.id, self.bet, "주사위")
+            if not p1_hold:
+                return await inter.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
+            p2_hold = await point_service.reserve_bet(inter.guild_id, target.id, self.bet, "주사위")
+            if not p2_hold:
+                await point_service.refund(p1_hold)
+                return await inter.response.send_message(f"❌ {target.display_name}님의 잔액이 부족합니다.", ephemeral=True)
+            await self.start_multi(inter, target, [p1_hold, p2_hold])
         
         v = View(); user_select.callback = callback; v.add_item(user_select)
         await interaction.response.edit_message(content="상대를 선택해주세요.", embed=None, view=v)
 
     @discord.ui.button(label="🔓 공개 대전 (아무나)", style=discord.ButtonStyle.success)
     async def public_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if POINT_MANAGER_AVAILABLE:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), -self.bet)
-        await self.start_multi(interaction, None)
+        p1_hold = await point_service.reserve_bet(interaction.guild_id, self.user.id, self.bet, "주사위")
+        if not p1_hold:
+            return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
+        await self.start_multi(interaction, None, [p1_hold])
 
-    async def start_multi(self, interaction, target):
-        view = MultiDiceView(self.bot, self.user, self.bet, target)
+    async def start_multi(self, interaction, target, holds):
+        view = MultiDiceView(self.bot, self.user, self.bet, target, holds)
         embed = discord.Embed(title="⚔️ 주사위 대결", description=f"배팅액: {self.bet:,}원\n상대방이 참여하면 주사위가 굴러갑니다!", color=discord.Color.orange())
         embed.add_field(name="P1", value=self.user.mention); embed.add_field(name="P2", value=target.mention if target else "대기 중...")
         await interaction.response.edit_message(content=None, embed=embed, view=view)
@@ -148,7 +147,7 @@ class MultiSetupView(View):
             return await interaction.response.send_message("❌ 당신은 이 게임의 상대방이 아닙니다.", ephemeral=True)
 
         # 2. [핵심] 수락한 사람의 잔액을 실시간으로 확인
-        p2_bal = await point_manager.get_point(self.bot, interaction.guild_id, str(self.p2.id))
+        p2_bal = await point_service.get_balance(interaction.guild_id, self.p2.id)
     
         if p2_bal < self.bet:
             # 돈이 부족하면 게임을 시작하지 않고 종료
@@ -164,9 +163,10 @@ class MultiSetupView(View):
 
 # 멀티 주사위게임 View
 class MultiDiceView(View):
-    def __init__(self, bot, p1, bet, p2=None):
+    def __init__(self, bot, p1, bet, p2=None, holds=None):
         super().__init__(timeout=60)
         self.bot, self.p1, self.bet, self.p2 = bot, p1, bet, p2
+        self.holds = list(holds or [])  # 참가자별 배팅 홀드 (배팅금은 이미 차감됨, 취소 시 환불)
         self.message = None
         self.game_completed = False
         
@@ -178,11 +178,9 @@ class MultiDiceView(View):
         if self.game_completed:
             return
         
-        # 게임이 완료되지 않고 타임아웃되면, 베팅 금액을 환불합니다.
-        if POINT_MANAGER_AVAILABLE:
-            await point_manager.add_point(self.bot, self.message.guild.id, str(self.p1.id), self.bet)
-            if self.p2:
-                await point_manager.add_point(self.bot, self.message.guild.id, str(self.p2.id), self.bet)
+        # 게임이 완료되지 않고 타임아웃되면, 배팅 홀드를 해제합니다.
+        for hold in self.holds:
+            await point_service.refund(hold)
 
         embed = discord.Embed(title="⏰ 시간 초과", description="게임이 취소되어 배팅금이 환불되었습니다.", color=discord.Color.red())
         try:
@@ -203,13 +201,11 @@ class MultiDiceView(View):
                 if user.id == view.p1.id:
                     return await interaction.response.send_message("자신과의 대결에는 참가할 수 없습니다.", ephemeral=True)
                 
+                hold = await point_service.reserve_bet(interaction.guild_id, user.id, view.bet, "주사위")
+                if not hold:
+                    return await interaction.response.send_message("❌ 잔액이 부족하여 참가할 수 없습니다.", ephemeral=True)
                 view.p2 = user
-                if POINT_MANAGER_AVAILABLE:
-                    balance = await point_manager.get_point(view.bot, interaction.guild_id, str(user.id))
-                    if balance < view.bet:
-                        view.p2 = None # 참가 자격 박탈
-                        return await interaction.response.send_message("❌ 잔액이 부족하여 참가할 수 없습니다.", ephemeral=True)
-                    await point_manager.add_point(view.bot, interaction.guild_id, str(user.id), -view.bet)
+                view.holds.append(hold)
                 
                 # P2 참가 후 즉시 게임 시작
                 await interaction.response.defer()
@@ -227,7 +223,6 @@ class MultiDiceView(View):
         self.game_completed = True
         p1_roll = random.randint(1, 6)
         p2_roll = random.randint(1, 6)
-        guild_id = self.message.guild.id
         
         # 애니메이션 실행
         anim_embed = discord.Embed(title="⚔️ 주사위 대결 진행 중", color=discord.Color.yellow())
@@ -246,23 +241,22 @@ class MultiDiceView(View):
         p1_payout, p2_payout = 0, 0
         if winner:
             reward = int(self.bet * 2 * WINNER_RETENTION)
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, guild_id, str(winner.id), reward)
             reward_text = f"\n**{reward:,}원** 획득!\n*20%의 딜러비가 차감된 후 지급됩니다."
             if winner == self.p1: p1_payout = reward
             else: p2_payout = reward
         else: # 무승부
             refund = int(self.bet * PUSH_RETENTION)
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, guild_id, str(self.p1.id), refund)
-                await point_manager.add_point(self.bot, guild_id, str(self.p2.id), refund)
             reward_text = f"\n**{refund:,}원** 환불\n*20%의 딜러비가 차감된 후 지급됩니다."
             p1_payout = p2_payout = refund
 
+        # 두 참가자 정산을 한 트랜잭션으로 기록
+        payouts = {str(self.p1.id): p1_payout, str(self.p2.id): p2_payout}
+        await point_service.settle_round([(h, payouts[h.user_id]) for h in self.holds], "주사위 멀티")
+
         # 통계 기록 (무승부 포함)
-        if STATS_AVAILABLE:
-            stats_manager.record_game(str(self.p1.id), self.p1.display_name, "주사위", self.bet, p1_payout, winner == self.p1)
-            stats_manager.record_game(str(self.p2.id), self.p2.display_name, "주사위", self.bet, p2_payout, winner == self.p2)
+        guild_id = self.p1.guild.id
+        record_dice_game(guild_id, str(self.p1.id), self.p1.display_name, self.bet, p1_payout, winner == self.p1, is_multi=True)
+        record_dice_game(guild_id, str(self.p2.id), self.p2.display_name, self.bet, p2_payout, winner == self.p2, is_multi=True)
 
         # 최종 임베드 출력
         result_embed = discord.Embed(title="🎲 최종 결과", color=discord.Color.purple())
@@ -270,7 +264,7 @@ class MultiDiceView(View):
         result_embed.add_field(name=f"{self.p1.display_name}", value=f"{DICE_EMOJIS[p1_roll]} ({p1_roll})", inline=True)
         result_embed.add_field(name=f"{self.p2.display_name}", value=f"{DICE_EMOJIS[p2_roll]} ({p2_roll})", inline=True)
     
-        await self.message.edit(embed=result_embed, view=None)
+        await frame_scheduler.push(self.message, final=True, embed=result_embed, view=None)
 
 # --- Cog 클래스 ---
 class DiceCog(commands.Cog):
@@ -295,9 +289,8 @@ class DiceCog(commands.Cog):
         if 배팅 < 100: return await interaction.response.send_message("❌ 최소 100원부터!", ephemeral=True)
         if 배팅 > MAX_BET: return await interaction.response.send_message(f"❌ 최대 배팅금은 {MAX_BET:,}원입니다.", ephemeral=True)
         
-        if POINT_MANAGER_AVAILABLE:
-            balance = await point_manager.get_point(self.bot, interaction.guild_id, str(interaction.user.id))
-            if balance < 배팅: return await interaction.response.send_message("❌ 잔액 부족!", ephemeral=True)
+        balance = await point_service.get_balance(interaction.guild_id, interaction.user.id)
+        if balance < 배팅: return await interaction.response.send_message("❌ 잔액 부족!", ephemeral=True)
 
         view = DiceModeSelectView(self.bot, interaction.user, 배팅)
         await interaction.response.send_message(f"🎲 **주사위 게임 모드 선택** (배팅: {배팅:,}원)", view=view)
@@ -4,13 +4,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import random
-import json
-import os
 import time
 import asyncio
 import string
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Tuple, Optional
+from database_manager import get_guild_db_manager
 
 # 한국 시간대 설정 (UTC+9)
 KST = timezone(timedelta(hours=9))
@@ -34,13 +33,13 @@ except ImportError:
     # Mock stats manager (통계 없이도 작동)
     class MockStatsManager:
         @staticmethod
-        def record_game_activity(user_id, username, game_name, **kwargs):
+        def record_game_activity(user_id, username, game_name, guild_id=None, **kwargs):
             pass
     
     stats_manager = MockStatsManager()
 
 # 통계 기록 헬퍼 함수
-def record_enhancement_attempt(user_id: str, username: str, is_success: bool):
+def record_enhancement_attempt(guild_id, user_id: str, username: str, is_success: bool):
     """강화 시도 통계 기록 (선택적)"""
     if STATS_AVAILABLE:
         try:
@@ -48,6 +47,7 @@ def record_enhancement_attempt(user_id: str, username: str, is_success: bool):
                 user_id=user_id,
                 username=username,
                 game_name="enhancement",
+                guild_id=guild_id,
                 is_win=is_success,
                 attempts=1
             )
@@ -56,19 +56,14 @@ def record_enhancement_attempt(user_id: str, username: str, is_success: bool):
 
 # ✅ 강화 시스템 설정
 ENHANCEMENT_CONFIG = {
-    "data_file": 'data/enhancement_data.json',
     "cooldown_time": 30,            # 강화 쿨다운 30초
     "max_level": 1000,              # 최대 레벨
     "min_safe_level": 10,           # 강등 방지 최소 레벨
     "level_change_range": (1, 5),   # 레벨 변동 범위
-    "backup_interval": 30,          # 30회마다 백업
     "max_items_per_user": 3,        # 갯수제한
     "special_reward_chance": 3.0    # 당첨 확률
 }
 
-# 데이터 디렉토리 생성
-os.makedirs("data", exist_ok=True)
-
 
 # 강화 확률 계산 함수들
 def get_success_rate(level: int) -> float:
@@ -181,139 +176,193 @@ def get_level_tier_info(level: int) -> Dict:
             "tier": "챌린저"
         }
 
-# 강화 데이터 관리 클래스
+# 강화 데이터 관리 클래스 (길드 DB 테이블 기반)
+ITEM_COUNTERS = ("level", "total_attempts", "success_count", "downgrade_count", "total_levels_gained",
+                 "total_levels_lost", "consecutive_fails", "shield_count", "daily_attack_count", "attack_fail_stack")
+ITEM_MUTABLE_FIELDS = ITEM_COUNTERS + ("owner_name", "banned_until", "last_attack_date", "last_attempt")
+ITEM_COLUMNS = ("guild_id", "owner_id", "item_name", "created_at") + ITEM_MUTABLE_FIELDS
+EMPTY_SERVER_STATS = {"total_attempts": 0, "total_successes": 0, "highest_level": 0, "total_users": 0}
+
 class EnhancementDataManager:
-    def __init__(self):
-        self.data_file = ENHANCEMENT_CONFIG["data_file"]
-        self.data = self.load_data()
-        self.backup_counter = 0
-
-    def load_data(self) -> Dict:
-        """데이터 로드 (안전성 강화)"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    if not isinstance(data, dict):
-                        print("❌ enhancement_data가 dict가 아닙니다. 기본 구조로 초기화합니다.")
-                        return self._create_default_data()
-                    
-                    if "items" not in data or not isinstance(data["items"], dict):
-                        data["items"] = {}
-                    
-                    if "event_codes" not in data or not isinstance(data["event_codes"], dict):
-                        data["event_codes"] = {}
-                        
-                    if "user_buffs" not in data or not isinstance(data["user_buffs"], dict):
-                        data["user_buffs"] = {}
-                    
-                    if "server_stats" not in data or not isinstance(data["server_stats"], dict):
-                        data["server_stats"] = {
-                            "total_attempts": 0,
-                            "total_successes": 0,
-                            "highest_level": 0,
-                            "total_users": 0
-                        }
-                    
-                    unique_users = set()
-                    for item_key, item_data in data["items"].items():
-                        if isinstance(item_data, dict) and "owner_id" in item_data:
-                            unique_users.add(item_data["owner_id"])
-                    
-                    data["server_stats"]["total_users"] = len(unique_users)
-                    
-                    return data
-            except (json.JSONDecodeError, FileNotFoundError) as e:
-                print(f"❌ 강화 데이터 로드 오류: {e}. 기본 구조로 초기화합니다.")
-        
-        return self._create_default_data()
+    """
+    강화 아이템/버프/이벤트 코드/서버 통계를 길드 DB(enhancement_* 테이블)에 보관합니다.
+    - 강화 1회 = 아이템 한 행 UPDATE + 서버 통계 증분 UPDATE (한 트랜잭션)
+    - /내강화, /강화순위는 (guild_id, owner_id, level DESC) / (guild_id, level DESC) 인덱스 순서대로 읽습니다.
+    - 예전 data/enhancement_data.json은 길드 DB가 처음 열릴 때 schema_migrations가 한 번 가져옵니다.
+    """
+
+    def _db(self, guild_id: str):
+        return get_guild_db_manager(str(guild_id))
+
+    @staticmethod
+    def _row_to_item(row) -> Dict:
+        item = {col: row[col] for col in ITEM_COLUMNS}
+        for field in ITEM_COUNTERS:
+            item[field] = int(item[field] or 0)
+        return item
 
-    def _create_default_data(self) -> Dict:
-        """기본 데이터 구조 생성"""
-        return {
-            "items": {},
-            "event_codes": {},
-            "user_buffs": {},
-            "server_stats": {
-                "total_attempts": 0,
-                "total_successes": 0,
-                "highest_level": 0,
-                "total_users": 0
-            }
-        }
+    def _ensure_stats_row(self, conn, guild_id: str):
+        conn.execute("INSERT OR IGNORE INTO enhancement_server_stats (guild_id) VALUES (?)", (guild_id,))
 
-    def save_data(self) -> bool:
-        """데이터 저장 (안전성 강화 - 원자적 저장 시도)"""
+    # ==================== 아이템 ====================
+    def get_item_data(self, item_name: str, owner_id: str, owner_name: str, guild_id: str) -> Dict:
+        """아이템 데이터 조회/생성 (없으면 Lv0 행을 만들고 참여자 수를 증분)"""
+        guild_id, owner_id = str(guild_id), str(owner_id)
+        item = self.get_existing_item_data(guild_id, item_name, owner_id)
+        if item:
+            return item
+
+        conn = self._db(guild_id).get_connection()
+        with conn:
+            is_new_owner = conn.execute(
+                "SELECT 1 FROM enhancement_items WHERE guild_id = ? AND owner_id = ? LIMIT 1", (guild_id, owner_id)
+            ).fetchone() is None
+            conn.execute(
+                "INSERT OR IGNORE INTO enhancement_items (guild_id, owner_id, item_key, item_name, owner_name, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, owner_id, item_name.lower(), item_name, owner_name, datetime.now(KST).isoformat())
+            )
+            self._ensure_stats_row(conn, guild_id)
+            if is_new_owner:
+                conn.execute("UPDATE enhancement_server_stats SET total_users = total_users + 1 WHERE guild_id = ?", (guild_id,))
+        return self.get_existing_item_data(guild_id, item_name, owner_id)
+
+    def get_existing_item_data(self, guild_id: str, item_name: str, owner_id: str) -> Optional[Dict]:
+        """아이템 데이터 조회 (없으면 None)"""
+        row = self._db(guild_id).execute_query(
+            f"SELECT {', '.join(ITEM_COLUMNS)} FROM enhancement_items WHERE guild_id = ? AND owner_id = ? AND item_key = ?",
+            (str(guild_id), str(owner_id), item_name.lower()), 'one'
+        )
+        return self._row_to_item(row) if row else None
+
+    @staticmethod
+    def _update_items(conn, guild_id: str, items):
+        assignments = ", ".join(f"{f} = ?" for f in ITEM_MUTABLE_FIELDS)
+        conn.executemany(
+            f"UPDATE enhancement_items SET {assignments} WHERE guild_id = ? AND owner_id = ? AND item_key = ?",
+            [tuple(item.get(f) for f in ITEM_MUTABLE_FIELDS) + (str(guild_id), item["owner_id"], item["item_name"].lower()) for item in items]
+        )
+
+    def save_items(self, guild_id: str, *items: Dict):
+        """변경된 아이템 행만 기록합니다. (한 트랜잭션)"""
+        conn = self._db(guild_id).get_connection()
+        with conn:
+            self._update_items(conn, guild_id, items)
+
+    def delete_item(self, guild_id: str, owner_id: str, item_name: str):
+        """아이템 파괴 (소유자의 마지막 아이템이면 참여자 수 감소)"""
+        guild_id, owner_id = str(guild_id), str(owner_id)
+        conn = self._db(guild_id).get_connection()
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM enhancement_items WHERE guild_id = ? AND owner_id = ? AND item_key = ?",
+                (guild_id, owner_id, item_name.lower())
+            ).rowcount
+            if deleted and conn.execute(
+                "SELECT 1 FROM enhancement_items WHERE guild_id = ? AND owner_id = ? LIMIT 1", (guild_id, owner_id)
+            ).fetchone() is None:
+                conn.execute("UPDATE enhancement_server_stats SET total_users = MAX(total_users - 1, 0) WHERE guild_id = ?", (guild_id,))
+
+    def count_user_items(self, guild_id: str, user_id: str) -> int:
+        row = self._db(guild_id).execute_query(
+            "SELECT COUNT(*) FROM enhancement_items WHERE guild_id = ? AND owner_id = ?", (str(guild_id), str(user_id)), 'one'
+        )
+        return row[0] if row else 0
+
+    def get_user_items(self, guild_id: str, user_id: str) -> List[Dict]:
+        """사용자의 모든 아이템 조회 (레벨 높은 순)"""
         try:
-            if not isinstance(self.data, dict):
-                print("❌ self.data가 dict가 아닙니다. 저장을 건너뜁니다.")
-                return False
-            
-            # 만료된 코드 정리
-            self.clean_expired_codes()
-            
-            unique_users = set()
-            items = self.data.get("items", {})
-            if isinstance(items, dict):
-                for item_key, item_data in items.items():
-                    if isinstance(item_data, dict) and "owner_id" in item_data:
-                        unique_users.add(item_data["owner_id"])
-            
-            if "server_stats" not in self.data:
-                self.data["server_stats"] = {}
-            self.data["server_stats"]["total_users"] = len(unique_users)
-            
-            # 원자적 저장을 위해 임시 파일 사용
-            temp_file = f"{self.data_file}.tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-            
-            # 성공적으로 쓰여졌다면 교체 (Windows에서는 os.replace 사용 권장)
-            if os.path.exists(self.data_file):
-                try:
-                    os.replace(temp_file, self.data_file)
-                except PermissionError:
-                    # Windows에서 파일이 열려있거나 하는 경우를 위한 차선책
-                    os.remove(self.data_file)
-                    os.rename(temp_file, self.data_file)
-            else:
-                os.rename(temp_file, self.data_file)
-            return True
+            rows = self._db(guild_id).execute_query(
+                f"SELECT {', '.join(ITEM_COLUMNS)} FROM enhancement_items WHERE guild_id = ? AND owner_id = ? ORDER BY level DESC",
+                (str(guild_id), str(user_id)), 'all'
+            )
+            return [self._row_to_item(r) for r in rows or []]
+        except Exception as e:
+            print(f"❌ 사용자 아이템 조회 오류: {e}")
+            return []
+
+    def get_top_items(self, guild_id: str, limit: int = 10) -> List[Dict]:
+        """해당 서버(guild_id)의 상위 아이템 목록 조회"""
+        try:
+            rows = self._db(guild_id).execute_query(
+                f"SELECT {', '.join(ITEM_COLUMNS)} FROM enhancement_items WHERE guild_id = ? ORDER BY level DESC LIMIT ?",
+                (str(guild_id), limit), 'all'
+            )
+            return [self._row_to_item(r) for r in rows or []]
         except Exception as e:
-            print(f"❌ 강화 데이터 저장 실패: {e}")
-            return False
+            print(f"❌ 상위 아이템 조회 오류: {e}")
+            return []
 
-    def generate_event_code(self, creator_id: str, item_name: str) -> str:
+    def get_server_stats(self, guild_id: str) -> Dict:
+        """서버 통계 조회 (증분 집계된 행을 그대로 읽음)"""
+        try:
+            row = self._db(guild_id).execute_query(
+                "SELECT total_attempts, total_successes, highest_level, total_users FROM enhancement_server_stats WHERE guild_id = ?",
+                (str(guild_id),), 'one'
+            )
+            return dict(row) if row else EMPTY_SERVER_STATS.copy()
+        except Exception as e:
+            print(f"❌ 서버 통계 조회 오류: {e}")
+            return EMPTY_SERVER_STATS.copy()
+
+    def reset_guild(self, guild_id: str) -> int:
+        """길드의 모든 강화 데이터 삭제 (삭제된 아이템 수 반환)"""
+        conn = self._db(guild_id).get_connection()
+        with conn:
+            deleted = conn.execute("DELETE FROM enhancement_items WHERE guild_id = ?", (str(guild_id),)).rowcount
+            for table in ("enhancement_user_buffs", "enhancement_event_codes", "enhancement_server_stats"):
+                conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", (str(guild_id),))
+        return deleted
+
+    # ==================== 버프 ====================
+    def get_user_buffs(self, guild_id: str, user_id: str) -> Dict:
+        row = self._db(guild_id).execute_query(
+            "SELECT ban_rights, success_boost_until FROM enhancement_user_buffs WHERE guild_id = ? AND user_id = ?",
+            (str(guild_id), str(user_id)), 'one'
+        )
+        return dict(row) if row else {"ban_rights": 0, "success_boost_until": None}
+
+    def consume_ban_right(self, guild_id: str, user_id: str) -> Optional[int]:
+        """이용금지권 1개 사용 (남은 개수 반환, 없으면 None)"""
+        conn = self._db(guild_id).get_connection()
+        with conn:
+            updated = conn.execute(
+                "UPDATE enhancement_user_buffs SET ban_rights = ban_rights - 1 WHERE guild_id = ? AND user_id = ? AND ban_rights > 0",
+                (str(guild_id), str(user_id))
+            ).rowcount
+            if not updated:
+                return None
+            return conn.execute(
+                "SELECT ban_rights FROM enhancement_user_buffs WHERE guild_id = ? AND user_id = ?", (str(guild_id), str(user_id))
+            ).fetchone()[0]
+
+    # ==================== 이벤트 코드 ====================
+    def generate_event_code(self, guild_id: str, creator_id: str, item_name: str) -> str:
         """3시간 유효한 히든 이벤트 코드 생성 (아이템 정보 포함)"""
         code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
         expires_at = (datetime.now(KST) + timedelta(hours=3)).isoformat()
-        
-        if "event_codes" not in self.data:
-            self.data["event_codes"] = {}
-            
-        self.data["event_codes"][code] = {
-            "creator_id": creator_id,
-            "item_name": item_name,
-            "expires_at": expires_at,
-            "used_by": []
-        }
-        self.save_data()
+        conn = self._db(guild_id).get_connection()
+        with conn:
+            self._clean_expired_codes(conn, str(guild_id))
+            conn.execute(
+                "INSERT OR REPLACE INTO enhancement_event_codes (code, guild_id, creator_id, item_name, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (code, str(guild_id), str(creator_id), item_name, expires_at)
+            )
         return code
 
-    def verify_event_code(self, code: str, user_id: str) -> Tuple[bool, str]:
+    def verify_event_code(self, guild_id: str, code: str, user_id: str) -> Tuple[bool, str]:
         """코드 검증 및 랜덤 버프 지급"""
-        if "event_codes" not in self.data or code not in self.data["event_codes"]:
+        guild_id, user_id = str(guild_id), str(user_id)
+        db = self._db(guild_id)
+        event = db.execute_query("SELECT * FROM enhancement_event_codes WHERE code = ? AND guild_id = ?", (code, guild_id), 'one')
+        if not event:
             return False, "❌ 존재하지 않거나 유효하지 않은 코드입니다."
-            
-        event = self.data["event_codes"][code]
         
-        if event.get("creator_id") != user_id:
+        if event["creator_id"] != user_id:
             return False, "🚫 **권한 없음:** 이 코드는 본인이 직접 획득한 코드가 아니므로 사용할 수 없습니다."
             
-        target_item_name = event.get("item_name")
-        item_key = f"{user_id}_{target_item_name.lower()}"
-        if item_key not in self.data.get("items", {}):
+        target_item_name = event["item_name"]
+        item_data = self.get_existing_item_data(guild_id, target_item_name, user_id)
+        if not item_data:
             return False, f"❌ **아이템 상실:** 코드를 획득했던 아이템(**{target_item_name}**)을 더 이상 보유하고 있지 않아 인증이 불가능합니다."
 
         try:
@@ -324,7 +373,7 @@ class EnhancementDataManager:
         if datetime.now(KST) > expires_at:
             return False, "⏰ 해당 코드는 이미 만료되었습니다 (3시간 경과)."
             
-        if user_id in event.get("used_by", []):
+        if event["used_by"] == user_id:
             return False, "🚫 이미 사용하신 코드입니다."
             
         # --- 랜덤 버프 로직 ---
@@ -333,131 +382,51 @@ class EnhancementDataManager:
         weights = [333, 333, 333, 1]
         buff_type = random.choices(buff_types, weights=weights, k=1)[0]
         buff_msg = ""
-        
-        if "user_buffs" not in self.data:
-            self.data["user_buffs"] = {}
-        if user_id not in self.data["user_buffs"]:
-            self.data["user_buffs"][user_id] = {"ban_rights": 0, "success_boost_until": None}
-            
-        item_data = self.data["items"][item_key]
-        
-        if buff_type == "SUCCESS_BOOST":
-            until = (datetime.now(KST) + timedelta(minutes=30)).isoformat()
-            self.data["user_buffs"][user_id]["success_boost_until"] = until
-            buff_msg = "✨ **[버프 획득] 30분 동안 성공 확률 30% 상승!**\n지금 바로 강화를 시도해보세요!"
-        elif buff_type == "ATTACK_SHIELD":
-            item_data["shield_count"] = item_data.get("shield_count", 0) + 1
-            buff_msg = f"🛡️ **[아이템 강화] 공격 1회 방어권 획득!**\n아이템 **{target_item_name}**이(가) 다음 공격을 1회 무효화합니다."
-        elif buff_type == "ENHANCE_BAN_RIGHT":
-            self.data["user_buffs"][user_id]["ban_rights"] = self.data["user_buffs"][user_id].get("ban_rights", 0) + 1
-            buff_msg = "🚫 **[권한 획득] 상대지정 1시간 강화 이용금지권!**\n`/강화금지 닉네임 아이템명` 명령어로 상대를 1시간 동안 강화 불가능 상태로 만듭니다."
-        elif buff_type == "STAFF_VOUCHER":
-            money = random.randint(10000, 30000)
-            xp = random.randint(3000, 9300)
-            fame = random.randint(50, 100)
-            buff_msg = f"📞 **[특별 당첨] 운영진호출(지급권) 획득!**\n\n" \
-                       f"💰 **지급 골드:** {money:,}원\n" \
-                       f"🧪 **지급 경험치:** {xp:,} XP\n" \
-                       f"🌟 **지급 명성:** {fame} 명성\n\n" \
-                       f"*이 메시지를 캡처하여 운영진에게 제출해주세요!*"
-
-        event.setdefault("used_by", []).append(user_id)
-        self.save_data()
-        return True, f"✅ **히든 이벤트 인증 성공!**\n\n{buff_msg}\n\n*아이템: {target_item_name}*"
 
-    def clean_expired_codes(self):
-        """만료된 코드 삭제 (데이터 파일 관리용)"""
-        if "event_codes" not in self.data:
-            return
-            
-        current_time = datetime.now(KST)
-        to_delete = []
-        for code, info in self.data["event_codes"].items():
-            try:
-                expires_at = parse_kst_iso(info["expires_at"])
-                if current_time > expires_at:
-                    to_delete.append(code)
-            except Exception:
-                to_delete.append(code)
-        
-        for code in to_delete:
-            del self.data["event_codes"][code]
-
-    def get_item_data(self, item_name: str, owner_id: str, owner_name: str, guild_id: str) -> Dict:
-        """아이템 데이터 조회/생성 및 모든 필드 보정"""
-        item_key = f"{owner_id}_{item_name.lower()}"
-        
-        if not isinstance(self.data, dict):
-            self.data = self._create_default_data()
-        
-        if "items" not in self.data or not isinstance(self.data["items"], dict):
-            self.data["items"] = {}
-        
-        # 기본 필드 구조 정의
-        default_fields = {
-            "item_name": item_name,
-            "owner_id": owner_id,
-            "guild_id": guild_id,
-            "owner_name": owner_name,
-            "level": 0,
-            "total_attempts": 0,
-            "success_count": 0,
-            "downgrade_count": 0, 
-            "total_levels_gained": 0,
-            "total_levels_lost": 0,
-            "created_at": datetime.now(KST).isoformat(),
-            "last_attempt": None,
-            "consecutive_fails": 0,
-            "shield_count": 0
-        }
+        conn = db.get_connection()
+        with conn:
+            # 동시에 두 번 인증해도 한 번만 적용되도록 사용 처리를 먼저 조건부로 기록
+            if not conn.execute("UPDATE enhancement_event_codes SET used_by = ? WHERE code = ? AND used_by IS NULL", (user_id, code)).rowcount:
+                return False, "🚫 이미 사용하신 코드입니다."
+            conn.execute("INSERT OR IGNORE INTO enhancement_user_buffs (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
+
+            if buff_type == "SUCCESS_BOOST":
+                until = (datetime.now(KST) + timedelta(minutes=30)).isoformat()
+                conn.execute("UPDATE enhancement_user_buffs SET success_boost_until = ? WHERE guild_id = ? AND user_id = ?", (until, guild_id, user_id))
+                buff_msg = "✨ **[버프 획득] 30분 동안 성공 확률 30% 상승!**\n지금 바로 강화를 시도해보세요!"
+            elif buff_type == "ATTACK_SHIELD":
+                conn.execute(
+                    "UPDATE enhancement_items SET shield_count = shield_count + 1 WHERE guild_id = ? AND owner_id = ? AND item_key = ?",
+                    (guild_id, user_id, target_item_name.lower())
+                )
+                buff_msg = f"🛡️ **[아이템 강화] 공격 1회 방어권 획득!**\n아이템 **{target_item_name}**이(가) 다음 공격을 1회 무효화합니다."
+            elif buff_type == "ENHANCE_BAN_RIGHT":
+                conn.execute("UPDATE enhancement_user_buffs SET ban_rights = ban_rights + 1 WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+                buff_msg = "🚫 **[권한 획득] 상대지정 1시간 강화 이용금지권!**\n`/강화금지 닉네임 아이템명` 명령어로 상대를 1시간 동안 강화 불가능 상태로 만듭니다."
+            elif buff_type == "STAFF_VOUCHER":
+                money = random.randint(10000, 30000)
+                xp = random.randint(3000, 9300)
+                fame = random.randint(50, 100)
+                buff_msg = f"📞 **[특별 당첨] 운영진호출(지급권) 획득!**\n\n" \
+                           f"💰 **지급 골드:** {money:,}원\n" \
+                           f"🧪 **지급 경험치:** {xp:,} XP\n" \
+                           f"🌟 **지급 명성:** {fame} 명성\n\n" \
+                           f"*이 메시지를 캡처하여 운영진에게 제출해주세요!*"
 
-        # 새 아이템 생성 또는 기존 아이템 가져오기
-        if item_key not in self.data["items"]:
-            self.data["items"][item_key] = default_fields.copy()
-            
-            # 서버 통계 업데이트 (새 유저인 경우)
-            unique_users = set()
-            for existing_key, existing_data in self.data["items"].items():
-                if isinstance(existing_data, dict) and "owner_id" in existing_data:
-                    unique_users.add(existing_data["owner_id"])
-            
-            if "server_stats" not in self.data:
-                self.data["server_stats"] = {"total_attempts": 0, "total_successes": 0, "highest_level": 0, "total_users": 0}
-            self.data["server_stats"]["total_users"] = len(unique_users)
-        
-        # 데이터 보정 (누락된 모든 필드 추가)
-        item = self.data["items"][item_key]
-        if not isinstance(item, dict):
-            # 만약 데이터가 깨져서 dict가 아니라면 초기화
-            item = default_fields.copy()
-            self.data["items"][item_key] = item
-
-        for field, default_value in default_fields.items():
-            if field not in item:
-                item[field] = default_value
-            
-        return item
+        return True, f"✅ **히든 이벤트 인증 성공!**\n\n{buff_msg}\n\n*아이템: {target_item_name}*"
 
-    def get_existing_item_data(self, item_name: str, owner_id: str) -> Optional[Dict]:
-        """아이템 데이터 조회 (존재하면 필드 보정 후 반환)"""
-        item_key = f"{owner_id}_{item_name.lower()}"
-        items = self.data.get("items", {})
-        if isinstance(items, dict) and item_key in items:
-            item = items[item_key]
-            if isinstance(item, dict):
-                # 데이터 보정을 위해 get_item_data 호출 (아이템 이름 등은 기존 데이터에서 가져옴)
-                return self.get_item_data(
-                    item.get("item_name", item_name),
-                    item.get("owner_id", owner_id),
-                    item.get("owner_name", "Unknown"),
-                    item.get("guild_id", "0")
-                )
-        return None
+    @staticmethod
+    def _clean_expired_codes(conn, guild_id: str):
+        """만료된 코드 삭제 (expires_at은 모두 KST ISO 문자열이라 문자열 비교로 충분)"""
+        conn.execute("DELETE FROM enhancement_event_codes WHERE guild_id = ? AND expires_at < ?", (guild_id, datetime.now(KST).isoformat()))
 
+    # ==================== 강화 ====================
     def attempt_enhancement(self, item_name: str, owner_id: str, owner_name: str, guild_id: str) -> Tuple:
         """강화 시도 (버프 및 금지 로직 포함)"""
+        guild_id, owner_id = str(guild_id), str(owner_id)
         try:
             item_data = self.get_item_data(item_name, owner_id, owner_name, guild_id)
+            item_data["owner_name"] = owner_name
             
             # 1. 강화 금지 여부 확인 (아이템별)
             banned_until = item_data.get("banned_until")
@@ -471,7 +440,7 @@ class EnhancementDataManager:
                     # 유효하지 않은 날짜 형식이면 무시하고 진행
                     item_data["banned_until"] = None
 
-            buffs = self.data.get("user_buffs", {}).get(owner_id, {})
+            buffs = self.get_user_buffs(guild_id, owner_id)
             current_level = int(item_data.get("level", 0))
             
             if current_level >= ENHANCEMENT_CONFIG["max_level"]:
@@ -507,9 +476,6 @@ class EnhancementDataManager:
 
             item_data["total_attempts"] += 1
             item_data["last_attempt"] = datetime.now(KST).isoformat()
-            
-            if isinstance(self.data.get("server_stats"), dict):
-                self.data["server_stats"]["total_attempts"] += 1
 
             level_change = 0
             if result_type == "success":
@@ -518,14 +484,7 @@ class EnhancementDataManager:
                 item_data["success_count"] += 1
                 item_data["total_levels_gained"] += level_change
                 item_data["consecutive_fails"] = 0
-                
-                if isinstance(self.data.get("server_stats"), dict):
-                    current_highest = self.data["server_stats"].get("highest_level", 0)
-                    if item_data["level"] > current_highest:
-                        self.data["server_stats"]["highest_level"] = item_data["level"]
-                    self.data["server_stats"]["total_successes"] += 1
-                
-                record_enhancement_attempt(owner_id, owner_name, True)
+                record_enhancement_attempt(guild_id, owner_id, owner_name, True)
                 
             elif result_type == "downgrade":
                 level_change = random.randint(*ENHANCEMENT_CONFIG["level_change_range"])
@@ -536,16 +495,24 @@ class EnhancementDataManager:
                 level_change = -actual_lost
                 item_data["consecutive_fails"] += 1
                 item_data["downgrade_count"] += 1
-                record_enhancement_attempt(owner_id, owner_name, False)
+                record_enhancement_attempt(guild_id, owner_id, owner_name, False)
                 
             else:  # fail
                 item_data["consecutive_fails"] += 1
-                record_enhancement_attempt(owner_id, owner_name, False)
-
-            self.backup_counter += 1
-            if self.backup_counter >= ENHANCEMENT_CONFIG["backup_interval"]:
-                self.save_data()
-                self.backup_counter = 0
+                record_enhancement_attempt(guild_id, owner_id, owner_name, False)
+
+            # 아이템 행 갱신 + 서버 통계 증분을 한 트랜잭션으로 기록
+            conn = self._db(guild_id).get_connection()
+            with conn:
+                self._update_items(conn, guild_id, [item_data])
+                self._ensure_stats_row(conn, guild_id)
+                conn.execute("""
+                    UPDATE enhancement_server_stats
+                    SET total_attempts = total_attempts + 1,
+                        total_successes = total_successes + ?,
+                        highest_level = MAX(highest_level, ?)
+                    WHERE guild_id = ?
+                """, (1 if result_type == "success" else 0, item_data["level"], guild_id))
 
             return (
                 result_type == "success",
@@ -563,42 +530,12 @@ class EnhancementDataManager:
             traceback.print_exc()
             try:
                 # 오류 발생 시 최대한 현재 레벨이라도 반환하여 Lv0 방지
-                item_key = f"{owner_id}_{item_name.lower()}"
-                curr_lv = self.data.get("items", {}).get(item_key, {}).get("level", 0)
+                existing = self.get_existing_item_data(guild_id, item_name, owner_id)
+                curr_lv = existing["level"] if existing else 0
                 return False, curr_lv, curr_lv, 0, 0, "오류", 0, 0
             except:
                 return False, 0, 0, 0, 0, "오류", 0, 0
 
-    def get_user_items(self, user_id: str) -> List[Dict]:
-        """사용자의 모든 아이템 조회"""
-        try:
-            user_items = [v for k, v in self.data.get("items", {}).items() if v.get("owner_id") == user_id]
-            user_items.sort(key=lambda x: int(x.get("level", 0)), reverse=True)
-            return user_items
-        except Exception as e:
-            print(f"❌ 사용자 아이템 조회 오류: {e}")
-            return []
-
-    def get_server_stats(self) -> Dict:
-        """서버 통계 조회"""
-        try:
-            return self.data.get("server_stats", {
-                "total_attempts": 0, "total_successes": 0, "highest_level": 0, "total_users": 0
-            }).copy()
-        except Exception as e:
-            print(f"❌ 서버 통계 조회 오류: {e}")
-            return {"total_attempts": 0, "total_successes": 0, "highest_level": 0, "total_users": 0}
-
-    def get_top_items(self, guild_id: str, limit: int = 10) -> List[Dict]:
-        """해당 서버(guild_id)의 상위 아이템 목록 조회"""
-        try:
-            items = [v for v in self.data.get("items", {}).values() if v.get("guild_id") == guild_id]
-            items.sort(key=lambda x: int(x.get("level", 0)), reverse=True)
-            return items[:limit]
-        except Exception as e:
-            print(f"❌ 상위 아이템 조회 오류: {e}")
-            return []
-
 enhancement_data = EnhancementDataManager()
 enhancement_cooldowns = {}
 
@@ -637,8 +574,8 @@ class EnhancementSystemCog(commands.Cog):
             if len(아이템명) < 1 or len(아이템명) > 20:
                 return await interaction.response.send_message("❌ 아이템명은 1~20자 사이여야 합니다.", ephemeral=True)
             
-            if not self.enhancement_data.get_existing_item_data(아이템명, user_id):
-                if len(self.enhancement_data.get_user_items(user_id)) >= ENHANCEMENT_CONFIG["max_items_per_user"]:
+            if not self.enhancement_data.get_existing_item_data(guild_id, 아이템명, user_id):
+                if self.enhancement_data.count_user_items(guild_id, user_id) >= ENHANCEMENT_CONFIG["max_items_per_user"]:
                     return await interaction.response.send_message(f"❎ **아이템 보유 제한:** 최대 **{ENHANCEMENT_CONFIG['max_items_per_user']}개**의 아이템만 소유할 수 있습니다.", ephemeral=True)
                 
             can_enhance, remaining = check_cooldown(user_id, 아이템명)
@@ -656,12 +593,12 @@ class EnhancementSystemCog(commands.Cog):
 
             success, old_lv, new_lv, rate, d_rate, r_type, change, c_fails = res
             old_tier, new_tier = get_level_tier_info(old_lv), get_level_tier_info(new_lv)
-            item_data = self.enhancement_data.get_item_data(아이템명, user_id, username, guild_id)
+            item_data = self.enhancement_data.get_existing_item_data(guild_id, 아이템명, user_id) or {}
             
             embed = discord.Embed(color=new_tier["color"])
             
             if r_type == "success" and random.random() * 100 <= ENHANCEMENT_CONFIG["special_reward_chance"]:
-                code = self.enhancement_data.generate_event_code(user_id, 아이템명)
+                code = self.enhancement_data.generate_event_code(guild_id, user_id, 아이템명)
                 embed.add_field(name="🎁 히든 이벤트 발생!", value=f"### 코드: `{code}`\n이 코드는 **3시간** 동안만 유효합니다.\n`/강화이벤트 코드:{code}`를 입력하여 버프를 받으세요!", inline=False)
 
             result_text = f"{old_tier['emoji']} Lv{old_lv} ({old_tier['tier']}) → {new_tier['emoji']} **Lv{new_lv} ({new_tier['tier']} {new_lv})**\n"
@@ -699,7 +636,7 @@ class EnhancementSystemCog(commands.Cog):
             
             # 다음 강화 확률에도 버프 적용 여부 표시
             display_rate = next_s
-            buffs = self.enhancement_data.data.get("user_buffs", {}).get(user_id, {})
+            buffs = self.enhancement_data.get_user_buffs(guild_id, user_id)
             boost_until = buffs.get("success_boost_until")
             if boost_until and datetime.now(KST) < parse_kst_iso(boost_until):
                 display_rate += 30.0
@@ -721,10 +658,10 @@ class EnhancementSystemCog(commands.Cog):
     @app_commands.command(name="강화이벤트", description="히든 이벤트 코드를 인증하여 랜덤 버프를 받습니다.")
     @app_commands.describe(코드="발급받은 히든 이벤트 코드")
     async def use_event_code(self, interaction: discord.Interaction, 코드: str):
-        user_id = str(interaction.user.id)
-        if not self.enhancement_data.get_user_items(user_id):
+        user_id, guild_id = str(interaction.user.id), str(interaction.guild_id)
+        if not self.enhancement_data.count_user_items(guild_id, user_id):
             return await interaction.response.send_message("❌ **아이템 소지자 전용:** 최소 하나 이상의 강화 아이템을 보유하고 있어야 코드를 사용할 수 있습니다.", ephemeral=True)
-        success, message = self.enhancement_data.verify_event_code(코드, user_id)
+        success, message = self.enhancement_data.verify_event_code(guild_id, 코드.strip().upper(), user_id)
         await interaction.response.send_message(message, ephemeral=not success)
 
     @app_commands.command(name="강화금지", description="상대방의 아이템을 지정하여 1시간 동안 강화를 금지합니다. (권한 소모)")
@@ -732,38 +669,36 @@ class EnhancementSystemCog(commands.Cog):
     async def ban_user_enhancement(self, interaction: discord.Interaction, 닉네임: discord.Member, 아이템명: str):
         user_id = str(interaction.user.id)
         target_id = str(닉네임.id)
+        guild_id = str(interaction.guild_id)
         
         if user_id == target_id: return await interaction.response.send_message("❌ 본인에게는 사용할 수 없습니다.", ephemeral=True)
         
         # 대상 아이템 찾기
-        target_item = self.enhancement_data.get_existing_item_data(아이템명, target_id)
+        target_item = self.enhancement_data.get_existing_item_data(guild_id, 아이템명, target_id)
         
-        if not target_item or target_item.get("guild_id") != str(interaction.guild_id):
+        if not target_item:
             return await interaction.response.send_message(f"❌ **{닉네임.display_name}**님의 **{아이템명}** 아이템을 찾을 수 없습니다.", ephemeral=True)
             
         target_name = 닉네임.display_name
         
-        buffs = self.enhancement_data.data.get("user_buffs", {}).get(user_id, {})
-        rights = buffs.get("ban_rights", 0)
-        if rights <= 0: return await interaction.response.send_message("❌ 사용할 수 있는 '강화 이용금지권'이 없습니다.", ephemeral=True)
-        
-        self.enhancement_data.data["user_buffs"][user_id]["ban_rights"] = rights - 1
+        remaining_rights = self.enhancement_data.consume_ban_right(guild_id, user_id)
+        if remaining_rights is None: return await interaction.response.send_message("❌ 사용할 수 있는 '강화 이용금지권'이 없습니다.", ephemeral=True)
         
         # 아이템별 강화 금지 적용
         target_item["banned_until"] = (datetime.now(KST) + timedelta(hours=1)).isoformat()
-        self.enhancement_data.save_data()
+        self.enhancement_data.save_items(guild_id, target_item)
         
         embed = discord.Embed(title="🚫 강화 금지 발동!", description=f"**{interaction.user.display_name}**님이 **{target_name}**님의 **{아이템명}**을 겨냥해 이용금지권을 사용했습니다!", color=discord.Color.dark_red())
         embed.add_field(name="⏰ 효과", value=f"**{target_name}**님은 지금부터 **1시간** 동안 강화 시도가 불가능해집니다.", inline=False)
-        embed.set_footer(text=f"남은 권한: {rights - 1}개")
+        embed.set_footer(text=f"남은 권한: {remaining_rights}개")
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="내강화", description="내가 소유한 아이템 목록을 확인합니다.")
     async def my_items(self, interaction: discord.Interaction):
-        user_id, username = str(interaction.user.id), interaction.user.display_name
+        user_id, username, guild_id = str(interaction.user.id), interaction.user.display_name, str(interaction.guild_id)
         try:
-            items = self.enhancement_data.get_user_items(user_id)
-            buffs = self.enhancement_data.data.get("user_buffs", {}).get(user_id, {})
+            items = self.enhancement_data.get_user_items(guild_id, user_id)
+            buffs = self.enhancement_data.get_user_buffs(guild_id, user_id)
             embed = discord.Embed(title="📦 내 아이템 및 버프", color=discord.Color.blue())
             if not items: embed.description = "아직 강화한 아이템이 없습니다.\n`/강화 아이템명`으로 첫 아이템을 강화해보세요!"
             else:
@@ -785,7 +720,7 @@ class EnhancementSystemCog(commands.Cog):
     async def enhancement_ranking(self, interaction: discord.Interaction):
         try:
             top = self.enhancement_data.get_top_items(str(interaction.guild_id), 10)
-            stats = self.enhancement_data.get_server_stats()
+            stats = self.enhancement_data.get_server_stats(str(interaction.guild_id))
             embed = discord.Embed(title="🏆 강화 순위", description="전체 서버의 최고 강화 아이템들입니다.", color=discord.Color.gold())
             if top:
                 for i, item in enumerate(top, 1):
@@ -802,10 +737,10 @@ class EnhancementSystemCog(commands.Cog):
     @app_commands.command(name="공격", description="상대방의 아이템을 공격합니다. (등급별 일일 횟수 제한)")
     @app_commands.describe(내아이템="내가 사용할 아이템 이름", 상대방="공격할 대상 유저", 상대아이템="상대방의 아이템 이름")
     async def attack_item(self, interaction: discord.Interaction, 내아이템: str, 상대방: discord.Member, 상대아이템: str):
-        user_id, target_id = str(interaction.user.id), str(상대방.id)
+        user_id, target_id, guild_id = str(interaction.user.id), str(상대방.id), str(interaction.guild_id)
         if user_id == target_id: return await interaction.response.send_message("❌ 본인의 아이템은 공격할 수 없습니다!", ephemeral=True)
-        my_item = self.enhancement_data.get_existing_item_data(내아이템, user_id)
-        target_item = self.enhancement_data.get_existing_item_data(상대아이템, target_id)
+        my_item = self.enhancement_data.get_existing_item_data(guild_id, 내아이템, user_id)
+        target_item = self.enhancement_data.get_existing_item_data(guild_id, 상대아이템, target_id)
         if not my_item: return await interaction.response.send_message(f"❌ **{내아이템}** 아이템을 소유하고 있지 않습니다.", ephemeral=True)
         if not target_item: return await interaction.response.send_message(f"❌ **{상대방.display_name}**님은 **{상대아이템}** 아이템을 소유하고 있지 않습니다.", ephemeral=True)
         if my_item['level'] <= 0: return await interaction.response.send_message("❌ Lv.0 아이템으로는 공격할 수 없습니다.", ephemeral=True)
@@ -821,7 +756,7 @@ class EnhancementSystemCog(commands.Cog):
 
         # 방어막 체크
         if target_item.get("shield_count", 0) > 0:
-            target_item["shield_count"] -= 1; self.enhancement_data.save_data()
+            target_item["shield_count"] -= 1; self.enhancement_data.save_items(guild_id, target_item)
             embed = discord.Embed(title="🛡️ 공격 방어됨!", description=f"**{상대방.display_name}**의 아이템이 방어막을 사용하여 공격을 무효화했습니다!\n(남은 방어막: {target_item['shield_count']}회)", color=discord.Color.blue())
             return await interaction.response.send_message(embed=embed)
 
@@ -835,7 +770,7 @@ class EnhancementSystemCog(commands.Cog):
             my_item["attack_fail_stack"] = 0
             msg = f"💥 **공격 성공!**\n**{상대방.display_name}**의 **{상대아이템}** 레벨이 **-{actual}** 하락했습니다."
             if target_item['level'] <= 0:
-                del self.enhancement_data.data["items"][f"{target_id}_{상대아이템.lower()}"]
+                self.enhancement_data.delete_item(guild_id, target_id, 상대아이템)
                 msg += f"\n💀 **[파괴]** 레벨이 0이 되어 아이템이 소멸했습니다!"
             embed.add_field(name="✅ 결과: 성공", value=msg, inline=False); embed.color = discord.Color.green()
         else:
@@ -844,7 +779,7 @@ class EnhancementSystemCog(commands.Cog):
             my_item["attack_fail_stack"] = my_item.get("attack_fail_stack", 0) + 1
             msg = f"🛡️ **공격 실패 (반동 저항)**\n내 **{내아이템}** 레벨이 **-{actual}** 하락했습니다."
             if my_item["attack_fail_stack"] >= 5:
-                del self.enhancement_data.data["items"][f"{user_id}_{내아이템.lower()}"]
+                self.enhancement_data.delete_item(guild_id, user_id, 내아이템)
                 msg = f"💀 **[아이템 파괴]**\n공격 연속 **5회 실패**로 아이템이 파괴되었습니다!"
             else: embed.add_field(name="⚠️ 파괴 경고", value=f"현재 등급 내 연속 실패: **{my_item['attack_fail_stack']}/5**", inline=False)
             embed.add_field(name="❌ 결과: 실패", value=msg, inline=False)
@@ -853,7 +788,8 @@ class EnhancementSystemCog(commands.Cog):
             my_item["daily_attack_count"] += 1
             embed.add_field(name="📅 남은 공격 횟수", value=f"**{max_daily - my_item['daily_attack_count']}회** / {max_daily}회", inline=True)
         embed.add_field(name="📊 확률", value=f"성공률: **{rate:.1f}%**", inline=True)
-        self.enhancement_data.save_data(); await interaction.response.send_message(embed=embed)
+        # 파괴된 아이템은 UPDATE 대상 행이 없으므로 그대로 무시됩니다.
+        self.enhancement_data.save_items(guild_id, my_item, target_item); await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="강화정보", description="강화 시스템에 대한 정보를 확인합니다.")
     async def enhancement_info(self, interaction: discord.Interaction):
@@ -870,15 +806,13 @@ class EnhancementSystemCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def reset_enhancement(self, interaction: discord.Interaction):
         try:
-            total_items = len(self.enhancement_data.data.get("items", {}))
-            server_stats = self.enhancement_data.get_server_stats()
+            guild_id = str(interaction.guild_id)
+            server_stats = self.enhancement_data.get_server_stats(guild_id)
+            total_items = self.enhancement_data.reset_guild(guild_id)
             if total_items == 0: return await interaction.response.send_message("ℹ️ 초기화할 강화 데이터가 없습니다.", ephemeral=True)
-            self.enhancement_data.data = self.enhancement_data._create_default_data()
-            if self.enhancement_data.save_data():
-                embed = discord.Embed(title="✅ 강화 데이터 초기화 완료", description="모든 강화 데이터가 성공적으로 초기화되었습니다.", color=discord.Color.green())
-                embed.add_field(name="🗑️ 삭제된 데이터", value=f"• 아이템 수: **{total_items}개**\n• 총 시도: **{server_stats['total_attempts']:,}회**\n• 참여자: **{server_stats['total_users']:,}명**\n• 최고 레벨: **{server_stats['highest_level']}**", inline=False)
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-            else: await interaction.response.send_message("❌ 초기화 실패", ephemeral=True)
+            embed = discord.Embed(title="✅ 강화 데이터 초기화 완료", description="모든 강화 데이터가 성공적으로 초기화되었습니다.", color=discord.Color.green())
+            embed.add_field(name="🗑️ 삭제된 데이터", value=f"• 아이템 수: **{total_items}개**\n• 총 시도: **{server_stats['total_attempts']:,}회**\n• 참여자: **{server_stats['total_users']:,}명**\n• 최고 레벨: **{server_stats['highest_level']}**", inline=False)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e: print(f"❌ 초기화 오류: {e}"); await interaction.response.send_message("❌ 오류 발생", ephemeral=True)
 
 async def setup(bot):
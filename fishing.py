@@ -3,7 +3,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import asyncio
+import heapq
 import random
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 from typing import Optional
 from datetime import datetime, timedelta, timezone
 
@@ -303,6 +308,207 @@ FACILITIES = {
 active_sessions = {}
 user_locks = {}
 
+# ==========================================
+# 🗺️ [낚시터 상태 캐시 & 확률표]
+# ==========================================
+# 당기기마다 낚시터/시설을 다시 읽지 않도록 (guild_id, channel_id) 단위 스냅샷을 보관합니다.
+# 등급·지형·오염도·시설을 바꾸는 명령은 커밋한 뒤에 invalidate_ground()를 호출해야 하며,
+# (커밋 전에 비우면 그 사이의 조회가 이전 상태를 다시 캐시함)
+# TTL은 무효화가 누락된 경로에 대비한 안전망입니다.
+GROUND_CACHE_TTL = 60
+ground_cache = {}
+
+def _missing_required_facility(tier: int, built) -> Optional[str]:
+    """티어별 필수 시설 누락 여부 (하향 검증 포함)"""
+    if tier >= 2 and ("매표소" not in built and "창고" not in built):
+        return "[매표소] 또는 [창고]"
+    elif tier >= 3 and "중형창고" not in built:
+        return "[중형창고]"
+    elif tier >= 4 and "화력발전소" not in built:
+        return "[화력발전소]"
+    elif tier >= 5 and ("세계1위기업" not in built and "환경부" not in built):
+        return "[세계1위기업] 또는 [환경부]"
+    return None
+
+def get_ground_snapshot(db, guild_id, channel_id) -> Optional[dict]:
+    """낚시터 상태와 시설 효과 합계를 반환합니다. 낚시터가 없으면 None"""
+    key = (str(guild_id), str(channel_id))
+    cached = ground_cache.get(key)
+    now = time.monotonic()
+    if cached and now - cached[0] < GROUND_CACHE_TTL:
+        return cached[1]
+
+    gid, chid = key
+    row = db.execute_query("SELECT tier, ground_type, pollution FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", (chid, gid), 'one')
+    if not row:
+        ground_cache.pop(key, None)
+        return None
+
+    rows = db.execute_query("SELECT facility_name FROM fishing_facilities WHERE channel_id = ? AND guild_id = ?", (chid, gid), 'all')
+    facilities = frozenset(r['facility_name'] for r in rows) if rows else frozenset()
+    effects = [FACILITIES[name].get("effect", {}) for name in facilities if name in FACILITIES]
+
+    tier = row['tier'] or 1
+    snapshot = {
+        "tier": tier,
+        "ground_type": row['ground_type'] or "호수",
+        "pollution": row['pollution'] or 0,
+        "facilities": facilities,
+        "missing_facility": _missing_required_facility(tier, facilities),
+        "trash_rate": sum(e.get("trash_rate", 0) for e in effects),
+        "fish_rate": sum(e.get("fish_rate", 0.0) for e in effects),
+        "rep_mult": max([1.0] + [e.get("rep_mult", 1.0) for e in effects]),
+    }
+    ground_cache[key] = (now, snapshot)
+    return snapshot
+
+def invalidate_ground(guild_id, channel_id=None):
+    """낚시터 스냅샷 무효화 (channel_id가 없으면 길드 전체)"""
+    gid = str(guild_id)
+    if channel_id is not None:
+        ground_cache.pop((gid, str(channel_id)), None)
+        return
+    for key in [k for k in ground_cache if k[0] == gid]:
+        ground_cache.pop(key, None)
+
+def weighted_pick(items, cum_weights):
+    """누적 가중치 테이블에서 이분 탐색으로 하나를 뽑습니다."""
+    x = random.random() * cum_weights[-1]
+    return items[min(bisect_right(cum_weights, x), len(items) - 1)]
+
+@lru_cache(maxsize=None)
+def trash_table(tier: int):
+    """티어별 쓰레기 누적 가중치 (6티어 이상은 동일한 표를 사용)"""
+    g_items = {i: [t for t in TRASH_LIST if t["group"] == i] for i in range(1, 7)}
+
+    # 5%는 무조건 ??? (Group 6)
+    target_weights = {6: 0.05}
+    if tier == 1:
+        target_weights[1], others_weight = 0.80, 0.15
+    elif tier == 2:
+        target_weights[2], others_weight = 0.70, 0.25
+    elif tier == 3:
+        target_weights[3], others_weight = 0.60, 0.35
+    elif tier == 4:
+        target_weights[4], others_weight = 0.50, 0.45
+    else: # 5티어 및 6티어 이상 예외 처리
+        target_weights[5], others_weight = 0.50, 0.45
+
+    # 나머지 그룹들에 others_weight를 균등 배분 (현재 티어 그룹 및 Group 6 제외)
+    other_groups = [i for i in range(1, 6) if i != tier]
+    if other_groups:
+        per_group_weight = others_weight / len(other_groups)
+        for og in other_groups:
+            target_weights[og] = per_group_weight
+
+    weights = []
+    for t in TRASH_LIST:
+        items_in_grp = len(g_items[t["group"]])
+        weights.append(target_weights.get(t["group"], 0) / items_in_grp if items_in_grp > 0 else 0)
+    return tuple(accumulate(weights))
+
+def _apply_cap(weights, indices, cap_percent):
+    total_w = sum(weights)
+    if total_w <= 0: return weights
+
+    current_w_sum = sum(weights[i] for i in indices)
+    if current_w_sum / total_w > cap_percent:
+        # target / (other + target) = cap  =>  target = other * cap / (1 - cap)
+        other_w_sum = total_w - current_w_sum
+        if other_w_sum <= 0: return weights # 전체가 해당 등급이면 조정 불가
+
+        scale_factor = other_w_sum * (cap_percent / (1.0 - cap_percent)) / current_w_sum
+        for i in indices:
+            weights[i] *= scale_factor
+    return weights
+
+@lru_cache(maxsize=256)
+def fish_table(location: str, tier: int, fish_rate_bonus: float):
+    """(지형, 티어, 시설 보너스)별 어종 풀과 등급 캡이 적용된 누적 가중치"""
+    pool = FISHING_ECOLOGY.get(location, FISHING_ECOLOGY["호수"])
+    valid_pool = [f for f in pool if f.get("req_tier", 1) <= tier]
+    if not valid_pool: valid_pool = pool
+
+    # 희귀 이상은 티어 비례 상승 + 시설 버프 합산
+    weights = [
+        f["chance"] * tier * (1 + fish_rate_bonus) if f["rarity"] in ["희귀", "신종", "전설", "환상"] else f["chance"]
+        for f in valid_pool
+    ]
+
+    rarity_map = {"환상": [], "전설": [], "신종": []}
+    for i, f in enumerate(valid_pool):
+        if f["rarity"] in rarity_map: rarity_map[f["rarity"]].append(i)
+
+    # 캡 적용 (가장 희귀한 순서대로 조정하여 하위 등급의 비중을 확보)
+    weights = _apply_cap(weights, rarity_map["환상"], 0.10) # 환상 10%
+    weights = _apply_cap(weights, rarity_map["전설"], 0.15) # 전설 15%
+    weights = _apply_cap(weights, rarity_map["신종"], 0.30) # 신종 30%
+    return tuple(valid_pool), tuple(accumulate(weights))
+
+# ==========================================
+# ⏰ [만료 이벤트 스케줄러]
+# ==========================================
+ABANDON_RECLAIM_AFTER = timedelta(days=7)  # 방치 낚시터 국고 환수 기준
+
+class GroundSweeper:
+    """
+    임시 지형 복구 / 입장권 만료 / 방치 낚시터 회수의 다음 예정 시각을 길드 단위 최소 힙으로 관리합니다.
+    힙 항목은 "이 시각에 이 길드를 점검하라"는 의미이며, 실제 대상은 점검 시 DB에서 다시 확인하므로
+    늦게 바뀐(연장된) 항목이 먼저 터져도 아무 일 없이 지나갑니다.
+    """
+    MAX_SLEEP = 3600  # 외부에서 DB를 고친 경우에 대비한 최대 대기 시간(초)
+
+    def __init__(self):
+        self._heap = []       # [(due_ts, guild_id)]
+        self._next_due = {}   # {guild_id: due_ts} - 힙에서 유효한 항목 (나머지는 지연 삭제)
+        self._wakeup = asyncio.Event()
+
+    def schedule(self, guild_id, due: datetime):
+        """길드의 다음 점검 시각을 등록합니다. 이미 더 이른 시각이 잡혀 있으면 무시합니다."""
+        gid = str(guild_id)
+        # 만료 비교가 초 단위 문자열의 엄격 비교(<)이므로 1초 여유를 둡니다.
+        ts = due.timestamp() + 1
+        current = self._next_due.get(gid)
+        if current is not None and current <= ts:
+            return
+        self._next_due[gid] = ts
+        heapq.heappush(self._heap, (ts, gid))
+        if self._heap[0] == (ts, gid):
+            self._wakeup.set()
+
+    def schedule_reclaim(self, guild_id, last_activity: Optional[str]):
+        """last_activity 문자열 기준으로 방치 회수 시각을 등록합니다. (기존 비교와 같은 KST 해석)"""
+        if last_activity:
+            self.schedule(guild_id, parse_kst(str(last_activity)[:19]) + ABANDON_RECLAIM_AFTER)
+
+    def forget(self, guild_id):
+        self._next_due.pop(str(guild_id), None)
+
+    def pop_due(self, now_ts: float):
+        """예정 시각이 지난 길드 ID 목록을 꺼냅니다."""
+        due = []
+        while self._heap and self._heap[0][0] <= now_ts:
+            ts, gid = heapq.heappop(self._heap)
+            if self._next_due.get(gid) == ts:
+                del self._next_due[gid]
+                due.append(gid)
+        return due
+
+    async def wait(self):
+        """다음 예정 시각까지(또는 더 이른 일정이 등록될 때까지) 대기합니다."""
+        while self._heap and self._next_due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        timeout = self.MAX_SLEEP
+        if self._heap:
+            timeout = max(0.0, min(self.MAX_SLEEP, self._heap[0][0] - time.time()))
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+ground_sweeper = GroundSweeper()
+
 async def get_usage_benefit(user_id, guild_id, db):
     """최근 24시간 내 이용 횟수를 조회하여 0.5씩 이득 수치를 계산합니다."""
     now = datetime.now(KST)
@@ -358,6 +564,7 @@ class TrashActionView(discord.ui.View):
             if self.value > 0 or is_anger:
                 chid, gid = str(self.channel_id), str(self.guild_id)
                 self.db.execute_query("UPDATE fishing_ground SET pollution = pollution + 0.5 WHERE channel_id = ? AND guild_id = ?", (chid, gid))
+                invalidate_ground(gid, chid)
                 
                 msg = f"**[{self.value_name}]**을 무시했습니다\n(낚시터 오염도 약간 상승)"
                 if is_anger:
@@ -441,6 +648,7 @@ class TrashActionView(discord.ui.View):
                         ban_msg = f"\n\n💸 **[가중 과태료 부과]**\n무단투기 50회 누적 페널티로 가중 과태료 **{surcharge:,}원**이 추가 징수되었습니다. (소지금 보유로 이용 제한 면제)"
 
                 conn.commit() # ✅ 추가: 트랜잭션 완료
+                invalidate_ground(gid, chid)
 
                 if self.message:
                     embed = discord.Embed(
@@ -524,6 +732,7 @@ class TrashActionView(discord.ui.View):
         is_anger = (self.value_name == self.value_name.endswith("의 분노"))
         if self.value > 0 or is_anger:
             self.db.execute_query("UPDATE fishing_ground SET pollution = pollution + 0.5 WHERE channel_id = ? AND guild_id = ?", (chid, gid))
+            invalidate_ground(gid, chid)
             msg = f"**[{self.value_name}]**을 무시했습니다.\n(오염도가 미량 상승합니다)"
             await interaction.response.edit_message(embed=discord.Embed(title="🌬️ 쪽지 폐기", description=msg, color=discord.Color.light_gray()), view=None)
             self._clear_session()
@@ -534,6 +743,7 @@ class TrashActionView(discord.ui.View):
             "UPDATE fishing_ground SET pollution = pollution + 1 WHERE channel_id = ? AND guild_id = ?",
             (chid, gid)
         )
+        invalidate_ground(gid, chid)
         
         current_data = self.db.execute_query(
             "SELECT pollution, owner_id FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", 
@@ -689,6 +899,7 @@ class TierUpgradeConfirmView(discord.ui.View):
             conn.execute("BEGIN")
             conn.execute("UPDATE fishing_ground SET tier = tier + 1, ground_reputation = ground_reputation - ? WHERE channel_id = ? AND guild_id = ?", (self.req_rep, self.chid, self.gid))
             conn.commit()
+            invalidate_ground(self.gid, self.chid)
 
             embed = discord.Embed(
                 title="🎉 낚시터 등급 상승 완료!", 
@@ -829,6 +1040,7 @@ class CleanConfirmView(discord.ui.View):
                          (str(self.user.id), "낚시", -self.cost, user_cash - self.cost, f"낚시터 채널 오염도 {self.reduce_amount} 정화 비용 지출"))
             
             conn.commit()
+            invalidate_ground(self.gid, self.chid)
 
             # 오염도 정산 후 최종 조회
             ground = self.db.execute_query("SELECT pollution FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", (self.chid, self.gid), 'one')
@@ -902,6 +1114,7 @@ class ResetConfirmView(discord.ui.View):
             except: pass
             
             conn.commit()
+            invalidate_ground(gid)
             
             # 실시간 메모리 세션 클리어 (현재 서버의 모든 유저 대상)
             uids = list(active_sessions.keys())
@@ -940,17 +1153,6 @@ class BuyConfirmView(discord.ui.View):
         if self.responded: return
         self.responded = True
 
-        # 🚨 [추가] 런타임 스키마 보정: last_activity 컬럼 존재 여부 재확인
-        try:
-            res = self.db.execute_query("PRAGMA table_info(fishing_ground)", (), 'all')
-            cols = [c['name'] for c in res] if res else []
-            if 'last_activity' not in cols:
-                # SQLite 제약: ALTER TABLE 시 CURRENT_TIMESTAMP 직접 추가 불가
-                self.db.execute_query("ALTER TABLE fishing_ground ADD COLUMN last_activity TIMESTAMP")
-                self.db.execute_query("UPDATE fishing_ground SET last_activity = CURRENT_TIMESTAMP WHERE last_activity IS NULL")
-        except Exception as e:
-            print(f"[스키마 보정 실패] {e}")
-
         conn = self.db.get_connection()
         try:
             conn.execute("BEGIN")
@@ -1021,6 +1223,8 @@ class BuyConfirmView(discord.ui.View):
                 "WHERE channel_id = ? AND guild_id = ?", 
                 (self.buyer_id, new_price, self.chid, self.gid)
             )
+            # last_activity는 CURRENT_TIMESTAMP 문자열이므로 같은 기준으로 방치 회수 시각을 등록합니다.
+            ground_sweeper.schedule_reclaim(self.gid, datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
             
             # 구매자 로그 기록
             conn.execute(
@@ -1029,6 +1233,7 @@ class BuyConfirmView(discord.ui.View):
             )
             
             conn.commit()
+            invalidate_ground(self.gid, self.chid)
             
             title = "⚔️ 낚시터 약탈 성공!" if is_takeover else "🎊 낚시터 매입 성공!"
             takeover_msg = "\n⚠️ 땅의 등급과 명성이 초기화되었습니다." if is_takeover else ""
@@ -1127,6 +1332,7 @@ class SellConfirmView(discord.ui.View):
             )
             
             conn.commit()
+            invalidate_ground(self.gid, self.chid)
             
             embed = discord.Embed(
                 title="🏢 낚시터 매각 완료",
@@ -1185,7 +1391,7 @@ class FishingGameView(discord.ui.View):
         chid = str(interaction.channel_id)
         
         # 🦖 [쥬라기 특수 지형 체크]
-        ground = self.db.execute_query("SELECT ground_type FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", (chid, gid), 'one')
+        ground = get_ground_snapshot(self.db, gid, chid)
         location = ground['ground_type'] if ground else "호수"
         bait_needed = 30 if location == "쥬라기" else 1
 
@@ -1291,33 +1497,11 @@ class FishingGameView(discord.ui.View):
         chid = str(interaction.channel.id)
 
         # 🛑 [하드코어 소급 적용] 필수 건축물 실시간 검증 시스템 --------------------------
-        db = self.db
-        ground = db.execute_query(
-            "SELECT tier FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", 
-            (chid, gid), 'one'
-        )
-        
-        if ground:
-            current_tier = ground['tier']
-            
-            # 현재 땅에 지어진 시설 목록 조회
-            facilities = db.execute_query(
-                "SELECT facility_name FROM fishing_facilities WHERE channel_id = ? AND guild_id = ?", 
-                (chid, gid), 'all'
-            )
-            built_names = [f['facility_name'] for f in facilities] if facilities else []
+        snapshot = get_ground_snapshot(self.db, gid, chid)
 
-            # 🚨 각 티어별 필수 시설 누락 검증 (하향 검증 포함)
-            missing_facility = None
-            
-            if current_tier >= 2 and ("매표소" not in built_names and "창고" not in built_names):
-                missing_facility = "[매표소] 또는 [창고]"
-            elif current_tier >= 3 and "중형창고" not in built_names:
-                missing_facility = "[중형창고]"
-            elif current_tier >= 4 and "화력발전소" not in built_names:
-                missing_facility = "[화력발전소]"
-            elif current_tier >= 5 and ("세계1위기업" not in built_names and "환경부" not in built_names):
-                missing_facility = "[세계1위기업] 또는 [환경부]"
+        if snapshot:
+            current_tier = snapshot['tier']
+            missing_facility = snapshot['missing_facility']
 
             # 필수 시설이 누락되었다면 낚시 차단
             if missing_facility:
@@ -1361,13 +1545,11 @@ class FishingGameView(discord.ui.View):
                 conn.execute("BEGIN")
                 conn.execute("UPDATE fishing_gear SET rod_durability = MAX(0, rod_durability - 1) WHERE user_id = ? AND guild_id = ?", (uid, gid))
 
-                ground = self.db.execute_query("SELECT ground_type, tier, pollution FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", (chid, gid), 'one')
+                ground = get_ground_snapshot(self.db, gid, chid)
                 location = ground['ground_type'] if ground else "호수"
                 current_ground_tier = ground['tier'] if ground else 1
                 current_pollution = ground['pollution'] if ground else 0
 
-                built_facilities = self.db.execute_query("SELECT facility_name FROM fishing_facilities WHERE channel_id = ? AND guild_id = ?", (chid, gid), 'all')
-
                 # ✅ [연타 패널티 적용] force_trash가 활성화된 경우 무조건 쓰레기 낚시
                 if self.force_trash:
                     trash_chance = 1.0
@@ -1383,7 +1565,13 @@ class FishingGameView(discord.ui.View):
                         trash_chance = base_trash + (current_pollution * 0.007499) 
 
                 # 🧤 [추가] 낚시 장갑 버프 체크 (쓰레기 확률 -10%)
-                user_data_buff = self.db.execute_query("SELECT trash_buff_until, fish_buff_until, appeal_buff_until FROM users WHERE user_id = ? AND guild_id = ?", (uid, gid), 'one')
+                # 🧪 입장권 함정 여부도 같은 조회에서 함께 가져옵니다.
+                user_data_buff = self.db.execute_query(
+                    "SELECT trash_buff_until, fish_buff_until, appeal_buff_until, "
+                    "(SELECT is_sabotaged FROM fishing_passes p WHERE p.user_id = users.user_id AND p.channel_id = ? AND p.guild_id = ?) AS is_sabotaged "
+                    "FROM users WHERE user_id = ? AND guild_id = ?",
+                    (chid, gid, uid, gid), 'one'
+                )
                 if user_data_buff:
                     if user_data_buff['trash_buff_until']:
                         buff_until = parse_kst(user_data_buff['trash_buff_until'])
@@ -1404,17 +1592,12 @@ class FishingGameView(discord.ui.View):
 
                 # 🧪 [추가] 함정(Sabotage) 체크 (입장권 기반)
                 # 사유지일 경우에만 입장권의 함정 여부를 확인합니다.
-                pass_data = self.db.execute_query("SELECT is_sabotaged FROM fishing_passes WHERE user_id = ? AND channel_id = ? AND guild_id = ?", (uid, chid, gid), 'one')
-                if pass_data and pass_data['is_sabotaged'] == 1:
+                if user_data_buff and user_data_buff['is_sabotaged'] == 1:
                     trash_chance += 0.05 # 5% 증가
 
                 # 시설 효과가 있다면 마저 계산해 줍니다. (패널티 중에는 적용 안 함)
-                if not self.force_trash and built_facilities:
-                    for f in built_facilities:
-                        f_name = f['facility_name']
-                        if f_name in FACILITIES:
-                            trash_mod = FACILITIES[f_name].get("effect", {}).get("trash_rate", 0)
-                            trash_chance += trash_mod
+                if not self.force_trash and ground:
+                    trash_chance += ground['trash_rate']
 
                 # 쓰레기 확률 상한선을 0.9999 (99.99%)로 설정합니다! (단, 패널티 시는 1.0)
                 if not self.force_trash:
@@ -1424,47 +1607,8 @@ class FishingGameView(discord.ui.View):
                 if random.random() < trash_chance:
                     # ... (기존 쓰레기 결정 로직 중 가중치 계산 부분은 유지)
                     
-                    # ⚖️ [티어별 그룹 가중치 계산]
-                    all_groups = range(1, 7)
-                    g_items = {i: [t for t in TRASH_LIST if t["group"] == i] for i in all_groups}
-                    
-                    # 5%는 무조건 ??? (Group 6)
-                    target_weights = {6: 0.05}
-                    
-                    if current_ground_tier == 1:
-                        target_weights[1] = 0.80
-                        others_weight = 0.15
-                    elif current_ground_tier == 2:
-                        target_weights[2] = 0.70
-                        others_weight = 0.25
-                    elif current_ground_tier == 3:
-                        target_weights[3] = 0.60
-                        others_weight = 0.35
-                    elif current_ground_tier == 4:
-                        target_weights[4] = 0.50
-                        others_weight = 0.45
-                    elif current_ground_tier == 5:
-                        target_weights[5] = 0.50
-                        others_weight = 0.45
-                    else: # 6티어 이상 예외 처리
-                        target_weights[5] = 0.50
-                        others_weight = 0.45
-                    
-                    # 나머지 그룹들에 others_weight를 균등 배분 (현재 티어 그룹 및 Group 6 제외)
-                    other_groups = [i for i in range(1, 6) if i != current_ground_tier]
-                    if other_groups:
-                        per_group_weight = others_weight / len(other_groups)
-                        for og in other_groups:
-                            target_weights[og] = per_group_weight
-
-                    trash_weights = []
-                    for t in TRASH_LIST:
-                        grp = t["group"]
-                        grp_total_weight = target_weights.get(grp, 0)
-                        items_in_grp = len(g_items[grp])
-                        trash_weights.append(grp_total_weight / items_in_grp if items_in_grp > 0 else 0)
-
-                    trash = random.choices(TRASH_LIST, weights=trash_weights, k=1)[0]
+                    # ⚖️ [티어별 그룹 가중치] 미리 계산된 누적 가중치 표에서 이분 탐색
+                    trash = weighted_pick(TRASH_LIST, trash_table(min(current_ground_tier, 6)))
 
                     # 💰 소지금 기반 퍼센트 비용 계산
                     current_cash = self.db.get_user_cash(uid) or 0
@@ -1530,68 +1674,18 @@ class FishingGameView(discord.ui.View):
 
                 # 🎣 물고기 기믹
                 # (이전 중복 조회 부분 제거됨)
-                pool = FISHING_ECOLOGY.get(location, FISHING_ECOLOGY["호수"])
-                valid_pool = [f for f in pool if f.get("req_tier", 1) <= current_ground_tier]
-                if not valid_pool: valid_pool = pool
-
-                fish_rate_bonus = 0.0
-                if built_facilities:
-                    for f in built_facilities:
-                        f_name = f['facility_name']
-                        if f_name in FACILITIES:
-                            fish_rate_bonus += FACILITIES[f_name].get("effect", {}).get("fish_rate", 0.0)
-
-                # ⚖️ [등급별 확률 캡 시스템]
-                raw_weights = []
-                for f in valid_pool:
-                    base_chance = f["chance"]
-                    if f["rarity"] in ["희귀", "신종", "전설", "환상"]:
-                        # 티어 비례 상승 + 시설 버프 합산
-                        adj_w = base_chance * current_ground_tier * (1 + fish_rate_bonus)
-                    else:
-                        adj_w = base_chance
-                    raw_weights.append(adj_w)
-
-                # 등급별 가중치 합 및 인덱스 분류
-                rarity_map = {"환상": [], "전설": [], "신종": [], "기타": []}
-                for i, f in enumerate(valid_pool):
-                    r = f["rarity"]
-                    if r in rarity_map: rarity_map[r].append(i)
-                    else: rarity_map["기타"].append(i)
-
-                def apply_cap(weights, indices, cap_percent):
-                    total_w = sum(weights)
-                    if total_w <= 0: return weights
-                    
-                    current_w_sum = sum(weights[i] for i in indices)
-                    current_ratio = current_w_sum / total_w
-                    
-                    if current_ratio > cap_percent:
-                        # 목표 확률을 맞추기 위한 새로운 가중치 합 계산
-                        # target / (other + target) = cap  =>  target = other * cap / (1 - cap)
-                        other_w_sum = total_w - current_w_sum
-                        if other_w_sum <= 0: return weights # 전체가 해당 등급이면 조정 불가
-                        
-                        target_w_sum = other_w_sum * (cap_percent / (1.0 - cap_percent))
-                        scale_factor = target_w_sum / current_w_sum
-                        
-                        for i in indices:
-                            weights[i] *= scale_factor
-                    return weights
-
-                # 캡 적용 (가장 희귀한 순서대로 조정하여 하위 등급의 비중을 확보)
-                adjusted_weights = list(raw_weights)
-                adjusted_weights = apply_cap(adjusted_weights, rarity_map["환상"], 0.10) # 환상 10%
-                adjusted_weights = apply_cap(adjusted_weights, rarity_map["전설"], 0.15) # 전설 15%
-                adjusted_weights = apply_cap(adjusted_weights, rarity_map["신종"], 0.30) # 신종 30%
+                # ⚖️ [등급별 확률 캡 시스템] (지형, 티어, 시설 보너스)별로 미리 계산된 표 사용
+                fish_rate_bonus = ground['fish_rate'] if ground else 0.0
+                valid_pool, fish_weights = fish_table(location, current_ground_tier, fish_rate_bonus)
 
                 # ✅ 최종 결정
-                fish = random.choices(valid_pool, weights=adjusted_weights, k=1)[0]
+                fish = weighted_pick(valid_pool, fish_weights)
                 length = round(random.uniform(fish["min"], fish["max"]), 1)
 
                 # 💥 [특수 동물 및 유해생물 이벤트 즉시 작동 구역]
                 # ✅ [수정] 특수 이벤트 체크 및 DB 트랜잭션을 통합 관리합니다.
                 special_event = False
+                ground_changed = False  # 낚시터 상태를 바꿨으면 커밋 후 스냅샷 무효화
                 event_embed = None
 
                 if fish["name"] == "수달":
@@ -1688,6 +1782,7 @@ class FishingGameView(discord.ui.View):
                     conn.execute("UPDATE users SET cash = cash + 10000 WHERE user_id = ? AND guild_id = ?", (uid, gid))
                     new_pollution = min(100.0, current_pollution + 2.0)
                     conn.execute("UPDATE fishing_ground SET pollution = ? WHERE channel_id = ? AND guild_id = ?", (new_pollution, chid, gid))
+                    ground_changed = True
                     event_embed = discord.Embed(title="🐸 황소개구리 포획!", description="외래종 퇴치 포상금 **10,000원**을 획득했습니다.\n(🚨 늪 오염도 **+2.0 P** 상승)", color=discord.Color.gold())
                     special_event = True
 
@@ -1700,6 +1795,7 @@ class FishingGameView(discord.ui.View):
                     reduced_pollution = current_pollution * 0.05
                     new_pollution = max(0.0, current_pollution - reduced_pollution)
                     conn.execute("UPDATE fishing_ground SET pollution = ? WHERE channel_id = ? AND guild_id = ?", (new_pollution, chid, gid))
+                    ground_changed = True
                     event_embed = discord.Embed(title="🌿 해초 수거!", description=f"낚싯바늘에 걸려온 해초를 수거하여 바다를 정화했습니다!\n(✨ 오염도 **-{reduced_pollution:.2f} P** 감소 / 현재: {new_pollution:.1f} P)", color=discord.Color.blue())
                     special_event = True
 
@@ -1760,14 +1856,7 @@ class FishingGameView(discord.ui.View):
                         is_new_record = True
 
                     # ✨ [명성 계산 시스템 개선]
-                    rep_multiplier = 1.0
-                    if built_facilities:
-                        for f in built_facilities:
-                            f_name = f['facility_name']
-                            if f_name in FACILITIES:
-                                f_mult = FACILITIES[f_name].get("effect", {}).get("rep_mult", 1.0)
-                                if f_mult > rep_multiplier:
-                                    rep_multiplier = f_mult
+                    rep_multiplier = ground['rep_mult'] if ground else 1.0
 
                     # 1. 개인 명성 지급 (등급별 기본 점수 + 특정 어종 보너스)
                     rarity_rep = {"흔함": 1, "희귀": 3, "신종": 10, "전설": 30, "환상": 100}
@@ -1853,6 +1942,8 @@ class FishingGameView(discord.ui.View):
 
                 # 🏁 모든 처리가 끝난 후 커밋을 수행합니다.
                 conn.commit()
+                if ground_changed:
+                    invalidate_ground(gid, chid)
                 
                 # 💬 최종 메시지 전송
                 await interaction.edit_original_response(embed=event_embed, view=None)
@@ -1955,6 +2046,7 @@ class GroundAccessView(discord.ui.View):
                 "ON CONFLICT(user_id, channel_id, guild_id) DO UPDATE SET expire_time = excluded.expire_time, is_sabotaged = excluded.is_sabotaged",
                 (uid, str(interaction.channel_id), gid, expire, is_sabotaged)
             )
+            ground_sweeper.schedule(gid, parse_kst(expire))
             
             conn.commit()
 
@@ -1992,139 +2084,26 @@ class FishingSystemCog(commands.Cog):
         if not self.auto_cleanup_inactive_grounds.is_running():
             self.auto_cleanup_inactive_grounds.start()
 
+    def cog_unload(self):
+        self.auto_cleanup_inactive_grounds.cancel()
+
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
         if self.db_cog:
             db = self.db_cog.get_manager(guild.id)
             self._init_db_schema(db)
+            await self._seed_sweeper(guild)
 
-    def _init_db_schema(self, db):
-        # 1. 기본 테이블 생성
-        db.create_table("fishing_ground", "channel_id TEXT, guild_id TEXT, owner_id TEXT, channel_name TEXT, ground_type TEXT DEFAULT '호수', tier INTEGER DEFAULT 1, ground_reputation INTEGER DEFAULT 0, ground_price INTEGER DEFAULT 100000, purchasable INTEGER DEFAULT 1, is_public INTEGER DEFAULT 1, entry_fee INTEGER DEFAULT 0, usage_time_limit INTEGER DEFAULT 6, pollution INTEGER DEFAULT 0, last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY(channel_id, guild_id)")
-        db.create_table("fishing_gear", "user_id TEXT, guild_id TEXT, rod_level INTEGER DEFAULT 0, rod_durability INTEGER DEFAULT 100, bait_level INTEGER DEFAULT 0, bait_count INTEGER DEFAULT 0, PRIMARY KEY(user_id, guild_id)")
-        db.create_table("fishing_inventory", "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, guild_id TEXT, fish_name TEXT, length REAL, price_per_cm INTEGER, rarity TEXT DEFAULT '흔함'")
-        db.create_table("fishing_passes", "user_id TEXT, channel_id TEXT, guild_id TEXT, expire_time TEXT, is_sabotaged INTEGER DEFAULT 0, PRIMARY KEY(user_id, channel_id, guild_id)")
-        db.create_table("fishing_facilities", "channel_id TEXT, guild_id TEXT, facility_name TEXT, PRIMARY KEY(channel_id, guild_id, facility_name)")
-        db.create_table("point_history", "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, transaction_type TEXT, amount INTEGER, balance_after INTEGER, description TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP")
-        
-        # 🔍 [수정 부분] users 테이블 컬럼 누락 체크 및 보정
-        cols_u_res = db.execute_query("PRAGMA table_info(users)", (), 'all')
-        cols_u = [c['name'] for c in cols_u_res] if cols_u_res else []
-
-        if 'max_fish_length' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN max_fish_length REAL DEFAULT 0.0")
-            except: pass
-
-        if 'fishing_reputation' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN fishing_reputation INTEGER DEFAULT 0")
-            except: pass
-
-        if 'illegal_dump_count' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN illegal_dump_count INTEGER DEFAULT 0")
-            except: pass
-
-        if 'neglect_dump_count' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN neglect_dump_count INTEGER DEFAULT 0")
-            except: pass
-
-        if 'fine_debt' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN fine_debt INTEGER DEFAULT 0")
-            except: pass
-
-        if 'fishing_ban_until' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN fishing_ban_until TEXT")
-            except: pass
-
-        if 'max_dump_rate' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN max_dump_rate REAL DEFAULT 0.0")
-            except: pass
-
-        if 'trash_buff_until' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN trash_buff_until TEXT")
-            except: pass
-
-        if 'fish_buff_until' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN fish_buff_until TEXT")
-            except: pass
-
-        if 'award_buff_until' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN award_buff_until TEXT")
-            except: pass
-
-        if 'appeal_buff_until' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN appeal_buff_until TEXT")
-            except: pass
-
-        if 'trash_free_passes' not in cols_u:
-            try: db.execute_query("ALTER TABLE users ADD COLUMN trash_free_passes INTEGER DEFAULT 0")
-            except: pass
-
-        # 📦 [추가] 인벤토리 rarity 컬럼 누락 체크
-        cols_i_res = db.execute_query("PRAGMA table_info(fishing_inventory)", (), 'all')
-        cols_i = [c['name'] for c in cols_i_res] if cols_i_res else []
-        if 'rarity' not in cols_i:
-            try: db.execute_query("ALTER TABLE fishing_inventory ADD COLUMN rarity TEXT DEFAULT '흔함'")
-            except: pass
-
-        # 🎫 [추가] 입장권 sabotaged 컬럼 체크
-        cols_p_res = db.execute_query("PRAGMA table_info(fishing_passes)", (), 'all')
-        cols_p = [c['name'] for c in cols_p_res] if cols_p_res else []
-        if 'is_sabotaged' not in cols_p:
-            try: db.execute_query("ALTER TABLE fishing_passes ADD COLUMN is_sabotaged INTEGER DEFAULT 0")
-            except: pass
-
-        # 3. 낚시터 테이블 컬럼 누락 보정 (PRAGMA 조회)
-        cols_g_res = db.execute_query("PRAGMA table_info(fishing_ground)", (), 'all')
-        cols_g = [c['name'] for c in cols_g_res] if cols_g_res else []
-
-        if 'pollution' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN pollution INTEGER DEFAULT 0")
-            except: pass
-
-        if 'trap_count' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN trap_count INTEGER DEFAULT 0")
-            except: pass
-
-        # ✅ 여기에 purchasable 자동 생성 로직을 추가합니다!
-        if 'purchasable' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN purchasable INTEGER DEFAULT 1")
-            except: pass
-
-        if 'is_public' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN is_public INTEGER DEFAULT 1")
-            except: pass
-        
-        if 'usage_time_limit' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN usage_time_limit INTEGER DEFAULT 6")
-            except: pass
-
-        if 'entry_fee' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN entry_fee INTEGER DEFAULT 0")
-            except: pass
-        if 'ground_type' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN ground_type TEXT DEFAULT '호수'")
-            except: pass
-
-        if 'last_activity' not in cols_g:
-            try: 
-                # SQLite에서는 ALTER TABLE 시 CURRENT_TIMESTAMP 같은 동적 기본값을 직접 추가할 수 없음
-                db.execute_query("ALTER TABLE fishing_ground ADD COLUMN last_activity TIMESTAMP")
-                db.execute_query("UPDATE fishing_ground SET last_activity = CURRENT_TIMESTAMP WHERE last_activity IS NULL")
-            except: pass
-
-        if 'original_ground_type' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN original_ground_type TEXT")
-            except: pass
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        ground_sweeper.forget(guild.id)
 
-        if 'temp_terrain_expire' not in cols_g:
-            try: db.execute_query("ALTER TABLE fishing_ground ADD COLUMN temp_terrain_expire TEXT")
-            except: pass
+    def _init_db_schema(self, db):
+        """낚시 스키마 마이그레이션 적용 (cog 로드/길드 참여 시 1회, 이후에는 건너뜀)"""
+        db.apply_migrations("fishing")
 
     def _get_db(self, interaction: discord.Interaction):
-        db = self.db_cog.get_manager(interaction.guild_id)
-        # ✅ 명령어를 날릴 때마다 스키마를 체크하여 누락된 컬럼(is_public 등)이 있다면 채워 넣습니다.
-        self._init_db_schema(db)
-        return db
+        return self.db_cog.get_manager(interaction.guild_id)
     
     def _ensure_ground_exists(self, db, chid: str, gid: str, channel_name: str):
         ground = db.execute_query("SELECT 1 FROM fishing_ground WHERE channel_id = ? AND guild_id = ?", (chid, gid), 'one')
@@ -2287,7 +2266,7 @@ class FishingSystemCog(commands.Cog):
     async def fish_start(self, interaction: discord.Interaction):
         # 💡 현재 서버의 분리된 DB 인스턴스를 가져옵니다.
         db = self.db_cog.get_manager(interaction.guild.id) if self.db_cog else None
-        if not db or not db.get_user(str(interaction.user.id)):
+        if not db or not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2297,7 +2276,7 @@ class FishingSystemCog(commands.Cog):
     async def fish_short(self, interaction: discord.Interaction):
         # 💡 단축어 명령어 공간도 동일하게 현재 서버의 DB 인스턴스를 찔러줍니다.
         db = self.db_cog.get_manager(interaction.guild.id) if self.db_cog else None
-        if not db or not db.get_user(str(interaction.user.id)):
+        if not db or not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2325,7 +2304,7 @@ class FishingSystemCog(commands.Cog):
         지형: Optional[str] = None
     ):
         db = self._get_db(interaction) # 인스턴스화된 안전한 DB 매니저 먼저 로드
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return                
@@ -2515,6 +2494,7 @@ class FishingSystemCog(commands.Cog):
                                 "UPDATE fishing_ground SET original_ground_type = ?, temp_terrain_expire = ? WHERE channel_id = ? AND guild_id = ?",
                                 (ground['ground_type'], expire_time, chid, gid)
                             )
+                            ground_sweeper.schedule(gid, parse_kst(expire_time))
                             revert_msg = "\n⚠️ **주의:** 운영진 권한으로 고대 생태계가 개방되었습니다! **30분 후** 원래 지형으로 복구됩니다."
                         new_type = "쥬라기"
                     else:
@@ -2529,6 +2509,7 @@ class FishingSystemCog(commands.Cog):
                     "UPDATE fishing_ground SET entry_fee = ?, ground_type = ? WHERE channel_id = ? AND guild_id = ?", 
                     (new_fee, new_type, chid, gid)
                 )
+                invalidate_ground(gid, chid)
                 await interaction.response.send_message(f"✅ 기초 정보가 업데이트되었습니다! (입장료: {new_fee:,}원 / 환경: {new_type}){revert_msg}")
                 return 
 
@@ -2574,7 +2555,7 @@ class FishingSystemCog(commands.Cog):
     ])
     async def edit_tier(self, interaction: discord.Interaction, 액션: str):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2650,6 +2631,7 @@ class FishingSystemCog(commands.Cog):
                 conn.execute("BEGIN")
                 conn.execute("UPDATE fishing_ground SET tier = tier - 1, ground_reputation = ground_reputation + 500 WHERE channel_id = ? AND guild_id = ?", (chid, gid))
                 conn.commit()
+                invalidate_ground(gid, chid)
                 await interaction.response.send_message(f"🔽 낚시터 등급이 **{current_tier - 1}티어**로 내려갔습니다! (명성 500점 환급)")
             except Exception as e:
                 conn.rollback()
@@ -2663,7 +2645,7 @@ class FishingSystemCog(commands.Cog):
     ])
     async def clean_channel_pollution(self, interaction: discord.Interaction, 청소량: str):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2743,7 +2725,7 @@ class FishingSystemCog(commands.Cog):
     # 📌 autocomplete=True 를 시설명 파라미터에 추가합니다.
     async def build_facility(self, interaction: discord.Interaction, 대분류: str, 시설명: str):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2754,7 +2736,7 @@ class FishingSystemCog(commands.Cog):
             return await interaction.response.send_message("❌ 선택하신 시설은 이 카테고리에 속해있지 않습니다.", ephemeral=True)
         
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2799,6 +2781,7 @@ class FishingSystemCog(commands.Cog):
             conn.execute("INSERT INTO fishing_facilities (channel_id, guild_id, facility_name) VALUES (?, ?, ?)", (chid, gid, 시설명))
 
             conn.commit()
+            invalidate_ground(gid, chid)
             await interaction.response.send_message(
                 f"🏗️ <#{chid}> 채널에 **{시설명}** 건설이 완료되었습니다!\n"
                 f"💸 **차감 소지금:** `{f_data['req_cash']:,}원` / 📉 **소모 명성:** `{f_data['req_rep']:,}점`"
@@ -2842,7 +2825,7 @@ class FishingSystemCog(commands.Cog):
     @app_commands.command(name="시설철거", description="낚시터에 지어진 시설을 파괴하고 명성을 일부 돌려받습니다.")
     async def destroy_facility(self, interaction: discord.Interaction, 시설명: str):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2868,6 +2851,7 @@ class FishingSystemCog(commands.Cog):
             conn.execute("DELETE FROM fishing_facilities WHERE channel_id = ? AND guild_id = ? AND facility_name = ?", (chid, gid, 시설명))
             conn.execute("UPDATE users SET fishing_reputation = fishing_reputation + ? WHERE user_id = ? AND guild_id = ?", (refund_rep, uid, gid))
             conn.commit()
+            invalidate_ground(gid, chid)
             await interaction.response.send_message(f"🪓 <#{chid}> 채널의 **{시설명}** 시설이 철거되었습니다! 개인 명성 **{refund_rep:,}점**을 환급받았습니다.")
         except Exception as e:
             conn.rollback()
@@ -2894,7 +2878,7 @@ class FishingSystemCog(commands.Cog):
     @app_commands.choices(분류=[app_commands.Choice(name="내 정보", value="me"), app_commands.Choice(name="서버 랭킹", value="rank")])
     async def fish_info(self, interaction: discord.Interaction, 분류: str = "me"):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -2950,7 +2934,7 @@ class FishingSystemCog(commands.Cog):
     ])
     async def fish_shop(self, interaction: discord.Interaction, 액션: str, 수량: Optional[int] = None):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -3184,7 +3168,7 @@ class FishingSystemCog(commands.Cog):
     ])
     async def upgrade_gear(self, interaction: discord.Interaction, 강화대상: str):
         db = self._get_db(interaction) # 인스턴스화된 DB 매니저 할당
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -3244,7 +3228,7 @@ class FishingSystemCog(commands.Cog):
     ])
     async def admin_control(self, interaction: discord.Interaction, 대상: str, 수치: Optional[int] = None, 유저: Optional[discord.Member] = None):
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -3307,6 +3291,7 @@ class FishingSystemCog(commands.Cog):
                 )
                 conn.execute("DELETE FROM fishing_facilities WHERE channel_id = ? AND guild_id = ?", (chid, gid))
                 conn.commit()
+                invalidate_ground(gid, chid)
 
                 async def safe_rename_reset():
                     try:
@@ -3328,7 +3313,7 @@ class FishingSystemCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def reset_all_fishing_data(self, interaction: discord.Interaction): # 👈 에러 수정: 불필요한 인자 제거 및 이름 정상화
         db = self._get_db(interaction)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -3345,66 +3330,121 @@ class FishingSystemCog(commands.Cog):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 
-    @tasks.loop(minutes=1)
-    async def auto_cleanup_inactive_grounds(self):
-        """방치 낚시터 회수(24시간 주기 체크) 및 임시 지형 복구(실시간)"""
-        now_dt = datetime.now(KST)
+    @staticmethod
+    def _next_sweep_time(conn) -> Optional[datetime]:
+        """세 가지 만료 이벤트 중 가장 이른 예정 시각 (부분 인덱스를 타는 MIN 조회)"""
+        row = conn.execute(
+            "SELECT (SELECT MIN(temp_terrain_expire) FROM fishing_ground WHERE temp_terrain_expire IS NOT NULL) AS terrain, "
+            "(SELECT MIN(expire_time) FROM fishing_passes) AS pass, "
+            "(SELECT MIN(last_activity) FROM fishing_ground WHERE owner_id IS NOT NULL) AS activity"
+        ).fetchone()
+        candidates = []
+        if row['terrain']: candidates.append(parse_kst(row['terrain']))
+        if row['pass']: candidates.append(parse_kst(row['pass']))
+        if row['activity']: candidates.append(parse_kst(str(row['activity'])[:19]) + ABANDON_RECLAIM_AFTER)
+        return min(candidates) if candidates else None
+
+    @staticmethod
+    def _apply_due_events(db, gid: str, now_dt: datetime):
+        """
+        길드 워커 스레드에서 실행: 만료된 임시 지형 복구, 만료 입장권 정리, 방치 낚시터 회수를 한 트랜잭션으로 처리하고
+        다음 예정 시각을 함께 돌려줍니다.
+        """
         now_str = now_dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        for guild in self.bot.guilds:
-            try:
-                db = self.db_cog.get_manager(guild.id)
-                self._init_db_schema(db)
+        threshold_date = (now_dt - ABANDON_RECLAIM_AFTER).strftime('%Y-%m-%d %H:%M:%S')
 
-                # 🦕 [1] 임시 지형 복구 로직 (쥬라기 등)
-                expired_terrains = db.execute_query(
+        conn = db.get_connection()
+        with conn:
+            # 🦕 [1] 임시 지형 복구 (쥬라기 등)
+            terrains = [
+                (t['channel_id'], t['original_ground_type'] or "호수")
+                for t in conn.execute(
                     "SELECT channel_id, original_ground_type FROM fishing_ground WHERE temp_terrain_expire IS NOT NULL AND temp_terrain_expire < ?",
-                    (now_str,), 'all'
-                )
-                
-                if expired_terrains:
-                    for t in expired_terrains:
-                        chid = t['channel_id']
-                        orig = t['original_ground_type'] or "호수"
-                        db.execute_query(
-                            "UPDATE fishing_ground SET ground_type = ?, original_ground_type = NULL, temp_terrain_expire = NULL WHERE channel_id = ?",
-                            (orig, chid)
-                        )
-                        print(f"🦕 [지형복구] {guild.name} - {chid} 채널이 원래 지형({orig})으로 복구되었습니다.")
-
-                # 🏛️ [2] 7일 방치 낚시터 회수 (기존 로직 유지하되 1시간에 한 번만 실제 실행되도록 내부 체크 가능)
-                # 여기서는 매 분 실행되지만, last_activity가 7일 이전인 것만 골라내므로 안전합니다.
-                threshold_date = (now_dt - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
-                targets = db.execute_query(
-                    "SELECT * FROM fishing_ground WHERE owner_id IS NOT NULL AND last_activity < ?", 
-                    (threshold_date,), 'all'
+                    (now_str,)
+                ).fetchall()
+            ]
+            conn.executemany(
+                "UPDATE fishing_ground SET ground_type = ?, original_ground_type = NULL, temp_terrain_expire = NULL WHERE channel_id = ?",
+                [(orig, chid) for chid, orig in terrains]
+            )
+
+            # 🎫 [2] 만료된 입장권 정리
+            expired_passes = conn.execute("DELETE FROM fishing_passes WHERE expire_time < ?", (now_str,)).rowcount
+
+            # 🏛️ [3] 7일 방치 낚시터 회수
+            reclaimed = [
+                (g['channel_id'], g['owner_id'], int(g['ground_price'] * 0.5))
+                for g in conn.execute(
+                    "SELECT channel_id, owner_id, ground_price FROM fishing_ground WHERE owner_id IS NOT NULL AND last_activity < ?",
+                    (threshold_date,)
+                ).fetchall()
+            ]
+            if reclaimed:
+                conn.executemany(
+                    """UPDATE fishing_ground 
+                       SET owner_id = NULL, 
+                           pollution = 0, 
+                           is_public = 1, 
+                           ground_price = 100000, 
+                           last_activity = CURRENT_TIMESTAMP 
+                       WHERE channel_id = ?""",
+                    [(chid,) for chid, _, _ in reclaimed]
                 )
+                conn.executemany("DELETE FROM fishing_facilities WHERE channel_id = ? AND guild_id = ?", [(chid, gid) for chid, _, _ in reclaimed])
+                conn.executemany("UPDATE users SET cash = cash + ? WHERE user_id = ? AND guild_id = ?", [(refund, uid, gid) for _, uid, refund in reclaimed])
 
-                if targets:
-                    for ground in targets:
-                        uid, chid = ground['owner_id'], ground['channel_id']
-                        refund_amount = int(ground['ground_price'] * 0.5)
-
-                        try:
-                            with db.get_connection() as conn:
-                                conn.execute(
-                                    """UPDATE fishing_ground 
-                                       SET owner_id = NULL, 
-                                           pollution = 0, 
-                                           is_public = 1, 
-                                           ground_price = 100000, 
-                                           last_activity = CURRENT_TIMESTAMP 
-                                       WHERE channel_id = ?""", 
-                                    (chid,)
-                                )
-                                conn.execute("DELETE FROM fishing_facilities WHERE channel_id = ? AND guild_id = ?", (chid, str(guild.id)))
-                                conn.execute("UPDATE users SET cash = cash + ? WHERE user_id = ? AND guild_id = ?", (refund_amount, uid, str(guild.id)))
-                            print(f"🏛️ [국고환수] {guild.name} - {chid} 채널 회수 완료.")
-                        except Exception as e:
-                            print(f"❌ [{guild.name}] 국고 환수 오류: {e}")
+            next_due = FishingSystemCog._next_sweep_time(conn)
+        return terrains, expired_passes, reclaimed, next_due
+
+    async def _seed_sweeper(self, guild):
+        """길드의 다음 만료 예정 시각을 인덱스 조회로 읽어 스케줄러에 등록합니다."""
+        db = self.db_cog.get_manager(guild.id) if self.db_cog else None
+        if not db:
+            return
+        next_due = await db.run_in_executor(lambda: self._next_sweep_time(db.get_connection()))
+        if next_due:
+            ground_sweeper.schedule(guild.id, next_due)
 
+    async def _sweep_guild(self, guild, now_dt: datetime):
+        db = self.db_cog.get_manager(guild.id)
+        gid = str(guild.id)
+        try:
+            terrains, expired_passes, reclaimed, next_due = await db.run_in_executor(self._apply_due_events, db, gid, now_dt)
+        except Exception as e:
+            print(f"❌ [{guild.name}] 루프 오류: {e}")
+            ground_sweeper.schedule(gid, now_dt + timedelta(minutes=1))  # 1분 뒤 재시도
+            return
+
+        for chid, orig in terrains:
+            invalidate_ground(gid, chid)
+            print(f"🦕 [지형복구] {guild.name} - {chid} 채널이 원래 지형({orig})으로 복구되었습니다.")
+        for chid, _, _ in reclaimed:
+            invalidate_ground(gid, chid)
+            print(f"🏛️ [국고환수] {guild.name} - {chid} 채널 회수 완료.")
+        if expired_passes:
+            print(f"🎫 [입장권만료] {guild.name} - 만료된 입장권 {expired_passes}장 정리")
+        if next_due:
+            ground_sweeper.schedule(gid, next_due)
+
+    @tasks.loop(seconds=1)
+    async def auto_cleanup_inactive_grounds(self):
+        """방치 낚시터 회수 / 입장권 만료 / 임시 지형 복구 (다음 예정 시각까지 잠들었다가 해당 길드만 처리)"""
+        await ground_sweeper.wait()
+
+        now_dt = datetime.now(KST)
+        for gid in ground_sweeper.pop_due(now_dt.timestamp()):
+            guild = self.bot.get_guild(int(gid))
+            if guild:
+                await self._sweep_guild(guild, now_dt)
+
+    @auto_cleanup_inactive_grounds.before_loop
+    async def before_auto_cleanup(self):
+        await self.bot.wait_until_ready()
+        for guild in self.bot.guilds:
+            try:
+                await self._seed_sweeper(guild)
             except Exception as e:
-                print(f"❌ [{guild.name}] 루프 오류: {e}")
+                print(f"❌ [{guild.name}] 만료 일정 조회 오류: {e}")
 
 async def setup(bot):
     await bot.add_cog(FishingSystemCog(bot))
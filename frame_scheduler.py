@@ -0,0 +1,312 @@
+# frame_scheduler.py - [시스템] 게임 애니메이션 메시지 수정 스케줄러
+"""
+게임 애니메이션(경마, 주사위, 홀짝, 슬롯머신 ...)이 함께 쓰는 메시지 수정(edit) 스케줄러입니다.
+
+    await frame_scheduler.push(message, embed=프레임)                      # 대기 없이 반환 (중간 프레임)
+    await asyncio.sleep(0.5)
+    ...
+    await frame_scheduler.push(message, final=True, embed=결과, view=None)  # 실제로 반영될 때까지 대기
+
+- 메시지별로 아직 보내지 못한 프레임은 하나만 남깁니다. (새 프레임이 오면 합쳐지고 마지막 상태만 전송)
+- 채널별로 최근 전송 시각을 기억해 "5초에 5회"(기본값) 창을 넘지 않게 보내므로, 한 채널에서 여러 게임이 돌아도
+  429가 나지 않습니다. 창이 가득 찬 동안 들어온 중간 프레임은 자연스럽게 건너뜁니다.
+- final=True 프레임은 반드시 전송되며 (429면 retry_after만큼 기다렸다가 재시도), 대기 중인 메시지 중 가장 먼저 보냅니다.
+- 중간 프레임 전송이 실패하면(메시지 삭제 등) 그 메시지의 다음 push에서 예외가 올라옵니다.
+  채널 큐가 빈 뒤 한 창(CHANNEL_EDIT_PER초) 안에 다음 push가 없으면 그 예외는 버립니다.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("frame_scheduler")
+
+CHANNEL_EDIT_LIMIT = 5      # 채널별: CHANNEL_EDIT_PER초 안에 최대 이 횟수
+CHANNEL_EDIT_PER = 5.0
+
+@dataclass
+class _Frame:
+    message: Any
+    kwargs: Dict[str, Any]
+    waiters: List[asyncio.Future] = field(default_factory=list)
+
+@dataclass
+class _ChannelBucket:
+    sent: deque                 # 최근 전송 완료 시각 (최대 limit개)
+    blocked_until: float = 0.0
+    pending: Dict[int, _Frame] = field(default_factory=dict)  # 메시지 ID → 보낼 프레임 (삽입 순서 = 대기 순서)
+    errors: Dict[int, Tuple[Exception, float]] = field(default_factory=dict)  # 메시지 ID → (중간 프레임 실패, 시각)
+    worker: Optional[asyncio.Task] = None
+    reaper: Optional[asyncio.Task] = None
+
+class FrameScheduler:
+    def __init__(self, limit: int = CHANNEL_EDIT_LIMIT, per: float = CHANNEL_EDIT_PER,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.limit = limit
+        self.per = per
+        self._clock = clock     # 테스트에서는 가상 시계를 주입
+        self._sleep = sleep
+        self._channels: Dict[int, _ChannelBucket] = {}
+        self.stats = {"pushed": 0, "sent": 0, "coalesced": 0, "rate_limited": 0, "failed": 0}
+
+    # ==================== 공개 API ====================
+    async def push(self, message, *, final: bool = False, **kwargs) -> None:
+        """
+        message.edit(**kwargs)를 예약합니다.
+        final=False면 바로 반환하고, final=True면 이 내용이 반영될 때까지 기다립니다. (실패 시 예외)
+        """
+        bucket = self._bucket(self._channel_id(message))
+        error = bucket.errors.pop(message.id, None)
+        if error is not None:
+            raise error[0]
+
+        self.stats["pushed"] += 1
+        frame = bucket.pending.get(message.id)
+        if frame is None:
+            frame = bucket.pending[message.id] = _Frame(message, dict(kwargs))
+        else:
+            # 아직 못 보낸 프레임 위에 덮어씀 (바뀌지 않은 필드는 이전 프레임 값 유지)
+            frame.message = message
+            frame.kwargs.update(kwargs)
+            self.stats["coalesced"] += 1
+
+        waiter = None
+        if final:
+            waiter = asyncio.get_running_loop().create_future()
+            frame.waiters.append(waiter)
+
+        if bucket.worker is None or bucket.worker.done():
+            bucket.worker = asyncio.create_task(self._run(bucket))
+        if waiter is not None:
+            await waiter
+
+    def pending_count(self) -> int:
+        return sum(len(b.pending) for b in self._channels.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "pending": self.pending_count(), "channels": len(self._channels)}
+
+    # ==================== 내부 ====================
+    @staticmethod
+    def _channel_id(message) -> int:
+        channel = getattr(message, "channel", None)
+        return getattr(channel, "id", None) or getattr(message, "channel_id", 0)
+
+    def _bucket(self, channel_id: int) -> _ChannelBucket:
+        bucket = self._channels.get(channel_id)
+        if bucket is None:
+            bucket = self._channels[channel_id] = _ChannelBucket(sent=deque(maxlen=self.limit))
+        return bucket
+
+    def _reserve(self, bucket: _ChannelBucket) -> float:
+        """보낼 수 있으면 자리를 잡고 0을 반환. 아니면 창에 자리가 날 때까지 남은 시간(초)"""
+        now = self._clock()
+        if now < bucket.blocked_until:
+            return bucket.blocked_until - now
+        if len(bucket.sent) == self.limit:
+            wait = bucket.sent[0] + self.per - now
+            if wait > 1e-9:  # 부동소수점 오차로 아주 작은 대기가 반복되지 않도록
+                return wait
+        bucket.sent.append(now)
+        return 0.0
+
+    @staticmethod
+    def _next_message(bucket: _ChannelBucket) -> int:
+        # 결과(final) 프레임을 기다리는 메시지 먼저, 그다음은 오래 기다린 순서
+        for message_id, frame in bucket.pending.items():
+            if frame.waiters:
+                return message_id
+        return next(iter(bucket.pending))
+
+    async def _run(self, bucket: _ChannelBucket):
+        """채널별 작업: 토큰이 생길 때마다 대기 중인 메시지의 최신 프레임을 하나씩 전송"""
+        try:
+            while bucket.pending:
+                wait = self._reserve(bucket)
+                if wait > 0:
+                    await self._sleep(wait)
+                    continue
+
+                message_id = self._next_message(bucket)
+                frame = bucket.pending.pop(message_id)
+                try:
+                    await frame.message.edit(**frame.kwargs)
+                    # 서버는 요청이 도착한 시각으로 세므로 보수적으로 응답 받은 시각을 기록
+                    bucket.sent[-1] = self._clock()
+                except Exception as e:
+                    retry_after = getattr(e, "retry_after", None) if getattr(e, "status", None) == 429 else None
+                    if retry_after is not None:
+                        # 다른 봇 작업과 버킷을 나눠 쓰는 경우: 기다렸다가 같은 내용(+그사이 새 프레임)으로 재시도
+                        self.stats["rate_limited"] += 1
+                        bucket.blocked_until = self._clock() + retry_after
+                        self._requeue(bucket, message_id, frame)
+                        continue
+                    self.stats["failed"] += 1
+                    if frame.waiters:
+                        for waiter in frame.waiters:
+                            if not waiter.done():
+                                waiter.set_exception(e)
+                    else:
+                        bucket.errors[message_id] = (e, self._clock())
+                        logger.warning(f"⚠️ 애니메이션 프레임 전송 실패 (메시지 {message_id}): {e}")
+                    continue
+
+                self.stats["sent"] += 1
+                for waiter in frame.waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        except asyncio.CancelledError:
+            for frame in bucket.pending.values():
+                for waiter in frame.waiters:
+                    waiter.cancel()
+            bucket.pending.clear()
+            bucket.errors.clear()
+            raise
+
+        # 큐가 비었음: 남은 실패는 다음 push가 가져갈 수 있도록 한 창만 보관했다가 정리
+        if bucket.errors and (bucket.reaper is None or bucket.reaper.done()):
+            bucket.reaper = asyncio.create_task(self._reap_errors(bucket))
+
+    async def _reap_errors(self, bucket: _ChannelBucket):
+        """다시 push되지 않은 메시지의 실패 기록 정리 (게임이 끝났거나 메시지가 삭제된 경우)"""
+        while bucket.errors:
+            await self._sleep(self.per)
+            expired = self._clock() - self.per
+            for message_id in [m for m, (_, failed_at) in bucket.errors.items() if failed_at <= expired]:
+                del bucket.errors[message_id]
+
+    @staticmethod
+    def _requeue(bucket: _ChannelBucket, message_id: int, frame: _Frame):
+        newer = bucket.pending.pop(message_id, None)
+        if newer is not None:
+            frame.message = newer.message
+            frame.kwargs.update(newer.kwargs)
+            frame.waiters.extend(newer.waiters)
+        bucket.pending[message_id] = frame
+
+# 게임 모듈이 공유하는 단일 인스턴스
+frame_scheduler = FrameScheduler()
+
+# ==================== 가상 시계 테스트 ====================
+if __name__ == "__main__":
+    # python frame_scheduler.py  →  가짜 HTTP 계층(채널별 5초/5회 제한)과 가상 시계로
+    #   한 채널에서 게임 4개가 0.5초마다 수정할 때 직접 수정 vs 스케줄러를 비교 (실제 시간은 거의 걸리지 않음)
+    import heapq
+    import itertools
+
+    class SimClock:
+        """가상 시계: 실행 가능한 태스크가 모두 멈추면 가장 가까운 sleep 시각으로 시간을 넘김"""
+
+        def __init__(self):
+            self.now = 0.0
+            self._timers = []
+            self._seq = itertools.count()
+
+        def time(self) -> float:
+            return self.now
+
+        async def sleep(self, delay: float):
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._timers, (self.now + max(0.0, delay), next(self._seq), future))
+            await future
+
+        async def run(self, main):
+            task = asyncio.ensure_future(main)
+            while not task.done():
+                for _ in range(50):  # 준비된 태스크를 모두 진행시킴
+                    await asyncio.sleep(0)
+                if task.done():
+                    break
+                if not self._timers:
+                    raise RuntimeError("교착 상태: 대기 중인 타이머가 없습니다.")
+                self.now, _, future = heapq.heappop(self._timers)
+                if not future.done():
+                    future.set_result(None)
+            return task.result()
+
+    class RateLimited(Exception):
+        status = 429
+
+        def __init__(self, retry_after: float):
+            super().__init__(f"429 Too Many Requests (retry_after={retry_after:.2f})")
+            self.retry_after = retry_after
+
+    class FakeHTTP:
+        """디스코드 채널별 수정 버킷 흉내: per초 창 안에서 limit회를 넘으면 429"""
+
+        def __init__(self, clock: SimClock, limit: int = CHANNEL_EDIT_LIMIT, per: float = CHANNEL_EDIT_PER):
+            self.clock, self.limit, self.per = clock, limit, per
+            self.calls: Dict[int, List[float]] = {}
+            self.ok = 0
+            self.rejected = 0
+
+        async def edit(self, channel_id: int):
+            await self.clock.sleep(0.05)  # 왕복 지연
+            now = self.clock.time()
+            window = [t for t in self.calls.get(channel_id, []) if now - t < self.per]
+            if len(window) >= self.limit:
+                self.rejected += 1
+                raise RateLimited(self.per - (now - window[0]))
+            window.append(now)
+            self.calls[channel_id] = window
+            self.ok += 1
+
+    class FakeChannel:
+        def __init__(self, channel_id: int):
+            self.id = channel_id
+
+    class FakeMessage:
+        def __init__(self, http: FakeHTTP, message_id: int, channel: FakeChannel):
+            self.http, self.id, self.channel = http, message_id, channel
+            self.content = None
+
+        async def edit(self, **kwargs):
+            await self.http.edit(self.channel.id)
+            self.content = kwargs.get("content", self.content)
+
+    GAMES, FRAMES, INTERVAL = 4, 20, 0.5
+
+    async def direct_game(clock: SimClock, message: FakeMessage) -> float:
+        # 이전 방식: 프레임마다 직접 수정, 429면 (discord.py처럼) retry_after만큼 멈췄다 재시도
+        for turn in range(FRAMES + 1):
+            while True:
+                try:
+                    await message.edit(content=f"턴 {turn}")
+                    break
+                except RateLimited as e:
+                    await clock.sleep(e.retry_after)
+            await clock.sleep(INTERVAL)
+        return clock.time()
+
+    async def scheduled_game(clock: SimClock, scheduler: FrameScheduler, message: FakeMessage) -> float:
+        for turn in range(FRAMES):
+            await scheduler.push(message, content=f"턴 {turn}")
+            await clock.sleep(INTERVAL)
+        await scheduler.push(message, final=True, content=f"턴 {FRAMES} (결과)")
+        return clock.time()
+
+    def simulate(use_scheduler: bool):
+        clock = SimClock()
+        http = FakeHTTP(clock)
+        channel = FakeChannel(1)
+        messages = [FakeMessage(http, 100 + i, channel) for i in range(GAMES)]
+        scheduler = FrameScheduler(clock=clock.time, sleep=clock.sleep)
+
+        async def main():
+            if use_scheduler:
+                return await asyncio.gather(*(scheduled_game(clock, scheduler, m) for m in messages))
+            return await asyncio.gather(*(direct_game(clock, m) for m in messages))
+
+        finish = asyncio.run(clock.run(main()))
+        return finish, http, scheduler, messages
+
+    for label, use_scheduler in (("직접 수정", False), ("스케줄러", True)):
+        finish, http, scheduler, messages = simulate(use_scheduler)
+        finals = sum(1 for m in messages if m.content and str(FRAMES) in m.content)
+        extra = f", 합쳐진 프레임 {scheduler.stats['coalesced']}개" if use_scheduler else ""
+        print(f"⏱️ {label}: 게임 종료 {max(finish):.1f}s(가상), 전송 {http.ok}회, 429 {http.rejected}회, "
+              f"결과 반영 {finals}/{GAMES}{extra}")
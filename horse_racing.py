@@ -5,30 +5,12 @@ import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-from typing import List, Optional
-
-# 안전한 point_manager import
-try:
-    import point_manager as pm_module
-    point_manager = pm_module
-    POINT_MANAGER_AVAILABLE = True
-except ImportError:
-    POINT_MANAGER_AVAILABLE = False
-    print("⚠️ point_manager가 없어 포인트 기능이 비활성화됩니다.")
-    
-    # point_manager 모의 함수들
-    class MockPointManager:
-        @staticmethod
-        async def is_registered(bot, guild_id, user_id):
-            return True
-        @staticmethod
-        async def add_point(bot, guild_id, user_id, amount):
-            pass
-        @staticmethod
-        async def get_point(bot, guild_id, user_id):
-            return 10000
-    
-    point_manager = MockPointManager()
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# 포인트 서비스 (등록 여부 확인)
+from point_service import point_service
+from frame_scheduler import frame_scheduler
 
 # 경마 트랙 설정
 TRACK_LENGTH = 20  # 트랙 길이
@@ -37,79 +19,130 @@ HORSE_EMOJI = "🐎"
 TRACK_EMOJI = "."  # 트랙 표시
 FINISH_EMOJI = "🏁"
 SIGNUP_TIME = 120  # 신청 시간 2분 (초)
+HORSE_MOVES = (0, 1, 2)  # 한 턴에 움직이는 칸 수 (균등 확률)
+MAX_RACE_TURNS = 1000    # 안전장치: 이 턴까지 못 들어온 말은 위치 순으로 순위 확정 (사실상 도달하지 않음)
+FRAME_INTERVAL = 0.5     # 경주 프레임 간격(초)
+
+def _render_track_cell(position: int, simple: bool) -> str:
+    """한 말의 트랙 문자열 (오른쪽에서 왼쪽으로 달림, 맨 왼쪽이 결승선)"""
+    track = [" " if simple else TRACK_EMOJI] * TRACK_LENGTH
+    display_position = TRACK_LENGTH - 1 - position
+    if position < TRACK_LENGTH and display_position >= 0:
+        track[display_position] = HORSE_EMOJI
+    if position >= FINISH_LINE:
+        track[0] = HORSE_EMOJI  # 결승선 도착 시 맨 왼쪽에 말 표시
+    elif not simple:
+        track[0] = FINISH_EMOJI  # 결승선 표시
+    return f"|{''.join(track)}|     "
+
+# 위치별 트랙 문자열은 위치 수(TRACK_LENGTH)만큼만 있으므로 한 번만 만들어 둠
+TRACK_CELLS = [_render_track_cell(p, simple=False) for p in range(FINISH_LINE + 1)]
+SIMPLE_TRACK_CELLS = [_render_track_cell(p, simple=True) for p in range(FINISH_LINE + 1)]
+
+@dataclass(frozen=True)
+class RaceResult:
+    seed: int
+    order: Tuple[int, ...]                    # 도착 순서 (말 인덱스)
+    finish_turns: Tuple[int, ...]             # 말별 도착 턴
+    positions: Tuple[Tuple[int, ...], ...]    # 턴별 전체 말 위치 (record=False면 비어 있음)
+
+    @property
+    def turns(self) -> int:
+        return max(self.finish_turns, default=0)
+
+def simulate_race(horse_count: int, seed: int, record: bool = True) -> RaceResult:
+    """
+    시드 하나로 경주 전체를 한 번에 진행합니다. (같은 말 수 + 같은 시드 = 항상 같은 경주)
+    같은 턴에 들어온 말은 결승선을 더 많이 넘은 말이 앞서고, 그래도 같으면 시드로 뽑아 둔 순번으로 정합니다.
+    """
+    rng = random.Random(seed)
+    tiebreak = [rng.random() for _ in range(horse_count)]
+    positions = [0] * horse_count
+    finish_turns = [0] * horse_count
+    running = list(range(horse_count))
+    order: List[int] = []
+    snapshots = []
+    turn = 0
+
+    while running:
+        turn += 1
+        arrived = []
+        still_running = []
+        for i, move in zip(running, rng.choices(HORSE_MOVES, k=len(running))):
+            position = positions[i] + move
+            if position >= FINISH_LINE:
+                arrived.append((FINISH_LINE - position, tiebreak[i], i))
+                positions[i] = FINISH_LINE
+                finish_turns[i] = turn
+            else:
+                positions[i] = position
+                still_running.append(i)
+        if arrived:
+            arrived.sort()
+            order.extend(i for _, _, i in arrived)
+        running = still_running
+        if record:
+            snapshots.append(tuple(positions))
+
+        if running and turn >= MAX_RACE_TURNS:
+            running.sort(key=lambda i: (-positions[i], tiebreak[i]))
+            order.extend(running)
+            for i in running:
+                finish_turns[i] = turn
+            break
+
+    return RaceResult(seed, tuple(order), tuple(finish_turns), tuple(snapshots))
 
 class HorseRacing:
-    def __init__(self, horses: List[str]):
+    def __init__(self, horses: List[str], seed: Optional[int] = None):
         self.horses = horses
+        # 시작 전에 경주 결과를 모두 계산 (시드를 공개하면 누구나 같은 경주를 재현 가능)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.result = simulate_race(len(horses), self.seed)
+        self.turn = 0
         self.positions = [0] * len(horses)  # 각 말의 현재 위치
         self.finished_horses = []  # 완주한 말들의 순서
         self.is_racing = False
+        self._frames: Optional[List[str]] = None
         
     def move_horses(self):
-        """말들을 랜덤하게 이동시킴"""
-        for i, horse in enumerate(self.horses):
-            if self.positions[i] < FINISH_LINE:
-                # 각 말이 0~2칸 랜덤하게 이동
-                move = random.randint(0, 2)
-                self.positions[i] = min(self.positions[i] + move, FINISH_LINE)
-                
-                # 결승선에 도착한 말 체크
-                if self.positions[i] >= FINISH_LINE and horse not in self.finished_horses:
-                    self.finished_horses.append(horse)
+        """미리 계산된 다음 턴으로 진행"""
+        if self.turn >= len(self.result.positions):
+            return
+        self.turn += 1
+        self.positions = list(self.result.positions[self.turn - 1])
+        finished = sum(1 for t in self.result.finish_turns if t <= self.turn)
+        self.finished_horses = [self.horses[i] for i in self.result.order[:finished]]
+
+    def finish(self):
+        """마지막 턴으로 바로 이동 (프레임 전송이 중간에 끊겨도 결과는 확정)"""
+        while not self.is_race_finished() and self.turn < len(self.result.positions):
+            self.move_horses()
+        self.finished_horses = [self.horses[i] for i in self.result.order]
     
     def generate_track_display(self):
         """현재 경마 상황을 시각적으로 표시 (오른쪽에서 왼쪽으로)"""
-        display_lines = []
-        
-        for i, horse in enumerate(self.horses):
-            # 트랙 생성
-            track = [TRACK_EMOJI] * TRACK_LENGTH
-            
-            # 말의 실제 위치를 오른쪽부터 계산 (오른쪽에서 왼쪽으로 이동)
-            display_position = TRACK_LENGTH - 1 - self.positions[i]
-            
-            # 말의 위치에 말 이모지 배치
-            if self.positions[i] < TRACK_LENGTH and display_position >= 0:
-                track[display_position] = HORSE_EMOJI
-            
-            # 결승선 표시 (맨 왼쪽)
-            if self.positions[i] >= FINISH_LINE:
-                track[0] = HORSE_EMOJI  # 결승선 도착 시 맨 왼쪽에 말 표시
-            else:
-                track[0] = FINISH_EMOJI  # 결승선 표시
-            
-            # 라인 구성: |트랙|     유저명
-            track_str = "".join(track)
-            line = f"|{track_str}|     {horse}"
-            display_lines.append(line)
-        
-        return "\n".join(display_lines)
+        return "\n".join(TRACK_CELLS[p] + horse for p, horse in zip(self.positions, self.horses))
     
     def generate_simple_track_display(self):
         """간단한 트랙 표시 (최종 결과용, 오른쪽에서 왼쪽으로)"""
-        display_lines = []
-        
-        for i, horse in enumerate(self.horses):
-            # 트랙 생성 (공백으로)
-            track = [" "] * TRACK_LENGTH
-            
-            # 말의 실제 위치를 오른쪽부터 계산
-            display_position = TRACK_LENGTH - 1 - self.positions[i]
-            
-            # 말의 위치에 말 이모지 배치
-            if self.positions[i] < TRACK_LENGTH and display_position >= 0:
-                track[display_position] = HORSE_EMOJI
-            
-            # 결승선 도착한 말은 맨 왼쪽에 표시
-            if self.positions[i] >= FINISH_LINE:
-                track[0] = HORSE_EMOJI
-            
-            # 트랙 문자열 생성
-            track_str = "".join(track)
-            line = f"|{track_str}|     {horse}"
-            display_lines.append(line)
-        
-        return "\n".join(display_lines)
+        return "\n".join(SIMPLE_TRACK_CELLS[p] + horse for p, horse in zip(self.positions, self.horses))
+
+    def render_race_frames(self) -> List[str]:
+        """경주 진행 프레임(메시지 내용)을 턴마다 한 번씩만 만들어 둡니다. (현재 진행 상태는 바꾸지 않음)"""
+        if self._frames is None:
+            frames = []
+            for turn, positions in enumerate(self.result.positions, 1):
+                track = "\n".join(TRACK_CELLS[p] + horse for p, horse in zip(positions, self.horses))
+                content = f"🏁 **경주 진행 중... (턴 {turn})**\n```\n{track}\n```"
+                finished = sum(1 for t in self.result.finish_turns if t <= turn)
+                if finished == 1:
+                    content += f"\n🎉 **{self.horses[self.result.order[0]]}** 1위로 결승선 통과!"
+                elif 1 < finished <= 3:
+                    content += f"\n🏆 현재 {finished}마리가 결승선 통과!"
+                frames.append(content)
+            self._frames = frames
+        return self._frames
     
     def is_race_finished(self):
         """경주가 끝났는지 확인"""
@@ -143,7 +176,7 @@ class ManualSignupView(discord.ui.View):
         user_name = interaction.user.display_name
         
         # 등록된 사용자인지 확인 (통일된 확인 방식)
-        if not await point_manager.is_registered(self.bot, guild_id, user_id):
+        if not point_service.is_registered(guild_id, user_id):
             return await interaction.response.send_message(
                 "❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", 
                 ephemeral=True
@@ -336,40 +369,23 @@ class AutoHorseRacingView(discord.ui.View):
             # 카운트다운은 1초 유지
             for count in range(3, 0, -1):
                 content = f"🚨 **{count}초 후 시작!**\n```\n{self.racing.generate_track_display()}\n```"
-                await self.message.edit(content=content, view=self)
+                await frame_scheduler.push(self.message, content=content, view=self)
                 await asyncio.sleep(1) # <-- 이 부분은 1초 유지
 
             # 경주 시작 알림
             content = f"🏁 **경주 시작!**\n```\n{self.racing.generate_track_display()}\n```"
-            await self.message.edit(content=content, view=self)
+            await frame_scheduler.push(self.message, content=content, view=self)
             await asyncio.sleep(1) # <-- 이 부분은 1초 유지
 
-            # 경주 진행
-            race_turn = 1
-            while not self.racing.is_race_finished():
-                self.racing.move_horses() 
-            
-                content = f"🏁 **경주 진행 중... (턴 {race_turn})**\n"
-                content += f"```\n{self.racing.generate_track_display()}\n```"
-                
-                if self.racing.finished_horses:
-                    current_finishers = len(self.racing.finished_horses)
-                    if current_finishers == 1:
-                        content += f"\n🎉 **{self.racing.finished_horses[0]}** 1위로 결승선 통과!"
-                    elif current_finishers <= 3:
-                        content += f"\n🏆 현재 {current_finishers}마리가 결승선 통과!"
-            
+            # 경주 진행 (미리 계산/렌더링된 프레임을 순서대로 전송)
+            for content in self.racing.render_race_frames():
                 try:
-                    await self.message.edit(content=content, view=self)
+                    await frame_scheduler.push(self.message, content=content, view=self)
                 except:
-                    break # 💥 [필수 수정] pass에서 break로 변경하여 무한 루프 방지!
-            
-                await asyncio.sleep(0.5) # ⏱️ [추천] 1.2초는 너무 답답하므로 0.5초로 밸런스 조정
-                race_turn += 1
+                    break # 메시지가 사라진 경우 중단 (결과는 이미 확정)
+                await asyncio.sleep(FRAME_INTERVAL)
+            self.racing.finish()
             
-                if race_turn > 50:
-                    break
-        
             # 최종 결과 표시
             await self.show_final_results()
         
@@ -408,10 +424,10 @@ class AutoHorseRacingView(discord.ui.View):
                 inline=True
             )
             
-            embed.set_footer(text=f"경주 주최자: {self.user.display_name}")
+            embed.set_footer(text=f"경주 주최자: {self.user.display_name} | 🎲 시드 {self.racing.seed} (/경마재현으로 확인)")
             
             if self.message:
-                await self.message.edit(embed=embed, view=None)
+                await frame_scheduler.push(self.message, final=True, embed=embed, view=None)
                 
         except Exception as e:
             print(f"경마 결과 표시 오류: {e}")
@@ -460,43 +476,22 @@ class HorseRacingView(discord.ui.View):
             
             for count in range(3, 0, -1):
                 content = f"🚨 **{count}초 후 시작!**\n```\n{self.racing.generate_track_display()}\n```"
-                await self.message.edit(content=content)
+                await frame_scheduler.push(self.message, content=content)
                 await asyncio.sleep(1)
             
             # 경주 시작 알림
             content = f"🏁 **경주 시작!**\n```\n{self.racing.generate_track_display()}\n```"
-            await self.message.edit(content=content)
+            await frame_scheduler.push(self.message, content=content)
             await asyncio.sleep(1) # <-- 이 부분은 1초 유지
             
-            # 경주 진행
-            race_turn = 1
-            while not self.racing.is_race_finished():
-                self.racing.move_horses() 
-            
-                content = f"🏁 **경주 진행 중... (턴 {race_turn})**\n"
-                content += f"```\n{self.racing.generate_track_display()}\n```"
-                
-                if self.racing.finished_horses:
-                    current_finishers = len(self.racing.finished_horses)
-                    if current_finishers == 1:
-                        content += f"\n🎉 **{self.racing.finished_horses[0]}** 1위로 결승선 통과!"
-                    elif current_finishers <= 3:
-                        content += f"\n🏆 현재 {current_finishers}마리가 결승선 통과!"
-            
+            # 경주 진행 (미리 계산/렌더링된 프레임을 순서대로 전송)
+            for content in self.racing.render_race_frames():
                 try:
-                    await self.message.edit(content=content, view=self)
+                    await frame_scheduler.push(self.message, content=content, view=self)
                 except:
-                    break # 💥 [필수 수정] pass에서 break로 변경하여 무한 루프 방지!
-            
-                await asyncio.sleep(0.5) # ⏱️ [추천] 1.2초는 너무 답답하므로 0.5초로 밸런스 조정
-                race_turn += 1
-            
-                if race_turn > 50:
-                    break 
-                
-                # 무한루프 방지 (최대 50턴)
-                if race_turn > 50:
-                    break
+                    break # 메시지가 사라진 경우 중단 (결과는 이미 확정)
+                await asyncio.sleep(FRAME_INTERVAL)
+            self.racing.finish()
             
             # 최종 결과 표시
             await self.show_final_results()
@@ -540,7 +535,7 @@ class HorseRacingView(discord.ui.View):
                 inline=True
             )
             
-            embed.set_footer(text=f"경주 주최자: {self.user.display_name}")
+            embed.set_footer(text=f"경주 주최자: {self.user.display_name} | 🎲 시드 {self.racing.seed} (/경마재현으로 확인)")
             
             # 모든 버튼 비활성화
             for item in self.children:
@@ -549,7 +544,7 @@ class HorseRacingView(discord.ui.View):
                 item.style = discord.ButtonStyle.secondary
             
             if self.message:
-                await self.message.edit(embed=embed, view=self)
+                await frame_scheduler.push(self.message, final=True, embed=embed, view=self)
                 
         except Exception as e:
             print(f"경마 결과 표시 오류: {e}")
@@ -683,6 +678,59 @@ class HorseRacingCog(commands.Cog):
             except:
                 pass
 
+    @app_commands.command(name="경마재현", description="시드로 지난 경마 경주 결과를 다시 계산해 확인합니다.")
+    @app_commands.describe(
+        참가자="참가자 이름 (최종 트랙에 표시된 순서대로, 쉼표로 구분)",
+        시드="경주 결과 하단에 표시된 시드"
+    )
+    async def replay_race(self, interaction: discord.Interaction, 참가자: str, 시드: app_commands.Range[int, 0, 2 ** 32 - 1]):
+        horses = [name.strip() for name in 참가자.split(",") if name.strip()]
+        if len(horses) < 2:
+            return await interaction.response.send_message("❌ 최소 2명 이상의 참가자가 필요합니다.", ephemeral=True)
+
+        # 같은 말 수 + 같은 시드면 경주 전체가 똑같이 재현됨
+        racing = HorseRacing(horses, seed=시드)
+        racing.finish()
+
+        embed = discord.Embed(title="🔁 경마 재현 결과", color=discord.Color.gold())
+        embed.add_field(name="🏁 최종 트랙", value=f"```\n{racing.generate_simple_track_display()}\n```", inline=False)
+        embed.add_field(name="🥇 최종 순위", value="\n".join(racing.get_results()), inline=False)
+        embed.add_field(name="📊 경주 정보", value=f"시드: {시드}\n총 {racing.result.turns}턴", inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # ✅ setup 함수
 async def setup(bot: commands.Bot):
-    await bot.add_cog(HorseRacingCog(bot))
\ No newline at end of file
+    await bot.add_cog(HorseRacingCog(bot))
+
+# ==================== 벤치마크 ====================
+if __name__ == "__main__":
+    # python horse_racing.py [경주 수] [말 수]  →  경주 시뮬레이션 처리량과 레인별 우승 확률 (공정성) 확인
+    import sys
+    import time
+    from collections import Counter
+
+    races = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    horse_count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    wins = Counter()
+    total_turns = 0
+    longest = 0
+    started = time.perf_counter()
+    for seed in range(races):
+        result = simulate_race(horse_count, seed, record=False)
+        wins[result.order[0]] += 1
+        total_turns += result.turns
+        longest = max(longest, result.turns)
+    elapsed = time.perf_counter() - started
+
+    print(f"⏱️ 경주 {races:,}회 ({horse_count}마리): {elapsed:.2f}s → {elapsed / races * 1e6:,.1f} µs/경주")
+    print(f"📊 평균 {total_turns / races:.2f}턴, 최장 {longest}턴")
+    for lane in range(horse_count):
+        print(f"   레인 {lane + 1}: 우승 {wins[lane] / races:6.2%}")
+
+    # 프레임 렌더링: 경주당 한 번 (이후 전송은 문자열 재사용)
+    names = [f"말{i + 1}" for i in range(horse_count)]
+    started = time.perf_counter()
+    for seed in range(1000):
+        HorseRacing(names, seed=seed).render_race_frames()
+    print(f"⏱️ 경주 생성 + 전체 프레임 렌더링: {(time.perf_counter() - started) / 1000 * 1e3:.3f} ms/경주")
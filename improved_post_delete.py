@@ -5,11 +5,263 @@ from discord import app_commands, Interaction, TextChannel
 from discord.ext import commands
 from datetime import datetime, timedelta, timezone
 import asyncio
-from typing import Literal, Optional
+import logging
+from typing import Callable, Awaitable, Dict, Literal, Optional
+
+try:
+    from database_manager import get_guild_db_manager
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
+logger = logging.getLogger("improved_post_delete")
 
 # 한국 시간대 설정 (UTC+9)
 KST = timezone(timedelta(hours=9))
 
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)  # 벌크 삭제 가능 기간 (조회~삭제 사이 지연만큼 여유)
+BULK_BATCH_SIZE = 100       # 벌크 삭제 1회 최대 개수
+BULK_QUEUE_SIZE = 2         # 조회가 삭제보다 앞서 쌓아 둘 수 있는 벌크 묶음 수
+LEGACY_QUEUE_SIZE = 200     # 〃 14일 초과 메시지 수
+PROGRESS_INTERVAL = 3.0     # 진행 상황 표시/저장 간격(초)
+DEFAULT_RETRY_AFTER = 5.0   # 429 응답에 대기 시간 헤더가 없을 때
+
+# 진행 중인 삭제 작업 (채널 ID → 작업) - 같은 채널에서 두 작업이 겹치지 않도록
+# 값이 None이면 확인 버튼이 채널을 예약하고 작업을 만드는 중
+active_jobs: Dict[int, Optional["BulkDeleteJob"]] = {}
+
+def _retry_after(error: discord.HTTPException) -> float:
+    """429 응답 헤더에 담긴 실제 대기 시간"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    for key in ('Retry-After', 'X-RateLimit-Reset-After'):
+        try:
+            return float(headers[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return DEFAULT_RETRY_AFTER
+
+# ===== 스트리밍 삭제 작업 =====
+
+class BulkDeleteJob:
+    """
+    채널 하나의 스트리밍 글삭제 작업
+    - 기록을 페이지 단위로 읽으면서 바로 벌크(14일 이내, 100개씩)/개별(14일 초과) 대기열로 나누고, 조회와 삭제를 동시에 진행합니다.
+      메시지 객체 대신 ID만 들고 있고 대기열 크기가 제한되어 있어, 채널 크기와 관계없이 메모리 사용량이 일정합니다.
+    - 고정 sleep 없이 discord.py HTTP 클라이언트의 rate limit 헤더 기반 대기에 맡기고,
+      그래도 429가 올라오면 응답 헤더에 담긴 시간만큼만 기다립니다.
+    - 진행 상황을 post_delete_jobs에 주기적으로 저장하므로 봇이 재시작되어도 남은 범위만 이어서 삭제합니다.
+      개수 모드는 저장된 조회 위치보다 오래된 메시지를 지우기 전에 먼저 저장하므로, 재시작해도 요청한 개수를 넘겨 지우지 않습니다.
+    """
+
+    def __init__(self, channel: TextChannel, row: dict, db=None):
+        self.channel = channel
+        self.db = db
+        self.job_id = row.get('job_id')
+        self.mode = row['mode']
+        self.count_limit = row.get('count_limit')
+        self.after_id = row.get('after_id')
+        self.anchor_id = row['anchor_id']       # 이 ID 미만만 대상 (작업 시작 후 올라온 글은 건드리지 않음)
+        self.cursor_id = row.get('cursor_id')   # 지금까지 조회한 가장 오래된 메시지
+        self.scanned = row.get('scanned') or 0
+        self.deleted = row.get('deleted') or 0
+        self.failed = row.get('failed') or 0
+        self.status = row.get('status') or 'running'
+        self._saved_cursor_id = self.cursor_id  # 마지막으로 저장된 조회 위치
+        self._bulk_queue: Optional[asyncio.Queue] = None
+        self._legacy_queue: Optional[asyncio.Queue] = None
+
+    @classmethod
+    async def create(cls, channel: TextChannel, delete_info: dict, started_by: int) -> "BulkDeleteJob":
+        """삭제 조건을 메시지 ID 구간으로 바꿔 작업을 등록합니다."""
+        now_id = discord.utils.time_snowflake(datetime.now(timezone.utc), high=True) + 1
+        if delete_info['type'] == 'count':
+            row = {'mode': 'count', 'count_limit': delete_info['count'], 'after_id': None, 'anchor_id': now_id}
+        else:
+            # 시작일 0시 ~ 종료일 23:59:59 (KST)
+            start_id = discord.utils.time_snowflake(delete_info['start_date'], high=False)
+            end_id = discord.utils.time_snowflake(delete_info['end_date'] + timedelta(seconds=1), high=False)
+            row = {'mode': 'date', 'count_limit': None, 'after_id': start_id - 1, 'anchor_id': min(end_id, now_id)}
+
+        db = get_guild_db_manager(channel.guild.id) if DATABASE_AVAILABLE else None
+        if db:
+            row['job_id'] = await db.run_in_executor(cls._insert_job, db, str(channel.id), row, str(started_by))
+        return cls(channel, row, db)
+
+    @staticmethod
+    def _insert_job(db, channel_id: str, row: dict, started_by: str) -> int:
+        conn = db.get_connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO post_delete_jobs (channel_id, mode, count_limit, after_id, anchor_id, started_by) VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, row['mode'], row['count_limit'], row['after_id'], row['anchor_id'], started_by)
+            )
+            return cursor.lastrowid
+
+    async def save(self):
+        """진행 상황 저장 (cursor_id와 scanned는 항상 같은 시점의 값)"""
+        if not self.db or self.job_id is None:
+            return
+        cursor_id = self.cursor_id
+        try:
+            await self.db.execute(
+                "UPDATE post_delete_jobs SET cursor_id = ?, scanned = ?, deleted = ?, failed = ?, status = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                (cursor_id, self.scanned, self.deleted, self.failed, self.status, self.job_id)
+            )
+            self._saved_cursor_id = cursor_id
+        except Exception as e:
+            print(f"⚠️ 글삭제 진행 상황 저장 실패 (작업 #{self.job_id}): {e}")
+
+    def make_progress_embed(self) -> discord.Embed:
+        embed = discord.Embed(
+            title="🔄 글 삭제 진행 중...",
+            description="메시지를 조회하면서 동시에 삭제하고 있습니다.",
+            color=discord.Color.blue()
+        )
+        target = f" / {self.count_limit}" if self.count_limit else ""
+        embed.add_field(name="📥 조회", value=f"{self.scanned}{target}개", inline=True)
+        embed.add_field(name="🗑️ 삭제", value=f"{self.deleted}개", inline=True)
+        if self.failed:
+            embed.add_field(name="⚠️ 실패", value=f"{self.failed}개", inline=True)
+        embed.set_footer(text="봇이 재시작되어도 남은 메시지는 이어서 삭제됩니다.")
+        return embed
+
+    # ----- 실행 -----
+    async def run(self, on_progress: Optional[Callable[["BulkDeleteJob"], Awaitable[None]]] = None) -> int:
+        """조회 1개 + 삭제 2개(벌크/개별) 작업을 동시에 돌립니다. 하나라도 실패하면 전체 중단."""
+        self._bulk_queue = asyncio.Queue(maxsize=BULK_QUEUE_SIZE)
+        self._legacy_queue = asyncio.Queue(maxsize=LEGACY_QUEUE_SIZE)
+        tasks = [
+            asyncio.create_task(self._scan()),
+            asyncio.create_task(self._bulk_worker()),
+            asyncio.create_task(self._legacy_worker()),
+        ]
+        reporter = asyncio.create_task(self._report_loop(on_progress))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+            self.status = 'done'
+        except asyncio.CancelledError:
+            raise  # 봇 종료: 상태를 running으로 남겨 재시작 후 이어서 진행
+        except Exception:
+            self.status = 'failed'
+            raise
+        finally:
+            reporter.cancel()
+            for task in tasks:
+                task.cancel()
+            await self.save()
+        return self.deleted
+
+    async def _report_loop(self, on_progress):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            await self.save()
+            if on_progress:
+                try:
+                    await on_progress(self)
+                except Exception:
+                    pass  # 표시 실패(상호작용 만료 등)해도 삭제는 계속
+
+    async def _scan(self):
+        """기록을 읽으며 대기열로 분배 (대기열이 차면 삭제가 따라올 때까지 조회도 잠시 멈춤)"""
+        bulk_cutoff = discord.utils.time_snowflake(datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE)
+        batch = []
+
+        async def route(message_id: int):
+            nonlocal batch
+            if message_id >= bulk_cutoff:
+                batch.append(message_id)
+                if len(batch) >= BULK_BATCH_SIZE:
+                    await self._bulk_queue.put(batch)
+                    batch = []
+            else:
+                await self._legacy_queue.put(message_id)
+
+        # 1) 재시작 전에 이미 조회한 구간: 아직 남아 있는 메시지는 모두 대상
+        if self.cursor_id:
+            async for message in self.channel.history(limit=None, before=discord.Object(id=self.anchor_id),
+                                                      after=discord.Object(id=self.cursor_id - 1), oldest_first=False):
+                await route(message.id)
+
+        # 2) 아직 조회하지 않은 구간 (최신 → 과거)
+        remaining = None if self.count_limit is None else max(0, self.count_limit - self.scanned)
+        if remaining != 0:
+            after = discord.Object(id=self.after_id) if self.after_id else None
+            async for message in self.channel.history(limit=remaining, before=discord.Object(id=self.cursor_id or self.anchor_id),
+                                                      after=after, oldest_first=False):
+                self.scanned += 1
+                self.cursor_id = message.id
+                await route(message.id)
+
+        if batch:
+            await self._bulk_queue.put(batch)
+        await self._bulk_queue.put(None)
+        await self._legacy_queue.put(None)
+
+    async def _save_before_delete(self, oldest_id: int):
+        """
+        개수 모드: 저장된 조회 위치보다 오래된 메시지를 지우기 전에 진행 상황을 먼저 저장합니다.
+        (저장 전에 봇이 꺼지면 재시작 후 이미 지운 만큼 더 오래된 메시지를 조회해 요청한 개수보다 많이 지우게 됨)
+        """
+        if self.count_limit is not None and (self._saved_cursor_id is None or oldest_id < self._saved_cursor_id):
+            await self.save()
+
+    async def _bulk_worker(self):
+        while (batch := await self._bulk_queue.get()) is not None:
+            await self._save_before_delete(min(batch))
+            await self._delete_bulk(batch)
+
+    async def _legacy_worker(self):
+        while (message_id := await self._legacy_queue.get()) is not None:
+            await self._save_before_delete(message_id)
+            await self._delete_one(message_id)
+
+    async def _delete_bulk(self, batch):
+        while True:
+            try:
+                await self.channel.delete_messages([discord.Object(id=message_id) for message_id in batch])
+                self.deleted += len(batch)
+                return
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    await asyncio.sleep(_retry_after(e))
+                    continue
+                logger.debug(f"벌크 삭제 실패, 개별 삭제로 전환 - {e}")
+                break
+        for message_id in batch:
+            await self._delete_one(message_id)
+
+    async def _delete_one(self, message_id: int):
+        while True:
+            try:
+                await self.channel.get_partial_message(message_id).delete()
+                self.deleted += 1
+                return
+            except discord.NotFound:
+                return  # 이미 삭제된 메시지
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    await asyncio.sleep(_retry_after(e))
+                    continue
+                self.failed += 1
+                logger.debug(f"개별 삭제 실패 - {e}")
+                return
+
+async def run_job(job: BulkDeleteJob, on_progress=None) -> int:
+    """채널당 하나씩만 실행"""
+    active_jobs[job.channel.id] = job
+    try:
+        return await job.run(on_progress)
+    finally:
+        if active_jobs.get(job.channel.id) is job:
+            del active_jobs[job.channel.id]
+
 # ===== 모달 클래스들 =====
 
 class CountInputModal(discord.ui.Modal):
@@ -205,12 +457,27 @@ class DeleteConfirmView(discord.ui.View):
                 ephemeral=True
             )
         
+        if self.channel.id in active_jobs:
+            return await interaction.response.send_message(
+                "❌ 이 채널에서 이미 글 삭제가 진행 중입니다.", 
+                ephemeral=True
+            )
+        
+        # 첫 await 전에 채널을 예약해야 빠르게 두 번 눌러도 작업이 하나만 시작됨 (run_job이 작업으로 교체)
+        active_jobs[self.channel.id] = None
+        try:
+            await self._run_confirmed(interaction)
+        finally:
+            if self.channel.id in active_jobs and active_jobs[self.channel.id] is None:
+                del active_jobs[self.channel.id]
+
+    async def _run_confirmed(self, interaction: Interaction):
         await interaction.response.defer(ephemeral=True)
         
         # 진행 상황 표시
         progress_embed = discord.Embed(
             title="🔄 글 삭제 진행 중...",
-            description="메시지를 수집하고 삭제하는 중입니다. 잠시만 기다려주세요.",
+            description="메시지를 조회하면서 동시에 삭제하는 중입니다. 잠시만 기다려주세요.",
             color=discord.Color.blue()
         )
         progress_embed.add_field(
@@ -220,7 +487,7 @@ class DeleteConfirmView(discord.ui.View):
         )
         progress_embed.add_field(
             name="🛡️ 안전 조치",
-            value="Discord API 제한을 피하기 위해 안전한 속도로 진행됩니다.",
+            value="Discord API 제한(응답 헤더)에 맞춰 가능한 최대 속도로 진행됩니다.",
             inline=False
         )
         
@@ -297,165 +564,13 @@ class DeleteConfirmView(discord.ui.View):
         await interaction.response.edit_message(embed=embed, view=self)
 
     async def perform_deletion(self, interaction: Interaction):
-        """실제 삭제 수행 (Rate Limit 안전 버전)"""
-        messages_to_delete = []
-        
-        try:
-            if self.delete_info['type'] == 'count':
-                # 개수로 삭제 - 안전한 속도로 메시지 수집
-                count = 0
-                async for message in self.channel.history(limit=None):
-                    if count >= self.delete_info['count']:
-                        break
-                    messages_to_delete.append(message)
-                    count += 1
-                    
-                    # 메시지 수집 중간에도 잠시 대기 (Rate Limit 방지)
-                    if count % 100 == 0:
-                        print(f"Debug: {count}개 메시지 수집 완료, 잠시 대기...")
-                        
-                        # 진행 상황 업데이트
-                        progress_embed = discord.Embed(
-                            title="📥 메시지 수집 중...",
-                            description=f"{count}개 메시지 수집 완료",
-                            color=discord.Color.blue()
-                        )
-                        try:
-                            await interaction.edit_original_response(embed=progress_embed)
-                        except:
-                            pass  # Edit 실패해도 계속 진행
-                        
-                        await asyncio.sleep(1)
-                    
-            else:
-                # 날짜 범위로 삭제 - 안전한 속도로 메시지 수집
-                start_date = self.delete_info['start_date']
-                end_date = self.delete_info['end_date'] + timedelta(days=1)  # 다음날 0시까지 포함
-                
-                message_count = 0
-                async for message in self.channel.history(
-                    after=start_date,
-                    before=end_date,
-                    limit=None
-                ):
-                    messages_to_delete.append(message)
-                    message_count += 1
-                    
-                    # 메시지 수집 중간에도 잠시 대기 (Rate Limit 방지)
-                    if message_count % 100 == 0:
-                        print(f"Debug: {message_count}개 메시지 수집 완료, 잠시 대기...")
-                        
-                        # 진행 상황 업데이트
-                        progress_embed = discord.Embed(
-                            title="📥 메시지 수집 중...",
-                            description=f"{message_count}개 메시지 수집 완료",
-                            color=discord.Color.blue()
-                        )
-                        try:
-                            await interaction.edit_original_response(embed=progress_embed)
-                        except:
-                            pass  # Edit 실패해도 계속 진행
-                        
-                        await asyncio.sleep(1)
-            
-            print(f"Debug: 총 {len(messages_to_delete)}개 메시지 수집 완료")
-            
-            # 수집 완료 알림
-            collect_complete_embed = discord.Embed(
-                title="🗑️ 메시지 삭제 시작",
-                description=f"총 {len(messages_to_delete)}개 메시지 삭제를 시작합니다...",
-                color=discord.Color.orange()
-            )
-            try:
-                await interaction.edit_original_response(embed=collect_complete_embed)
-            except:
-                pass
-            
-        except discord.HTTPException as e:
-            if e.status == 429:
-                retry_after = e.response.headers.get('Retry-After', 5)
-                print(f"Debug: 메시지 수집 중 Rate Limit 감지, {retry_after}초 대기...")
-                await asyncio.sleep(float(retry_after) + 1)
-            raise e
-        
-        # 메시지 삭제 실행
-        return await self.bulk_delete_messages(messages_to_delete)
+        """스트리밍 삭제 실행 (진행 상황은 이 응답 메시지에 주기적으로 표시)"""
+        job = await BulkDeleteJob.create(self.channel, self.delete_info, self.admin_user.id)
 
-    async def bulk_delete_messages(self, messages):
-        """메시지를 효율적으로 삭제 (Rate Limit 안전 버전)"""
-        if not messages:
-            return 0
-        
-        deleted_count = 0
-        
-        # 14일 이내와 이후 메시지 분리
-        recent_messages = []
-        old_messages = []
-        
-        cutoff_date = datetime.now(KST) - timedelta(days=14)
-        
-        for message in messages:
-            if message.created_at > cutoff_date:
-                recent_messages.append(message)
-            else:
-                old_messages.append(message)
-        
-        print(f"Debug: 최근 메시지 {len(recent_messages)}개, 오래된 메시지 {len(old_messages)}개")
-        
-        # 14일 이내 메시지는 벌크 삭제 (최대 100개씩)
-        for i in range(0, len(recent_messages), 100):
-            batch = recent_messages[i:i+100]
-            try:
-                await self.channel.delete_messages(batch)
-                deleted_count += len(batch)
-                print(f"Debug: 벌크 삭제 완료 - {len(batch)}개")
-                
-                # API 제한 방지를 위한 더 긴 딜레이
-                await asyncio.sleep(2)  # 1초 → 2초로 증가
-                    
-            except discord.HTTPException as e:
-                print(f"Debug: 벌크 삭제 실패, 개별 삭제로 전환 - {str(e)}")
-                
-                # Rate Limit 감지시 더 긴 대기
-                if e.status == 429:
-                    retry_after = e.response.headers.get('Retry-After', 5)
-                    print(f"Debug: Rate Limit 감지, {retry_after}초 대기...")
-                    await asyncio.sleep(float(retry_after) + 1)
-                
-                # 벌크 삭제 실패시 개별 삭제
-                for message in batch:
-                    try:
-                        await message.delete()
-                        deleted_count += 1
-                        await asyncio.sleep(1)  # 0.5초 → 1초로 증가
-                    except discord.HTTPException as del_error:
-                        if del_error.status == 429:
-                            retry_after = del_error.response.headers.get('Retry-After', 3)
-                            print(f"Debug: 개별 삭제 Rate Limit, {retry_after}초 대기...")
-                            await asyncio.sleep(float(retry_after) + 1)
-                        print(f"Debug: 개별 삭제 실패 - {str(del_error)}")
-                    except Exception as del_error:
-                        print(f"Debug: 개별 삭제 실패 - {str(del_error)}")
-                        pass
-        
-        # 14일 이후 메시지는 개별 삭제
-        for message in old_messages:
-            try:
-                await message.delete()
-                deleted_count += 1
-                await asyncio.sleep(1)  # 0.5초 → 1초로 증가
-                print(f"Debug: 오래된 메시지 삭제 완료")
-            except discord.HTTPException as del_error:
-                if del_error.status == 429:
-                    retry_after = del_error.response.headers.get('Retry-After', 3)
-                    print(f"Debug: 오래된 메시지 Rate Limit, {retry_after}초 대기...")
-                    await asyncio.sleep(float(retry_after) + 1)
-                print(f"Debug: 오래된 메시지 삭제 실패 - {str(del_error)}")
-            except Exception as del_error:
-                print(f"Debug: 오래된 메시지 삭제 실패 - {str(del_error)}")
-                pass
-        
-        return deleted_count
+        async def show_progress(job: BulkDeleteJob):
+            await interaction.edit_original_response(embed=job.make_progress_embed())
+
+        return await run_job(job, show_progress)
 
     async def on_timeout(self):
         """타임아웃 처리"""
@@ -469,6 +584,48 @@ class ImprovedPostDeleteCog(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        self.resume_task: Optional[asyncio.Task] = None
+
+    def cog_load(self):
+        self.resume_task = asyncio.create_task(self.resume_jobs())
+
+    def cog_unload(self):
+        # 진행 중인 작업은 running 상태로 남아 다음 로드 때 이어서 진행
+        if self.resume_task:
+            self.resume_task.cancel()
+
+    async def resume_jobs(self):
+        """재시작 전에 끝나지 않은 글삭제 작업을 이어서 진행"""
+        if not DATABASE_AVAILABLE:
+            return
+        await self.bot.wait_until_ready()
+        jobs = []
+        for guild in self.bot.guilds:
+            try:
+                db = get_guild_db_manager(guild.id)
+                rows = await db.fetch_all("SELECT * FROM post_delete_jobs WHERE status = 'running'")
+            except Exception as e:
+                print(f"⚠️ 글삭제 작업 조회 실패 (길드 {guild.id}): {e}")
+                continue
+            for row in rows or []:
+                row = dict(row)
+                channel = guild.get_channel(int(row['channel_id']))
+                if channel is None or channel.id in active_jobs:
+                    await db.execute("UPDATE post_delete_jobs SET status = 'cancelled' WHERE job_id = ?", (row['job_id'],))
+                    continue
+                print(f"🔁 글삭제 작업 #{row['job_id']} 이어서 진행: #{channel.name} (조회 {row['scanned']}개, 삭제 {row['deleted']}개)")
+                jobs.append(BulkDeleteJob(channel, row, db))
+
+        async def resume(job: BulkDeleteJob):
+            try:
+                deleted = await run_job(job)
+                print(f"✅ 글삭제 작업 #{job.job_id} 완료: #{job.channel.name} 누적 {deleted}개 삭제")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ 글삭제 작업 #{job.job_id} 실패: {e}")
+
+        await asyncio.gather(*(resume(job) for job in jobs))
 
     @app_commands.command(name="글삭제", description="[관리자 전용] 메시지를 삭제합니다.")
     @app_commands.checks.has_permissions(administrator=True) # 서버 내 실제 권한 체크
@@ -50,6 +50,8 @@ class UserDeleteConfirmView(discord.ui.View):
             db = self.db_cog.get_manager(str(self.target_user.guild.id)) # db_cog를 통해 manager 가져오기
             # 사용자 데이터 삭제
             deleted_counts = db.delete_user(self.target_id)
+            from xp_leaderboard import xp_accumulator
+            xp_accumulator.discard(str(self.target_user.guild.id), self.target_id)
             
             for item in self.children:
                 item.disabled = True
@@ -350,7 +352,7 @@ class UserManagementCog(commands.Cog):
         db = self.db_cog.get_manager(guild_id) # db_cog를 통해 manager 가져오기
         
         # 사용자 등록 확인
-        if not db.get_user(target_id):
+        if not db.is_registered(target_id):
             return await interaction.response.send_message("❌ 해당 사용자가 등록되지 않았습니다.", ephemeral=True)
         
         # 자기 자신 초기화 방지
@@ -367,6 +369,8 @@ class UserManagementCog(commands.Cog):
                 UPDATE user_xp SET xp = 0, level = 1, updated_at = CURRENT_TIMESTAMP
                 WHERE user_id = ?
             ''', (target_id,))
+            from xp_leaderboard import xp_accumulator
+            xp_accumulator.discard(guild_id, target_id)
             
             # 3. 출석 기록 삭제
             db.execute_query('DELETE FROM attendance WHERE user_id = ?', (target_id,))
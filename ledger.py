@@ -0,0 +1,142 @@
+# ledger.py - [시스템] 현금 원장 (잔액 변경 + 거래 내역을 한 트랜잭션으로)
+"""
+users.cash 변경과 point_history 기록을 하나의 트랜잭션으로 처리하는 원장 API입니다.
+
+- 잔액은 `UPDATE ... RETURNING cash`로 변경과 동시에 읽으므로 읽고-쓰기 사이의 갱신 유실이 없습니다.
+- 출금은 `cash >= 금액` 조건부 UPDATE이며, 잔액이 부족하면 InsufficientFunds로 전체가 롤백됩니다.
+- 호출자가 이미 트랜잭션을 열어 둔 연결에서는 SAVEPOINT로 중첩되어 호출자의 커밋/롤백을 따릅니다.
+
+사용 예:
+    ledger.transfer(db, sender_id, receiver_id, 금액, fee=수수료)
+    ledger.batch_apply(db, [LedgerEntry(uid, +상금, "블랙잭 승리") for uid, 상금 in 정산목록])
+    await db.run_in_executor(ledger.debit, db, user_id, 베팅금, "슬롯 베팅")   # 이벤트 루프를 막지 않으려면
+"""
+from __future__ import annotations
+import sqlite3
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger("ledger")
+
+# RETURNING 절은 SQLite 3.35.0부터 지원됩니다. (이전 버전은 같은 트랜잭션 안에서 다시 조회)
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+class LedgerError(Exception):
+    """원장 처리 실패 (트랜잭션은 롤백됨)"""
+
+class UnknownAccount(LedgerError):
+    def __init__(self, user_id: str):
+        super().__init__(f"등록되지 않은 사용자: {user_id}")
+        self.user_id = user_id
+
+class InsufficientFunds(LedgerError):
+    def __init__(self, user_id: str, required: int, balance: int):
+        super().__init__(f"잔액 부족: {user_id} (필요 {required:,}원 / 보유 {balance:,}원)")
+        self.user_id = user_id
+        self.required = required
+        self.balance = balance
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    """원장 한 줄: amount > 0 이면 입금, < 0 이면 출금"""
+    user_id: str
+    amount: int
+    transaction_type: str
+    description: str = ""
+    allow_negative: bool = False  # True면 잔액 부족이어도 출금 (벌금/강제 회수용)
+
+@contextmanager
+def atomic(db) -> Iterator[sqlite3.Connection]:
+    """길드 DB 연결에서 하나의 원자적 구간을 엽니다. (이미 트랜잭션 중이면 SAVEPOINT로 중첩)"""
+    conn = db.get_connection()
+    if conn.in_transaction:
+        conn.execute("SAVEPOINT ledger")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK TO ledger")
+            conn.execute("RELEASE ledger")
+            raise
+        conn.execute("RELEASE ledger")
+    else:
+        with conn:
+            yield conn
+
+def _apply(conn: sqlite3.Connection, guild_id: str, entry: LedgerEntry) -> int:
+    """잔액 변경 1건 + 거래 내역 1건. 변경 후 잔액을 반환합니다."""
+    user_id, amount = str(entry.user_id), int(entry.amount)
+    guard = "" if amount >= 0 or entry.allow_negative else " AND cash >= ?"
+    params: Tuple = (amount, user_id, guild_id) + (() if not guard else (-amount,))
+    query = f"UPDATE users SET cash = cash + ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND guild_id = ?{guard}"
+
+    if SUPPORTS_RETURNING:
+        row = conn.execute(query + " RETURNING cash", params).fetchone()
+        balance = row[0] if row else None
+    else:
+        balance = None
+        if conn.execute(query, params).rowcount:
+            balance = conn.execute("SELECT cash FROM users WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)).fetchone()[0]
+
+    if balance is None:
+        # 실패 원인 구분 (실패 경로에서만 추가 조회)
+        row = conn.execute("SELECT cash FROM users WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)).fetchone()
+        if row is None:
+            raise UnknownAccount(user_id)
+        raise InsufficientFunds(user_id, -amount, row[0])
+
+    conn.execute(
+        "INSERT INTO point_history (user_id, transaction_type, amount, balance_after, description) VALUES (?, ?, ?, ?, ?)",
+        (user_id, entry.transaction_type, amount, balance, entry.description)
+    )
+    return balance
+
+def batch_apply(db, entries: Iterable[LedgerEntry]) -> Dict[str, int]:
+    """
+    ✅ 여러 건을 한 트랜잭션으로 적용합니다. (멀티플레이 게임 정산 등)
+    하나라도 실패하면 전체가 롤백되고 예외가 전파됩니다. {user_id: 최종 잔액}을 반환합니다.
+    """
+    balances: Dict[str, int] = {}
+    with atomic(db) as conn:
+        for entry in entries:
+            if entry.amount == 0:
+                continue
+            balances[str(entry.user_id)] = _apply(conn, str(db.guild_id), entry)
+    return balances
+
+def credit(db, user_id: str, amount: int, transaction_type: str, description: str = "") -> int:
+    """입금 후 잔액 반환"""
+    if amount < 0:
+        raise ValueError("credit 금액은 0 이상이어야 합니다.")
+    with atomic(db) as conn:
+        return _apply(conn, str(db.guild_id), LedgerEntry(user_id, amount, transaction_type, description))
+
+def debit(db, user_id: str, amount: int, transaction_type: str, description: str = "", allow_negative: bool = False) -> int:
+    """출금 후 잔액 반환 (잔액 부족 시 InsufficientFunds)"""
+    if amount < 0:
+        raise ValueError("debit 금액은 0 이상이어야 합니다.")
+    with atomic(db) as conn:
+        return _apply(conn, str(db.guild_id), LedgerEntry(user_id, -amount, transaction_type, description, allow_negative))
+
+def transfer(db, sender_id: str, receiver_id: str, amount: int, fee: int = 0,
+             send_type: str = "송금", receive_type: str = "입금",
+             send_description: str = "", receive_description: str = "") -> Tuple[int, int]:
+    """
+    ✅ 송금: 보내는 사람에게서 amount + fee를 빼고 받는 사람에게 amount를 넣습니다. (수수료는 소각)
+    (보내는 사람 잔액, 받는 사람 잔액)을 반환합니다.
+    """
+    if amount <= 0 or fee < 0:
+        raise ValueError("송금 금액은 양수, 수수료는 0 이상이어야 합니다.")
+    if str(sender_id) == str(receiver_id):
+        raise ValueError("자기 자신에게는 송금할 수 없습니다.")
+    balances = batch_apply(db, [
+        LedgerEntry(sender_id, -(amount + fee), send_type, send_description),
+        LedgerEntry(receiver_id, amount, receive_type, receive_description),
+    ])
+    return balances[str(sender_id)], balances[str(receiver_id)]
+
+def get_balance(db, user_id: str) -> Optional[int]:
+    """현재 잔액 (미등록이면 None)"""
+    row = db.execute_query("SELECT cash FROM users WHERE user_id = ? AND guild_id = ?", (str(user_id), str(db.guild_id)), 'one')
+    return row['cash'] if row else None
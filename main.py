@@ -416,6 +416,15 @@ class EnhancedBot(commands.Bot):
         except Exception as e:
             self.logger.error(f"❌ 명령어 동기화 중 오류 발생: {e}")
 
+    async def close(self):
+        """종료 시 확장(쓰기 버퍼 flush 포함)을 먼저 내린 뒤 DB 체크포인트 및 연결 정리"""
+        await super().close()
+        try:
+            from database_manager import shutdown_all_managers
+            shutdown_all_managers()
+        except Exception as e:
+            self.logger.error(f"❌ DB 종료 처리 중 오류 발생: {e}")
+
 # 신호 핸들러 설정
 def setup_signal_handlers(bot: EnhancedBot):
     """우아한 종료를 위한 신호 핸들러 설정"""
@@ -6,7 +6,7 @@ from discord import app_commands, Member
 import datetime
 import json
 from typing import Optional, Dict, Any, List
-from database_manager import DatabaseManager
+from database_manager import get_guild_db_manager
 
 # 한국 시간대 설정 (UTC+9)
 KST = datetime.timezone(datetime.timedelta(hours=9))
@@ -42,7 +42,7 @@ class MemberExitLogger(commands.Cog):
     async def on_member_remove(self, member: Member):
         """멤버가 서버를 떠났을 때 로그 기록 및 메시지 전송"""
         
-        db = DatabaseManager(str(member.guild.id))
+        db = get_guild_db_manager(str(member.guild.id))
         
         # ✅ 설정이 활성화되어 있는지 확인
         setting = db.execute_query("SELECT * FROM log_settings WHERE guild_id = ?", (str(member.guild.id),), 'one')
@@ -166,7 +166,7 @@ class MemberExitLogger(commands.Cog):
                     f"❌ {채널.mention} 채널에 메시지를 보낼 권한이 없습니다.",
                     ephemeral=True
                 )
-            db = DatabaseManager(str(interaction.guild.id))
+            db = get_guild_db_manager(str(interaction.guild.id))
             query = "INSERT OR REPLACE INTO log_settings (guild_id, channel_id, enabled) VALUES (?, ?, ?)"
             db.execute_query(query, (str(interaction.guild.id), str(채널.id), 1))
         
@@ -175,13 +175,13 @@ class MemberExitLogger(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
         elif 작업 == "disable":
-            db = DatabaseManager(str(interaction.guild.id))
+            db = get_guild_db_manager(str(interaction.guild.id))
             db.execute_query("UPDATE log_settings SET enabled = 0 WHERE guild_id = ?", (str(interaction.guild.id),))
         
             await interaction.response.send_message("🔴 퇴장 로그 시스템이 비활성화되었습니다.", ephemeral=True)
         
         elif 작업 == "status":
-            db = DatabaseManager(str(interaction.guild.id))
+            db = get_guild_db_manager(str(interaction.guild.id))
             setting = db.execute_query("SELECT * FROM log_settings WHERE guild_id = ?", (str(interaction.guild.id),), 'one')
         
             embed = discord.Embed(title="📊 퇴장 로그 시스템 상태", color=discord.Color.blue())
@@ -202,7 +202,7 @@ class MemberExitLogger(commands.Cog):
             
             cutoff_date = (datetime.datetime.now(KST) - datetime.timedelta(days=일수)).isoformat()
         
-            db = DatabaseManager(str(interaction.guild.id))
+            db = get_guild_db_manager(str(interaction.guild.id))
             # ✅ 데이터베이스에서 최근 로그 조회
             query = """
                 SELECT * FROM exit_logs
@@ -13,11 +13,8 @@ try:
     STATS_AVAILABLE = True
 except ImportError:
     STATS_AVAILABLE = False
-try:
-    import point_manager
-    POINT_MANAGER_AVAILABLE = True
-except ImportError:
-    POINT_MANAGER_AVAILABLE = False
+from point_service import point_service
+from frame_scheduler import frame_scheduler
 
 # 상수 설정
 MAX_BET = 3000              # 최대 배팅금: 3천 원
@@ -26,10 +23,10 @@ WINNER_RETENTION = 0.8      # 승리 시 수수료 (20%)
 
 DICE_EMOJIS = {1: "⚀", 2: "⚁", 3: "⚂", 4: "⚃", 5: "⚄", 6: "⚅"}
 
-def record_odd_even_game(user_id: str, username: str, bet: int, payout: int, is_win: bool):
+def record_odd_even_game(guild_id, user_id: str, username: str, bet: int, payout: int, is_win: bool, is_multi: bool = False):
     if STATS_AVAILABLE:
         try:
-            stats_manager.record_game(user_id, username, "odd_even", bet, payout, is_win)
+            stats_manager.record_game(user_id, username, "odd_even", bet, payout, is_win, guild_id=guild_id, is_multi=is_multi)
         except: pass
         
 # --- 애니메이션 유틸리티 ---
@@ -38,7 +35,7 @@ async def play_dice_animation(message: discord.InteractionMessage, base_embed: d
     for _ in range(3):  # 횟수를 줄여 속도 향상
         current_face = random.choice(dice_faces)
         base_embed.description = f"🎲 **주사위를 굴리는 중...** {current_face}"
-        await message.edit(embed=base_embed) # 애니메이션 도중 view를 건드리지 않음
+        await frame_scheduler.push(message, embed=base_embed.copy()) # 애니메이션 도중 view를 건드리지 않음
         await asyncio.sleep(0.5)
 
 # --- 1단계: 모드 선택 View ---
@@ -55,11 +52,12 @@ class OddEvenModeSelectView(View):
 
     @discord.ui.button(label="🤖 싱글 모드", style=discord.ButtonStyle.secondary, emoji="👤")
     async def single_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if POINT_MANAGER_AVAILABLE:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), -self.bet)
+        hold = await point_service.reserve_bet(interaction.guild_id, self.user.id, self.bet, "홀짝")
+        if not hold:
+            return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
         
         embed = discord.Embed(title="🤖 홀짝: 싱글 모드", description="주사위 결과가 **홀**일지 **짝**일지 예측하세요!", color=discord.Color.blue())
-        await interaction.response.edit_message(embed=embed, view=SingleOddEvenView(self.bot, self.user, self.bet))
+        await interaction.response.edit_message(embed=embed, view=SingleOddEvenView(self.bot, self.user, self.bet, hold))
 
     @discord.ui.button(label="👥 멀티 모드", style=discord.ButtonStyle.primary, emoji="⚔️")
     async def multi_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -68,9 +66,14 @@ class OddEvenModeSelectView(View):
 
 # --- 2단계: 싱글 게임 진행 View ---
 class SingleOddEvenView(View):
-    def __init__(self, bot, user, bet):
+    def __init__(self, bot, user, bet, hold):
         super().__init__(timeout=60)
         self.bot, self.user, self.bet = bot, user, bet
+        self.hold = hold
+
+    async def on_timeout(self):
+        # 선택하지 않고 시간이 지나면 배팅금 환불
+        await point_service.refund(self.hold)
 
     @discord.ui.button(label="홀 (1,3,5)", style=discord.ButtonStyle.danger, emoji="🔴")
     async def choose_odd(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -81,6 +84,10 @@ class SingleOddEvenView(View):
         await self.process_game(interaction, "짝")
 
     async def process_game(self, interaction: discord.Interaction, user_choice):
+        if self.hold.closed:
+            return await interaction.response.send_message("이미 종료된 게임입니다.", ephemeral=True)
+        self.stop()
+
         # 1. 응답 지연 처리
         await interaction.response.defer()
     
@@ -93,7 +100,7 @@ class SingleOddEvenView(View):
 
         # 2. 버튼 즉시 제거 (중복 클릭 방지)
         anim_embed = discord.Embed(title="🎲 결과 확인 중...", color=discord.Color.light_grey())
-        await message.edit(embed=anim_embed, view=None)
+        await frame_scheduler.push(message, embed=anim_embed.copy(), view=None)
 
         # 3. 애니메이션 실행
         await play_dice_animation(message, anim_embed)
@@ -105,11 +112,9 @@ class SingleOddEvenView(View):
         
         # 배팅금의 2배 정산 (승리 시)
         payout = int(self.bet * 2 * WINNER_RETENTION) if is_win else 0
-        if POINT_MANAGER_AVAILABLE and is_win:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), payout)
+        await point_service.settle(self.hold, payout, f"홀짝 싱글 ({user_choice} → {actual})")
     
-        if STATS_AVAILABLE:
-            stats_manager.record_game(str(self.user.id), self.user.display_name, "홀짝", self.bet, payout, is_win)
+        record_odd_even_game(self.hold.guild_id, str(self.user.id), self.user.display_name, self.bet, payout, is_win)
 
         # 5. 최종 결과 출력
         result_embed = discord.Embed(title="🎲 홀짝 결과", color=discord.Color.gold() if is_win else discord.Color.red())
@@ -121,7 +126,7 @@ class SingleOddEvenView(View):
             f"정산: {payout:,}원\n*20%의 딜러비가 차감된 후 지급됩니다."
         )
     
-        await message.edit(embed=result_embed)
+        await frame_scheduler.push(message, final=True, embed=result_embed)
 
 # --- 3단계: 멀티 세부 설정 View ---
 class MultiSetupView(View):
@@ -136,22 +141,27 @@ class MultiSetupView(View):
             target = user_select.values[0]
             if target.id == self.user.id or target.bot:
                 return await inter.response.send_message("❌ 올바른 상대를 선택하세요.", ephemeral=True)
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, inter.guild_id, str(self.user.id), -self.bet)
-                await point_manager.add_point(self.bot, inter.guild_id, str(target.id), -self.bet)
-            await self.start_multi(inter, target)
+            p1_hold = await point_service.reserve_bet(inter.guild_id, self.user.id, self.bet, "홀짝")
+            if not p1_hold:
+                return await inter.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
+            p2_hold = await point_service.reserve_bet(inter.guild_id, target.id, self.bet, "홀짝")
+            if not p2_hold:
+                await point_service.refund(p1_hold)
+                return await inter.response.send_message(f"❌ {target.display_name}님의 잔액이 부족합니다.", ephemeral=True)
+            await self.start_multi(inter, target, [p1_hold, p2_hold])
         
         v = View(); user_select.callback = callback; v.add_item(user_select)
         await interaction.response.edit_message(content="상대를 선택해주세요.", embed=None, view=v)
 
     @discord.ui.button(label="🔓 공개 대전 (아무나)", style=discord.ButtonStyle.success)
     async def public_mode(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if POINT_MANAGER_AVAILABLE:
-            await point_manager.add_point(self.bot, interaction.guild_id, str(self.user.id), -self.bet)
-        await self.start_multi(interaction, None)
+        p1_hold = await point_service.reserve_bet(interaction.guild_id, self.user.id, self.bet, "홀짝")
+        if not p1_hold:
+            return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
+        await self.start_multi(interaction, None, [p1_hold])
 
-    async def start_multi(self, interaction, target):
-        view = MultiOddEvenView(self.bot, self.user, self.bet, target)
+    async def start_multi(self, interaction, target, holds):
+        view = MultiOddEvenView(self.bot, self.user, self.bet, target, holds)
         embed = discord.Embed(title="⚔️ 홀짝 대결", description=f"배팅액: {self.bet:,}원\n두 분 모두 홀 또는 짝을 선택해주세요!", color=discord.Color.orange())
         embed.add_field(name="P1", value=self.user.mention); embed.add_field(name="P2", value=target.mention if target else "대기 중...")
         await interaction.response.edit_message(content=None, embed=embed, view=view)
@@ -164,7 +174,7 @@ class MultiSetupView(View):
             return await interaction.response.send_message("❌ 당신은 이 게임의 상대방이 아닙니다.", ephemeral=True)
 
         # 2. [핵심] 수락한 사람의 잔액을 실시간으로 확인
-        p2_bal = await point_manager.get_point(self.bot, interaction.guild_id, str(self.p2.id))
+        p2_bal = await point_service.get_balance(interaction.guild_id, self.p2.id)
     
         if p2_bal < self.bet:
             # 돈이 부족하면 게임을 시작하지 않고 종료
@@ -179,19 +189,18 @@ class MultiSetupView(View):
         self.stop() # View 대기 종료
 
 class MultiOddEvenView(View):
-    def __init__(self, bot, p1, bet, p2=None):
+    def __init__(self, bot, p1, bet, p2=None, holds=None):
         super().__init__(timeout=60)
         self.bot, self.p1, self.bet, self.p2 = bot, p1, bet, p2
+        self.holds = list(holds or [])  # 참가자별 배팅 홀드
         self.choices = {}
         self.message = None
         self.game_completed = False
         
     async def on_timeout(self):
         if self.game_completed: return
-        guild_id = self.message.guild.id
-        if POINT_MANAGER_AVAILABLE:
-            await point_manager.add_point(self.bot, guild_id, str(self.p1.id), self.bet)
-            if self.p2: await point_manager.add_point(self.bot, guild_id, str(self.p2.id), self.bet)
+        for hold in self.holds:
+            await point_service.refund(hold)
         embed = discord.Embed(title="❌ 타임아웃 환불", description="⏰ 두 분 모두 선택하지 않아 게임이 취소되었습니다.", color=discord.Color.red())
         await self.message.edit(embed=embed, view=None)
 
@@ -205,8 +214,11 @@ class MultiOddEvenView(View):
 
     async def make_choice(self, interaction, choice):
         if self.p2 is None and interaction.user.id != self.p1.id:
+            hold = await point_service.reserve_bet(interaction.guild_id, interaction.user.id, self.bet, "홀짝")
+            if not hold:
+                return await interaction.response.send_message("❌ 잔액이 부족하여 참가할 수 없습니다.", ephemeral=True)
             self.p2 = interaction.user
-            if POINT_MANAGER_AVAILABLE: await point_manager.add_point(self.bot, interaction.guild_id, str(self.p2.id), -self.bet)
+            self.holds.append(hold)
 
         if interaction.user.id not in [self.p1.id, self.p2.id if self.p2 else None]:
             return await interaction.response.send_message("❌ 참가자가 아닙니다.", ephemeral=True)
@@ -224,14 +236,13 @@ class MultiOddEvenView(View):
         self.game_completed = True
         
         anim_embed = discord.Embed(title="🎲 결과 확인 중...", color=discord.Color.light_grey())
-        await self.message.edit(embed=anim_embed, view=None)
+        await frame_scheduler.push(self.message, embed=anim_embed.copy(), view=None)
 
         # 애니메이션 실행
         await play_dice_animation(self.message, anim_embed)
         
         dice_val = random.randint(1, 6)
         actual = "홀" if dice_val % 2 != 0 else "짝"
-        guild_id = self.message.guild.id
         
         p1_correct = (self.choices[self.p1.id] == actual)
         p2_correct = (self.choices[self.p2.id] == actual)
@@ -243,15 +254,16 @@ class MultiOddEvenView(View):
         if winner:
             total_pot = self.bet * 2
             reward = int(total_pot * WINNER_RETENTION)
-            if POINT_MANAGER_AVAILABLE: await point_manager.add_point(self.bot, guild_id, str(winner.id), reward)
+            payouts = {str(winner.id): reward}
             res_msg = f"🏆 {winner.mention} 승리! **{reward:,}원** 획득!\n*20%의 딜러비가 차감된 후 지급됩니다."
         else:
             refund = int(self.bet * PUSH_RETENTION)
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, guild_id, str(self.p1.id), refund)
-                await point_manager.add_point(self.bot, guild_id, str(self.p2.id), refund)
+            payouts = {str(self.p1.id): refund, str(self.p2.id): refund}
             res_msg = f"🤝 무승부! (**{refund:,}원** 환불)\n*20%의 딜러비가 차감된 후 지급됩니다."
 
+        # 두 참가자 정산을 한 트랜잭션으로 기록
+        await point_service.settle_round([(h, payouts.get(h.user_id, 0)) for h in self.holds], f"홀짝 멀티 ({actual})")
+
         result_embed = discord.Embed(title="🎲 홀짝 대결 결과", color=discord.Color.purple())
         result_embed.description = (
             f"결과: {DICE_EMOJIS[dice_val]} ({dice_val}) -> **{actual}**\n\n"
@@ -260,7 +272,7 @@ class MultiOddEvenView(View):
             f"{self.p2.mention}: {self.choices.get(self.p2.id, '선택 안 함')}"
         )
 
-        await self.message.edit(embed=result_embed)
+        await frame_scheduler.push(self.message, final=True, embed=result_embed)
 
 # --- Cog 클래스 ---
 class OddEvenCog(commands.Cog):
@@ -286,9 +298,8 @@ class OddEvenCog(commands.Cog):
         if 배팅 < 100 or 배팅 > MAX_BET:
             return await interaction.response.send_message(f"❌ 배팅 금액은 100원부터 {MAX_BET:,}원까지만 가능합니다.", ephemeral=True)
         
-        if POINT_MANAGER_AVAILABLE:
-            balance = await point_manager.get_point(self.bot, interaction.guild_id, str(interaction.user.id))
-            if balance < 배팅: return await interaction.response.send_message("❌ 잔액 부족!", ephemeral=True)
+        balance = await point_service.get_balance(interaction.guild_id, interaction.user.id)
+        if balance < 배팅: return await interaction.response.send_message("❌ 잔액 부족!", ephemeral=True)
 
         # XP 시스템을 가져와서 실행
         xp_cog = self.bot.get_cog("XPLeaderboardCog")
@@ -1,11 +1,41 @@
 # pet_climate.py
+"""
+신비섬 기후.
+
+실제 날씨는 백그라운드 갱신 작업(WeatherProvider)이 캐시 만료 전에 미리 받아 두고,
+펫 명령어는 항상 메모리에 있는 값만 읽습니다. (네트워크를 기다리지 않음)
+조회에 실패하면 마지막으로 받은 값을, 그것도 너무 오래되었으면 계절별 기본 날씨를 사용합니다.
+"""
+import asyncio
 import time
 import json
 import urllib.request
 import random
-from datetime import datetime
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
+
+WEATHER_ENDPOINT = "https://wttr.in/Jeju?format=j1"
+
+CLIMATE_CONFIG = {
+    "state_ttl": 3600,          # 기후 상태(특수 기상 추첨 포함) 유지 시간
+    "refresh_interval": 3600,   # 실제 날씨 갱신 주기
+    "prefetch_margin": 300,     # 만료 이만큼 전에 미리 갱신
+    "retry_interval": 60,       # 조회 실패 시 재시도 간격
+    "stale_limit": 6 * 3600,    # 이보다 오래된 관측값은 버리고 계절 기본값 사용
+    "fetch_timeout": 5,
+}
+
+# 계절별 기본 날씨 (온도, 풍속 km/h, 설명) - 관측값이 없을 때 사용
+SEASON_FALLBACK = {
+    "봄": (15, 12, "partly cloudy"),
+    "여름": (27, 10, "sunny"),
+    "가을": (18, 11, "clear"),
+    "겨울": (7, 18, "overcast"),
+}
+
+KST = timezone(timedelta(hours=9))
 
 @dataclass
 class ClimateState:
@@ -17,6 +47,30 @@ class ClimateState:
     wind_speed: int
     raw_desc: str
 
+class WeatherProvider(ABC):
+    """날씨 조회 인터페이스: (온도, 풍속 km/h, 영문 설명 소문자)를 돌려줍니다."""
+
+    @abstractmethod
+    async def fetch(self) -> Tuple[int, int, str]:
+        ...
+
+class WttrWeatherProvider(WeatherProvider):
+    """wttr.in JSON(format=j1) 조회. endpoint를 바꿔 로컬 테스트 서버를 쓸 수 있습니다."""
+
+    def __init__(self, endpoint: str = WEATHER_ENDPOINT, timeout: float = CLIMATE_CONFIG["fetch_timeout"]):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def _fetch_sync(self) -> Tuple[int, int, str]:
+        with urllib.request.urlopen(self.endpoint, timeout=self.timeout) as req:
+            data = json.loads(req.read())
+        current = data['current_condition'][0]
+        return int(current['temp_C']), int(current['windspeedKmph']), current['weatherDesc'][0]['value'].lower()
+
+    async def fetch(self) -> Tuple[int, int, str]:
+        # urlopen은 블로킹이므로 스레드에서 실행
+        return await asyncio.to_thread(self._fetch_sync)
+
 class ClimateManager:
     _instance = None
     
@@ -27,38 +81,85 @@ class ClimateManager:
         return cls._instance
 
     def _init(self):
-        self.last_fetch_time = 0
+        self.provider: WeatherProvider = WttrWeatherProvider()
+        self.last_fetch_time = 0            # 현재 기후 상태를 만든 시각
         self.cached_state: Optional[ClimateState] = None
+        self.observation: Optional[Tuple[int, int, str]] = None
+        self.observed_at = 0                # 마지막으로 실제 날씨를 받은 시각
+        self._state_is_fallback = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresher_stopped = False     # stop_refresher() 이후에는 get_current_climate()가 다시 띄우지 않음
+
+    def set_provider(self, provider: WeatherProvider):
+        """날씨 조회 방식 교체 (다음 갱신부터 적용)"""
+        self.provider = provider
+
+    # ==================== 백그라운드 갱신 ====================
+    def start_refresher(self):
+        """실행 중인 이벤트 루프에 갱신 작업을 띄움 (이미 돌고 있으면 무시)"""
+        self._refresher_stopped = False
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    def stop_refresher(self):
+        """갱신 작업 중지 (start_refresher()를 다시 부를 때까지 자동으로 재시작하지 않음)"""
+        self._refresher_stopped = True
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
 
+    async def refresh(self) -> bool:
+        """실제 날씨를 한 번 받아 둡니다. 실패하면 이전 관측값을 그대로 둡니다."""
+        try:
+            self.observation = await self.provider.fetch()
+            self.observed_at = time.time()
+        except Exception as e:
+            print(f"⚠️ Weather API Fetch Error: {e}")
+            return False
+        if self._state_is_fallback:
+            # 기본값으로 만든 상태는 실제 날씨가 들어오는 즉시 교체
+            self.cached_state = None
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            ok = await self.refresh()
+            if ok:
+                delay = CLIMATE_CONFIG["refresh_interval"] - CLIMATE_CONFIG["prefetch_margin"]
+            else:
+                delay = CLIMATE_CONFIG["retry_interval"]
+            await asyncio.sleep(max(1, delay))
+
+    # ==================== 기후 상태 ====================
     def get_season(self, month: int) -> str:
         if 3 <= month <= 5: return "봄"
         elif 6 <= month <= 8: return "여름"
         elif 9 <= month <= 11: return "가을"
         else: return "겨울"
 
-    def fetch_weather_api(self):
-        try:
-            req = urllib.request.urlopen("https://wttr.in/Jeju?format=j1", timeout=5)
-            data = json.loads(req.read())
-            current = data['current_condition'][0]
-            temp = int(current['temp_C'])
-            wind = int(current['windspeedKmph'])
-            desc = current['weatherDesc'][0]['value'].lower()
-            return temp, wind, desc
-        except Exception as e:
-            print(f"Weather API Fetch Error: {e}")
-            # API 에러 시 임시 디폴트 (맑음, 20도, 바람 5)
-            return 20, 5, "clear"
+    def _current_weather(self, season: str, now: float) -> Tuple[int, int, str]:
+        """메모리에 있는 관측값 (없거나 너무 오래되었으면 계절 기본값)"""
+        if self.observation and now - self.observed_at <= CLIMATE_CONFIG["stale_limit"]:
+            self._state_is_fallback = False
+            return self.observation
+        self._state_is_fallback = True
+        return SEASON_FALLBACK[season]
 
     def get_current_climate(self) -> ClimateState:
+        """현재 기후 (네트워크 대기 없음). 이벤트 루프 안에서 처음 호출되면 갱신 작업도 시작합니다."""
+        if self._refresh_task is None and not self._refresher_stopped:
+            try:
+                self.start_refresher()
+            except RuntimeError:
+                pass  # 이벤트 루프 밖 (스크립트 등) → 계절 기본값/마지막 관측값만 사용
+
         now = time.time()
         # 1시간(3600초) 단위 캐싱
-        if self.cached_state is None or (now - self.last_fetch_time) > 3600:
+        if self.cached_state is None or (now - self.last_fetch_time) > CLIMATE_CONFIG["state_ttl"]:
             self.last_fetch_time = now
             
-            from datetime import timezone, timedelta
-            tz_kst = timezone(timedelta(hours=9))
-            dt = datetime.now(tz_kst)
+            dt = datetime.now(KST)
             
             month = dt.month
             hour = dt.hour
@@ -66,7 +167,7 @@ class ClimateManager:
             season = self.get_season(month)
             is_night = (hour >= 19 or hour <= 6)
             
-            temp, wind, raw_desc = self.fetch_weather_api()
+            temp, wind, raw_desc = self._current_weather(season, now)
             
             # 1. 기본 날씨 판별 로직
             weather = "맑음"
@@ -124,4 +225,42 @@ class ClimateManager:
                 raw_desc=raw_desc
             )
             
-        return self.cached_state
\ No newline at end of file
+        return self.cached_state
+
+# ==================== 로컬 테스트 ====================
+if __name__ == "__main__":
+    # python pet_climate.py  →  느린 로컬 날씨 서버로 갱신 중에도 기후 조회가 기다리지 않는지 확인
+    import threading
+    import timeit
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class SlowWeatherHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(2)  # 느린 외부 API 흉내
+            body = json.dumps({"current_condition": [{
+                "temp_C": "35", "windspeedKmph": "8", "weatherDesc": [{"value": "Sunny"}]
+            }]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), SlowWeatherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def main():
+        manager = ClimateManager()
+        manager.set_provider(WttrWeatherProvider(f"http://127.0.0.1:{server.server_port}/"))
+        per_call = min(timeit.repeat(manager.get_current_climate, number=10000, repeat=3)) / 10000
+        state = manager.cached_state
+        print(f"⏱️ 갱신 대기 중 조회: {per_call * 1e6:,.2f} µs/회 → {state.weather} {state.temperature}℃ (계절 기본값)")
+        await asyncio.sleep(2.5)
+        state = manager.get_current_climate()
+        print(f"🌤️ 갱신 후: {state.weather} {state.temperature}℃ ({state.raw_desc})")
+        manager.stop_refresher()
+
+    asyncio.run(main())
+    server.shutdown()
@@ -11,94 +11,162 @@ from discord import app_commands, Interaction
 from discord.ext import commands, tasks
 from discord.ui import Button, View
 from typing import Optional, List
-from database_manager import DatabaseManager
+from database_manager import DatabaseManager, get_guild_db_manager
 from pet_skill import DiscordUIFormatter
 from pet_climate import ClimateManager
 
+# 시간이 지나면 감소하는 스탯 (시간당 감소량) - Pet.update_passive_decay와 일괄 감소 UPDATE가 함께 사용
+FULLNESS_DECAY_PER_HOUR = 2.1
+CLEANLINESS_DECAY_PER_HOUR = 2.1
+MOOD_DECAY_PER_HOUR = 1.5
+STRESS_DECAY_THRESHOLD = 60     # 스트레스가 이 이상이면 기분 감소 2배
+
+# user_pets에 실제 컬럼으로 저장되는 스탯 (나머지는 pet_data JSON)
+PET_HOT_COLUMNS = ("stage", "stress", "fullness", "cleanliness", "mood_score", "zero_fullness_time",
+                   "zero_cleanliness_time", "is_sick", "fine_charged", "last_decay_time")
+PET_BOOL_COLUMNS = ("is_sick", "fine_charged")
+
+# 랭크전 매칭 설정
+PVP_MATCH_CONFIG = {
+    "timeout": 60,              # 최대 대기 시간(초)
+    "score_window": None,       # 랭크 점수 차이가 이 이내인 상대만 매칭 (None = 점수 무관)
+    "ranked_fallback": False,   # 시간 내 대기 상대가 없으면 점수 범위 내 다른 유저의 펫과 매칭
+}
+
+# pet_data 형식 버전 (1 = 버전 표시 없이 __dict__를 통째로 저장하던 형식)
+PET_SCHEMA_VERSION = 2
+
+def _copy_default(value):
+    """스키마 기본값 복사 (dict/list는 펫마다 새로 만듦 - copy.deepcopy보다 빠름)"""
+    if isinstance(value, dict):
+        return {k: _copy_default(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_default(v) for v in value]
+    return value
+
+def _upgrade_pet_v1(data: dict):
+    """v1 → v2: 예전 펫에 없을 수 있는 시각 필드를 지금 시각으로 채움 (나머지 누락 필드는 스키마 기본값)"""
+    now = time.time()
+    for field in ("created_time", "last_update_time", "last_decay_time"):
+        if data.get(field) is None:
+            data[field] = now
+
+# 저장된 버전 → 다음 버전으로 올리는 규칙 (from_dict에서 순서대로 적용)
+PET_UPGRADES = {
+    1: _upgrade_pet_v1,
+}
+
 # 알 -> 새끼 -> 유년기 -> 성체 -> 최종 진화
 class Pet:
-    def __init__(self, name: str, owner_name: str = None, main_type: str = "노말"):
-        self.name = name
-        self.stage = "알"
-        self.owner_name = owner_name
-        self.level = 1
-        self.main_type = main_type
-        self.sub_type = None
-        
+    # 저장 스키마: 필드 이름 → 기본값 (이 순서가 곧 슬롯 순서)
+    # 기본값과 같은 필드는 저장하지 않으며, 필드를 추가할 때는 여기에 기본값과 함께 등록합니다.
+    FIELDS = {
+        "name": "이름없음",
+        "stage": "알",
+        "owner_name": None,
+        "level": 1,
+        "main_type": "노말",
+        "sub_type": None,
+
         # 알 단계 컨디션 및 성장 요소
-        self._max_mp = 50
-        self.warmth = 50
-        self.cleanliness_egg = 50
-        self.stability = 50
-        self.hatch_progress = 0.0
-        self.created_time = time.time()  # 이 시점 기준으로 3일 뒤 방생 가능
-        
+        "_max_mp": 50,
+        "warmth": 50,
+        "cleanliness_egg": 50,
+        "stability": 50,
+        "hatch_progress": 0.0,
+        "created_time": None,           # 생성 시각 (이 시점 기준으로 3일 뒤 방생 가능)
+
         # 숨겨진 스탯
-        self.rarity = "일반"
-        self.iv = random.randint(0, 31)
-        self.personality = None
-        self.hidden_trait = None  # 숨겨진 특성
-        self.name_changed = False
-        
+        "rarity": "일반",
+        "iv": 0,
+        "personality": None,
+        "hidden_trait": None,           # 숨겨진 특성
+        "name_changed": False,
+        "is_mutant": False,
+        "locked_appearance": None,
+
         # 기획서 기준 실시간 변동 상태 요소 (0~100)
-        self.fullness = 100
-        self.cleanliness = 100
-        self.closeness = 30
-        self.stress = 0
-        self.health = 100
-        self.mood_score = 100
-        self.energy = 100
-        self.affinity = 0
-        
+        "fullness": 100,
+        "cleanliness": 100,
+        "closeness": 30,
+        "stress": 0,
+        "health": 100,
+        "mood_score": 100,
+        "energy": 100,
+        "affinity": 0,
+
         # 전투 스탯 (기본값)
-        self.hp = 20
-        self.max_hp = 100
-        self.attack = 15
-        self.defense = 10
-        self.speed = 10
-        self.exp = 0
-        self.potential = 0
-        self.rank_score = 1000
-        self.is_dead = False
-        self.luck = 10
+        "hp": 20,
+        "max_hp": 100,
+        "attack": 15,
+        "defense": 10,
+        "speed": 10,
+        "exp": 0,
+        "potential": 0,
+        "rank_score": 1000,
+        "is_dead": False,
+        "luck": 10,
+        "win_count": 0,
 
         # 최종 진화 스탯 확장용
-        self.crit = 0
-        self.res = 0
-        
+        "crit": 0,
+        "res": 0,
+
         # 패널티 스탯
-        self.is_sick = False
-        self.fine_charged = False
-        self.zero_fullness_time = None  # 포만감 0이 된 시간 기록
-        self.zero_cleanliness_time = None  # 청결 0이 된 시간 기록
-        
+        "is_sick": False,
+        "fine_charged": False,
+        "zero_fullness_time": None,     # 포만감 0이 된 시간 기록
+        "zero_cleanliness_time": None,  # 청결 0이 된 시간 기록
+        "is_fainted": False,
+        "faint_time": None,
+
         # 카운터 및 일일 제한 (자정 초기화용)
-        self.train_count = 0
-        self.explore_count = 0
-        self.train_count_today = 0
-        self.explore_count_today = 0
-        self.snack_count_today = 0  
-        self.pvp_count = 0
-        self.last_update_time = time.time()
-        self.pet_count_today = 0      # 쓰다듬기 카운트
-        self.clean_count_today = 0    # 청소 카운트
-        self.bug_count_today = 0      # 벌레잡기 카운트
-        self.sleep_count_today = 0    # 휴식 및 재우기 일일 카운트
-        self.last_decay_time = time.time()
-
-        # 알 돌보기 일일 행동 기록용 딕셔너리
-        self.egg_actions_today = {"햇빛받기": 0, "보듬어주기": 0, "씻겨주기": 0, "품어주기": 0}
-
-        self.skills = []
-        self.equipment = {"머리": None, "견갑": None, "허리": None, "다리": None, "아이템": None}
-        self.inventory = {"열매": {"상": 0, "중": 0, "하": 0}, "장비": []}
-        self.learned_ultimate = None
-
-        self.last_update_time = getattr(self, 'last_update_time', time.time())
-
-        # 📜 [추가] 일일 퀘스트 카운터 및 보상 플래그
-        self.stroke_count_today = 0
-        self.last_reward_date = None
+        "train_count": 0,
+        "explore_count": 0,
+        "train_count_today": 0,
+        "explore_count_today": 0,
+        "snack_count_today": 0,
+        "pvp_count": 0,
+        "pet_count_today": 0,           # 쓰다듬기 카운트
+        "clean_count_today": 0,         # 청소 카운트
+        "bug_count_today": 0,           # 벌레잡기 카운트
+        "sleep_count_today": 0,         # 휴식 및 재우기 일일 카운트
+        "last_update_time": None,
+        "last_decay_time": None,
+
+        # 알 돌보기 일일 행동 기록용
+        "egg_actions_today": {"햇빛받기": 0, "보듬어주기": 0, "씻겨주기": 0, "품어주기": 0},
+
+        "skills": [],
+        "equipment": {"머리": None, "견갑": None, "허리": None, "다리": None, "아이템": None},
+        "inventory": {"열매": {"상": 0, "중": 0, "하": 0}, "장비": []},
+        "learned_ultimate": None,
+
+        # 📜 일일 퀘스트 카운터 및 보상 플래그
+        "stroke_count_today": 0,
+        "last_reward_date": None,
+        "daily_quests": {},
+        "quest_date": None,
+        "last_quest_check_date": None,
+    }
+    # 스키마에 없는 키 (이전 버전에서 저장된 값 등)는 _extra에 보관했다가 그대로 다시 저장합니다.
+    __slots__ = tuple(FIELDS) + ("_extra",)
+
+    def __init__(self, name: str, owner_name: str = None, main_type: str = "노말"):
+        self._fill_defaults()
+        now = time.time()
+        self.name = name
+        self.owner_name = owner_name
+        self.main_type = main_type
+        self.iv = random.randint(0, 31)
+        self.created_time = now
+        self.last_update_time = now
+        self.last_decay_time = now
+
+    def _fill_defaults(self):
+        for field, default in Pet.FIELDS.items():
+            setattr(self, field, _copy_default(default))
+        self._extra = {}
 
     @property
     def mood_state(self):
@@ -140,12 +208,6 @@ class Pet:
         """시간 경과에 따른 스탯 자연 감소 및 일일 제한 리셋 (원본 복원)"""
         current_time = time.time()
 
-        # 1. 초기화되지 않은 경우 대비
-        if not hasattr(self, 'last_update_time'):
-            self.last_update_time = current_time
-        if not hasattr(self, 'last_decay_time'):
-            self.last_decay_time = current_time
-    
         # 2. 날짜 비교 변수 정의 (안전한 속성 접근)
         last_date = time.strftime('%Y-%m-%d', time.localtime(self.last_update_time + 32400))
         current_date = time.strftime('%Y-%m-%d', time.localtime(current_time + 32400))
@@ -181,10 +243,10 @@ class Pet:
         # 96시간(4일) 기준 = 1.0
         
         # 3. 상태 감소 연산 (기존 로직 유지)
-        decay_modifier = 2.0 if self.stress >= 60 else 1.0
-        self.fullness = max(0, self.fullness - (hours_passed * 2.1))
-        self.cleanliness = max(0, self.cleanliness - (hours_passed * 2.1))
-        self.mood_score = max(0, self.mood_score - (hours_passed * 1.5 * decay_modifier))
+        decay_modifier = 2.0 if self.stress >= STRESS_DECAY_THRESHOLD else 1.0
+        self.fullness = max(0, self.fullness - (hours_passed * FULLNESS_DECAY_PER_HOUR))
+        self.cleanliness = max(0, self.cleanliness - (hours_passed * CLEANLINESS_DECAY_PER_HOUR))
+        self.mood_score = max(0, self.mood_score - (hours_passed * MOOD_DECAY_PER_HOUR * decay_modifier))
 
         # 4. 상태 0 처리 (기존 로직 유지)
         if self.fullness <= 0 and self.zero_fullness_time is None:
@@ -251,10 +313,6 @@ class Pet:
 
     def interact_egg(self, action_name):
         """알 단계 전용 행동 핸들러"""
-        # ✅ 1. 기존에 생성된 알(DB에 정보가 없는 경우)을 위한 방어 코드
-        if not hasattr(self, 'egg_actions_today'):
-            self.egg_actions_today = {"햇빛받기": 0, "보듬어주기": 0, "씻겨주기": 0, "품어주기": 0}
-
         # ✅ 2. 하루 1회 제한 검사
         if self.egg_actions_today.get(action_name, 0) >= 1:
             return f"❌ [{action_name}] 행동은 하루에 한 번만 가능합니다! 내일 다시 돌봐주세요."
@@ -510,7 +568,16 @@ class Pet:
         return f"🍖 먹이를 주었습니다. 포만감: {int(self.fullness)}/100, 스트레스: {self.stress}/100"
 
     def to_dict(self) -> dict:
-        return self.__dict__
+        """저장용 dict: 버전 + 기본값과 다른 필드만"""
+        data = {"v": PET_SCHEMA_VERSION, **self._extra}
+        for field, default in Pet.FIELDS.items():
+            value = getattr(self, field)
+            if value != default:
+                data[field] = value
+        return data
+
+    def encode(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
 
     def try_learn_skill(self) -> tuple:
         from pet_skill import get_random_skill_by_type
@@ -538,18 +605,23 @@ class Pet:
         
     @classmethod
     def from_dict(cls, data: dict) -> Pet:
-        pet = cls(data.get('name', '이름없음'), data.get('main_type', '노말'))
-        pet.__dict__.update(data)
-        if not hasattr(pet, 'equipment'):
-            pet.equipment = {"머리": None, "견갑": None, "허리": None, "다리": None, "아이템": None}
-        if not hasattr(pet, 'inventory'):
-            pet.inventory = {"열매": {"상": 0, "중": 0, "하": 0}, "장비": []}
-        if not hasattr(pet, 'is_fainted'):
-            pet.is_fainted = False
-        if not hasattr(pet, 'faint_time'):
-            pet.faint_time = None
+        """저장된 dict에서 복원 (__init__을 거치지 않으므로 IV 등을 다시 뽑지 않음)"""
+        data = dict(data)
+        version = data.pop("v", 1)
+        while version < PET_SCHEMA_VERSION:
+            PET_UPGRADES[version](data)
+            version += 1
+
+        pet = cls.__new__(cls)
+        for field, default in cls.FIELDS.items():
+            setattr(pet, field, data.pop(field) if field in data else _copy_default(default))
+        pet._extra = data
         return pet
 
+    @classmethod
+    def decode(cls, raw: str) -> Pet:
+        return cls.from_dict(json.loads(raw))
+
 class SkillConfirmView(discord.ui.View):
     def __init__(self, cog, user_id, guild_id, skill_to_remove):
         super().__init__()
@@ -601,12 +673,53 @@ class ActionButton(discord.ui.Button):
         )
         await exec_view.handle_action(interaction)
 
+class PetMatchQueue:
+    """
+    길드별 랭크전 대기열. 들어오는 순간 조건에 맞는 대기자가 있으면 바로 짝을 지어 주고,
+    없으면 Future를 걸어 두고 기다립니다. (모든 조작은 이벤트 루프 안에서 동기적으로 끝나므로 잠금이 필요 없음)
+    """
+
+    def __init__(self, score_window: Optional[int] = None):
+        self.score_window = score_window
+        self._waiting = {}  # user_id → (랭크 점수, Future) - 삽입 순서 = 대기 순서
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def __contains__(self, user_id):
+        return user_id in self._waiting
+
+    def _fits(self, score: int, other_score: int) -> bool:
+        return self.score_window is None or abs(score - other_score) <= self.score_window
+
+    def enqueue(self, user_id: str, score: int) -> asyncio.Future:
+        """대기열에 들어갑니다. 상대가 정해지면 Future 결과가 상대 user_id가 됩니다."""
+        self.discard(user_id)
+        future = asyncio.get_running_loop().create_future()
+        for other_id, (other_score, other_future) in self._waiting.items():
+            if self._fits(score, other_score) and not other_future.done():
+                # 먼저 기다리던 유저부터 매칭 → 양쪽 모두 즉시 깨어남
+                del self._waiting[other_id]
+                other_future.set_result(user_id)
+                future.set_result(other_id)
+                return future
+        self._waiting[user_id] = (score, future)
+        return future
+
+    def discard(self, user_id: str, future: Optional[asyncio.Future] = None):
+        """대기열에서 빼고 대기 중인 Future를 취소합니다. (future를 주면 그 대기일 때만)"""
+        entry = self._waiting.get(user_id)
+        if entry and (future is None or entry[1] is future):
+            del self._waiting[user_id]
+            entry[1].cancel()
+
 class PetManager(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.matching_queues = defaultdict(list)
+        self.matching_queues = defaultdict(lambda: PetMatchQueue(PVP_MATCH_CONFIG["score_window"]))
         self.match_tasks = {}
-        self.db_managers = {}
+        self.db_managers = {}  # 펫 테이블 초기화가 끝난 길드 (매니저 자체는 공유 레지스트리 소유)
+        self.pet_names = defaultdict(dict)  # 리더보드용 펫 이름 캐시 {guild_id: {user_id: 이름 또는 None}}
         self.quest_pool = [
             {"id": "train", "name": "🏋️ 펫 훈련하기", "target": 3, "desc": "훈련을 3회 수행하세요."},
             {"id": "stroke", "name": "❤️ 펫 쓰다듬기", "target": 5, "desc": "펫을 5회 쓰다듬어주세요."},
@@ -614,61 +727,56 @@ class PetManager(commands.Cog):
             {"id": "feed", "name": "🍖 펫 먹이주기", "target": 2, "desc": "펫에게 먹이를 2회 주세요."}
         ]
 
-        try:
-            dummy_db = DatabaseManager(guild_id="pet_init_setup")
-            dummy_db.create_table(
-                "user_pets",
-                """
-                user_id TEXT NOT NULL,
-                guild_id TEXT NOT NULL,
-                pet_data TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (user_id, guild_id)
-                """
-            )
-            dummy_db.create_table(
-                "user_pet_storage",
-                """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                guild_id TEXT NOT NULL,
-                pet_data TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                """
-            )
-        except Exception as e:
-            print(f"⚠️ 테이블 설정 에러: {e}")
-
     def cog_load(self):
         self.pet_decay_loop.start()
+        ClimateManager().start_refresher()  # 날씨는 백그라운드에서 미리 받아 둠
 
     def cog_unload(self):
         self.pet_decay_loop.cancel()
+        ClimateManager().stop_refresher()
 
     @tasks.loop(minutes=30)
     async def pet_decay_loop(self):
-        """30분마다 모든 활성 펫의 상태를 실시간 감소시킵니다."""
-        try:
-            for guild_id_str, db in list(self.db_managers.items()):
-                rows = db.execute_query(
-                    "SELECT user_id, guild_id, pet_data FROM user_pets",
-                    (), 'all'
-                )
-                if not rows:
-                    continue
-                for row in rows:
-                    try:
-                        pet = Pet.from_dict(json.loads(row['pet_data']))
-                        pet.update_passive_decay()
-                        pet_json = json.dumps(pet.to_dict(), ensure_ascii=False)
-                        db.execute_query(
-                            "UPDATE user_pets SET pet_data = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND guild_id = ?",
-                            (pet_json, row['user_id'], row['guild_id']), 'none'
-                        )
-                    except Exception as e:
-                        print(f"⚠️ [decay_loop] {row['user_id']} 펫 업데이트 실패: {e}")
-        except Exception as e:
-            print(f"⚠️ [decay_loop] 스케줄러 오류: {e}")
+        """30분마다 봇이 들어가 있는 모든 길드의 펫 상태를 길드당 UPDATE 한 번으로 감소시킵니다."""
+        now = time.time()
+        for guild in list(self.bot.guilds):
+            try:
+                db = self._get_db(guild.id)
+                await db.run_in_executor(self._apply_bulk_decay, db, now)
+            except Exception as e:
+                print(f"⚠️ [decay_loop] 길드 {guild.id} 펫 상태 감소 실패: {e}")
+
+    @staticmethod
+    def _apply_bulk_decay(db: DatabaseManager, now: float) -> int:
+        """
+        길드 워커 스레드에서 실행: Pet.update_passive_decay와 같은 규칙을 SQL로 적용합니다.
+        감소는 경과 시간에 비례하고 0에서 멈추므로, 나중에 읽을 때 남은 시간만큼 다시 적용해도 결과가 같습니다.
+        (자정 일일 횟수 초기화는 JSON 쪽이라 읽을 때 update_passive_decay에서 처리)
+        """
+        hours = "(MAX(0, :now - COALESCE(last_decay_time, :now)) / 3600.0)"
+        fullness = f"MAX(0, fullness - {hours} * {FULLNESS_DECAY_PER_HOUR})"
+        cleanliness = f"MAX(0, cleanliness - {hours} * {CLEANLINESS_DECAY_PER_HOUR})"
+        mood = (f"MAX(0, mood_score - {hours} * {MOOD_DECAY_PER_HOUR}"
+                f" * (CASE WHEN stress >= {STRESS_DECAY_THRESHOLD} THEN 2.0 ELSE 1.0 END))")
+        params = {"now": now}
+        conn = db.get_connection()
+        with conn:
+            # 알 단계는 감소 없이 기준 시각만 옮김
+            conn.execute("UPDATE user_pets SET last_decay_time = :now WHERE stage = '알'", params)
+            # SET의 모든 식은 갱신 전 값으로 계산됩니다.
+            cursor = conn.execute(f"""
+                UPDATE user_pets SET
+                    fullness = {fullness},
+                    cleanliness = {cleanliness},
+                    mood_score = {mood},
+                    zero_fullness_time = CASE WHEN {fullness} > 0 THEN NULL ELSE COALESCE(zero_fullness_time, :now) END,
+                    zero_cleanliness_time = CASE WHEN {cleanliness} > 0 THEN NULL ELSE COALESCE(zero_cleanliness_time, :now) END,
+                    is_sick = CASE WHEN {cleanliness} > 0 THEN 0 WHEN zero_cleanliness_time IS NULL THEN 1 ELSE is_sick END,
+                    fine_charged = CASE WHEN {cleanliness} > 0 THEN 0 ELSE fine_charged END,
+                    last_decay_time = :now
+                WHERE stage IS NOT NULL AND stage != '알' AND COALESCE(last_decay_time, 0) < :now
+            """, params)
+            return cursor.rowcount
 
     @pet_decay_loop.before_loop
     async def before_decay_loop(self):
@@ -677,32 +785,10 @@ class PetManager(commands.Cog):
     def _get_db(self, guild_id: int) -> DatabaseManager:
         gid_str = str(guild_id)
         if gid_str not in self.db_managers:
-            db = DatabaseManager(guild_id=gid_str)
+            db = get_guild_db_manager(gid_str)
             
-            # 🛡️ 새로운 길드 DB가 로드될 때, 테이블이 없다면 즉시 생성해 줍니다.
-            try:
-                db.create_table(
-                    "user_pets",
-                    """
-                    user_id TEXT NOT NULL,
-                    guild_id TEXT NOT NULL,
-                    pet_data TEXT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (user_id, guild_id)
-                    """
-                )
-                db.create_table(
-                    "user_pet_storage",
-                    """
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    guild_id TEXT NOT NULL,
-                    pet_data TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    """
-                )
-            except Exception as e:
-                print(f"⚠️ [{gid_str}] 테이블 동적 초기화 에러: {e}")
+            # 🛡️ 새로운 길드 DB가 로드될 때 펫 스키마 마이그레이션을 적용합니다.
+            db.apply_migrations("pet_manager")
                 
             self.db_managers[gid_str] = db
             
@@ -710,22 +796,35 @@ class PetManager(commands.Cog):
 
     def get_user_pet(self, guild_id: str, user_id: str) -> Optional[Pet]:
         db = self._get_db(int(guild_id))
-        res = db.execute_query("SELECT pet_data FROM user_pets WHERE user_id = ? AND guild_id = ?", (user_id, guild_id), 'one')
+        res = db.execute_query(
+            f"SELECT pet_data, {', '.join(PET_HOT_COLUMNS)} FROM user_pets WHERE user_id = ? AND guild_id = ?",
+            (user_id, guild_id), 'one'
+        )
         if res and res['pet_data']:
-            return Pet.from_dict(json.loads(res['pet_data']))
+            pet = Pet.decode(res['pet_data'])
+            # 컬럼 값이 최신 (일괄 감소는 컬럼만 갱신) → 마지막 감소 이후 경과분만 적용
+            for col in PET_HOT_COLUMNS:
+                if res[col] is not None:
+                    setattr(pet, col, bool(res[col]) if col in PET_BOOL_COLUMNS else res[col])
+            pet.update_passive_decay()
+            return pet
         return None
 
     def save_user_pet(self, guild_id: str, user_id: str, pet: Pet):
         db = self._get_db(int(guild_id))
-        pet_json = json.dumps(pet.to_dict(), ensure_ascii=False)
+        pet_json = pet.encode()
+        hot = [getattr(pet, col, None) for col in PET_HOT_COLUMNS]
+        hot = [int(bool(v)) if col in PET_BOOL_COLUMNS else v for col, v in zip(PET_HOT_COLUMNS, hot)]
         db.execute_query(
-            """
-            INSERT INTO user_pets (user_id, guild_id, pet_data, updated_at) 
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(user_id, guild_id) DO UPDATE SET pet_data = ?, updated_at = CURRENT_TIMESTAMP
+            f"""
+            INSERT INTO user_pets (user_id, guild_id, pet_data, {', '.join(PET_HOT_COLUMNS)}, updated_at) 
+            VALUES (?, ?, ?, {', '.join('?' * len(PET_HOT_COLUMNS))}, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id, guild_id) DO UPDATE SET pet_data = excluded.pet_data,
+                {', '.join(f'{col} = excluded.{col}' for col in PET_HOT_COLUMNS)}, updated_at = CURRENT_TIMESTAMP
             """,
-            (user_id, guild_id, pet_json, pet_json), 'none'
+            (user_id, guild_id, pet_json, *hot), 'none'
         )
+        self.pet_names[str(guild_id)][str(user_id)] = pet.name
 
     def assign_daily_quests(self, pet):
         """매일 새로운 퀘스트를 선정하되, 현재 단계에서 가능한 미션만 부여합니다."""
@@ -776,6 +875,7 @@ class PetManager(commands.Cog):
         """방치형 페널티로 야생으로 날아갈 시 DB 레코드 완전히 말소"""
         db = self._get_db(int(guild_id))
         db.execute_query("DELETE FROM user_pets WHERE user_id = ? AND guild_id = ?", (user_id, guild_id), 'none')
+        self.pet_names[str(guild_id)][str(user_id)] = None
 
     async def force_release_pet(self, guild_id: int, user_id: int) -> bool:
         """관리자 권한으로 대상 유저의 현재 펫을 강제 방생(삭제)합니다."""
@@ -791,6 +891,7 @@ class PetManager(commands.Cog):
             (str(guild_id), str(user_id)), 
             'none'
         )
+        self.pet_names[str(guild_id)][str(user_id)] = None
         return True
     
     # --- 보관함 (Storage) DB 관리 로직 ---
@@ -803,7 +904,7 @@ class PetManager(commands.Cog):
         pets = []
         for row in rows:
             try:
-                pet_obj = Pet.from_dict(json.loads(row['pet_data']))
+                pet_obj = Pet.decode(row['pet_data'])
                 pets.append((row['id'], pet_obj))
             except Exception:
                 pass
@@ -811,7 +912,7 @@ class PetManager(commands.Cog):
 
     def add_stored_pet(self, guild_id: str, user_id: str, pet: Pet):
         db = self._get_db(int(guild_id))
-        pet_json = json.dumps(pet.to_dict(), ensure_ascii=False)
+        pet_json = pet.encode()
         db.execute_query(
             "INSERT INTO user_pet_storage (user_id, guild_id, pet_data) VALUES (?, ?, ?)",
             (user_id, guild_id, pet_json), 'none'
@@ -825,7 +926,7 @@ class PetManager(commands.Cog):
         db = self._get_db(int(guild_id))
         res = db.execute_query("SELECT pet_data FROM user_pet_storage WHERE id = ? AND guild_id = ?", (id_to_get, guild_id), 'one')
         if res and res['pet_data']:
-            return Pet.from_dict(json.loads(res['pet_data']))
+            return Pet.decode(res['pet_data'])
         return None
 
     def get_total_pet_count(self, guild_id: str, user_id: str) -> int:
@@ -914,27 +1015,47 @@ class PetManager(commands.Cog):
         return "SUCCESS", "", embed
         
     def get_server_rank(self, guild_id: str, user_id: str, new_score: int = None) -> int:
-        """서버 내 랭크 순위를 반환합니다. new_score를 주면 그 점수 기준으로 계산."""
+        """서버 내 랭크 순위를 반환합니다. new_score를 주면 그 점수 기준으로 계산. (동점은 같은 순위)"""
         try:
             db = self._get_db(int(guild_id))
-            rows = db.execute_query(
-                "SELECT user_id, pet_rank_score FROM users ORDER BY pet_rank_score DESC",
-                (), 'all'
-            )
-            if not rows:
-                return 1
-            scores = [(r['user_id'], r.get('pet_rank_score', 1000)) for r in rows]
-            # new_score가 주어진 경우 해당 유저 점수 교체
-            if new_score is not None:
-                scores = [(uid, new_score if uid == user_id else sc) for uid, sc in scores]
-                scores.sort(key=lambda x: x[1], reverse=True)
-            for idx, (uid, _) in enumerate(scores, 1):
-                if uid == user_id:
-                    return idx
-            return len(scores)
+            if new_score is None:
+                # 점수 인덱스 범위 카운트 → 전체 정렬 없이 (나보다 높은 유저 수 + 1)
+                row = db.execute_query(
+                    """
+                    SELECT COUNT(*) AS higher FROM users
+                    WHERE pet_rank_score > COALESCE((SELECT pet_rank_score FROM users WHERE user_id = ?), 1000)
+                    """,
+                    (user_id,), 'one'
+                )
+            else:
+                # 아직 DB에 반영 전인 새 점수 기준 → 본인 행은 제외하고 셉니다.
+                row = db.execute_query(
+                    "SELECT COUNT(*) AS higher FROM users WHERE pet_rank_score > ? AND user_id != ?",
+                    (new_score, user_id), 'one'
+                )
+            return (row['higher'] if row else 0) + 1
         except Exception:
             return 0
 
+    def _get_pet_names(self, guild_id: str, user_ids: List[str]) -> dict:
+        """리더보드용 펫 이름 조회. 캐시에 없는 유저만 pet_data에서 이름만 뽑아 한 번에 채웁니다."""
+        cache = self.pet_names[str(guild_id)]
+        missing = [uid for uid in user_ids if uid not in cache]
+        if missing:
+            db = self._get_db(int(guild_id))
+            rows = db.execute_query(
+                f"""
+                SELECT user_id, json_extract(pet_data, '$.name') AS name FROM user_pets
+                WHERE guild_id = ? AND user_id IN ({', '.join('?' * len(missing))})
+                """,
+                (str(guild_id), *missing), 'all'
+            ) or []
+            # 기본값과 같은 필드는 저장하지 않으므로 이름이 없으면 기본 이름
+            found = {row['user_id']: row['name'] or Pet.FIELDS["name"] for row in rows}
+            for uid in missing:
+                cache[uid] = found.get(uid)
+        return {uid: cache[uid] for uid in user_ids}
+
     def get_server_ranking_list(self, guild_id: str, top_n: int = 10) -> list:
         """서버 내 랭크 상위 top_n명의 (user_id, score, pet_name) 리스트를 반환합니다."""
         try:
@@ -943,14 +1064,12 @@ class PetManager(commands.Cog):
                 "SELECT user_id, pet_rank_score FROM users ORDER BY pet_rank_score DESC LIMIT ?",
                 (top_n,), 'all'
             )
-            result = []
-            for row in rows:
-                uid = row['user_id']
-                score = row.get('pet_rank_score', 1000)
-                pet = self.get_user_pet(guild_id, uid)
-                pet_name = pet.name if pet else "동행 펫 없음"
-                result.append((uid, score, pet_name))
-            return result
+            names = self._get_pet_names(guild_id, [row['user_id'] for row in rows])
+            return [
+                (row['user_id'], row['pet_rank_score'] if row['pet_rank_score'] is not None else 1000,
+                 names.get(row['user_id']) or "동행 펫 없음")
+                for row in rows
+            ]
         except Exception:
             return []
 
@@ -991,27 +1110,26 @@ class PetManager(commands.Cog):
 
         return None
     
-    async def find_matching_user(self, guild_id: str, user_id: str) -> Optional[str]:
-        """60초 동안 대기열에서 다른 유저를 찾습니다."""
+    async def find_matching_user(self, guild_id: str, user_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """대기열에서 다른 유저를 기다립니다. 상대가 들어오는 즉시 깨어나며, 시간 초과 시 None."""
+        db = self._get_db(int(guild_id))
+        user_data = db.get_user(user_id)
+        score = user_data.get('pet_rank_score', 1000) if user_data else 1000
+
         queue = self.matching_queues[guild_id]
-        queue.append(user_id)
-        
+        future = queue.enqueue(user_id, score)
         try:
-            for _ in range(60):  # 60초 동안 1초마다 확인
-                await asyncio.sleep(1)
-                # 큐에 나 말고 다른 유저가 있다면 매칭 성공!
-                opponents = [uid for uid in queue if uid != user_id]
-                if opponents:
-                    opponent_id = opponents[0]
-                    # 매칭되었으니 큐에서 두 명 모두 제거
-                    if user_id in queue: queue.remove(user_id)
-                    if opponent_id in queue: queue.remove(opponent_id)
-                    return opponent_id
-            return None  # 60초 초과 시 None 반환
+            return await asyncio.wait_for(future, timeout or PVP_MATCH_CONFIG["timeout"])
+        except asyncio.TimeoutError:
+            if not PVP_MATCH_CONFIG["ranked_fallback"]:
+                return None
+            # 대기 상대가 없으면 점수 범위 내 다른 유저의 펫과 매칭
+            window = PVP_MATCH_CONFIG["score_window"] or 200
+            row = await db.run_in_executor(db.get_ranked_opponents, guild_id, user_id, score - window, score + window)
+            return row['user_id'] if row else None
         finally:
-            # 에러가 나거나 취소되었을 때 큐에서 확실히 제거
-            if user_id in queue:
-                queue.remove(user_id)
+            # 취소/시간 초과/오류 시 대기열에서 확실히 제거 (이미 매칭되었다면 아무것도 하지 않음)
+            queue.discard(user_id, future)
 
     def check_and_reset_daily_quest(self, pet) -> None:
         """한국 시간 기준으로 날짜가 바뀌었다면 일일 퀘스트 카운터를 초기화합니다."""
@@ -2634,7 +2752,7 @@ class PetActionExecutionView(View):
 
         # 1. 대기 화면 출력
         await interaction.edit_original_response(
-            content=f"🔍 {battle_type} 상대를 찾는 중입니다... (최대 60초)", 
+            content=f"🔍 {battle_type} 상대를 찾는 중입니다... (최대 {PVP_MATCH_CONFIG['timeout']}초)", 
             embed=None, 
             view=MatchingCancelView(cancel_callback)
         )
@@ -2642,11 +2760,13 @@ class PetActionExecutionView(View):
         try:
             # 2. 대기열에서 매칭 찾기
             match_task = asyncio.create_task(self.cog.find_matching_user(self.guild_id, self.user_id))
+            cancel_task = asyncio.create_task(cancel_event.wait())
             done, pending = await asyncio.wait(
-                [match_task, asyncio.create_task(cancel_event.wait())],
-                timeout=60.0,
+                [match_task, cancel_task],
+                timeout=PVP_MATCH_CONFIG["timeout"] + 5,
                 return_when=asyncio.FIRST_COMPLETED
             )
+            cancel_task.cancel()
             
             if cancel_event.is_set():
                 match_task.cancel()
@@ -2690,4 +2810,56 @@ class PetActionExecutionView(View):
             )
 
 async def setup(bot):
-    await bot.add_cog(PetManager(bot))
\ No newline at end of file
+    await bot.add_cog(PetManager(bot))
+
+# ==================== 벤치마크 ====================
+if __name__ == "__main__":
+    # python pet_manager.py [펫 수]  →  pet_data 직렬화와 user_pets 저장/조회 처리량 비교 (임시 디렉터리에서 실행)
+    import sys
+    import tempfile
+    import timeit
+
+    os.chdir(tempfile.mkdtemp(prefix="pet_codec_bench_"))
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    guild_id = "1234"
+    pets = []
+    for i in range(count):
+        pet = Pet(f"펫{i}", f"주인{i}", random.choice(["노말", "불", "물", "풀"]))
+        pet.stage = random.choice(["알", "새끼", "유년기", "성체"])
+        pet.level = random.randint(1, 50)
+        pet.fullness = random.uniform(0, 100)
+        pet.skills = ["몸통박치기", "할퀴기"][:random.randint(0, 2)]
+        pets.append(pet)
+
+    def legacy_encode(pet: Pet) -> str:
+        # 이전 구현: __dict__ 전체를 그대로 저장
+        return json.dumps({field: getattr(pet, field) for field in Pet.FIELDS}, ensure_ascii=False)
+
+    def legacy_decode(raw: str) -> Pet:
+        # 이전 구현: 기본 펫 생성(IV 추첨 포함) 후 전체 덮어쓰기
+        data = json.loads(raw)
+        pet = Pet(data.get('name', '이름없음'), data.get('main_type', '노말'))
+        for key, value in data.items():
+            setattr(pet, key, value)
+        return pet
+
+    legacy_blobs = [legacy_encode(p) for p in pets]
+    blobs = [p.encode() for p in pets]
+    print(f"📦 평균 크기: 이전 {sum(map(len, legacy_blobs)) / count:,.0f}자 → 현재 {sum(map(len, blobs)) / count:,.0f}자")
+
+    for name, func in (
+        ("이전 저장 (__dict__)", lambda: [legacy_encode(p) for p in pets]),
+        ("현재 저장 (encode)", lambda: [p.encode() for p in pets]),
+        ("이전 조회 (__init__ + 덮어쓰기)", lambda: [legacy_decode(b) for b in legacy_blobs]),
+        ("현재 조회 (decode)", lambda: [Pet.decode(b) for b in blobs]),
+    ):
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print(f"⏱️ {name}: {count / elapsed:,.0f}마리/초")
+
+    cog = PetManager(bot=None)
+    for name, func in (
+        ("save_user_pet", lambda: [cog.save_user_pet(guild_id, str(i), p) for i, p in enumerate(pets)]),
+        ("get_user_pet", lambda: [cog.get_user_pet(guild_id, str(i)) for i in range(count)]),
+    ):
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print(f"⏱️ {name}: {count / elapsed:,.0f}마리/초")
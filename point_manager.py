@@ -9,13 +9,15 @@ import json
 import os
 from datetime import datetime, timedelta, timezone
 import traceback
+import ledger
+from point_service import point_service
 
 # --- 시간대 설정 ---
 KST = timezone(timedelta(hours=9), 'KST')
 
 # 안전한 데이터베이스 매니저 import
 try:
-    from database_manager import DatabaseManager, get_guild_db_manager
+    from database_manager import DatabaseManager, get_guild_db_manager, get_registry_stats
     DATABASE_AVAILABLE = True
     print("✅ DatabaseManager를 성공적으로 불러왔습니다.")
 except ImportError as e:
@@ -46,6 +48,9 @@ except ImportError as e:
             print(f"[MOCK] 사용자 조회: {user_id} -> {user}")
             return user
         
+        def is_registered(self, user_id):
+            return str(user_id) in self.users
+        
         def get_user_cash(self, user_id):
             cash = self.users.get(user_id, {}).get('cash', 0)
             print(f"[MOCK] 현금 조회: {user_id} -> {cash}원")
@@ -171,6 +176,8 @@ class LeaveConfirmView(discord.ui.View):
 
             # 2. 데이터베이스 사용자 삭제 실행
             self.db.delete_user(self.user_id)
+            from xp_leaderboard import xp_accumulator
+            xp_accumulator.discard(str(interaction.guild.id), self.user_id)
             
             # 3. 결과 알림
             role_msg = f" 및 {removed_roles_count}개의 역할이 회수" if removed_roles_count > 0 else ""
@@ -202,11 +209,7 @@ class PointManager(commands.Cog):
         self.daily_gift_counts: Dict[str, Dict[str, Union[str, int]]] = {}
         
         # DatabaseManager 확인
-        self.DATABASE_AVAILABLE = True
-        try:
-            _ = DatabaseManager(guild_id="temp_check") 
-        except Exception:
-            self.DATABASE_AVAILABLE = False
+        self.DATABASE_AVAILABLE = DATABASE_AVAILABLE
         
         print(f"📊 데이터베이스 상태: {'실제 DB' if self.DATABASE_AVAILABLE else 'Mock DB'}")
         print("✅ 통합 포인트 관리 시스템 + 고급 선물 시스템 초기화 완료")
@@ -220,7 +223,7 @@ class PointManager(commands.Cog):
         if guild_id_str not in self.db_managers:
             if self.DATABASE_AVAILABLE:
                 try:
-                    self.db_managers[guild_id_str] = DatabaseManager(guild_id=guild_id_str)
+                    self.db_managers[guild_id_str] = get_guild_db_manager(guild_id_str)
                     print(f"✅ 길드 {guild_id_str}에 대한 DatabaseManager 인스턴스 생성 완료.")
                 except Exception as e:
                     print(f"❌ 길드 {guild_id_str}에 대한 DatabaseManager 인스턴스 생성 실패: {e}")
@@ -295,7 +298,7 @@ class PointManager(commands.Cog):
         try:
             db = self._get_db(interaction.guild_id)
             # 기존 사용자 체크
-            existing_user = db.get_user(user_id)
+            existing_user = db.is_registered(user_id)
             print(f"🔍 기존 사용자 확인: {existing_user}")
             
             if existing_user:
@@ -505,12 +508,12 @@ class PointManager(commands.Cog):
         
         db = self._get_db(interaction.guild_id)
         # 보내는 사람 등록 확인
-        if not db.get_user(sender_id):
+        if not db.is_registered(sender_id):
             await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요.", ephemeral=True)
             return
         
         # 받는 사람 등록 확인 (자동 등록)
-        if not db.get_user(receiver_id):
+        if not db.is_registered(receiver_id):
             success = db.create_user(receiver_id, 받는사람.name, 받는사람.display_name, initial_cash=10000)
             if not success:
                 await interaction.response.send_message("❌ 받는 사람의 계정 생성에 실패했습니다.", ephemeral=True)
@@ -553,22 +556,24 @@ class PointManager(commands.Cog):
         
         # 선물 실행
         try:
-            # 원자적 차감 실행 (조건: cash >= total_cost)
-            affected = db.execute_query(
-                "UPDATE users SET cash = cash - ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ? AND guild_id = ? AND cash >= ?",
-                (total_cost, sender_id, str(interaction.guild_id), total_cost),
-                'rowcount'
-            )
-            
-            if not affected or affected == 0:
+            # 차감/입금/거래 내역 2건을 한 트랜잭션으로 처리 (조건: cash >= total_cost)
+            try:
+                if self.DATABASE_AVAILABLE:
+                    ledger.transfer(
+                        db, sender_id, receiver_id, 금액, fee=fee,
+                        send_type="선물 보내기", receive_type="선물 받기",
+                        send_description=f"{받는사람.display_name}에게 선물 (수수료 포함)",
+                        receive_description=f"{interaction.user.display_name}님으로부터 선물"
+                    )
+                else:
+                    # Mock DB는 메모리 딕셔너리이므로 순서대로 반영
+                    db.add_user_cash(sender_id, -total_cost)
+                    db.add_user_cash(receiver_id, 금액)
+            except ledger.LedgerError:
                 await interaction.response.send_message("❌ 잔액이 부족하거나 일시적인 오류가 발생했습니다. (마이너스 복사 방어됨)", ephemeral=True)
                 return
-                
-            db.add_user_cash(receiver_id, 금액)
-            
-            # 거래 내역 기록
-            db.add_transaction(sender_id, "선물 보내기", -total_cost, f"{받는사람.display_name}에게 선물 (수수료 포함)")
-            db.add_transaction(receiver_id, "선물 받기", 금액, f"{interaction.user.display_name}님으로부터 선물")
+            point_service.invalidate(guild_id_str, sender_id)
+            point_service.invalidate(guild_id_str, receiver_id)
             
             # 쿨다운 및 일일 카운트 설정
             self._set_cooldown(guild_id_str, sender_id)
@@ -656,6 +661,18 @@ class PointManager(commands.Cog):
                 value="실제 데이터베이스에 연결되어 있습니다.\n모든 데이터가 영구 저장됩니다.",
                 inline=False
             )
+            registry_stats = get_registry_stats()
+            embed.add_field(
+                name="🗂️ 매니저 레지스트리",
+                value=f"로드된 길드: {registry_stats['managers']}개\n열린 연결: {registry_stats['connections']}개",
+                inline=True
+            )
+            embed.add_field(
+                name="👥 등록 사용자 인덱스",
+                value=f"인덱스 크기: {registry_stats['registered_users']}명\n"
+                      f"조회 {registry_stats['registration_lookups']:,}회 (적중률 {registry_stats['registration_hit_rate'] * 100:.1f}%)",
+                inline=True
+            )
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -773,9 +790,11 @@ class PointManager(commands.Cog):
         guild_id = str(member.guild.id)
         db = self._get_db(guild_id)
 
-        if db.get_user(user_id):
+        if db.is_registered(user_id):
             try:
                 db.delete_user(user_id)
+                from xp_leaderboard import xp_accumulator
+                xp_accumulator.discard(guild_id, user_id)
                 print(f"✅ 회원 탈퇴 처리: {member.display_name} (ID: {user_id}) (Guild: {guild_id})")
             except Exception as e:
                 print(f"❌ 자동 탈퇴 처리 중 오류: {member.display_name} - {e} (Guild: {guild_id})")
@@ -801,7 +820,7 @@ class PointManager(commands.Cog):
         user_id = str(대상자.id)
         
         # 등록 여부 확인
-        if not db.get_user(user_id):
+        if not db.is_registered(user_id):
             return await interaction.response.send_message(f"❌ {대상자.display_name}님은 등록되지 않은 사용자입니다.", ephemeral=True)
 
         try:
@@ -809,6 +828,7 @@ class PointManager(commands.Cog):
                 # 현금 지급 로직
                 db.add_user_cash(user_id, 금액)
                 db.add_transaction(user_id, "관리자 지급", 금액, f"{interaction.user.display_name}이 지급")
+                point_service.invalidate(interaction.guild.id, user_id)
                 
                 embed = discord.Embed(
                     title="💰 현금 지급 완료",
@@ -820,6 +840,7 @@ class PointManager(commands.Cog):
                 # 현금 차감 로직
                 db.add_user_cash(user_id, -금액)
                 db.add_transaction(user_id, "관리자 차감", -금액, f"{interaction.user.display_name}이 차감")
+                point_service.invalidate(interaction.guild.id, user_id)
                 
                 embed = discord.Embed(
                     title="💸 현금 차감 완료",
@@ -932,51 +953,29 @@ async def save_points(bot, guild_id: int, points_data):
                     db.update_user_cash(user_id, cash)
                 except Exception as e:
                     print(f"save_points 오류 (사용자 {user_id}): {e}")
+            point_service.invalidate(guild_id)
         else:
             print("PointManager cog not found for save_points.")
     except Exception as e:
         print(f"save_points 전역 오류: {e}")
 
 async def add_point(bot, guild_id, user_id, amount):
-    """
-    Cog 인스턴스가 있다면 그것을 사용하고, 없다면 직접 DB에 연결합니다.
-    """
-    cog = bot.get_cog("PointManager")
-    if cog:
-        db = cog._get_db(guild_id)
-        new_cash = db.add_user_cash(str(user_id), int(amount))
-        db.add_transaction(str(user_id), "게임 결과", int(amount))
-        return True
-    
-    # Cog를 찾을 수 없을 때의 Fallback
-    try:
-        from database_manager import DatabaseManager
-        db = DatabaseManager(guild_id=str(guild_id))
-        db.add_user_cash(str(user_id), int(amount))
-        return True
-    except:
-        return False
+    """기존 시스템 호환 - 포인트 증감 (게임 공용 point_service로 위임)"""
+    balance = await point_service.credit(guild_id, user_id, int(amount), "게임 결과")
+    return balance is not None
 
 async def get_point(bot, guild_id, user_id):
-    """직접 DB에서 포인트 조회"""
+    """기존 시스템 호환 - 사용 가능 잔액 조회 (진행 중인 배팅 홀드 제외)"""
     try:
-        from database_manager import DatabaseManager
-        db = DatabaseManager(guild_id=str(guild_id))
-        user_data = db.get_user(str(user_id))
-        return user_data['cash'] if user_data else 0
-    except:
+        return await point_service.get_balance(guild_id, user_id)
+    except Exception as e:
+        print(f"get_point 오류 (사용자 {user_id}): {e}")
         return 0
 
 async def is_registered(bot, guild_id: int, user_id):
     """기존 시스템 호환 - 등록 여부 확인"""
     try:
-        point_manager_cog = bot.get_cog("PointManager")
-        if point_manager_cog:
-            db = point_manager_cog._get_db(guild_id)
-            return db.get_user(str(user_id)) is not None
-        else:
-            print("PointManager cog not found for is_registered.")
-            return False
+        return point_service.is_registered(guild_id, user_id)
     except Exception as e:
         print(f"is_registered 오류 (사용자 {user_id}): {e}")
         return False
@@ -1006,6 +1005,7 @@ async def set_point(bot, guild_id: int, user_id, amount):
         if point_manager_cog:
             db = point_manager_cog._get_db(guild_id)
             db.update_user_cash(str(user_id), amount)
+            point_service.invalidate(guild_id, user_id)
             return True
         else:
             print("PointManager cog not found for set_point.")
@@ -0,0 +1,238 @@
+# point_service.py - [시스템] 게임 공용 포인트 서비스 (배팅 홀드 / 정산 / 환불)
+"""
+게임 모듈(블랙잭, 주사위, 홀짝, 슬롯머신, 경마, 야바위 ...)이 함께 쓰는 비동기 포인트 서비스입니다.
+
+한 판의 흐름:
+    hold = await point_service.reserve_bet(guild_id, user_id, 배팅, "슬롯머신")   # 배팅금 출금 1회 (조건부 UPDATE)
+    if not hold: ... 잔액 부족
+    ...
+    balance = await point_service.settle(hold, 지급액)      # 지급액만 입금 (패배 시 DB 쓰기 없음)
+    # 또는 취소 시
+    await point_service.refund(hold)                         # 배팅금 반환
+
+- 배팅금은 홀드 시점에 원장에서 빠지므로, 게임 도중 선물/송금/관리자 차감 등 다른 경로가 같은 돈을 쓸 수 없습니다.
+- 잔액은 길드/유저별로 짧게 캐시합니다. (게임 외 경로의 변경은 BALANCE_TTL 안에 반영)
+- 정산은 ledger를 통해 users.cash 변경과 point_history 기록을 한 트랜잭션으로 처리합니다.
+- 멀티플레이 게임은 settle_round()로 참가자 전원의 정산을 한 트랜잭션에 기록합니다.
+- database_manager를 불러올 수 없는 환경에서는 메모리 잔액으로 동작합니다. (재시작 시 초기화)
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import ledger
+
+try:
+    from database_manager import get_guild_db_manager
+    DATABASE_AVAILABLE = True
+except ImportError:
+    DATABASE_AVAILABLE = False
+
+logger = logging.getLogger("point_service")
+
+BALANCE_TTL = 5.0          # 잔액 캐시 유효 시간(초) - 게임 외 경로(선물, 낚시 등)의 변경은 이 시간 안에 반영
+HOLD_TTL = 15 * 60         # 정산/환불되지 않은 홀드의 최대 수명(초) - 뷰가 유실되면 배팅금을 돌려줌
+MOCK_INITIAL_CASH = 10000  # 메모리 모드 기본 잔액
+GAME_TRANSACTION_TYPE = "게임 결과"
+BET_TRANSACTION_TYPE = "게임 배팅"
+REFUND_TRANSACTION_TYPE = "배팅 환불"
+
+_hold_ids = itertools.count(1)
+
+@dataclass
+class BetHold:
+    """진행 중인 한 판의 배팅 (배팅금은 이미 출금됨, 정산/환불 전까지 메모리에서 추적)"""
+    guild_id: str
+    user_id: str
+    amount: int
+    game: str
+    hold_id: int = field(default_factory=lambda: next(_hold_ids))
+    created_at: float = field(default_factory=time.monotonic)
+    closed: bool = False
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.guild_id, self.user_id)
+
+class PointService:
+    def __init__(self):
+        self._balances: Dict[Tuple[str, str], Tuple[int, float]] = {}   # {(guild_id, user_id): (cash, fetched_at)}
+        self._holds: Dict[Tuple[str, str], Dict[int, BetHold]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._mock_cash: Dict[Tuple[str, str], int] = {}
+
+    # ==================== 내부 ====================
+    def _lock(self, key: Tuple[str, str]) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def _expire(self, key: Tuple[str, str]):
+        """정산/환불되지 않은 채 HOLD_TTL이 지난 홀드의 배팅금을 돌려줍니다."""
+        holds = self._holds.get(key)
+        if not holds:
+            return
+        now = time.monotonic()
+        for hold in [h for h in holds.values() if now - h.created_at > HOLD_TTL]:
+            logger.warning(f"⚠️ 만료된 배팅 홀드 환불: {hold.game} {hold.user_id} ({hold.amount:,}원)")
+            await self.refund(hold)
+
+    def _release(self, hold: BetHold):
+        hold.closed = True
+        holds = self._holds.get(hold.key)
+        if holds is not None:
+            holds.pop(hold.hold_id, None)
+            if not holds:
+                del self._holds[hold.key]
+
+    async def _cash(self, key: Tuple[str, str], refresh: bool = False) -> Optional[int]:
+        """캐시된 잔액 (없거나 오래되었으면 DB에서 다시 읽음). 미등록이면 None"""
+        cached = self._balances.get(key)
+        if cached and not refresh and time.monotonic() - cached[1] < BALANCE_TTL:
+            return cached[0]
+
+        guild_id, user_id = key
+        if DATABASE_AVAILABLE:
+            db = get_guild_db_manager(guild_id)
+            row = await db.fetch_one("SELECT cash FROM users WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+            cash = row['cash'] if row else None
+        else:
+            cash = self._mock_cash.setdefault(key, MOCK_INITIAL_CASH)
+
+        if cash is None:
+            self._balances.pop(key, None)
+        else:
+            self._balances[key] = (cash, time.monotonic())
+        return cash
+
+    async def _apply(self, guild_id: str, entries: List[ledger.LedgerEntry]) -> Dict[str, int]:
+        """원장 기록 (길드 워커 스레드에서 한 트랜잭션) 후 캐시 갱신"""
+        entries = [e for e in entries if e.amount]
+        if not entries:
+            return {}
+        if DATABASE_AVAILABLE:
+            db = get_guild_db_manager(guild_id)
+            balances = await db.run_in_executor(ledger.batch_apply, db, entries)
+        else:
+            balances = {}
+            mock = dict(self._mock_cash)
+            for e in entries:
+                key = (guild_id, str(e.user_id))
+                mock[key] = mock.get(key, MOCK_INITIAL_CASH) + e.amount
+                if mock[key] < 0 and e.amount < 0 and not e.allow_negative:
+                    raise ledger.InsufficientFunds(str(e.user_id), -e.amount, mock[key] - e.amount)
+                balances[str(e.user_id)] = mock[key]
+            self._mock_cash = mock
+        now = time.monotonic()
+        for user_id, cash in balances.items():
+            self._balances[(guild_id, user_id)] = (cash, now)
+        return balances
+
+    # ==================== 조회 ====================
+    def is_registered(self, guild_id, user_id) -> bool:
+        if not DATABASE_AVAILABLE:
+            return True
+        return get_guild_db_manager(str(guild_id)).is_registered(str(user_id))
+
+    async def get_balance(self, guild_id, user_id) -> int:
+        """사용 가능 잔액 (진행 중인 배팅금은 이미 빠져 있음, 미등록이면 0)"""
+        key = (str(guild_id), str(user_id))
+        await self._expire(key)
+        cash = await self._cash(key)
+        return max(0, cash or 0)
+
+    # ==================== 배팅 ====================
+    async def reserve_bet(self, guild_id, user_id, amount: int, game: str) -> Optional[BetHold]:
+        """
+        ✅ 배팅 금액을 원장에서 출금하고 홀드로 추적합니다. (조건부 UPDATE 1회)
+        미등록이거나 잔액이 부족하면 None을 반환합니다.
+        """
+        key = (str(guild_id), str(user_id))
+        async with self._lock(key):
+            await self._expire(key)
+            try:
+                await self._apply(key[0], [ledger.LedgerEntry(key[1], -int(amount), BET_TRANSACTION_TYPE, game)])
+            except ledger.LedgerError:
+                self._balances.pop(key, None)
+                return None
+            hold = BetHold(key[0], key[1], int(amount), game)
+            self._holds.setdefault(key, {})[hold.hold_id] = hold
+            return hold
+
+    async def refund(self, hold: Optional[BetHold]):
+        """배팅 취소: 홀드를 해제하고 배팅금을 돌려줍니다."""
+        if not hold or hold.closed:
+            return
+        self._release(hold)
+        try:
+            await self._apply(hold.guild_id, [ledger.LedgerEntry(hold.user_id, hold.amount, REFUND_TRANSACTION_TYPE, hold.game)])
+        except ledger.LedgerError as e:
+            logger.warning(f"⚠️ 배팅금 환불 실패: {e}")
+
+    async def settle(self, hold: Optional[BetHold], payout: int, description: str = "") -> Optional[int]:
+        """
+        ✅ 한 판을 정산합니다. payout은 배팅금을 포함한 총 지급액(패배 시 0)이며,
+        배팅금은 홀드 시점에 이미 출금되었으므로 payout만 입금하고 정산 후 잔액을 반환합니다.
+        """
+        if not hold or hold.closed:
+            return None
+        balances = await self.settle_round([(hold, payout)], description)
+        return balances.get(hold.user_id)
+
+    async def settle_round(self, results: Iterable[Tuple[BetHold, int]], description: str = "") -> Dict[str, int]:
+        """
+        ✅ 여러 참가자의 정산을 한 트랜잭션으로 기록합니다. {user_id: 정산 후 잔액}
+        지급액은 0 이상이므로 입금만 일어나며, 패배한 참가자는 DB에 쓰지 않습니다.
+        """
+        results = [(h, max(0, int(p))) for h, p in results if h and not h.closed]
+        if not results:
+            return {}
+        guild_id = results[0][0].guild_id
+        for hold, _ in results:
+            self._release(hold)
+
+        entries = [
+            ledger.LedgerEntry(h.user_id, payout, GAME_TRANSACTION_TYPE, description or h.game)
+            for h, payout in results
+        ]
+        balances = await self._apply(guild_id, entries)
+
+        for hold, _ in results:
+            if hold.user_id not in balances:
+                balances[hold.user_id] = await self._cash(hold.key)
+        return balances
+
+    async def credit(self, guild_id, user_id, amount: int, game: str, description: str = "") -> Optional[int]:
+        """배팅과 무관한 지급/차감을 한 번에 기록합니다. (음수면 차감, 잔액 부족 시 None)"""
+        try:
+            balances = await self._apply(str(guild_id), [
+                ledger.LedgerEntry(str(user_id), int(amount), GAME_TRANSACTION_TYPE, description or game)
+            ])
+        except ledger.LedgerError as e:
+            logger.warning(f"⚠️ 포인트 처리 실패: {e}")
+            return None
+        return balances.get(str(user_id))
+
+    def invalidate(self, guild_id, user_id=None):
+        """관리자 지급/차감 등 외부 변경 후 캐시를 버립니다."""
+        gid = str(guild_id)
+        if user_id is not None:
+            self._balances.pop((gid, str(user_id)), None)
+            return
+        for key in [k for k in self._balances if k[0] == gid]:
+            self._balances.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "cached_balances": len(self._balances),
+            "open_holds": sum(len(h) for h in self._holds.values()),
+            "held_amount": sum(h.amount for holds in self._holds.values() for h in holds.values()),
+        }
+
+# 게임 모듈이 공유하는 단일 인스턴스
+point_service = PointService()
@@ -25,10 +25,10 @@ PUSH_RETENTION = 0.8        # 무승부 시 수수료 (20%)
 WINNER_RETENTION = 0.8      # 승리 시 수수료 (20%)
 RPS_EMOJIS = {"가위": "✌️", "바위": "✊", "보": "✋"}
 
-def record_rps_game(user_id: str, username: str, bet: int, payout: int, is_win: bool):
+def record_rps_game(guild_id, user_id: str, username: str, bet: int, payout: int, is_win: bool, is_multi: bool = False):
     if STATS_AVAILABLE:
         try:
-            stats_manager.record_game(user_id, username, "rock_paper_scissors", bet, payout, is_win)
+            stats_manager.record_game(user_id, username, "rock_paper_scissors", bet, payout, is_win, guild_id=guild_id, is_multi=is_multi)
         except: pass
 
 # --- [상호작용 1단계] 초기 모드 선택창 ---
@@ -92,7 +92,7 @@ class SingleRPSView(View):
             result = "패배"
             payout = 0
         
-        record_rps_game(str(self.user.id), self.user.display_name, self.bet, payout, result == "승리")
+        record_rps_game(interaction.guild_id, str(self.user.id), self.user.display_name, self.bet, payout, result == "승리")
 
         embed = discord.Embed(title="🎮 가위바위보 결과", color=discord.Color.gold() if result == "승리" else discord.Color.red())
         embed.description = f"**{self.user.display_name}**: {RPS_EMOJIS[user_choice]}\n**봇**: {RPS_EMOJIS[bot_choice]}\n\n**결과: {result}!**\n"
@@ -261,8 +261,8 @@ class MultiRPSView(View):
             if POINT_MANAGER_AVAILABLE:
                 await point_manager.add_point(self.bot, guild_id, str(winner.id), reward)
             msg = f"💰 승자에게 **{reward:,}원**이 지급되었습니다.\n*20%의 딜러비가 차감된 후 지급됩니다."
-            record_rps_game(str(self.p1.id), self.p1.display_name, self.bet, reward if winner == self.p1 else 0, winner == self.p1)
-            record_rps_game(str(self.p2.id), self.p2.display_name, self.bet, reward if winner == self.p2 else 0, winner == self.p2)
+            record_rps_game(guild_id, str(self.p1.id), self.p1.display_name, self.bet, reward if winner == self.p1 else 0, winner == self.p1, is_multi=True)
+            record_rps_game(guild_id, str(self.p2.id), self.p2.display_name, self.bet, reward if winner == self.p2 else 0, winner == self.p2, is_multi=True)
         else:
             refund = int(self.bet * PUSH_RETENTION)
             if POINT_MANAGER_AVAILABLE:
@@ -0,0 +1,825 @@
+# schema_migrations.py - [시스템] 버전 기반 스키마 마이그레이션
+"""
+길드 DB(data/guilds/<id>.db)의 스키마를 모듈별 버전으로 관리합니다.
+
+- 각 모듈(database_manager, fishing, pet_manager ...)은 순서가 있는 마이그레이션 목록을 가집니다.
+- 적용된 버전은 schema_version 테이블에 기록되며, 이미 적용된 마이그레이션은 다시 실행되지 않습니다.
+- 한 프로세스 안에서는 (DB 경로, 모듈) 단위로 한 번만 확인하므로 명령어 처리 경로에는 비용이 없습니다.
+
+운영자용 점검:
+    python schema_migrations.py                 # data/guilds/*.db 의 대기 중인 마이그레이션 보고 (dry-run)
+    python schema_migrations.py --apply         # 대기 중인 마이그레이션 실제 적용
+    python schema_migrations.py path/to/1.db    # 특정 DB 파일만 대상
+"""
+from __future__ import annotations
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Set, Tuple
+
+logger = logging.getLogger("schema_migrations")
+
+@dataclass(frozen=True)
+class Migration:
+    module: str
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection, str], None]  # (conn, guild_id)
+
+# 모듈명 -> 버전 순으로 정렬된 마이그레이션 목록
+MIGRATIONS: Dict[str, List[Migration]] = {}
+
+# 이 프로세스에서 이미 최신으로 확인된 (db_path, module)
+_verified: Set[Tuple[str, str]] = set()
+_lock = threading.Lock()
+
+def migration(module: str, version: int, description: str):
+    """마이그레이션 등록 데코레이터 (버전은 모듈 안에서 1부터 연속 증가해야 합니다)"""
+    def decorator(func: Callable[[sqlite3.Connection, str], None]):
+        migrations = MIGRATIONS.setdefault(module, [])
+        expected = len(migrations) + 1
+        if version != expected:
+            raise ValueError(f"{module} 마이그레이션 버전 오류: {version} (기대값 {expected})")
+        migrations.append(Migration(module, version, description, func))
+        return func
+    return decorator
+
+# ==================== 엔진 ====================
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            module TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+def get_current_version(conn: sqlite3.Connection, module: str) -> int:
+    """모듈의 현재 적용 버전 (기록이 없으면 0)"""
+    has_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'").fetchone()
+    if not has_table:
+        return 0
+    row = conn.execute("SELECT version FROM schema_version WHERE module = ?", (module,)).fetchone()
+    return row[0] if row else 0
+
+def get_pending(conn: sqlite3.Connection, module: str) -> List[Migration]:
+    """아직 적용되지 않은 마이그레이션 목록"""
+    current = get_current_version(conn, module)
+    return [m for m in MIGRATIONS.get(module, []) if m.version > current]
+
+def apply_migrations(conn: sqlite3.Connection, db_path: str, module: str, guild_id: str = "", dry_run: bool = False) -> List[Migration]:
+    """
+    ✅ 모듈의 대기 중인 마이그레이션을 순서대로 적용합니다.
+    마이그레이션 하나가 트랜잭션 하나이며, 실패 시 해당 마이그레이션만 롤백하고 중단합니다.
+    dry_run이면 적용하지 않고 대기 목록만 반환합니다.
+    """
+    key = (db_path, module)
+    if not dry_run and key in _verified:
+        return []
+
+    with _lock:
+        if not dry_run and key in _verified:
+            return []
+
+        pending = get_pending(conn, module)
+        if dry_run:
+            return pending
+
+        _ensure_version_table(conn)
+        applied = []
+        for m in pending:
+            try:
+                conn.execute("BEGIN")
+                m.apply(conn, guild_id)
+                conn.execute(
+                    "INSERT INTO schema_version (module, version, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP) "
+                    "ON CONFLICT(module) DO UPDATE SET version = excluded.version, updated_at = CURRENT_TIMESTAMP",
+                    (module, m.version)
+                )
+                conn.commit()
+                applied.append(m)
+                logger.info(f"✅ [{module}] v{m.version} 적용 완료: {m.description} ({db_path})")
+            except Exception as e:
+                # SQL 오류뿐 아니라 데이터 변환 중 파이썬 예외도 이 마이그레이션만 롤백하고 기록하지 않음
+                conn.rollback()
+                logger.error(f"❌ [{module}] v{m.version} 마이그레이션 실패: {e} ({db_path})", exc_info=not isinstance(e, sqlite3.Error))
+                return applied
+
+        _verified.add(key)
+        return applied
+
+def migration_report(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """모든 모듈의 현재/최신 버전과 대기 중인 마이그레이션 설명을 반환합니다."""
+    report = {}
+    for module, migrations in MIGRATIONS.items():
+        pending = get_pending(conn, module)
+        report[module] = {
+            'current': get_current_version(conn, module),
+            'latest': migrations[-1].version if migrations else 0,
+            'pending': [f"v{m.version}: {m.description}" for m in pending],
+        }
+    return report
+
+# ==================== 공통 헬퍼 ====================
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+def _create_table(conn: sqlite3.Connection, table: str, schema: str):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({schema})")
+
+def _add_columns(conn: sqlite3.Connection, table: str, columns: List[Tuple[str, str]]):
+    """누락된 컬럼만 추가합니다. (기존 DB가 버전 기록 없이 일부 컬럼을 이미 가진 경우 대비)"""
+    existing = _columns(conn, table)
+    for name, decl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+# ==================== database_manager ====================
+CORE_TABLES = [
+    ("users", """
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        username TEXT DEFAULT '',
+        display_name TEXT DEFAULT '',
+        cash INTEGER DEFAULT 0,
+        bank INTEGER DEFAULT 0,
+        fishing_reputation INTEGER DEFAULT 0,
+        max_fish_length REAL DEFAULT 0.0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, guild_id)
+    """),
+    ("settings", """
+        key TEXT PRIMARY KEY,
+        value TEXT
+    """),
+    ("attendance", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        attendance_date DATE NOT NULL,
+        streak_count INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, attendance_date)
+    """),
+    ("enhancement", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        level INTEGER DEFAULT 0,
+        success_count INTEGER DEFAULT 0,
+        fail_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id)
+    """),
+    ("point_history", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        transaction_type TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        balance_after INTEGER NOT NULL,
+        description TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("user_xp", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        xp INTEGER DEFAULT 0,
+        level INTEGER DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, guild_id)
+    """),
+    ("leaderboard_settings", """
+        guild_id TEXT NOT NULL PRIMARY KEY,
+        attendance_cash INTEGER DEFAULT 3000,
+        attendance_xp INTEGER DEFAULT 100,
+        streak_cash_per_day INTEGER DEFAULT 100,
+        streak_xp_per_day INTEGER DEFAULT 10,
+        max_streak_bonus_days INTEGER DEFAULT 30,
+        weekly_cash_bonus INTEGER DEFAULT 1000,
+        weekly_xp_bonus INTEGER DEFAULT 500,
+        monthly_cash_bonus INTEGER DEFAULT 10000,
+        monthly_xp_bonus INTEGER DEFAULT 5000,
+        gift_fee_rate REAL DEFAULT 0.1,
+        auto_update_level_channel TEXT,
+        auto_update_cash_channel TEXT,
+        last_leaderboard_update TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("voice_time", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        total_time INTEGER DEFAULT 0,
+        last_join TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id)
+    """),
+    ("voice_time_log", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        join_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        leave_time TIMESTAMP,
+        duration_minutes INTEGER DEFAULT 0,
+        is_speaking INTEGER DEFAULT 0
+    """),
+    ("levelup_channels", """
+        channel_id TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("log_settings", """
+        guild_id TEXT NOT NULL PRIMARY KEY,
+        channel_id TEXT NOT NULL,
+        enabled INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("exit_logs", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        username TEXT,
+        display_name TEXT,
+        joined_at TEXT,
+        left_at TEXT NOT NULL,
+        server_time TEXT,
+        avatar_url TEXT,
+        is_bot INTEGER DEFAULT 0,
+        roles TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("server_settings", """
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("anonymous_messages", """
+        msg_id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        user_name TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("channel_configs", """
+        channel_id TEXT NOT NULL,
+        feature_type TEXT NOT NULL,
+        PRIMARY KEY (channel_id, feature_type)
+    """),
+    ("fishing_ground", """
+        channel_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        channel_name TEXT DEFAULT '',
+        owner_id TEXT,
+        ground_type TEXT DEFAULT '호수',
+        ground_price INTEGER DEFAULT 100000,
+        entry_fee INTEGER DEFAULT 0,
+        usage_time_limit INTEGER DEFAULT 1,
+        is_public INTEGER DEFAULT 1,
+        pollution INTEGER DEFAULT 0,
+        ground_reputation INTEGER DEFAULT 0,
+        tier INTEGER DEFAULT 1,
+        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (channel_id, guild_id)
+    """),
+    ("fishing_inventory", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        fish_name TEXT NOT NULL,
+        length REAL NOT NULL,
+        price_per_cm INTEGER DEFAULT 100,
+        caught_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+    ("fishing_gear", """
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        rod_level INTEGER DEFAULT 0,
+        rod_durability INTEGER DEFAULT 100,
+        bait_level INTEGER DEFAULT 0,
+        bait_count INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, guild_id)
+    """),
+    ("fishing_facilities", """
+        channel_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        facility_name TEXT NOT NULL,
+        PRIMARY KEY (channel_id, guild_id, facility_name)
+    """),
+    ("sticky_memos", """
+        channel_id TEXT NOT NULL,
+        title TEXT,
+        content TEXT,
+        use_embed INTEGER,
+        last_msg_id TEXT,
+        PRIMARY KEY (channel_id)
+    """),
+]
+
+@migration("database_manager", 1, "핵심 테이블 생성")
+def _core_tables(conn, guild_id):
+    for table, schema in CORE_TABLES:
+        _create_table(conn, table, schema)
+
+@migration("database_manager", 2, "users/user_xp 레거시 컬럼 보정")
+def _core_legacy_columns(conn, guild_id):
+    _add_columns(conn, "users", [
+        ("display_name", "TEXT DEFAULT ''"),
+        ("cash", "INTEGER DEFAULT 0"),
+        ("bank", "INTEGER DEFAULT 0"),
+        ("fishing_reputation", "INTEGER DEFAULT 0"),
+        ("max_fish_length", "REAL DEFAULT 0.0"),
+        ("pet_rank_score", "INTEGER DEFAULT 1000"),
+    ])
+    if 'guild_id' not in _columns(conn, "user_xp"):
+        conn.execute("ALTER TABLE user_xp ADD COLUMN guild_id TEXT")
+        conn.execute("UPDATE user_xp SET guild_id = ? WHERE guild_id IS NULL", (guild_id,))
+        try:
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_user_xp_unique ON user_xp (user_id, guild_id)")
+        except sqlite3.IntegrityError:
+            logger.warning("⚠️ user_xp 테이블에 기존 중복 데이터가 있어 UNIQUE 제약 조건 추가를 건너뜁니다.")
+
+@migration("database_manager", 3, "보이스 일별 집계 테이블 및 조회 인덱스")
+def _voice_rollup_tables(conn, guild_id):
+    # 일별 사용자 집계 (day는 KST 기준 'YYYY-MM-DD')
+    _create_table(conn, "voice_daily", """
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        minutes INTEGER DEFAULT 0,
+        sessions INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_voice_daily_day ON voice_daily (day)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_voice_time_log_user_join ON voice_time_log (user_id, join_time)")
+
+VOICE_KST = timezone(timedelta(hours=9))
+VOICE_SESSION_GAP_SECONDS = 150  # 1분 단위 로그 사이 간격이 이보다 크면 별도 세션으로 간주
+
+def voice_day(timestamp: str) -> str:
+    """UTC 'YYYY-MM-DD HH:MM:SS' 문자열을 KST 날짜로 변환"""
+    try:
+        return datetime.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).astimezone(VOICE_KST).date().isoformat()
+    except (TypeError, ValueError):
+        return str(timestamp)[:10]
+
+@migration("database_manager", 4, "1분 단위 voice_time_log를 세션 단위로 압축하고 일별 집계 백필")
+def _voice_log_compaction(conn, guild_id):
+    daily: Dict[Tuple[str, str], List[int]] = {}  # (user_id, day) -> [minutes, sessions]
+
+    # 1. 이미 세션 단위로 기록된 행은 그대로 두고 집계만 반영
+    for user_id, join_time, minutes in conn.execute(
+        "SELECT user_id, join_time, duration_minutes FROM voice_time_log WHERE NOT (duration_minutes = 1 AND join_time = leave_time)"
+    ):
+        entry = daily.setdefault((user_id, voice_day(join_time)), [0, 0])
+        entry[0] += minutes or 0
+        entry[1] += 1
+
+    # 2. 업데이트 루프가 남긴 1분 단위 행(join_time == leave_time)을 연속 구간별 세션으로 병합
+    sessions = []
+    current = None  # [user_id, join_time, leave_time, minutes, last_dt]
+    for user_id, join_time in conn.execute(
+        "SELECT user_id, join_time FROM voice_time_log WHERE duration_minutes = 1 AND join_time = leave_time ORDER BY user_id, join_time"
+    ):
+        try:
+            dt = datetime.strptime(join_time[:19], "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            dt = None
+        day_entry = daily.setdefault((user_id, voice_day(join_time)), [0, 0])
+        day_entry[0] += 1
+
+        if (current and current[0] == user_id and dt and current[4]
+                and (dt - current[4]).total_seconds() <= VOICE_SESSION_GAP_SECONDS):
+            current[2], current[3], current[4] = join_time, current[3] + 1, dt
+            continue
+        if current:
+            sessions.append(tuple(current[:4]))
+        # 세션 시작 시각 = 첫 1분 적립 시각 - 1분
+        start = (dt - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S") if dt else join_time
+        current = [user_id, start, join_time, 1, dt]
+        day_entry[1] += 1
+    if current:
+        sessions.append(tuple(current[:4]))
+
+    conn.execute("DELETE FROM voice_time_log WHERE duration_minutes = 1 AND join_time = leave_time")
+    conn.executemany(
+        "INSERT INTO voice_time_log (user_id, join_time, leave_time, duration_minutes, is_speaking) VALUES (?, ?, ?, ?, 1)",
+        sessions
+    )
+    conn.executemany(
+        "INSERT INTO voice_daily (user_id, day, minutes, sessions) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(user_id, day) DO UPDATE SET minutes = excluded.minutes, sessions = excluded.sessions",
+        [(user_id, day, m, n) for (user_id, day), (m, n) in daily.items()]
+    )
+    if sessions:
+        logger.info(f"🗜️ voice_time_log 압축: 세션 {len(sessions)}건으로 병합 (Guild: {guild_id})")
+
+@migration("database_manager", 5, "진행 중인 음성 세션 체크포인트 테이블")
+def _voice_session_checkpoint(conn, guild_id):
+    _create_table(conn, "voice_active_sessions", """
+        user_id TEXT PRIMARY KEY,
+        channel_name TEXT,
+        join_time REAL,
+        is_speaking INTEGER DEFAULT 0,
+        segment_start TEXT,
+        segment_minutes INTEGER DEFAULT 0,
+        segment_days TEXT,
+        updated_at REAL
+    """)
+
+# ==================== fishing ====================
+@migration("fishing", 1, "낚시 테이블 생성")
+def _fishing_tables(conn, guild_id):
+    _create_table(conn, "fishing_ground", "channel_id TEXT, guild_id TEXT, owner_id TEXT, channel_name TEXT, ground_type TEXT DEFAULT '호수', tier INTEGER DEFAULT 1, ground_reputation INTEGER DEFAULT 0, ground_price INTEGER DEFAULT 100000, purchasable INTEGER DEFAULT 1, is_public INTEGER DEFAULT 1, entry_fee INTEGER DEFAULT 0, usage_time_limit INTEGER DEFAULT 6, pollution INTEGER DEFAULT 0, last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY(channel_id, guild_id)")
+    _create_table(conn, "fishing_gear", "user_id TEXT, guild_id TEXT, rod_level INTEGER DEFAULT 0, rod_durability INTEGER DEFAULT 100, bait_level INTEGER DEFAULT 0, bait_count INTEGER DEFAULT 0, PRIMARY KEY(user_id, guild_id)")
+    _create_table(conn, "fishing_inventory", "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, guild_id TEXT, fish_name TEXT, length REAL, price_per_cm INTEGER, rarity TEXT DEFAULT '흔함'")
+    _create_table(conn, "fishing_passes", "user_id TEXT, channel_id TEXT, guild_id TEXT, expire_time TEXT, is_sabotaged INTEGER DEFAULT 0, PRIMARY KEY(user_id, channel_id, guild_id)")
+    _create_table(conn, "fishing_facilities", "channel_id TEXT, guild_id TEXT, facility_name TEXT, PRIMARY KEY(channel_id, guild_id, facility_name)")
+    _create_table(conn, "point_history", "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, transaction_type TEXT, amount INTEGER, balance_after INTEGER, description TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP")
+
+@migration("fishing", 2, "유저 낚시/벌금/버프 컬럼 추가")
+def _fishing_user_columns(conn, guild_id):
+    _add_columns(conn, "users", [
+        ("max_fish_length", "REAL DEFAULT 0.0"),
+        ("fishing_reputation", "INTEGER DEFAULT 0"),
+        ("illegal_dump_count", "INTEGER DEFAULT 0"),
+        ("neglect_dump_count", "INTEGER DEFAULT 0"),
+        ("fine_debt", "INTEGER DEFAULT 0"),
+        ("fishing_ban_until", "TEXT"),
+        ("max_dump_rate", "REAL DEFAULT 0.0"),
+        ("trash_buff_until", "TEXT"),
+        ("fish_buff_until", "TEXT"),
+        ("award_buff_until", "TEXT"),
+        ("appeal_buff_until", "TEXT"),
+        ("trash_free_passes", "INTEGER DEFAULT 0"),
+    ])
+
+@migration("fishing", 3, "인벤토리/입장권/낚시터 컬럼 보정")
+def _fishing_ground_columns(conn, guild_id):
+    _add_columns(conn, "fishing_inventory", [("rarity", "TEXT DEFAULT '흔함'")])
+    _add_columns(conn, "fishing_passes", [("is_sabotaged", "INTEGER DEFAULT 0")])
+    had_last_activity = 'last_activity' in _columns(conn, "fishing_ground")
+    _add_columns(conn, "fishing_ground", [
+        ("pollution", "INTEGER DEFAULT 0"),
+        ("trap_count", "INTEGER DEFAULT 0"),
+        ("purchasable", "INTEGER DEFAULT 1"),
+        ("is_public", "INTEGER DEFAULT 1"),
+        ("usage_time_limit", "INTEGER DEFAULT 6"),
+        ("entry_fee", "INTEGER DEFAULT 0"),
+        ("ground_type", "TEXT DEFAULT '호수'"),
+        # SQLite에서는 ALTER TABLE 시 CURRENT_TIMESTAMP 같은 동적 기본값을 직접 추가할 수 없음
+        ("last_activity", "TIMESTAMP"),
+        ("original_ground_type", "TEXT"),
+        ("temp_terrain_expire", "TEXT"),
+    ])
+    if not had_last_activity:
+        conn.execute("UPDATE fishing_ground SET last_activity = CURRENT_TIMESTAMP WHERE last_activity IS NULL")
+
+@migration("fishing", 4, "만료/회수 예정 시각 조회용 인덱스")
+def _fishing_sweep_indexes(conn, guild_id):
+    # 스위퍼는 각 이벤트의 가장 이른 시각(MIN)과 만료된 행만 조회하므로 부분 인덱스로 충분합니다.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fishing_ground_terrain_expire ON fishing_ground(temp_terrain_expire) WHERE temp_terrain_expire IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fishing_ground_owned_activity ON fishing_ground(last_activity) WHERE owner_id IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fishing_passes_expire ON fishing_passes(expire_time)")
+
+# ==================== pet_manager ====================
+@migration("pet_manager", 1, "펫 테이블 생성")
+def _pet_tables(conn, guild_id):
+    _create_table(conn, "user_pets", """
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        pet_data TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, guild_id)
+    """)
+    _create_table(conn, "user_pet_storage", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        pet_data TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """)
+
+@migration("pet_manager", 2, "시간 감소 스탯을 user_pets 컬럼으로 분리 (기존 pet_data에서 채움)")
+def _pet_hot_columns(conn, guild_id):
+    # 감소 루프가 JSON을 풀고 다시 쓰지 않고 길드당 UPDATE 한 번으로 처리할 수 있도록 합니다.
+    import json
+    _add_columns(conn, "user_pets", [
+        ("stage", "TEXT"),
+        ("stress", "REAL DEFAULT 0"),
+        ("fullness", "REAL DEFAULT 100"),
+        ("cleanliness", "REAL DEFAULT 100"),
+        ("mood_score", "REAL DEFAULT 100"),
+        ("zero_fullness_time", "REAL"),
+        ("zero_cleanliness_time", "REAL"),
+        ("is_sick", "INTEGER DEFAULT 0"),
+        ("fine_charged", "INTEGER DEFAULT 0"),
+        ("last_decay_time", "REAL"),
+    ])
+    rows = conn.execute("SELECT rowid, pet_data FROM user_pets WHERE pet_data IS NOT NULL").fetchall()
+    updates = []
+    for rowid, pet_data in rows:
+        try:
+            pet = json.loads(pet_data)
+        except ValueError:
+            continue
+        if not isinstance(pet, dict):
+            continue
+        updates.append((
+            pet.get("stage", "알"), pet.get("stress", 0), pet.get("fullness", 100), pet.get("cleanliness", 100),
+            pet.get("mood_score", 100), pet.get("zero_fullness_time"), pet.get("zero_cleanliness_time"),
+            int(bool(pet.get("is_sick"))), int(bool(pet.get("fine_charged"))), pet.get("last_decay_time"), rowid
+        ))
+    conn.executemany("""
+        UPDATE user_pets SET stage = ?, stress = ?, fullness = ?, cleanliness = ?, mood_score = ?,
+            zero_fullness_time = ?, zero_cleanliness_time = ?, is_sick = ?, fine_charged = ?, last_decay_time = ?
+        WHERE rowid = ?
+    """, updates)
+
+@migration("pet_manager", 3, "랭크 점수 인덱스 (순위 조회/매칭 범위 검색)")
+def _pet_rank_index(conn, guild_id):
+    # 순위 = 내 점수보다 높은 유저 수 + 1 → 인덱스 범위 카운트로 전체 정렬 없이 계산합니다.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_pet_rank_score ON users(pet_rank_score DESC)")
+
+# ==================== birthday ====================
+@migration("birthday", 1, "생일 테이블 생성")
+def _birthday_tables(conn, guild_id):
+    _create_table(conn, "user_birthdays", """
+        user_id TEXT NOT NULL,
+        year INTEGER,
+        month INTEGER,
+        day INTEGER,
+        is_public INTEGER,
+        PRIMARY KEY (user_id)
+    """)
+    _create_table(conn, "birthday_config", """
+        key TEXT PRIMARY KEY,
+        value TEXT
+    """)
+
+# ==================== sticky_memo ====================
+@migration("sticky_memo", 1, "구버전 접착 메모 테이블(message_id) 재구성")
+def _sticky_memo_table(conn, guild_id):
+    # 구버전 파편(message_id 컬럼)이 남아 있으면 표준 5대 컬럼 구조로 재생성합니다.
+    if 'message_id' in _columns(conn, "sticky_memos"):
+        conn.execute("DROP TABLE IF EXISTS sticky_memos")
+    _create_table(conn, "sticky_memos", """
+        channel_id TEXT NOT NULL,
+        title TEXT,
+        content TEXT,
+        use_embed INTEGER,
+        last_msg_id TEXT,
+        PRIMARY KEY (channel_id)
+    """)
+
+# ==================== channel_config ====================
+@migration("channel_config", 1, "잘못된 경로(data/guilds/database/<id>.db.db)에 저장된 채널 설정 이관")
+def _channel_config_legacy_import(conn, guild_id):
+    # 예전 ChannelConfig.get_db()가 "database/<id>.db"를 길드 ID로 넘겨 별도 파일에 설정을 기록했습니다.
+    from pathlib import Path
+    legacy_path = Path("data/guilds") / "database" / f"{guild_id}.db.db"
+    if not guild_id or not legacy_path.exists():
+        return
+    legacy = sqlite3.connect(str(legacy_path))
+    try:
+        has_table = legacy.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'channel_configs'").fetchone()
+        rows = legacy.execute("SELECT channel_id, feature_type FROM channel_configs").fetchall() if has_table else []
+    finally:
+        legacy.close()
+    conn.executemany("INSERT OR IGNORE INTO channel_configs (channel_id, feature_type) VALUES (?, ?)", rows)
+
+# ==================== enhancement_system ====================
+@migration("enhancement_system", 1, "강화 아이템/버프/이벤트 코드/서버 통계 테이블 생성")
+def _enhancement_tables(conn, guild_id):
+    _create_table(conn, "enhancement_items", """
+        guild_id TEXT NOT NULL,
+        owner_id TEXT NOT NULL,
+        item_key TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        owner_name TEXT DEFAULT '',
+        level INTEGER DEFAULT 0,
+        total_attempts INTEGER DEFAULT 0,
+        success_count INTEGER DEFAULT 0,
+        downgrade_count INTEGER DEFAULT 0,
+        total_levels_gained INTEGER DEFAULT 0,
+        total_levels_lost INTEGER DEFAULT 0,
+        consecutive_fails INTEGER DEFAULT 0,
+        shield_count INTEGER DEFAULT 0,
+        banned_until TEXT,
+        last_attack_date TEXT,
+        daily_attack_count INTEGER DEFAULT 0,
+        attack_fail_stack INTEGER DEFAULT 0,
+        created_at TEXT,
+        last_attempt TEXT,
+        PRIMARY KEY (guild_id, owner_id, item_key)
+    """)
+    # /내강화 (소유자별 레벨순)과 /강화순위 (서버 레벨순)를 정렬 없이 인덱스 순서대로 읽습니다.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_enhancement_items_owner ON enhancement_items(guild_id, owner_id, level DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_enhancement_items_level ON enhancement_items(guild_id, level DESC)")
+    _create_table(conn, "enhancement_user_buffs", """
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        ban_rights INTEGER DEFAULT 0,
+        success_boost_until TEXT,
+        PRIMARY KEY (guild_id, user_id)
+    """)
+    _create_table(conn, "enhancement_event_codes", """
+        code TEXT PRIMARY KEY,
+        guild_id TEXT NOT NULL,
+        creator_id TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        expires_at TEXT NOT NULL,
+        used_by TEXT
+    """)
+    _create_table(conn, "enhancement_server_stats", """
+        guild_id TEXT PRIMARY KEY,
+        total_attempts INTEGER DEFAULT 0,
+        total_successes INTEGER DEFAULT 0,
+        highest_level INTEGER DEFAULT 0,
+        total_users INTEGER DEFAULT 0
+    """)
+
+@migration("enhancement_system", 2, "전역 data/enhancement_data.json에서 이 길드의 강화 데이터 가져오기")
+def _enhancement_json_import(conn, guild_id):
+    # 예전에는 모든 길드의 아이템을 JSON 파일 하나에 보관했습니다. 이 길드 소유 아이템만 골라 옮기고,
+    # 버프와 이벤트 코드는 이 길드에 아이템을 가진 사용자 것만 가져옵니다. (원본 파일은 건드리지 않음)
+    import json
+    from pathlib import Path
+    legacy_path = Path("data/enhancement_data.json")
+    if not guild_id or not legacy_path.exists():
+        return
+    try:
+        data = json.loads(legacy_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ 강화 JSON 가져오기 건너뜀: {e}")
+        return
+    if not isinstance(data, dict):
+        return
+
+    fields = ["level", "total_attempts", "success_count", "downgrade_count", "total_levels_gained",
+              "total_levels_lost", "consecutive_fails", "shield_count", "daily_attack_count", "attack_fail_stack"]
+    rows, owners, skipped = [], {}, 0
+    for item in (data.get("items") or {}).values():
+        if not isinstance(item, dict) or str(item.get("guild_id")) != str(guild_id) or not item.get("owner_id") or not item.get("item_name"):
+            continue
+        owner_id, name = str(item["owner_id"]), str(item["item_name"])
+        try:
+            counters = [int(item.get(f) or 0) for f in fields]
+        except (TypeError, ValueError):
+            # 손으로 고친 JSON 등 숫자가 아닌 값이 있는 아이템은 건너뜀 (마이그레이션 전체를 막지 않도록)
+            skipped += 1
+            continue
+        owners.setdefault(owner_id, set()).add(name.lower())
+        rows.append((
+            str(guild_id), owner_id, name.lower(), name, item.get("owner_name", ""),
+            *counters,
+            item.get("banned_until"), item.get("last_attack_date"), item.get("created_at"), item.get("last_attempt"),
+        ))
+    if skipped:
+        logger.warning(f"⚠️ 강화 JSON 가져오기: 값이 잘못된 아이템 {skipped}개 건너뜀 (길드 {guild_id})")
+    if not rows:
+        return
+    conn.executemany(f"""
+        INSERT OR IGNORE INTO enhancement_items
+            (guild_id, owner_id, item_key, item_name, owner_name, {', '.join(fields)}, banned_until, last_attack_date, created_at, last_attempt)
+        VALUES ({', '.join('?' * (len(fields) + 9))})
+    """, rows)
+
+    buff_rows = []
+    for uid, b in (data.get("user_buffs") or {}).items():
+        if uid not in owners or not isinstance(b, dict):
+            continue
+        try:
+            buff_rows.append((str(guild_id), uid, int(b.get("ban_rights") or 0), b.get("success_boost_until")))
+        except (TypeError, ValueError):
+            logger.warning(f"⚠️ 강화 JSON 가져오기: 값이 잘못된 버프 건너뜀 (user_id={uid})")
+    conn.executemany(
+        "INSERT OR IGNORE INTO enhancement_user_buffs (guild_id, user_id, ban_rights, success_boost_until) VALUES (?, ?, ?, ?)",
+        buff_rows
+    )
+    # 만료된 코드는 가져오지 않음 (expires_at은 KST ISO 문자열이라 문자열 비교로 충분)
+    now = datetime.now(timezone(timedelta(hours=9))).isoformat()
+    conn.executemany(
+        "INSERT OR IGNORE INTO enhancement_event_codes (code, guild_id, creator_id, item_name, expires_at, used_by) VALUES (?, ?, ?, ?, ?, ?)",
+        [(code, str(guild_id), str(ev["creator_id"]), ev["item_name"], ev["expires_at"], (ev.get("used_by") or [None])[0])
+         for code, ev in (data.get("event_codes") or {}).items()
+         if isinstance(ev, dict) and isinstance(ev.get("expires_at"), str) and ev["expires_at"] >= now and ev.get("item_name")
+         and str(ev.get("item_name")).lower() in owners.get(str(ev.get("creator_id")), ())]
+    )
+    # 서버 통계는 전역 합계라 길드별로 나눌 수 없으므로 가져온 아이템에서 다시 집계합니다.
+    conn.execute("""
+        INSERT OR REPLACE INTO enhancement_server_stats (guild_id, total_attempts, total_successes, highest_level, total_users)
+        SELECT ?, COALESCE(SUM(total_attempts), 0), COALESCE(SUM(success_count), 0), COALESCE(MAX(level), 0), COUNT(DISTINCT owner_id)
+        FROM enhancement_items WHERE guild_id = ?
+    """, (str(guild_id), str(guild_id)))
+    logger.info(f"✅ 강화 JSON 가져오기: 길드 {guild_id} 아이템 {len(rows)}개")
+
+# ==================== statistics_system ====================
+@migration("statistics_system", 1, "게임 이벤트 로그와 게임별/사용자별/서버 집계 테이블 생성")
+def _statistics_tables(conn, guild_id):
+    # 예전 data/game_statistics.json, data/user_activity.json은 길드 구분 없는 전역 합계라 가져오지 않습니다.
+    _create_table(conn, "game_events", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        game_name TEXT NOT NULL,
+        is_win INTEGER DEFAULT 0,
+        is_multi INTEGER DEFAULT 0,
+        bet INTEGER DEFAULT 0,
+        payout INTEGER DEFAULT 0,
+        created_at TEXT NOT NULL
+    """)
+    # 보존 기간이 지난 이벤트 정리용
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_game_events_created ON game_events(guild_id, created_at)")
+    _create_table(conn, "game_stats_agg", """
+        guild_id TEXT NOT NULL,
+        game_name TEXT NOT NULL,
+        played INTEGER DEFAULT 0,
+        won INTEGER DEFAULT 0,
+        single_played INTEGER DEFAULT 0,
+        multi_played INTEGER DEFAULT 0,
+        total_bet INTEGER DEFAULT 0,
+        total_payout INTEGER DEFAULT 0,
+        last_played TEXT,
+        PRIMARY KEY (guild_id, game_name)
+    """)
+    _create_table(conn, "game_user_stats", """
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        game_name TEXT NOT NULL,
+        username TEXT DEFAULT '',
+        played INTEGER DEFAULT 0,
+        won INTEGER DEFAULT 0,
+        total_bet INTEGER DEFAULT 0,
+        total_payout INTEGER DEFAULT 0,
+        first_played TEXT,
+        last_played TEXT,
+        PRIMARY KEY (guild_id, user_id, game_name)
+    """)
+    # 게임별 순위를 정렬 없이 인덱스 순서대로 읽습니다.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_game_user_stats_rank ON game_user_stats(guild_id, game_name, played DESC)")
+    _create_table(conn, "game_server_stats", """
+        guild_id TEXT PRIMARY KEY,
+        total_games INTEGER DEFAULT 0,
+        total_wins INTEGER DEFAULT 0,
+        total_bet INTEGER DEFAULT 0,
+        total_payout INTEGER DEFAULT 0,
+        total_users INTEGER DEFAULT 0,
+        created_at TEXT,
+        last_updated TEXT
+    """)
+
+# ==================== improved_post_delete ====================
+@migration("improved_post_delete", 1, "글삭제 작업 진행 상황 테이블 (재시작 후 이어서 삭제)")
+def _post_delete_jobs(conn, guild_id):
+    # 대상 범위는 메시지 ID(snowflake) 구간으로 저장: anchor_id 미만, after_id 초과
+    # cursor_id/scanned는 "지금까지 조회한 가장 오래된 메시지 / 조회 개수"로 함께 갱신됩니다.
+    _create_table(conn, "post_delete_jobs", """
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_id TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        count_limit INTEGER,
+        after_id INTEGER,
+        anchor_id INTEGER NOT NULL,
+        cursor_id INTEGER,
+        scanned INTEGER DEFAULT 0,
+        deleted INTEGER DEFAULT 0,
+        failed INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'running',
+        started_by TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_post_delete_jobs_status ON post_delete_jobs(status)")
+
+# ==================== 운영자 CLI ====================
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="길드 DB 스키마 마이그레이션 점검/적용")
+    parser.add_argument("paths", nargs="*", help="대상 DB 파일 (기본: data/guilds/*.db)")
+    parser.add_argument("--apply", action="store_true", help="대기 중인 마이그레이션을 실제로 적용")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    targets = [Path(p) for p in args.paths] or sorted(Path("data/guilds").glob("*.db"))
+
+    for path in targets:
+        conn = sqlite3.connect(str(path))
+        try:
+            print(f"📂 {path}")
+            if args.apply:
+                for module in MIGRATIONS:
+                    applied = apply_migrations(conn, str(path), module, guild_id=path.stem)
+                    for m in applied:
+                        print(f"   ✅ [{module}] v{m.version} {m.description}")
+            for module, info in migration_report(conn).items():
+                status = "최신" if not info['pending'] else f"대기 {len(info['pending'])}건"
+                print(f"   [{module}] v{info['current']}/{info['latest']} - {status}")
+                for line in info['pending']:
+                    print(f"      · {line}")
+        finally:
+            conn.close()
@@ -19,34 +19,9 @@ TWO_MATCH_MULTIPLIER = 0.1
 # --- 외부 시스템 연동 ---
 STATS_AVAILABLE = True 
 
-try:
-    import point_manager
-    POINT_MANAGER_AVAILABLE = True
-except ImportError:
-    POINT_MANAGER_AVAILABLE = False
-    print("⚠️ point_manager가 없어 포인트 기능이 비활성화됩니다.")
-
-    # point_manager 파일이 없을 경우를 대비
-    class MockPointManager:
-        user_points = {}
-
-        @staticmethod
-        async def add_point(bot, guild_id, user_id, amount):
-            MockPointManager.user_points[user_id] = await MockPointManager.get_point(bot, guild_id, user_id) + amount
-
-        @staticmethod
-        async def get_point(bot, guild_id, user_id):
-            return MockPointManager.user_points.get(user_id, 10000)
-
-        @staticmethod
-        async def is_registered(bot, guild_id, user_id):
-            return True
-
-        @staticmethod
-        async def register_user(bot, guild_id, user_id):
-            MockPointManager.user_points[user_id] = 10000
-
-    point_manager = MockPointManager()
+# 포인트는 게임 공용 서비스로 처리 (배팅 홀드 → 한 판당 1회 정산)
+from point_service import point_service
+from frame_scheduler import frame_scheduler
 
 class SlotMachineView(discord.ui.View):
     def __init__(self, bot: commands.Bot, guild_id: str, user: discord.User, bet: int):
@@ -57,6 +32,7 @@ class SlotMachineView(discord.ui.View):
         self.bet = bet
         self.is_spinning = False
         self.message = None
+        self.hold = None
 
     @discord.ui.button(label="🎰 슬롯 돌리기!", style=discord.ButtonStyle.primary)
     async def spin(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -74,14 +50,11 @@ class SlotMachineView(discord.ui.View):
         self.is_spinning = True
         
         try:
-            # 1. 포인트 체크 및 선차감
-            current_balance = await point_manager.get_point(self.bot, self.guild_id, uid)
-            if current_balance < self.bet:
+            # 1. 배팅 홀드 (배팅금은 여기서 바로 차감, 실패 시 환불)
+            self.hold = await point_service.reserve_bet(self.guild_id, uid, self.bet, "슬롯머신")
+            if not self.hold:
                 self.is_spinning = False
                 return await interaction.response.send_message("❌ 잔액이 부족합니다.", ephemeral=True)
-            
-            if POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, self.guild_id, uid, -self.bet)
 
             # 2. 버튼 비활성화 및 초기 응답
             button.disabled = True
@@ -104,7 +77,7 @@ class SlotMachineView(discord.ui.View):
                     color=discord.Color.yellow()
                 )
                 try:
-                    await self.message.edit(embed=anim_embed)
+                    await frame_scheduler.push(self.message, embed=anim_embed)
                     await asyncio.sleep(0.7) # 간격을 조금 더 늘려 안정성 확보
                 except discord.NotFound: # 메시지가 삭제된 경우 중단
                     break
@@ -137,17 +110,17 @@ class SlotMachineView(discord.ui.View):
                         is_win=is_win,
                         bet_amount=self.bet,
                         payout=reward,
-                        is_multi=False  # 슬롯머신은 싱글 게임
+                        is_multi=False,  # 슬롯머신은 싱글 게임
+                        guild_id=self.guild_id
                     )
                 except Exception as stats_err:
                     print(f"통계 기록 중 오류: {stats_err}")
 
-            # 당첨금(보상) 지급
-            if reward > 0 and POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, self.guild_id, uid, reward)
-            
-            # 최종 잔액 조회
-            final_balance = await point_manager.get_point(self.bot, self.guild_id, uid)
+            # 정산 (배팅금은 홀드 때 이미 차감, 당첨금만 지급하고 정산 후 잔액을 받음)
+            final_balance = await point_service.settle(self.hold, reward, f"슬롯머신 {' | '.join(final_result)}")
+            if final_balance is None:
+                # 이미 정산/환불된 홀드 (만료 등) - 결과 표시는 현재 잔액으로
+                final_balance = await point_service.get_balance(self.guild_id, uid)
             
             # 7. 최종 결과 출력
             if reward > self.bet:
@@ -163,19 +136,19 @@ class SlotMachineView(discord.ui.View):
             end_embed.add_field(name="💳 잔액", value=f"{final_balance:,}원", inline=True)
             
             button.label = "게임 종료"
-            await self.message.edit(embed=end_embed, view=self)
+            await frame_scheduler.push(self.message, final=True, embed=end_embed, view=self)
             self.stop()
 
         except Exception as e:
             print(f"Slot Machine Error: {e}")
-            # 이미 포인트가 차감된 경우에만 환불
-            if self.is_spinning and POINT_MANAGER_AVAILABLE:
-                await point_manager.add_point(self.bot, self.guild_id, uid, self.bet)
+            # 정산 전이라면 홀드 때 차감된 배팅금을 환불
+            if self.is_spinning and self.hold and not self.hold.closed:
+                await point_service.refund(self.hold)
 
                 self.is_spinning = False
                 if self.message:
                     try:
-                        await self.message.edit(content=f"❌ 오류가 발생하여 환불되었습니다. (사유: {e})", embed=None, view=None)
+                        await frame_scheduler.push(self.message, final=True, content=f"❌ 오류가 발생하여 환불되었습니다. (사유: {e})", embed=None, view=None)
                     except:
                         pass
 
@@ -207,8 +180,8 @@ class SlotMachineCog(commands.Cog):
         uid = str(interaction.user.id)
         guild_id = str(interaction.guild.id)
 
-        # 잔액 확인
-        user_points = await point_manager.get_point(self.bot, guild_id, uid)
+        # 잔액 확인 (진행 중인 배팅 제외)
+        user_points = await point_service.get_balance(guild_id, uid)
         if user_points < 배팅:
             return await interaction.response.send_message(f"❌ 잔액이 부족합니다. (현재 잔액: {user_points:,}원)", ephemeral=True)
 
@@ -219,7 +192,7 @@ class SlotMachineCog(commands.Cog):
             
         try:
             # 등록 여부 확인
-            if not await point_manager.is_registered(self.bot, guild_id, uid):
+            if not point_service.is_registered(guild_id, uid):
                 return await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요.", ephemeral=True)
 
             current_balance = user_points
@@ -1,15 +1,26 @@
 # statistics_system.py - [게임] 통계
+"""
+길드별 게임 통계입니다.
+
+- 게임 한 판은 game_events에 한 줄씩 추가되는 이벤트입니다. (수정/삭제 없음, 보존 기간 후 정리)
+- 기록은 메모리에 모았다가 STATS_CONFIG["flush_interval"]마다 길드별 한 트랜잭션으로 반영하며,
+  같은 트랜잭션에서 게임별(game_stats_agg)/사용자별(game_user_stats)/서버(game_server_stats) 집계를 증분 갱신합니다.
+- 조회는 집계 테이블만 읽으므로 누적 기록량과 관계없이 일정한 비용입니다.
+"""
 from __future__ import annotations
-import os
-import json
+import asyncio
 import datetime
+import time
 from calendar import monthrange
 import logging
 from collections import defaultdict
+from dataclasses import dataclass
 from typing import Dict, List, Any, Optional
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from database_manager import get_guild_db_manager
 
 # 한국 시간대 설정 (UTC+9)
 KST = datetime.timezone(datetime.timedelta(hours=9))
@@ -18,458 +29,271 @@ KST = datetime.timezone(datetime.timedelta(hours=9))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ✅ 게임 분류 정의 (클래스 내부나 상단에 추가)
-SINGLE_GAMES = ["slot_machine", "yabawi_game", "blackjack", "dice_game", "rock_paper_scissors", "odd_even_game"]
-MULTI_GAMES = ["blackjack", "dice_game", "rock_paper_scissors", "odd_even_game"]
+# ✅ 게임 분류 정의 (기록되는 게임 이름 기준)
+SINGLE_GAMES = ["slot_machine", "yabawi", "blackjack", "dice_game", "rock_paper_scissors", "odd_even"]
+MULTI_GAMES = ["blackjack", "dice_game", "rock_paper_scissors", "odd_even"]
 
-# ✅ 데이터 파일 경로 및 설정
-STATS_CONFIG = {
-    "game_stats_file": 'data/game_statistics.json',
-    "user_activity_file": 'data/user_activity.json',
-    "daily_stats_file": 'data/daily_statistics.json',
-    "backup_interval": 100,
-    "max_daily_records": 365,
-    "enable_real_time": True
+# 게임 모듈마다 달리 부르던 이름을 하나로 모읍니다.
+GAME_ALIASES = {
+    "주사위": "dice_game",
+    "홀짝": "odd_even",
+    "odd_even_game": "odd_even",
+    "yabawi_game": "yabawi",
 }
 
-# 데이터 디렉토리 생성
-os.makedirs("data", exist_ok=True)
+# ✅ 통계 설정
+STATS_CONFIG = {
+    "flush_interval": 10,          # 모아 둔 기록을 DB에 반영하는 주기 (초)
+    "flush_batch_size": 200,       # 길드별로 이만큼 쌓이면 주기를 기다리지 않고 반영
+    "event_retention_days": 365,   # game_events 보존 기간 (집계는 유지)
+    "prune_interval": 24 * 3600,   # 보존 기간 정리 주기 (초)
+}
 
-# ✅ 통계 관리자 클래스 (디버깅 기능 추가)
+@dataclass(frozen=True)
+class GameEvent:
+    """게임 한 판의 기록 (game_events 한 줄)"""
+    user_id: str
+    username: str
+    game_name: str
+    is_win: bool
+    is_multi: bool
+    bet: int
+    payout: int
+    created_at: str
+
+# ✅ 통계 관리자 클래스
 class StatisticsManager:
-    # `db_cog` 인자를 추가하여 DatabaseCog 인스턴스를 받도록 변경
-    def __init__(self, db_cog: Any): # Any 대신 DatabaseCog 타입을 사용하는 것이 더 좋습니다.
-        self.db_cog = db_cog
-        self.game_stats = self.load_game_stats()
-        self.user_activity = self.load_user_activity()
-        self.daily_stats = self.load_daily_stats()
-        self.backup_counter = 0
-        
-        # ✅ 강제 타입 보장
-        self._ensure_data_integrity()
-        
-        # 실시간 캐시
+    """
+    게임 기록을 길드별로 모아 두었다가 일괄 반영합니다.
+    기록(record_*)은 이벤트 루프에서 동기적으로 호출되고, DB 쓰기는 길드 워커 스레드에서만 실행됩니다.
+    """
+    def __init__(self):
+        self._pending: Dict[str, List[GameEvent]] = {}     # guild_id -> 미반영 이벤트
+        self._last_prune: Dict[str, float] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+
+        # 실시간 캐시 (이번 세션, 길드별)
         self.real_time_cache = {
-            "hourly_games": defaultdict(int),
-            "active_users": set(),
+            "hourly_games": defaultdict(lambda: defaultdict(int)),
+            "active_users": defaultdict(set),
             "session_start": datetime.datetime.now(KST)
         }
-        
-        # ✅ 디버깅 카운터 추가
+
         self.debug_stats = {
             "record_calls": 0,
             "successful_records": 0,
             "failed_records": 0,
+            "flushed_events": 0,
+            "failed_flushes": 0,
             "last_record_time": None,
             "last_game_recorded": None
         }
-        
-        logger.info("✅ 통계 시스템 초기화 완료")
-        print(f"🔍 통계 시스템 디버그 모드 활성화")
-
-    def _ensure_data_integrity(self):
-        """데이터 무결성 강제 보장"""
-        # user_activity가 dict가 아니면 강제로 dict로 변환
-        if not isinstance(self.user_activity, dict):
-            logger.warning(f"user_activity 타입 오류: {type(self.user_activity)} -> dict로 강제 변환")
-            self.user_activity = {}
-        
-        # game_stats가 dict가 아니면 강제로 초기화
-        if not isinstance(self.game_stats, dict):
-            logger.warning(f"game_stats 타입 오류: {type(self.game_stats)} -> 기본값으로 초기화")
-            self.game_stats = self.create_empty_game_stats()
-        
-        # daily_stats가 dict가 아니면 강제로 dict로 변환
-        if not isinstance(self.daily_stats, dict):
-            logger.warning(f"daily_stats 타입 오류: {type(self.daily_stats)} -> dict로 강제 변환")
-            self.daily_stats = {}
 
-    def create_empty_game_stats(self) -> Dict:
-        """빈 게임 통계 구조 생성"""
-        return {
-            "games": {
-                "rock_paper_scissors": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0},
-                "dice_game": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0},
-                "odd_even": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0},
-                "blackjack": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0},
-                "slot_machine": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0},
-                "yabawi": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0},
-                "enhancement": {"attempts": 0, "success": 0, "total_spent": 0},
-                "ladder_game": {"played": 0, "won": 0, "total_reward": 0},
-                "horse_racing": {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0}
-            },
-            "total_games": 0,
-            "total_users": 0,
-            "created_date": datetime.datetime.now(KST).isoformat(),
-            "last_updated": datetime.datetime.now(KST).isoformat()
-        }
-
-    def load_game_stats(self) -> Dict:
-        """게임 통계 데이터 로드 (안전성 강화)"""
-        try:
-            if os.path.exists(STATS_CONFIG["game_stats_file"]):
-                with open(STATS_CONFIG["game_stats_file"], 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # 타입 검증
-                    if isinstance(data, dict):
-                        print(f"📊 기존 게임 통계 로드됨: {len(data.get('games', {}))}개 게임")
-                        return data
-                    else:
-                        logger.warning("game_stats 파일이 dict가 아닙니다. 기본값으로 초기화합니다.")
-                        return self.create_empty_game_stats()
-            else:
-                print("📊 새로운 게임 통계 파일 생성")
-                return self.create_empty_game_stats()
-        except Exception as e:
-            logger.error(f"게임 통계 로드 실패: {e}")
-            return self.create_empty_game_stats()
-
-    def load_user_activity(self) -> Dict:
-        """사용자 활동 데이터 로드 (완전 안전성 강화)"""
-        try:
-            if os.path.exists(STATS_CONFIG["user_activity_file"]):
-                with open(STATS_CONFIG["user_activity_file"], 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # ✅ 강제 타입 검증 및 변환
-                    if isinstance(data, dict):
-                        print(f"👥 기존 사용자 활동 로드됨: {len(data)}명")
-                        return data
-                    elif isinstance(data, list):
-                        logger.warning("user_activity가 list입니다. dict로 변환합니다.")
-                        return {}
-                    elif data is None:
-                        logger.warning("user_activity가 None입니다. 빈 dict로 초기화합니다.")
-                        return {}
-                    else:
-                        logger.warning(f"user_activity 타입 오류: {type(data)}. 빈 dict로 초기화합니다.")
-                        return {}
-            else:
-                print("👥 새로운 사용자 활동 파일 생성")
-                return {}
-        except json.JSONDecodeError as e:
-            logger.error(f"user_activity JSON 파싱 오류: {e}. 빈 dict로 초기화합니다.")
-            return {}
-        except Exception as e:
-            logger.error(f"사용자 활동 로드 실패: {e}. 빈 dict로 초기화합니다.")
-            return {}
-
-    def load_daily_stats(self) -> Dict:
-        """일일 통계 데이터 로드 (안전성 강화)"""
-        try:
-            if os.path.exists(STATS_CONFIG["daily_stats_file"]):
-                with open(STATS_CONFIG["daily_stats_file"], 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict):
-                        return self._cleanup_old_daily_stats(data)
-                    else:
-                        logger.warning("daily_stats가 dict가 아닙니다. 빈 dict로 초기화합니다.")
-                        return {}
-            else:
-                return {}
-        except Exception as e:
-            logger.error(f"일일 통계 로드 실패: {e}")
-            return {}
+        logger.info("✅ 통계 시스템 초기화 완료")
 
-    def _cleanup_old_daily_stats(self, data: Dict) -> Dict:
-        """오래된 일일 통계 정리"""
-        try:
-            if not isinstance(data, dict):
-                return {}
-                
-            cutoff_date = datetime.date.today() - datetime.timedelta(days=STATS_CONFIG["max_daily_records"])
-            cutoff_str = cutoff_date.isoformat()
-            
-            cleaned_data = {}
-            for date_str, stats in data.items():
-                if isinstance(date_str, str) and date_str >= cutoff_str:
-                    cleaned_data[date_str] = stats
-            
-            return cleaned_data
-        except Exception as e:
-            logger.error(f"일일 통계 정리 오류: {e}")
-            return {}
+    # ==================== 기록 ====================
+    @staticmethod
+    def normalize_game_name(game_name: str) -> str:
+        return GAME_ALIASES.get(game_name, game_name)
 
-    def save_all_stats(self) -> bool:
-        """모든 통계 데이터 저장 (완전 안전성 강화)"""
-        try:
-            # ✅ 저장 전 데이터 무결성 재확인
-            self._ensure_data_integrity()
-            
-            # 게임 통계 저장
-            if isinstance(self.game_stats, dict):
-                self.game_stats["last_updated"] = datetime.datetime.now(KST).isoformat()
-                with open(STATS_CONFIG["game_stats_file"], 'w', encoding='utf-8') as f:
-                    json.dump(self.game_stats, f, indent=2, ensure_ascii=False)
-                print(f"💾 게임 통계 저장됨: {self.game_stats.get('total_games', 0)}게임")
-            else:
-                logger.error("game_stats가 dict가 아닙니다. 저장을 건너뜁니다.")
-
-            # 사용자 활동 저장 (강제 dict 보장)
-            if isinstance(self.user_activity, dict):
-                with open(STATS_CONFIG["user_activity_file"], 'w', encoding='utf-8') as f:
-                    json.dump(self.user_activity, f, indent=2, ensure_ascii=False)
-                print(f"👥 사용자 활동 저장됨: {len(self.user_activity)}명")
-            else:
-                logger.warning("user_activity가 dict가 아닙니다. 빈 dict로 저장합니다.")
-                with open(STATS_CONFIG["user_activity_file"], 'w', encoding='utf-8') as f:
-                    json.dump({}, f, indent=2, ensure_ascii=False)
-                self.user_activity = {}
-
-            # 일일 통계 저장
-            if isinstance(self.daily_stats, dict):
-                with open(STATS_CONFIG["daily_stats_file"], 'w', encoding='utf-8') as f:
-                    json.dump(self.daily_stats, f, indent=2, ensure_ascii=False)
-            else:
-                logger.warning("daily_stats가 dict가 아닙니다. 빈 dict로 저장합니다.")
-                with open(STATS_CONFIG["daily_stats_file"], 'w', encoding='utf-8') as f:
-                    json.dump({}, f, indent=2, ensure_ascii=False)
-                self.daily_stats = {}
-
-            return True
-        except Exception as e:
-            logger.error(f"통계 저장 실패: {e}")
-            return False
-        
-    def record_game(self, user_id, user_name, game_name, bet, reward, is_win):
-        """슬롯머신 등 외부 호출용 호환 메서드"""
+    def record_game(self, user_id, user_name, game_name, bet, reward, is_win, guild_id=None, is_multi: bool = False):
+        """게임 모듈 공용 기록 메서드"""
         self.record_game_play(
             user_id=str(user_id),
             username=user_name,
-            game_name="slot_machine", # 통계 시스템에 등록된 이름
+            game_name=game_name,
             is_win=is_win,
             bet_amount=bet,
-            payout=reward
+            payout=reward,
+            is_multi=is_multi,
+            guild_id=guild_id
         )
-        print(f"[기록] {user_name}: {game_name} 결과 - 배팅: {bet}, 획득: {reward}, 승리: {is_win}")
-    
 
-    def record_game_play(self, user_id: str, username: str, game_name: str, is_win: bool, bet_amount: int = 0, payout: int = 0, is_multi: bool = False):
-        """게임 플레이 기록 (안전성 강화 + 디버깅)"""
+    def record_game_play(self, user_id: str, username: str, game_name: str, is_win: bool, bet_amount: int = 0,
+                         payout: int = 0, is_multi: bool = False, guild_id=None):
+        """게임 플레이 1건을 기록합니다. (메모리에 쌓고 주기적으로 일괄 반영)"""
+        self.debug_stats["record_calls"] += 1
+        if guild_id is None:
+            self.debug_stats["failed_records"] += 1
+            logger.warning(f"⚠️ guild_id 없는 게임 기록 무시: {game_name} ({username})")
+            return
+
+        gid, uid = str(guild_id), str(user_id)
+        game_name = self.normalize_game_name(game_name)
+        now = datetime.datetime.now(KST)
+        event = GameEvent(uid, str(username or ""), game_name, bool(is_win), bool(is_multi),
+                          int(bet_amount or 0), int(payout or 0), now.isoformat())
+        pending = self._pending.setdefault(gid, [])
+        pending.append(event)
+
+        self.debug_stats["successful_records"] += 1
+        self.debug_stats["last_record_time"] = event.created_at
+        self.debug_stats["last_game_recorded"] = game_name
+
+        # 실시간 캐시 (최근 24시간만 유지)
+        self.real_time_cache["active_users"][gid].add(uid)
+        hourly = self.real_time_cache["hourly_games"][gid]
+        hourly[now.strftime("%Y-%m-%d-%H")] += 1
+        if len(hourly) > 24:
+            del hourly[min(hourly)]
+
+        if len(pending) >= STATS_CONFIG["flush_batch_size"]:
+            self._schedule_flush(gid)
+
+    def record_game_activity(self, user_id: str, username: str, game_name: str, guild_id=None, **kwargs):
+        """게임 활동 기록 (호환 메서드)"""
+        is_win = kwargs.get('is_win', False)
+        if game_name == "enhancement":
+            # 강화는 배팅/지급 대신 소모 비용만 기록
+            self.record_game_play(user_id, username, game_name, is_win, kwargs.get('total_spent', 0), 0, guild_id=guild_id)
+        else:
+            bet_amount = kwargs.get('bet_amount', kwargs.get('bet', 0))  # 호환성을 위해 'bet'도 체크
+            self.record_game_play(user_id, username, game_name, is_win, bet_amount, kwargs.get('payout', 0),
+                                  kwargs.get('is_multi', False), guild_id=guild_id)
+
+    # ==================== 반영 ====================
+    def _schedule_flush(self, guild_id: str):
+        """배치가 가득 찬 길드를 바로 반영 (이벤트 루프 밖에서는 다음 주기에 반영)"""
+        task = self._flush_tasks.get(guild_id)
+        if task and not task.done():
+            return
         try:
-            # ✅ 디버깅 카운터 업데이트
-            self.debug_stats["record_calls"] += 1
-            self.debug_stats["last_record_time"] = datetime.datetime.now(KST).isoformat()
-            self.debug_stats["last_game_recorded"] = game_name
-            
-            print(f"🎮 게임 기록 시도: {game_name} | 사용자: {username} | 승리: {is_win} | 배팅: {bet_amount} | 지급: {payout}")
-            
-            # ✅ 데이터 무결성 재확인
-            self._ensure_data_integrity()
-            
-            # 게임 통계 업데이트
-            if isinstance(self.game_stats, dict) and "games" in self.game_stats:
-                if game_name not in self.game_stats["games"]:
-                    # 신규 게임 초기화 (기존 필드 유지)
-                    self.game_stats["games"][game_name] = {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0, "single_played": 0, "multi_played": 0}
-                
-                # 게임 통계 업데이트 로직 내부에 추가
-                game_stats = self.game_stats["games"][game_name]
-
-                # 모드별 횟수 기록 추가
-                mode_key = "multi_played" if is_multi else "single_played"
-                game_stats[mode_key] = game_stats.get(mode_key, 0) + 1
-
-                # 전체 플레이 횟수 (기존 코드 유지)
-                game_stats["played"] = game_stats.get("played", 0) + 1
-
-                # ✅ 싱글/멀티 횟수 분리 기록
-                if is_multi:
-                    game_stats["multi_played"] = game_stats.get("multi_played", 0) + 1
-                else:
-                    game_stats["single_played"] = game_stats.get("single_played", 0) + 1
-
-                # 플레이 모드 결정
-                mode = "multi" if is_multi else "single"
-        
-                # 데이터 구조에 모드별 카운트 추가 (기존 구조 유지하며 확장)
-                mode_key = f"{mode}_played"
-                game_stats[mode_key] = game_stats.get(mode_key, 0) + 1
-                
-                # 강화 시스템 특별 처리
-                if game_name == "enhancement":
-                    game_stats["attempts"] = game_stats.get("attempts", 0) + 1
-                    if is_win:
-                        game_stats["success"] = game_stats.get("success", 0) + 1
-                    game_stats["total_spent"] = game_stats.get("total_spent", 0) + bet_amount
-                    print(f"🔧 강화 통계 업데이트: 시도 {game_stats['attempts']}, 성공 {game_stats['success']}")
-                else:
-                    if is_win:
-                        game_stats["won"] = game_stats.get("won", 0) + 1
-                    game_stats["total_bet"] = game_stats.get("total_bet", 0) + bet_amount
-                    game_stats["total_payout"] = game_stats.get("total_payout", 0) + payout
-                    print(f"🎲 {game_name} 통계 업데이트: 플레이 {game_stats['played']}, 승리 {game_stats['won']}")
-
-            # 사용자 활동 통계 업데이트 (안전하게)
-            if isinstance(self.user_activity, dict):
-                if user_id not in self.user_activity:
-                    self.user_activity[user_id] = {
-                        "username": username,
-                        "first_game": datetime.datetime.now(KST).isoformat(),
-                        "last_game": datetime.datetime.now(KST).isoformat(),
-                        "total_games": 0,
-                        "total_won": 0,
-                        "total_bet": 0,
-                        "total_payout": 0,
-                        "games_played": {}
-                    }
-                    print(f"👤 새 사용자 '{username}' 등록됨")
-                
-                user_stats = self.user_activity[user_id]
-                user_stats["username"] = username  # 이름 업데이트
-                user_stats["last_game"] = datetime.datetime.now(KST).isoformat()
-                user_stats["total_games"] = user_stats.get("total_games", 0) + 1
-                
-                if is_win:
-                    user_stats["total_won"] = user_stats.get("total_won", 0) + 1
-                
-                user_stats["total_bet"] = user_stats.get("total_bet", 0) + bet_amount
-                user_stats["total_payout"] = user_stats.get("total_payout", 0) + payout
-                
-                # 게임별 통계
-                if "games_played" not in user_stats:
-                    user_stats["games_played"] = {}
-                
-                if game_name not in user_stats["games_played"]:
-                    user_stats["games_played"][game_name] = {"played": 0, "won": 0, "total_bet": 0, "total_payout": 0}
-                
-                game_user_stats = user_stats["games_played"][game_name]
-                game_user_stats["played"] = game_user_stats.get("played", 0) + 1
-                if is_win:
-                    game_user_stats["won"] = game_user_stats.get("won", 0) + 1
-                game_user_stats["total_bet"] = game_user_stats.get("total_bet", 0) + bet_amount
-                game_user_stats["total_payout"] = game_user_stats.get("total_payout", 0) + payout
-
-            # 실시간 캐시 업데이트
-            self.real_time_cache["active_users"].add(user_id)
-            current_hour = datetime.datetime.now(KST).strftime("%Y-%m-%d-%H")
-            self.real_time_cache["hourly_games"][current_hour] += 1
-
-            # 자동 저장 (백업 카운터 기반)
-            self.backup_counter += 1
-            if self.backup_counter >= STATS_CONFIG["backup_interval"]:
-                success = self.save_all_stats()
-                self.backup_counter = 0
-                print(f"💾 자동 백업 완료: {success}")
-
-            # ✅ 성공 카운터 업데이트
-            self.debug_stats["successful_records"] += 1
-            print(f"✅ 게임 기록 성공 - 총 기록: {self.debug_stats['successful_records']}")
-
+            self._flush_tasks[guild_id] = asyncio.get_running_loop().create_task(self.flush_guild(guild_id))
+        except RuntimeError:
+            pass
+
+    @staticmethod
+    def _write_batch(db, guild_id: str, events: List[GameEvent], prune_before: Optional[str]):
+        """길드 워커 스레드에서 실행: 이벤트 추가 + 집계 증분을 한 트랜잭션으로 처리"""
+        games: Dict[str, List[int]] = {}
+        users: Dict[tuple, List[Any]] = {}
+        for e in events:
+            g = games.setdefault(e.game_name, [0, 0, 0, 0, 0, 0])
+            g[0] += 1
+            g[1] += e.is_win
+            g[2] += not e.is_multi
+            g[3] += e.is_multi
+            g[4] += e.bet
+            g[5] += e.payout
+            u = users.setdefault((e.user_id, e.game_name), [e.username, 0, 0, 0, 0, e.created_at])
+            u[0] = e.username or u[0]
+            u[1] += 1
+            u[2] += e.is_win
+            u[3] += e.bet
+            u[4] += e.payout
+        last = events[-1].created_at
+
+        conn = db.get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO game_events (guild_id, user_id, game_name, is_win, is_multi, bet, payout, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(guild_id, e.user_id, e.game_name, int(e.is_win), int(e.is_multi), e.bet, e.payout, e.created_at) for e in events]
+            )
+            # 처음 게임하는 사용자 수 (PK 앞부분(guild_id, user_id)으로 조회)
+            new_users = sum(
+                1 for uid in {e.user_id for e in events}
+                if conn.execute("SELECT 1 FROM game_user_stats WHERE guild_id = ? AND user_id = ? LIMIT 1", (guild_id, uid)).fetchone() is None
+            )
+            conn.executemany("""
+                INSERT INTO game_stats_agg (guild_id, game_name, played, won, single_played, multi_played, total_bet, total_payout, last_played)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, game_name) DO UPDATE SET
+                    played = played + excluded.played, won = won + excluded.won,
+                    single_played = single_played + excluded.single_played, multi_played = multi_played + excluded.multi_played,
+                    total_bet = total_bet + excluded.total_bet, total_payout = total_payout + excluded.total_payout,
+                    last_played = excluded.last_played
+            """, [(guild_id, game, *g, last) for game, g in games.items()])
+            conn.executemany("""
+                INSERT INTO game_user_stats (guild_id, user_id, game_name, username, played, won, total_bet, total_payout, first_played, last_played)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id, user_id, game_name) DO UPDATE SET
+                    username = excluded.username, played = played + excluded.played, won = won + excluded.won,
+                    total_bet = total_bet + excluded.total_bet, total_payout = total_payout + excluded.total_payout,
+                    last_played = excluded.last_played
+            """, [(guild_id, uid, game, *u, last) for (uid, game), u in users.items()])
+            conn.execute("""
+                INSERT INTO game_server_stats (guild_id, total_games, total_wins, total_bet, total_payout, total_users, created_at, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET
+                    total_games = total_games + excluded.total_games, total_wins = total_wins + excluded.total_wins,
+                    total_bet = total_bet + excluded.total_bet, total_payout = total_payout + excluded.total_payout,
+                    total_users = total_users + excluded.total_users, last_updated = excluded.last_updated
+            """, (guild_id, len(events), sum(g[1] for g in games.values()), sum(g[4] for g in games.values()),
+                  sum(g[5] for g in games.values()), new_users, events[0].created_at, last))
+            if prune_before:
+                conn.execute("DELETE FROM game_events WHERE guild_id = ? AND created_at < ?", (guild_id, prune_before))
+
+    async def flush_guild(self, guild_id) -> int:
+        """길드의 미반영 기록을 DB에 반영하고 반영한 건수를 반환합니다."""
+        guild_id = str(guild_id)
+        events = self._pending.pop(guild_id, None)
+        if not events:
+            return 0
+
+        prune_before = None
+        if time.monotonic() - self._last_prune.get(guild_id, 0) >= STATS_CONFIG["prune_interval"]:
+            cutoff = datetime.datetime.now(KST) - datetime.timedelta(days=STATS_CONFIG["event_retention_days"])
+            prune_before = cutoff.isoformat()
+
+        db = get_guild_db_manager(guild_id)
+        try:
+            await db.run_in_executor(self._write_batch, db, guild_id, events, prune_before)
         except Exception as e:
-            # ✅ 실패 카운터 업데이트
-            self.debug_stats["failed_records"] += 1
-            logger.error(f"게임 플레이 기록 오류: {e}")
-            print(f"❌ 게임 기록 실패: {e}")
-
-    def get_server_stats(self, guild_id: int) -> Dict: # guild_id 인자 추가
-        """서버 전체 통계 반환 (완전 오류 수정 및 게임 통계 정확한 카운트)"""
+            # 실패 시 다음 주기에 다시 시도하도록 되돌림
+            self._pending[guild_id] = events + self._pending.get(guild_id, [])
+            self.debug_stats["failed_flushes"] += 1
+            logger.error(f"❌ 게임 통계 반영 실패 (Guild: {guild_id}): {e}")
+            return 0
+
+        if prune_before:
+            self._last_prune[guild_id] = time.monotonic()
+        self.debug_stats["flushed_events"] += len(events)
+        return len(events)
+
+    async def flush_all(self) -> int:
+        """모든 길드의 미반영 기록 반영"""
+        flushed = 0
+        for guild_id in list(self._pending.keys()):
+            flushed += await self.flush_guild(guild_id)
+        return flushed
+
+    # ==================== 조회 ====================
+    async def get_server_stats(self, guild_id) -> Dict:
+        """서버 전체 통계 (집계 테이블만 조회)"""
+        gid = str(guild_id)
         try:
-            # ✅ 실행 전 데이터 무결성 확인
-            self._ensure_data_integrity()
-            
-            # ✅ 게임 통계 정확한 계산
-            total_games = 0
-            total_wins = 0
-            total_bets = 0
-            total_payouts = 0
-            
-            if isinstance(self.game_stats, dict) and "games" in self.game_stats:
-                games_data = self.game_stats["games"]
-                for game_name, game_data in games_data.items():
-                    if isinstance(game_data, dict):
-                        # 강화 시스템은 attempts로 계산
-                        if game_name == "enhancement":
-                            total_games += game_data.get("attempts", 0)
-                            total_wins += game_data.get("success", 0)
-                            total_bets += game_data.get("total_spent", 0)
-                        else:
-                            total_games += game_data.get("played", 0)
-                            total_wins += game_data.get("won", 0)
-                            total_bets += game_data.get("total_bet", 0)
-                            total_payouts += game_data.get("total_payout", 0)
-            
-            # 계산된 값으로 game_stats 업데이트
-            if isinstance(self.game_stats, dict):
-                self.game_stats["total_games"] = total_games
-            
-            # ✅ total_users 완전 안전 계산
-            total_users = 0
-            try:
-                if isinstance(self.user_activity, dict):
-                    total_users = len(self.user_activity)
-                else:
-                    logger.warning(f"user_activity 타입 오류: {type(self.user_activity)}. 0으로 설정합니다.")
-                    total_users = 0
-            except Exception as e:
-                logger.error(f"total_users 계산 오류: {e}. 0으로 설정합니다.")
-                total_users = 0
-            
-            # 실시간 통계
-            real_time_stats = self._get_real_time_stats()
-            
-            # 경제 통계 (안전하게)
-            economy_stats = {}
-            # DatabaseCog를 통해 guild_db_manager 인스턴스 가져오기
-            guild_db_manager = self.db_cog.get_manager(str(guild_id)) # guild_id를 문자열로 변환하여 전달
-            DATABASE_AVAILABLE = guild_db_manager is not None # db_manager 인스턴스 존재 여부로 판단
-            
-            try:
-                economy_stats = {
-                    "total_points_consumed": total_bets,
-                    "total_points_distributed": total_payouts,
-                    "house_edge": self._calculate_house_edge(),
-                    "total_wins": total_wins,
-                    "win_rate": round((total_wins / max(total_games, 1)) * 100, 2)
-                }
-                
-                # 데이터베이스 통계 추가 (기존 메서드 사용)
-                if DATABASE_AVAILABLE:
-                    try:
-                        # 현금 리더보드를 통해 이 현금 계산
-                        leaderboard = guild_db_manager.get_cash_leaderboard(1000)  # 상위 1000명
-                        if leaderboard:
-                            db_total_cash = sum(user.get('cash', 0) for user in leaderboard)
-                            economy_stats["db_total_cash"] = db_total_cash
-                            economy_stats["db_active_users"] = len(leaderboard)
-                        
-                        # 데이터베이스 통계
-                        db_stats = guild_db_manager.get_database_stats()
-                        if db_stats and 'users' in db_stats:
-                            economy_stats["db_total_users"] = db_stats['users']
-                    except Exception as db_e:
-                        logger.warning(f"데이터베이스 경제 통계 조회 실패: {db_e}")
-                        
-            except Exception as e:
-                logger.error(f"경제 통계 계산 오류: {e}")
-                economy_stats = {
-                    "total_points_consumed": 0,
-                    "total_points_distributed": 0,
-                    "house_edge": 0.0,
-                    "error": str(e)
-                }
-
-            # ✅ 디버깅 정보 추가
-            debug_info = {
-                "record_calls": self.debug_stats["record_calls"],
-                "successful_records": self.debug_stats["successful_records"],
-                "failed_records": self.debug_stats["failed_records"],
-                "last_record_time": self.debug_stats["last_record_time"],
-                "last_game_recorded": self.debug_stats["last_game_recorded"]
-            }
+            await self.flush_guild(gid)
+            db = get_guild_db_manager(gid)
+            totals = await db.fetch_one("SELECT * FROM game_server_stats WHERE guild_id = ?", (gid,))
+            rows = await db.fetch_all(
+                "SELECT game_name, played, won, single_played, multi_played, total_bet, total_payout FROM game_stats_agg WHERE guild_id = ?",
+                (gid,)
+            )
+            games = {row['game_name']: dict(row) for row in rows}
 
-            print(f"📊 통계 조회 결과: 총 게임 {total_games}, 사용자 {total_users}, 기록 호출 {self.debug_stats['record_calls']}")
+            total_games = totals['total_games'] if totals else 0
+            total_wins = totals['total_wins'] if totals else 0
+            total_bet = totals['total_bet'] if totals else 0
+            total_payout = totals['total_payout'] if totals else 0
 
             return {
                 "total_games": total_games,
-                "total_users": total_users,
-                "games": self.game_stats.get('games', {}),
-                "economy": economy_stats,
-                "real_time": real_time_stats,
-                "debug_info": debug_info,
+                "total_users": totals['total_users'] if totals else 0,
+                "games": games,
+                "economy": {
+                    "total_points_consumed": total_bet,
+                    "total_points_distributed": total_payout,
+                    "house_edge": self._calculate_house_edge(total_bet, total_payout),
+                    "total_wins": total_wins,
+                    "win_rate": round((total_wins / max(total_games, 1)) * 100, 2)
+                },
+                "real_time": self._get_real_time_stats(gid),
+                "debug_info": dict(self.debug_stats),
                 "server_info": {
                     "bot_version": "v6",
-                    "last_updated": self.game_stats.get("last_updated", "Unknown"),
-                    "created_date": self.game_stats.get("created_date", "Unknown")
+                    "last_updated": totals['last_updated'] if totals else "Unknown",
+                    "created_date": totals['created_at'] if totals else "Unknown"
                 }
             }
         except Exception as e:
@@ -484,64 +308,27 @@ class StatisticsManager:
                 "server_info": {"bot_version": "v6", "status": "error"}
             }
 
-    def _get_real_time_stats(self) -> Dict:
-        """실시간 통계 계산"""
-        try:
-            now = datetime.datetime.now(KST)
-            session_duration = now - self.real_time_cache["session_start"]
-            
-            # 시간 단위로 변환
-            hours = session_duration.total_seconds() / 3600
-            
-            return {
-                "session_uptime": str(session_duration).split('.')[0],  # 마이크로초 제거
-                "active_users_count": len(self.real_time_cache["active_users"]),
-                "hourly_games": dict(self.real_time_cache["hourly_games"]),
-                "games_per_hour": round(sum(self.real_time_cache["hourly_games"].values()) / max(hours, 0.1), 2)
-            }
-        except Exception as e:
-            logger.error(f"실시간 통계 계산 오류: {e}")
-            return {"error": str(e)}
+    def _get_real_time_stats(self, guild_id: str) -> Dict:
+        """이번 세션의 실시간 통계"""
+        now = datetime.datetime.now(KST)
+        session_duration = now - self.real_time_cache["session_start"]
+        hours = session_duration.total_seconds() / 3600
+        hourly = self.real_time_cache["hourly_games"].get(guild_id, {})
+        return {
+            "session_uptime": str(session_duration).split('.')[0],  # 마이크로초 제거
+            "active_users_count": len(self.real_time_cache["active_users"].get(guild_id, ())),
+            "hourly_games": dict(hourly),
+            "games_per_hour": round(sum(hourly.values()) / max(hours, 0.1), 2)
+        }
 
-    def _calculate_house_edge(self) -> float:
+    @staticmethod
+    def _calculate_house_edge(total_bet: int, total_payout: int) -> float:
         """하우스 엣지 계산"""
-        try:
-            total_bet = sum(game.get('total_bet', 0) for game in self.game_stats.get('games', {}).values())
-            total_payout = sum(game.get('total_payout', 0) for game in self.game_stats.get('games', {}).values())
-            
-            if total_bet > 0:
-                return round(((total_bet - total_payout) / total_bet) * 100, 2)
-            return 0.0
-        except Exception as e:
-            logger.error(f"하우스 엣지 계산 오류: {e}")
-            return 0.0
+        if total_bet > 0:
+            return round(((total_bet - total_payout) / total_bet) * 100, 2)
+        return 0.0
 
-# ✅ 호환성 메서드 (기존 코드와의 호환성 유지)
-    def record_game_activity(self, user_id: str, username: str, game_name: str, **kwargs):
-        """게임 활동 기록 (향상된 호환성 + 디버깅)"""
-        try:
-            print(f"🔄 record_game_activity 호출됨: {game_name} | {username} | {kwargs}")
-            
-            # 기본 매개변수 추출
-            is_win = kwargs.get('is_win', False)
-            bet_amount = kwargs.get('bet_amount', kwargs.get('bet', 0))  # 호환성을 위해 'bet'도 체크
-            payout = kwargs.get('payout', 0)
-            attempts = kwargs.get('attempts', 1)
-            total_spent = kwargs.get('total_spent', 0)
-            
-            # 강화 시스템 특별 처리
-            if game_name == "enhancement":
-                # 강화는 bet_amount와 payout 대신 total_spent 사용
-                self.record_game_play(user_id, username, game_name, is_win, total_spent, 0)
-            else:
-                # 일반 게임
-                self.record_game_play(user_id, username, game_name, is_win, bet_amount, payout)
-                
-        except Exception as e:
-            logger.error(f"게임 활동 기록 오류: {e}")
-            print(f"❌ record_game_activity 실패: {e}")
-
-# ✅ 게임 한국어 이름 매핑
+    # ✅ 게임 한국어 이름 매핑
     def get_game_korean_name(self, game_name: str) -> str:
         """게임 영문명을 한국어로 변환"""
         korean_names = {
@@ -557,77 +344,62 @@ class StatisticsManager:
         }
         return korean_names.get(game_name, game_name)
 
-    def get_game_rankings(self, game_name: str, limit: int = 10) -> List[Dict]:
-        """특정 게임의 사용자 순위 반환"""
+    async def get_game_rankings(self, guild_id, game_name: str, limit: int = 10) -> List[Dict]:
+        """특정 게임의 사용자 순위 (플레이 횟수순, 인덱스 순서대로 limit건만 조회)"""
+        gid = str(guild_id)
         try:
-            self._ensure_data_integrity()
-            
-            if not isinstance(self.user_activity, dict):
-                return []
-                
-            rankings = []
-            for user_id, user_stats in self.user_activity.items():
-                if isinstance(user_stats, dict) and "games_played" in user_stats:
-                    game_stats = user_stats["games_played"].get(game_name, {})
-                    if game_stats and game_stats.get("played", 0) > 0:
-                        win_rate = round((game_stats.get("won", 0) / game_stats.get("played", 1)) * 100, 1)
-                        rankings.append({
-                            "user_id": user_id,
-                            "username": user_stats.get("username", "Unknown"),
-                            "played": game_stats.get("played", 0),
-                            "won": game_stats.get("won", 0),
-                            "win_rate": win_rate,
-                            "total_bet": game_stats.get("total_bet", 0),
-                            "total_payout": game_stats.get("total_payout", 0),
-                            "net_gain": game_stats.get("total_payout", 0) - game_stats.get("total_bet", 0)
-                        })
-            
-            # 플레이 횟수로 정렬
-            rankings.sort(key=lambda x: x["played"], reverse=True)
-            return rankings[:limit]
-            
+            await self.flush_guild(gid)
+            rows = await get_guild_db_manager(gid).fetch_all("""
+                SELECT user_id, username, played, won, total_bet, total_payout FROM game_user_stats
+                WHERE guild_id = ? AND game_name = ? AND played > 0
+                ORDER BY played DESC LIMIT ?
+            """, (gid, self.normalize_game_name(game_name), limit))
         except Exception as e:
             logger.error(f"게임 순위 조회 오류: {e}")
             return []
+        return [{
+            "user_id": row['user_id'],
+            "username": row['username'] or "Unknown",
+            "played": row['played'],
+            "won": row['won'],
+            "win_rate": round((row['won'] / row['played']) * 100, 1),
+            "total_bet": row['total_bet'],
+            "total_payout": row['total_payout'],
+            "net_gain": row['total_payout'] - row['total_bet']
+        } for row in rows]
 
-    # ✅ 디버깅 메서드 추가
     def get_debug_info(self) -> Dict:
         """디버깅 정보 반환"""
         return {
-            "debug_stats": self.debug_stats,
-            "file_exists": {
-                "game_stats": os.path.exists(STATS_CONFIG["game_stats_file"]),
-                "user_activity": os.path.exists(STATS_CONFIG["user_activity_file"]),
-                "daily_stats": os.path.exists(STATS_CONFIG["daily_stats_file"])
-            },
-            "data_types": {
-                "game_stats": type(self.game_stats).__name__,
-                "user_activity": type(self.user_activity).__name__,
-                "daily_stats": type(self.daily_stats).__name__
-            },
-            "data_sizes": {
-                "game_stats_games": len(self.game_stats.get('games', {})),
-                "user_activity_users": len(self.user_activity) if isinstance(self.user_activity, dict) else 0,
-                "daily_stats_days": len(self.daily_stats) if isinstance(self.daily_stats, dict) else 0
+            "debug_stats": dict(self.debug_stats),
+            "pending": {
+                "guilds": len(self._pending),
+                "events": sum(len(v) for v in self._pending.values())
             }
         }
 
-# ✅ 전역 통계 관리자 인스턴스 (이제 StatisticsCog 내에서 초기화됩니다)
-# stats_manager = StatisticsManager()
+# ✅ 게임 모듈이 공유하는 단일 인스턴스 (from statistics_system import stats_manager)
+stats_manager = StatisticsManager()
 
 # ===== Discord Cog =====
 
 class StatisticsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # DatabaseCog를 bot에서 가져오기
-        self.db_cog = self.bot.get_cog("DatabaseManager")
-        
-        if not self.db_cog:
-            logger.error("❌ DatabaseManager Cog를 찾을 수 없습니다. 통계 기능이 제한됩니다.")
-            self.stats = None # 통계 관리자 초기화 실패
-        else:
-            self.stats = StatisticsManager(self.db_cog) # DatabaseCog 인스턴스를 전달
+        self.stats = stats_manager
+
+    async def cog_load(self):
+        self.flush_stats_loop.start()
+
+    async def cog_unload(self):
+        """Cog 언로드(봇 종료 포함) 시 모아 둔 기록을 모두 반영"""
+        self.flush_stats_loop.cancel()
+        await self.stats.flush_all()
+
+    @tasks.loop(seconds=STATS_CONFIG["flush_interval"])
+    async def flush_stats_loop(self):
+        """모아 둔 게임 기록을 주기적으로 DB에 반영"""
+        await self.stats.flush_all()
 
     @app_commands.command(name="통계", description="[관리자 전용] 서버 전체 게임 통계를 확인합니다.")
     @app_commands.checks.has_permissions(administrator=True) # 서버 내 실제 권한 체크
@@ -639,9 +411,8 @@ class StatisticsCog(commands.Cog):
         await interaction.response.defer()
         
         try:
-            # StatisticsManager에서 데이터를 가져옴
-            games = self.stats.game_stats.get("games", {})
-            server_stats = self.stats.get_server_stats(interaction.guild_id)
+            server_stats = await self.stats.get_server_stats(interaction.guild_id)
+            games = server_stats.get("games", {})
             now = datetime.datetime.now(KST)
             
             # ✅ 통계 기간 계산
@@ -747,23 +518,13 @@ class StatisticsCog(commands.Cog):
                 inline=False
             )
             
-            # 파일 존재 여부
-            file_exists = debug_info.get('file_exists', {})
-            embed.add_field(
-                name="📁 파일 상태",
-                value=f"게임 통계: {'✅' if file_exists.get('game_stats') else '❌'}\n" +
-                      f"사용자 활동: {'✅' if file_exists.get('user_activity') else '❌'}\n" +
-                      f"일일 통계: {'✅' if file_exists.get('daily_stats') else '❌'}",
-                inline=True
-            )
-            
-            # 데이터 크기
-            data_sizes = debug_info.get('data_sizes', {})
+            # 반영 상태
+            pending = debug_info.get('pending', {})
             embed.add_field(
-                name="📏 데이터 크기",
-                value=f"게임 종류: {data_sizes.get('game_stats_games', 0)}개\n" +
-                      f"사용자 수: {data_sizes.get('user_activity_users', 0)}명\n" +
-                      f"일일 기록: {data_sizes.get('daily_stats_days', 0)}일",
+                name="💾 반영 상태",
+                value=f"반영된 기록: {debug_stats.get('flushed_events', 0)}건\n" +
+                      f"반영 실패: {debug_stats.get('failed_flushes', 0)}회\n" +
+                      f"대기 중: {pending.get('events', 0)}건 ({pending.get('guilds', 0)}개 서버)",
                 inline=True
             )
             
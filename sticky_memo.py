@@ -5,46 +5,66 @@ from discord import app_commands
 from discord.ext import commands
 from typing import Dict
 
+# 마지막 채팅 후 이 시간(초) 동안 조용하면 메모를 채널 맨 아래로 다시 올림
+RENEW_DELAY = 6.0
+
 class StickyMemoCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.active_tasks: Dict[int, asyncio.Task] = {}
+        # 길드별 {채널 ID: 메모 정보} - 길드당 한 번 DB에서 읽고 이후 명령어로만 갱신
+        self.memos: Dict[int, Dict[int, dict]] = {}
+        self.timers: Dict[int, asyncio.TimerHandle] = {}    # 채널별 디바운스 타이머 (메시지마다 태스크를 만들지 않음)
+        self.active_tasks: Dict[int, asyncio.Task] = {}     # 채널별 진행 중인 재게시 작업
         self._init_global_tables()
 
     def _init_global_tables(self):
-        """통합 DB에 접착 메모 영구 보관을 위한 테이블 구조 사전 생성"""
+        """이미 접속한 길드의 메모 목록을 미리 불러옴 (DB 매니저 생성 시 테이블 구조도 함께 보정)"""
         for guild in self.bot.guilds:
-            self.get_db(guild.id)
+            self.get_guild_memos(guild.id)
+
+    def cog_unload(self):
+        for handle in self.timers.values():
+            handle.cancel()
+        for task in self.active_tasks.values():
+            task.cancel()
 
     def get_db(self, guild_id: int):
-        """서버 격리 DB를 획득하는 동시에, 과거 파편 스키마가 있다면 실시간으로 무결성을 교정합니다."""
+        """서버 격리 DB를 획득합니다."""
         db_cog = self.bot.get_cog("DatabaseManager")
         if not db_cog:
             return None
             
-        db = db_cog.get_manager(guild_id)
-        if db:
-            # 💡 [스키마 검증] 만약 기존 테이블에 아직도 'message_id'라는 구버전 찌꺼기가 남아있다면
-            info = db.execute_query("PRAGMA table_info(sticky_memos)", (), 'all')
-            has_old_column = any(row['name'] == 'message_id' for row in info) if info else False
-            
-            # 구버전 파편이 발견되면 테이블을 완전히 새로 구조 조정(Drop & Create)합니다.
-            if has_old_column:
-                db.execute_query("DROP TABLE IF EXISTS sticky_memos")
-            
-            # 프로젝트 안전 규격 표준 5대 컬럼으로 실시간 보장 빌드
-            db.create_table(
-                "sticky_memos",
-                """
-                channel_id TEXT NOT NULL,
-                title TEXT,
-                content TEXT,
-                use_embed INTEGER,
-                last_msg_id TEXT,
-                PRIMARY KEY (channel_id)
-                """
-            )
-        return db
+        # 💡 구버전 스키마(message_id) 교정은 sticky_memo 마이그레이션이 매니저 생성 시 1회만 수행합니다.
+        return db_cog.get_manager(guild_id)
+
+    def get_guild_memos(self, guild_id: int) -> Dict[int, dict]:
+        """길드의 접착 메모 목록 (처음 한 번만 DB에서 읽음)"""
+        memos = self.memos.get(guild_id)
+        if memos is None:
+            db = self.get_db(guild_id)
+            if not db:
+                return {}
+            rows = db.execute_query("SELECT * FROM sticky_memos", (), 'all') or []
+            memos = {
+                int(row['channel_id']): {
+                    "title": row['title'],
+                    "content": row['content'],
+                    "use_embed": bool(row['use_embed']),
+                    "last_msg_id": int(row['last_msg_id']) if row['last_msg_id'] else None,
+                }
+                for row in rows
+            }
+            self.memos[guild_id] = memos
+        return memos
+
+    def cancel_renew(self, channel_id: int):
+        """채널의 대기 중인 타이머와 진행 중인 재게시를 취소"""
+        handle = self.timers.pop(channel_id, None)
+        if handle:
+            handle.cancel()
+        task = self.active_tasks.pop(channel_id, None)
+        if task:
+            task.cancel()
 
     async def send_sticky_memo(self, channel: discord.TextChannel, title: str, content: str, use_embed: bool) -> discord.Message:
         """메모 모양에 맞춰 메시지를 전송하는 내부 함수"""
@@ -73,26 +93,26 @@ class StickyMemoCog(commands.Cog):
         channel_id_str = str(interaction.channel_id)
 
         # 2. 이 채널에서 돌고 있던 기존 타이머(디바운스)가 있다면 즉시 취소
-        if interaction.channel_id in self.active_tasks:
-            self.active_tasks[interaction.channel_id].cancel()
+        self.cancel_renew(interaction.channel_id)
+        memos = self.get_guild_memos(interaction.guild_id)
+        record = memos.get(interaction.channel_id)
 
         # 3. [삭제 모드] 데이터베이스에서 지우고 기존 메시지 파괴
         if 내용.strip() == "삭제":
-            record = db.execute_query("SELECT last_msg_id FROM sticky_memos WHERE channel_id = ?", (channel_id_str,), 'one')
             if record and record['last_msg_id']:
                 try:
-                    old_msg = await interaction.channel.fetch_message(int(record['last_msg_id']))
+                    old_msg = await interaction.channel.fetch_message(record['last_msg_id'])
                     await old_msg.delete()
                 except: pass
             
             db.execute_query("DELETE FROM sticky_memos WHERE channel_id = ?", (channel_id_str,))
+            memos.pop(interaction.channel_id, None)
             return await interaction.followup.send("🗑️ 이 채널의 접착 메모가 데이터베이스에서 영구 삭제되었습니다.", ephemeral=True)
 
         # 4. [새로 등록] 기존에 떠 있던 이전 메모 메시지 청소
-        record = db.execute_query("SELECT last_msg_id FROM sticky_memos WHERE channel_id = ?", (channel_id_str,), 'one')
         if record and record['last_msg_id']:
             try:
-                old_msg = await interaction.channel.fetch_message(int(record['last_msg_id']))
+                old_msg = await interaction.channel.fetch_message(record['last_msg_id'])
                 await old_msg.delete()
             except: pass
 
@@ -103,56 +123,63 @@ class StickyMemoCog(commands.Cog):
                 "INSERT OR REPLACE INTO sticky_memos (channel_id, title, content, use_embed, last_msg_id) VALUES (?, ?, ?, ?, ?)",
                 (channel_id_str, 제목, 내용, 1 if 임베드모양 else 0, str(msg.id))
             )
+            memos[interaction.channel_id] = {"title": 제목, "content": 내용, "use_embed": 임베드모양, "last_msg_id": msg.id}
             await interaction.followup.send("✅ 이 채널 전용 접착 메모가 활성화되었습니다!", ephemeral=True)
         except discord.Forbidden:
             await interaction.followup.send("❌ 봇에게 이 채널에 메시지를 전송하거나 삭제할 권한이 없습니다.", ephemeral=True)
 
-    async def delayed_renew(self, channel: discord.TextChannel, delay: float):
-        """6초 동안 추가 채팅이 없을 때(잠잠해졌을 때) 호출되는 디바운스 핵심 핵심 함수"""
-        try:
-            await asyncio.sleep(delay)
-            db = self.get_db(channel.guild.id)
-            if not db: return
+    def _on_timer(self, channel: discord.TextChannel):
+        """디바운스 타이머 만료: 채널이 잠잠해졌으므로 재게시 작업을 하나만 시작"""
+        self.timers.pop(channel.id, None)
+        running = self.active_tasks.get(channel.id)
+        if running and not running.done():
+            # 이전 재게시가 아직 진행 중이면 끝날 때까지 미룸 (겹쳐서 두 번 올라가지 않게)
+            self.timers[channel.id] = asyncio.get_running_loop().call_later(RENEW_DELAY, self._on_timer, channel)
+            return
+        self.active_tasks[channel.id] = asyncio.create_task(self.delayed_renew(channel))
 
-            channel_id_str = str(channel.id)
-            # 데이터베이스에서 '현재 채널'에 매핑된 메모만 정확하게 쿼리
-            memo = db.execute_query("SELECT * FROM sticky_memos WHERE channel_id = ?", (channel_id_str,), 'one')
+    async def delayed_renew(self, channel: discord.TextChannel):
+        """잠잠해졌을 때 호출되어 기존 메모를 지우고 채널 맨 아래에 다시 올립니다."""
+        try:
+            memo = self.get_guild_memos(channel.guild.id).get(channel.id)
             if not memo: return
 
-            # 1. 기존 메모 메시지 안전하게 선 삭제
+            # 1. 기존 메모 메시지 안전하게 선 삭제 (ID를 알고 있으므로 조회 없이 바로 삭제)
             if memo['last_msg_id']:
                 try:
-                    old_msg = await channel.fetch_message(int(memo['last_msg_id']))
-                    await old_msg.delete()
+                    await channel.get_partial_message(memo['last_msg_id']).delete()
                 except: pass
 
             # 2. 채널 최하단에 완전히 새 메시지로 전송
-            new_msg = await self.send_sticky_memo(channel, memo['title'], memo['content'], bool(memo['use_embed']))
-            
-            # 3. 새로 보낸 메시지 ID를 DB에 업데이트 (다음 삭제를 위해)
-            db.execute_query("UPDATE sticky_memos SET last_msg_id = ? WHERE channel_id = ?", (str(new_msg.id), channel_id_str))
+            new_msg = await self.send_sticky_memo(channel, memo['title'], memo['content'], memo['use_embed'])
+            memo['last_msg_id'] = new_msg.id
+
+            # 3. 새로 보낸 메시지 ID를 DB에 업데이트 (재시작 후 삭제를 위해)
+            db = self.get_db(channel.guild.id)
+            if db:
+                await db.execute("UPDATE sticky_memos SET last_msg_id = ? WHERE channel_id = ?", (str(new_msg.id), str(channel.id)))
             
         except asyncio.CancelledError: pass
+        except Exception as e:
+            print(f"⚠️ 접착 메모 재게시 실패 (채널 {channel.id}): {e}")
         finally:
-            self.active_tasks.pop(channel.id, None)
+            if self.active_tasks.get(channel.id) is asyncio.current_task():
+                del self.active_tasks[channel.id]
 
     def trigger_debounce(self, channel):
         """메시지 또는 상호작용 발생 시 타이머(디바운스)를 가동/갱신하는 공통 로직"""
         if not hasattr(channel, 'guild') or not channel.guild:
             return
 
-        db = self.get_db(channel.guild.id)
-        if not db: return
-
-        # 현재 대화가 올라온 '그 채널'에 등록된 접착 메모가 있는지 확인
-        if db.execute_query("SELECT 1 FROM sticky_memos WHERE channel_id = ?", (str(channel.id),), 'one'):
-            # 채팅/명령어가 계속 이어지는 중이라면 이전 타이머를 파괴 (디바운스 초기화)
-            if channel.id in self.active_tasks:
-                self.active_tasks[channel.id].cancel()
+        # 메모가 없는 채널은 메모리 조회 한 번으로 끝
+        if channel.id not in self.get_guild_memos(channel.guild.id):
+            return
 
-            # 마지막 발생 시점부터 딱 6초간 타이머 가동 (6초 뒤 조용해지면 이사 시작)
-            task = asyncio.create_task(self.delayed_renew(channel, 6.0))
-            self.active_tasks[channel.id] = task
+        # 채팅/명령어가 계속 이어지는 중이라면 이전 타이머만 취소하고 다시 잡음 (태스크 생성 없음)
+        handle = self.timers.pop(channel.id, None)
+        if handle:
+            handle.cancel()
+        self.timers[channel.id] = asyncio.get_running_loop().call_later(RENEW_DELAY, self._on_timer, channel)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
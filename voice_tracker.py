@@ -8,24 +8,27 @@ import time
 import logging
 from discord import app_commands, Member
 from discord.ext import commands, tasks
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
 
 # 한국 시간대 설정 (UTC+9)
 KST = datetime.timezone(datetime.timedelta(hours=9))
 from database_manager import get_guild_db_manager
-from xp_leaderboard import check_and_send_levelup_notification
 from xp_leaderboard import load_xp_settings
 
 from xp_leaderboard import XPLeaderboardCog
-from xp_leaderboard import role_reward_manager, ROLE_REWARD_AVAILABLE 
 
 # 로거 설정
 logger = logging.getLogger('voice_tracker')
 
+def utc_timestamp() -> str:
+    """SQLite CURRENT_TIMESTAMP와 같은 형식의 UTC 시각"""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
 # XP 설정 로드
 xp_settings = load_xp_settings()
 VOICE_XP_PER_MINUTE = xp_settings.get("voice_xp", 10)
+SESSION_RESUME_GRACE_SECONDS = 300  # 체크포인트 후 이 시간 안에 재시작하면 진행 중이던 발화 구간을 이어서 기록
 
 # 데이터 초기화 전 확인 버튼 UI
 class VoiceResetConfirmView(discord.ui.View):
@@ -60,17 +63,173 @@ class VoiceTracker(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.xp_cog = XPLeaderboardCog(bot) # XPLeaderboardCog 인스턴스 생성
-        self.active_sessions: Dict[str, Dict] = {}
+        # (guild_id, user_id) -> 세션. 같은 사용자가 여러 길드의 음성 채널에 있어도 충돌하지 않습니다.
+        self.active_sessions: Dict[Tuple[str, str], Dict] = {}
+        self._restored_guilds: Set[str] = set()
 
     async def cog_load(self):
-        """Cog이 로드될 때 태스크 시작"""
+        """Cog이 로드될 때 태스크 시작 (리로드 시에는 현재 음성 채널 상태로 바로 세션 복구)"""
         self.update_sessions_loop.start()
         self.sync_voice_status_loop.start()
+        if self.bot.is_ready():
+            self.restore_sessions()
 
     def cog_unload(self):
-        """Cog이 내려갈 때 반복 작업 중단"""
+        """Cog이 내려갈 때 반복 작업 중단 및 진행 중인 세션 체크포인트 저장 (재시작 후 이어서 기록)"""
         self.update_sessions_loop.cancel()
         self.sync_voice_status_loop.cancel()
+        for guild_id in {key[0] for key in self.active_sessions} | self._restored_guilds:
+            try:
+                self._write_checkpoint(get_guild_db_manager(guild_id), guild_id, self._checkpoint_rows(guild_id))
+            except Exception as e:
+                logger.error(f"❌ 음성 세션 체크포인트 저장 실패 (Guild: {guild_id}): {e}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """재시작/재연결 시 모든 길드의 음성 채널을 한 번에 스캔하여 세션 복구"""
+        self.restore_sessions()
+
+    # ==================== 세션/발화 구간 관리 ====================
+    @staticmethod
+    def _can_speak(voice_state) -> bool:
+        """마이크 및 스피커가 켜져 있는지 확인 (음소거 유저는 XP 지급 방지용)"""
+        return not (voice_state.self_mute or voice_state.deaf or voice_state.self_deaf)
+
+    def _new_session(self, guild_id: str, channel_name: str, is_speaking: bool) -> Dict:
+        """음성 세션 생성 (마이크가 켜져 있으면 발화 구간도 바로 시작)"""
+        session = {
+            "guild_id": guild_id,
+            "last_active_time": time.time(),
+            "join_time": time.time(),
+            "channel_name": channel_name,
+            "is_speaking": is_speaking,
+            "segment_start": None,
+        }
+        if is_speaking:
+            self._open_segment(session)
+        return session
+
+    def _open_segment(self, session: Dict):
+        """발화 구간 시작 (이미 열려 있으면 유지). 구간 동안의 적립 시간은 메모리에서만 늘어납니다."""
+        if session.get("segment_start") is None:
+            session["segment_start"] = utc_timestamp()
+            session["segment_minutes"] = 0
+            session["segment_days"] = {}
+
+    def _close_segment(self, user_id: str, session: Dict, leave_time: Optional[str] = None):
+        """발화 구간 종료: 적립된 시간이 있으면 voice_time_log 세션 1행 + 일별 집계로 기록"""
+        start = session.get("segment_start")
+        minutes = session.get("segment_minutes", 0)
+        days = session.get("segment_days") or {}
+        session["segment_start"] = None
+        session["segment_minutes"] = 0
+        session["segment_days"] = {}
+        if start is None or minutes <= 0:
+            return
+        try:
+            db = get_guild_db_manager(session["guild_id"])
+            db.log_completed_voice_session(user_id, start, leave_time or utc_timestamp(), minutes, days)
+        except Exception as e:
+            logger.error(f"❌ 음성 세션 기록 실패: user_id={user_id}, {e}", exc_info=True)
+
+    # ==================== 체크포인트/복구 ====================
+    def _checkpoint_rows(self, guild_id: str) -> List[tuple]:
+        now = time.time()
+        return [
+            (user_id, s["channel_name"], s["join_time"], int(s["is_speaking"]), s.get("segment_start"),
+             s.get("segment_minutes", 0), json.dumps(s.get("segment_days") or {}), now)
+            for (gid, user_id), s in self.active_sessions.items() if gid == guild_id
+        ]
+
+    @staticmethod
+    def _write_checkpoint(db, guild_id: str, rows: List[tuple], credited: Optional[List[str]] = None):
+        """
+        길드 워커 스레드에서 실행: 이번 주기 통화 시간 적립과 세션 체크포인트를 한 트랜잭션으로 기록합니다.
+        체크포인트는 길드당 몇 행뿐이므로 매번 통째로 교체합니다.
+        """
+        conn = db.get_connection()
+        with conn:
+            if credited:
+                conn.executemany(
+                    "INSERT INTO voice_time (user_id, total_time, last_join, updated_at) VALUES (?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
+                    "ON CONFLICT(user_id) DO UPDATE SET total_time = total_time + 1, updated_at = CURRENT_TIMESTAMP",
+                    [(user_id,) for user_id in credited]
+                )
+            conn.execute("DELETE FROM voice_active_sessions")
+            conn.executemany(
+                "INSERT INTO voice_active_sessions (user_id, channel_name, join_time, is_speaking, segment_start, segment_minutes, segment_days, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def restore_sessions(self):
+        """모든 길드에 대해 체크포인트와 현재 음성 채널 상태를 대조하여 세션을 재구성합니다."""
+        restored = 0
+        for guild in self.bot.guilds:
+            try:
+                restored += self._reconcile_guild(guild, restore=str(guild.id) not in self._restored_guilds)
+                self._restored_guilds.add(str(guild.id))
+            except Exception as e:
+                logger.error(f"❌ 음성 세션 복구 실패 (Guild: {guild.id}): {e}", exc_info=True)
+        if restored:
+            logger.info(f"♻️ 음성 세션 {restored}개 복구 완료")
+
+    def _reconcile_guild(self, guild, restore: bool = False) -> int:
+        """
+        길드의 음성 채널 멤버 목록과 세션을 맞춥니다.
+        - 채널에 있지만 세션이 없는 멤버: 세션 생성 (restore면 체크포인트의 진행 중 발화 구간을 이어감)
+        - 세션은 있지만 채널에 없는 멤버: 발화 구간 기록 후 세션 제거
+        생성한 세션 수를 반환합니다.
+        """
+        guild_id = str(guild.id)
+        checkpoint = {}
+        if restore:
+            rows = get_guild_db_manager(guild_id).execute_query("SELECT * FROM voice_active_sessions", (), 'all') or []
+            checkpoint = {row['user_id']: dict(row) for row in rows}
+
+        now = time.time()
+        present = set()
+        created = 0
+        for voice_channel in guild.voice_channels:
+            for member in voice_channel.members:
+                if member.bot:
+                    continue
+                user_id = str(member.id)
+                present.add(user_id)
+                key = (guild_id, user_id)
+                if key in self.active_sessions:
+                    continue
+                is_speaking = self._can_speak(member.voice) if member.voice else False
+                session = self._new_session(guild_id, voice_channel.name, is_speaking)
+                saved = checkpoint.pop(user_id, None)
+                if saved and saved['is_speaking'] and is_speaking and saved['segment_start'] \
+                        and now - (saved['updated_at'] or 0) <= SESSION_RESUME_GRACE_SECONDS:
+                    # 짧은 재시작: 진행 중이던 발화 구간을 그대로 이어감
+                    session["join_time"] = saved['join_time'] or session["join_time"]
+                    session["segment_start"] = saved['segment_start']
+                    session["segment_minutes"] = saved['segment_minutes'] or 0
+                    session["segment_days"] = json.loads(saved['segment_days'] or "{}")
+                elif saved:
+                    checkpoint[user_id] = saved  # 아래에서 종료 처리
+                self.active_sessions[key] = session
+                created += 1
+
+        # 체크포인트에만 남은(퇴장했거나 오래 중단된) 발화 구간은 마지막 체크포인트 시각으로 종료 기록
+        for user_id, saved in checkpoint.items():
+            if not saved['segment_start'] or not saved['segment_minutes']:
+                continue
+            stale = {"guild_id": guild_id, "segment_start": saved['segment_start'],
+                     "segment_minutes": saved['segment_minutes'], "segment_days": json.loads(saved['segment_days'] or "{}")}
+            leave_time = datetime.datetime.fromtimestamp(saved['updated_at'] or now, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            self._close_segment(user_id, stale, leave_time)
+
+        for key in [k for k in self.active_sessions if k[0] == guild_id and k[1] not in present]:
+            logger.info(f"🧹 세션에서 사용자가 제거됨: ID={key[1]} (Guild: {guild_id}) - 실제 음성 채널에 없음")
+            self._close_segment(key[1], self.active_sessions.pop(key))
+
+        if restore:
+            self._write_checkpoint(get_guild_db_manager(guild_id), guild_id, self._checkpoint_rows(guild_id))
+        return created
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -84,195 +243,127 @@ class VoiceTracker(commands.Cog):
         if not guild_id_str:
             return
 
+        key = (guild_id_str, user_id_str)
+        session = self.active_sessions.get(key)
+
         # 마이크 및 스피커가 켜져 있는지 확인 (음소거 유저는 XP 지급 방지용)
-        was_unmuted = not (before.self_mute or before.deaf or before.self_deaf)
-        is_unmuted = not (after.self_mute or after.deaf or after.self_deaf)
+        was_unmuted = self._can_speak(before)
+        is_unmuted = self._can_speak(after)
         
         # 음성 채널에 새로 입장했을 때
         if after.channel is not None and before.channel is None:
+            if session:
+                self._close_segment(user_id_str, session)
+            self.active_sessions[key] = self._new_session(guild_id_str, after.channel.name, is_unmuted)
             if is_unmuted:
-                self.active_sessions[user_id_str] = {
-                    "guild_id": guild_id_str,
-                    "last_active_time": time.time(),
-                    "join_time": time.time(),
-                    "channel_name": after.channel.name,
-                    "is_speaking": True
-                }
                 logger.info(f"🎤 {member.name} (ID: {user_id_str})가 {after.channel.name} 채널에 입장. XP 세션 시작.")
             else:
                 # 음소거 상태로 입장한 경우
-                self.active_sessions[user_id_str] = {
-                    "guild_id": guild_id_str,
-                    "last_active_time": time.time(),
-                    "join_time": time.time(),
-                    "channel_name": after.channel.name,
-                    "is_speaking": False
-                }
                 logger.info(f"🔇 {member.name} (ID: {user_id_str})가 음소거 상태로 {after.channel.name} 채널에 입장. XP 미지급.")
 
         # 채널을 이동했을 때
         elif before.channel is not None and after.channel is not None and before.channel != after.channel:
-            if user_id_str in self.active_sessions:
-                self.active_sessions[user_id_str]["channel_name"] = after.channel.name
+            if session:
+                session["channel_name"] = after.channel.name
                 # 마이크 상태가 켜져 있으면 XP 세션 계속 진행
                 if is_unmuted:
-                    self.active_sessions[user_id_str]["is_speaking"] = True
-                    self.active_sessions[user_id_str]["last_active_time"] = time.time()
+                    session["is_speaking"] = True
+                    session["last_active_time"] = time.time()
+                    self._open_segment(session)
                     logger.info(f"🔄 {member.name} (ID: {user_id_str})가 채널 이동 후 마이크 켬. XP 세션 계속 진행.")
                 else:
-                    self.active_sessions[user_id_str]["is_speaking"] = False
+                    session["is_speaking"] = False
+                    self._close_segment(user_id_str, session)
                     logger.info(f"🔄🔇 {member.name} (ID: {user_id_str})가 채널 이동 후 마이크 끔. XP 지급 중지.")
             else:
                 # 이동했는데 세션이 없던 경우, 새로 생성
-                if is_unmuted:
-                    self.active_sessions[user_id_str] = {
-                        "guild_id": guild_id_str,
-                        "last_active_time": time.time(),
-                        "join_time": time.time(),
-                        "channel_name": after.channel.name,
-                        "is_speaking": True
-                    }
-                    logger.info(f"🎤 {member.name} (ID: {user_id_str})가 채널 이동 후 마이크를 켜고 새로운 세션 시작.")
+                self.active_sessions[key] = self._new_session(guild_id_str, after.channel.name, is_unmuted)
+                logger.info(f"🎤 {member.name} (ID: {user_id_str})가 채널 이동 후 새로운 세션 시작.")
         
         # 동일 채널 내에서 마이크 상태만 변경되었을 때
         elif before.channel is not None and after.channel is not None and before.channel == after.channel:
             # 마이크가 켜졌을 때
             if is_unmuted and not was_unmuted:
-                if user_id_str in self.active_sessions:
-                    self.active_sessions[user_id_str]["is_speaking"] = True
-                    self.active_sessions[user_id_str]["last_active_time"] = time.time()
+                if session:
+                    session["is_speaking"] = True
+                    session["last_active_time"] = time.time()
+                    self._open_segment(session)
                     logger.info(f"🎤 {member.name} (ID: {user_id_str})의 마이크가 켜졌습니다. XP 세션 재개.")
                 else:
-                    # 세션이 없던 경우 새로 생성 (봇 재시작 등)
-                    self.active_sessions[user_id_str] = {
-                        "guild_id": guild_id_str,
-                        "last_active_time": time.time(),
-                        "join_time": time.time(),
-                        "channel_name": after.channel.name,
-                        "is_speaking": True
-                    }
+                    # 세션이 없던 경우 새로 생성
+                    self.active_sessions[key] = self._new_session(guild_id_str, after.channel.name, True)
                     logger.info(f"🎤 {member.name} (ID: {user_id_str})가 채널에 있었지만 세션이 없어 새로 시작합니다.")
             # 마이크가 꺼졌을 때
             elif not is_unmuted and was_unmuted:
-                if user_id_str in self.active_sessions:
-                    self.active_sessions[user_id_str]["is_speaking"] = False
+                if session:
+                    session["is_speaking"] = False
+                    self._close_segment(user_id_str, session)
                     logger.info(f"🔇 {member.name} (ID: {user_id_str})의 마이크가 꺼졌습니다. XP 지급 중지.")
         
         # 채널을 나갔을 때
         elif before.channel is not None and after.channel is None:
-            if user_id_str in self.active_sessions:
-                del self.active_sessions[user_id_str]
+            if session:
+                self._close_segment(user_id_str, self.active_sessions.pop(key))
                 logger.info(f"🚪 {member.name} (ID: {user_id_str})가 채널을 떠났습니다. XP 세션 종료.")
 
     @tasks.loop(minutes=1)
     async def update_sessions_loop(self):
-        """1분마다 활성 음성 세션을 확인하고 XP를 지급합니다."""
+        """1분마다 활성 음성 세션을 확인하고 XP를 지급합니다. (길드별 통화 시간/체크포인트는 한 트랜잭션으로 기록)"""
         now = time.time()
-        sessions_to_update = list(self.active_sessions.items())
+        today = datetime.datetime.now(KST).date().isoformat()
+        credited: Dict[str, List[str]] = defaultdict(list)
                     
-        for user_id, session in sessions_to_update:
+        for (guild_id, user_id), session in list(self.active_sessions.items()):
             try:
-                if "guild_id" in session and session.get("is_speaking", False):
-                    guild_id = session["guild_id"]
-                    guild = self.bot.get_guild(int(guild_id))
-                    member = guild.get_member(int(user_id)) if guild else None
-                    if not member:
-                        logger.warning(f"❌ 멤버를 찾을 수 없어 XP 지급을 건너뜁니다. user_id={user_id}")
-                        continue
-                    # 레벨업 확인을 위한 이전 레벨 저장
-                    old_level = self.xp_cog.get_user_level(user_id, guild_id)
-                    # XP 지급
-                    xp_gained = VOICE_XP_PER_MINUTE
-                    success = await self.xp_cog.add_xp(user_id, guild_id, xp_gained)
-                    if success:
-                        logger.info(f"✅ {member.name}에게 음성 XP {xp_gained} 지급 완료!")
-                        
-                        # 레벨업 확인 및 알림
-                        new_level = self.xp_cog.get_user_level(user_id, guild_id)
-    
-                        if new_level > old_level:
-                            # 1. 레벨업 알림 전송 
-                            await check_and_send_levelup_notification(self.bot, member, guild, old_level, new_level)
-                            
-                            # 2. 역할 지급 로직 
-                            if ROLE_REWARD_AVAILABLE:
-                                try:
-                                    await role_reward_manager.check_and_assign_level_role(member, new_level, old_level)
-                                    logger.info(f"✨ 역할 지급 성공: {member.name}에게 레벨 {new_level} 역할 지급 완료.")
-                                except Exception as e:
-                                    logger.error(f"❌ 역할 지급 중 오류 발생: {e}", exc_info=True)
-
-                        # ==========================================================
-                        # 🎯 누락된 통화 시간 DB 기록 로직 추가 (안전 인라인 트랜잭션 버전)
-                        # ==========================================================
-                        try:
-                            db = get_guild_db_manager(guild_id)
-                            
-                            # 1. voice_time 테이블에 총 누적 통화 분수(total_time) 추가 (기존 레코드 없을 시 기본 삽입)
-                            db.execute_query(
-                                "INSERT INTO voice_time (user_id, total_time, last_join, updated_at) VALUES (?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
-                                "ON CONFLICT(user_id) DO UPDATE SET total_time = total_time + 1, updated_at = CURRENT_TIMESTAMP",
-                                (user_id,)
-                            )
-                            
-                            # 2. voice_time_log 테이블에 1분 단위 상세 세션 로그 즉시 적립
-                            db.execute_query(
-                                "INSERT INTO voice_time_log (user_id, join_time, leave_time, duration_minutes, is_speaking) "
-                                "VALUES (?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1, 1)",
-                                (user_id,)
-                            )
-                            
-                            logger.info(f"✅ {member.name}의 통화 시간 1분 기록 완료! (voice_time, voice_time_log 업데이트 완료)")
-                        except Exception as db_e:
-                            logger.error(f"❌ 통화 시간 DB 기록 실패: {db_e}", exc_info=True)
-                        # ==========================================================
-                        
-                        session["last_active_time"] = now
-                        
-                    else:
-                        logger.warning(f"❌ XP 지급 실패: user_id={user_id}, guild_id={guild_id}")
-            
-            except Exception as e:
-                logger.error(f"❌ 음성 XP 지급 처리 중 오류 발생: {e}", exc_info=True)
-                continue
+                if not session.get("is_speaking", False):
+                    continue
+                guild = self.bot.get_guild(int(guild_id))
+                member = guild.get_member(int(user_id)) if guild else None
+                if not member:
+                    logger.warning(f"❌ 멤버를 찾을 수 없어 XP 지급을 건너뜁니다. user_id={user_id}")
+                    continue
+                # XP 누적 지급 (레벨업 알림/역할 지급은 즉시, DB 반영은 XP 누적기가 주기적으로 일괄 처리)
+                xp_gained = VOICE_XP_PER_MINUTE
+                success = await self.xp_cog.grant_xp(member, xp_gained, "음성")
+                if success:
+                    logger.info(f"✅ {member.name}에게 음성 XP {xp_gained} 지급 완료!")
+                    # 통화 시간: 총 누적 시간은 아래에서 길드별로 일괄 반영, 상세 로그는 발화 구간이 끝날 때 세션 1행으로 기록
+                    credited[guild_id].append(user_id)
+                    self._open_segment(session)
+                    session["segment_minutes"] += 1
+                    session["segment_days"][today] = session["segment_days"].get(today, 0) + 1
+                    session["last_active_time"] = now
+                else:
+                    logger.warning(f"❌ XP 지급 실패: user_id={user_id}, guild_id={guild_id}")
             
             except Exception as e:
                 logger.error(f"❌ 음성 XP 지급 처리 중 오류 발생: {e}", exc_info=True)
                 continue
+
+        # 세션이 있거나(또는 방금 모두 빠져서 비워야 하는) 길드의 통화 시간 + 체크포인트 기록
+        for guild_id in {key[0] for key in self.active_sessions} | self._restored_guilds:
+            try:
+                db = get_guild_db_manager(guild_id)
+                await db.run_in_executor(self._write_checkpoint, db, guild_id, self._checkpoint_rows(guild_id), credited.get(guild_id))
+            except Exception as db_e:
+                logger.error(f"❌ 통화 시간 DB 기록 실패 (Guild: {guild_id}): {db_e}", exc_info=True)
                        
     @tasks.loop(minutes=5)
     async def sync_voice_status_loop(self):
-        """5분마다 음성 채널 상태와 내부 데이터를 동기화하는 루프"""
+        """5분마다 음성 채널 상태와 내부 세션을 양방향으로 동기화하는 루프 (누락된 입장 이벤트도 보정)"""
         logger.info("🔄 음성 상태 동기화 루프 실행...")
-        try:
-            guild_ids_in_sessions = {session['guild_id'] for session in self.active_sessions.values()}
-            
-            for guild_id in guild_ids_in_sessions:
-                guild = self.bot.get_guild(int(guild_id))
-                if not guild:
-                    continue
+        for guild in self.bot.guilds:
+            try:
+                created = self._reconcile_guild(guild)
+                if created:
+                    logger.info(f"➕ 음성 채널에 있지만 세션이 없던 사용자 {created}명 추가 (Guild: {guild.id})")
+            except Exception as e:
+                logger.error(f"❌ 동기화 루프 중 오류 발생: {e}")
 
-                # 모든 음성 채널의 멤버를 확인
-                members_in_vc = set()
-                for voice_channel in guild.voice_channels:
-                    for member in voice_channel.members:
-                        members_in_vc.add(str(member.id))
-                
-                # 세션에 있지만 실제 채널에 없는 사용자 제거
-                user_ids_to_remove = [
-                    user_id for user_id, session in self.active_sessions.items()
-                    if session['guild_id'] == guild_id and user_id not in members_in_vc
-                ]
-                for user_id in user_ids_to_remove:
-                    if user_id in self.active_sessions:
-                        # 제거되는 사용자 정보 로깅
-                        member = guild.get_member(int(user_id))
-                        member_name = member.display_name if member else f"ID:{user_id}"
-                        logger.info(f"🧹 세션에서 사용자가 제거됨: {member_name} (ID={user_id}) - 실제 음성 채널에 없음")
-                        del self.active_sessions[user_id]
-                        
-        except Exception as e:
-            logger.error(f"❌ 동기화 루프 중 오류 발생: {e}")
+    @update_sessions_loop.before_loop
+    @sync_voice_status_loop.before_loop
+    async def before_voice_loops(self):
+        await self.bot.wait_until_ready()
 
     @app_commands.command(name="보이스랭크", description="사용자의 통화 시간을 공개적으로 확인합니다.")
     @app_commands.describe(사용자="확인할 사용자")
@@ -412,7 +503,7 @@ class VoiceTracker(commands.Cog):
         try:
             period_days = int(기간.value)
             guild_id = str(interaction.guild.id)
-            top_users = self.get_top_voice_users_db(guild_id, 10)
+            top_users = self.get_top_voice_users_db(guild_id, 10, period_days)
             
             embed = discord.Embed(
                 title="📊 기간별 통화 통계",
@@ -458,8 +549,7 @@ class VoiceTracker(commands.Cog):
     @app_commands.default_permissions(administrator=True)    # 디스코드 메뉴 노출 설정
     @app_commands.describe(사용자="초기화할 사용자 (미지정시 전체 초기화)")
     async def reset_voice_data_cmd(self, interaction: discord.Interaction, 사용자: Optional[discord.Member] = None):
-        from database_manager import DatabaseManager
-        if not DatabaseManager().get_user(str(interaction.user.id)):
+        if not get_guild_db_manager(str(interaction.guild.id)).is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -509,12 +599,12 @@ class VoiceTracker(commands.Cog):
         db = get_guild_db_manager(guild_id)
         try:
             if user_id:
-                query = "DELETE FROM voice_time WHERE user_id = ?"
-                db.execute_query(query, (user_id,))
+                for table in ("voice_time", "voice_time_log", "voice_daily"):
+                    db.execute_query(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
                 logger.info(f"✅ 사용자 {user_id}의 음성 기록 초기화 완료.")
             else:
-                query = "DELETE FROM voice_time"
-                db.execute_query(query)
+                for table in ("voice_time", "voice_time_log", "voice_daily"):
+                    db.execute_query(f"DELETE FROM {table}")
                 logger.info("✅ 모든 음성 기록 초기화 완료.")
             return True
         except Exception as e:
@@ -533,58 +623,110 @@ class VoiceTracker(commands.Cog):
             logger.error(f"음성 시간 조회 실패: {e}")
             return 0
 
+    @staticmethod
+    def _period_start_day(days: int) -> str:
+        """최근 N일(오늘 포함, KST 기준)의 시작 날짜"""
+        return (datetime.datetime.now(KST).date() - datetime.timedelta(days=days - 1)).isoformat()
+
+    def _open_segment_usage(self, guild_id: str, since_day: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        """
+        아직 voice_daily에 기록되지 않은(진행 중인) 발화 구간의 {user_id: (분, 세션 수)}
+        since_day가 있으면 그 날짜 이후의 분만 세고, 세션은 구간 시작일이 그 이후일 때만 셉니다.
+        """
+        usage = {}
+        for (gid, user_id), session in self.active_sessions.items():
+            days = session.get("segment_days") or {}
+            if gid != guild_id or session.get("segment_start") is None or not days:
+                continue
+            minutes = sum(m for day, m in days.items() if since_day is None or day >= since_day)
+            started = since_day is None or min(days) >= since_day
+            if minutes or started:
+                usage[user_id] = (minutes, 1 if started else 0)
+        return usage
+
     def get_voice_statistics_db(self, guild_id: str, user_id: str, days: int = None) -> dict:
-        """사용자의 음성 통계를 반환합니다."""
+        """사용자의 음성 통계를 반환합니다. (voice_daily 일별 집계 + 진행 중인 발화 구간)"""
         db = get_guild_db_manager(guild_id)
         try:
             if days:
+                since_day = self._period_start_day(days)
                 query = """
                 SELECT 
-                    SUM(duration_minutes) as period_time,
-                    COUNT(*) as session_count
-                FROM voice_time_log 
-                WHERE user_id = ? AND join_time >= datetime('now', '-{} days')
-                """.format(days)
-                result = db.execute_query(query, (user_id,), 'one')
-                if result and result['period_time']:
+                    SUM(minutes) as period_time,
+                    SUM(sessions) as session_count
+                FROM voice_daily 
+                WHERE user_id = ? AND day >= ?
+                """
+                result = db.execute_query(query, (user_id, since_day), 'one')
+                open_minutes, open_sessions = self._open_segment_usage(guild_id, since_day).get(user_id, (0, 0))
+                period_time = ((result['period_time'] if result else 0) or 0) + open_minutes
+                if period_time:
                     return {
-                        'period_time': result['period_time'] * 60, # 분을 초로 변환
-                        'session_count': result['session_count']
+                        'period_time': period_time * 60, # 분을 초로 변환
+                        'session_count': ((result['session_count'] if result else 0) or 0) + open_sessions
                     }
             else:
                 query = """
                 SELECT 
                     total_time as total_time,
-                    (SELECT COUNT(*) FROM voice_time_log WHERE user_id = ?) as session_count,
-                    (SELECT AVG(duration_minutes) FROM voice_time_log WHERE user_id = ?) as average_session
+                    (SELECT SUM(sessions) FROM voice_daily WHERE user_id = ?) as session_count,
+                    (SELECT SUM(minutes) FROM voice_daily WHERE user_id = ?) as logged_minutes
                 FROM voice_time 
                 WHERE user_id = ?
                 """
                 result = db.execute_query(query, (user_id, user_id, user_id), 'one')
                 if result and result['total_time']:
+                    # voice_time은 매분 갱신되므로 진행 중인 구간은 세션 수/평균에만 더함
+                    open_minutes, open_sessions = self._open_segment_usage(guild_id).get(user_id, (0, 0))
+                    session_count = (result['session_count'] or 0) + open_sessions
+                    logged_minutes = (result['logged_minutes'] or 0) + open_minutes
                     return {
                         'total_time': result['total_time'] * 60, # 분을 초로 변환
-                        'session_count': result['session_count'],
-                        'average_session': (result['average_session'] or 0) * 60 # 분을 초로 변환
+                        'session_count': session_count,
+                        'average_session': logged_minutes * 60 / session_count if session_count else 0
                     }
             return None
         except Exception as e:
             logger.error(f"음성 통계 조회 실패: {e}")
             return None
 
-    def get_top_voice_users_db(self, guild_id: str, limit: int = 10) -> List[dict]:
-        """상위 음성 사용자 목록을 반환합니다."""
+    def get_top_voice_users_db(self, guild_id: str, limit: int = 10, days: int = None) -> List[dict]:
+        """상위 음성 사용자 목록을 반환합니다. days가 있으면 최근 N일 일별 집계 + 진행 중인 발화 구간 기준입니다."""
         db = get_guild_db_manager(guild_id)
         try:
-            query = """
-            SELECT 
-                user_id,
-                total_time
-            FROM voice_time 
-            ORDER BY total_time DESC 
-            LIMIT ?
-            """
-            results = db.execute_query(query, (limit,), 'all')
+            if days:
+                since_day = self._period_start_day(days)
+                open_usage = self._open_segment_usage(guild_id, since_day)
+                query = """
+                SELECT 
+                    user_id,
+                    SUM(minutes) as total_time
+                FROM voice_daily 
+                WHERE day >= ?
+                GROUP BY user_id
+                ORDER BY total_time DESC 
+                LIMIT ?
+                """
+                # 진행 중인 사용자 수만큼 더 읽으면 구간 시간을 더한 뒤에도 상위 limit명이 빠지지 않음
+                rows = db.execute_query(query, (since_day, limit + len(open_usage)), 'all') or []
+                totals = {row['user_id']: row['total_time'] for row in rows}
+                for user_id, (minutes, _) in open_usage.items():
+                    totals[user_id] = totals.get(user_id, 0) + minutes
+                results = [
+                    {'user_id': user_id, 'total_time': minutes}
+                    for user_id, minutes in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+                    if minutes
+                ]
+            else:
+                query = """
+                SELECT 
+                    user_id,
+                    total_time
+                FROM voice_time 
+                ORDER BY total_time DESC 
+                LIMIT ?
+                """
+                results = db.execute_query(query, (limit,), 'all')
             
             top_users = []
             if not results:
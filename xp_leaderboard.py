@@ -10,7 +10,7 @@ import os
 import time
 import random
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Set, Optional, Literal, Union
+from typing import Dict, Set, Optional, Literal, Tuple, Union
 from collections import defaultdict
 
 # --- 시간대 설정 ---
@@ -52,9 +52,7 @@ def get_levelup_channel_id(guild_id: str) -> Optional[int]:
 def is_user_registered(user_id: str, guild_id: str) -> bool:
     """사용자 등록 여부 확인"""
     try:
-        db = get_guild_db_manager(guild_id)
-        user = db.get_user(str(user_id))
-        return user is not None
+        return get_guild_db_manager(guild_id).is_registered(user_id)
     except Exception as e:
         print(f"등록 확인 오류: {e}")
         return False
@@ -118,6 +116,123 @@ def log_admin_action(action_msg):
     except Exception as e:
         print(f"로그 기록 실패: {e}")
 
+# ==================== XP 쓰기 지연(Write-behind) 누적기 ====================
+XP_FLUSH_INTERVAL = 30  # 누적된 XP를 DB에 반영하는 주기 (초)
+
+def level_from_xp(xp: int) -> int:
+    """XP로부터 레벨 계산 (XPLeaderboardCog.calculate_level_from_xp와 동일한 공식)"""
+    if xp < 98:
+        return 0
+    return int(math.floor(math.sqrt((xp + 2) / 100)))
+
+class XPAccumulator:
+    """
+    채팅/음성/명령어 XP 지급을 메모리에 누적합니다.
+    - 사용자별 XP/레벨을 캐시하여 레벨업은 지급 즉시 판정합니다. (알림/역할 지급용)
+    - 누적된 증가분은 XP_FLUSH_INTERVAL마다 길드별 단일 트랜잭션으로 user_xp에 반영됩니다.
+    모든 메서드는 이벤트 루프 스레드에서 호출되며, 실제 DB 쓰기만 길드 워커 스레드에서 실행됩니다.
+    """
+    def __init__(self):
+        self._state: Dict[Tuple[str, str], int] = {}        # (guild_id, user_id) -> 현재 XP (DB + 미반영분)
+        self._pending: Dict[str, Dict[str, int]] = {}       # guild_id -> {user_id: 미반영 XP}
+
+    def pending_xp(self, guild_id: str, user_id: str) -> int:
+        """아직 DB에 반영되지 않은 XP"""
+        return self._pending.get(guild_id, {}).get(user_id, 0)
+
+    async def _load(self, guild_id: str, user_id: str) -> int:
+        db = get_guild_db_manager(guild_id)
+        row = await db.fetch_one("SELECT xp FROM user_xp WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+        xp = (row['xp'] if row else 0) + self.pending_xp(guild_id, user_id)
+        self._state[(guild_id, user_id)] = xp
+        return xp
+
+    async def grant(self, guild_id: str, user_id: str, amount: int) -> Tuple[int, int, int]:
+        """XP를 누적하고 (이전 레벨, 새 레벨, 현재 XP)를 반환합니다."""
+        key = (guild_id, user_id)
+        old_xp = self._state.get(key)
+        if old_xp is None:
+            old_xp = await self._load(guild_id, user_id)
+        new_xp = old_xp + amount
+        self._state[key] = new_xp
+        guild_pending = self._pending.setdefault(guild_id, {})
+        guild_pending[user_id] = guild_pending.get(user_id, 0) + amount
+        return level_from_xp(old_xp), level_from_xp(new_xp), new_xp
+
+    def invalidate(self, guild_id: str, user_id: Optional[str] = None):
+        """외부에서 user_xp를 직접 수정한 경우 캐시를 버립니다. (다음 지급 시 DB에서 다시 로드)"""
+        if user_id is None:
+            for key in [k for k in self._state if k[0] == guild_id]:
+                del self._state[key]
+        else:
+            self._state.pop((guild_id, user_id), None)
+
+    def discard(self, guild_id: str, user_id: str):
+        """탈퇴/삭제된 사용자의 캐시와 미반영 XP를 폐기합니다."""
+        self._pending.get(guild_id, {}).pop(user_id, None)
+        self._state.pop((guild_id, user_id), None)
+
+    @staticmethod
+    def _write_batch(db, guild_id: str, batch: Dict[str, int]) -> Dict[str, int]:
+        """길드 워커 스레드에서 실행: 증가분 반영 + 레벨 재계산을 한 트랜잭션으로 처리"""
+        conn = db.get_connection()
+        user_ids = list(batch.keys())
+        with conn:
+            # 등록된 사용자에 대해서만 반영 (그 사이 탈퇴한 사용자의 XP는 버림)
+            conn.executemany(
+                "INSERT INTO user_xp (user_id, guild_id, xp, level) "
+                "SELECT ?, ?, ?, 0 WHERE EXISTS (SELECT 1 FROM users WHERE user_id = ? AND guild_id = ?) "
+                "ON CONFLICT(user_id, guild_id) DO UPDATE SET xp = xp + excluded.xp, updated_at = CURRENT_TIMESTAMP",
+                [(uid, guild_id, delta, uid, guild_id) for uid, delta in batch.items()]
+            )
+            placeholders = ', '.join('?' * len(user_ids))
+            rows = conn.execute(
+                f"SELECT user_id, xp, level FROM user_xp WHERE guild_id = ? AND user_id IN ({placeholders})",
+                (guild_id, *user_ids)
+            ).fetchall()
+            totals = {row['user_id']: row['xp'] for row in rows}
+            level_updates = [
+                (level_from_xp(row['xp']), row['user_id'], guild_id)
+                for row in rows if row['level'] != level_from_xp(row['xp'])
+            ]
+            if level_updates:
+                conn.executemany("UPDATE user_xp SET level = ? WHERE user_id = ? AND guild_id = ?", level_updates)
+        return totals
+
+    async def flush_guild(self, guild_id: str) -> int:
+        """길드의 미반영 XP를 DB에 반영하고 반영한 사용자 수를 반환합니다."""
+        batch = self._pending.pop(guild_id, None)
+        if not batch:
+            return 0
+        db = get_guild_db_manager(guild_id)
+        try:
+            totals = await db.run_in_executor(self._write_batch, db, guild_id, batch)
+        except Exception as e:
+            # 실패 시 다음 주기에 다시 시도하도록 되돌림
+            guild_pending = self._pending.setdefault(guild_id, {})
+            for uid, delta in batch.items():
+                guild_pending[uid] = guild_pending.get(uid, 0) + delta
+            print(f"❌ XP 일괄 반영 실패 (Guild: {guild_id}): {e}")
+            return 0
+
+        # 캐시를 DB 기준으로 재동기화 (flush 도중 새로 쌓인 XP 포함, 외부 수정분 반영)
+        for uid in batch:
+            if uid in totals:
+                self._state[(guild_id, uid)] = totals[uid] + self.pending_xp(guild_id, uid)
+            else:
+                self._state.pop((guild_id, uid), None)
+        return len(batch)
+
+    async def flush_all(self) -> int:
+        """모든 길드의 미반영 XP 반영"""
+        flushed = 0
+        for guild_id in list(self._pending.keys()):
+            flushed += await self.flush_guild(guild_id)
+        return flushed
+
+# 채팅(XPLeaderboardCog)과 음성(VoiceTracker)이 공유하는 단일 누적기
+xp_accumulator = XPAccumulator()
+
 # ✅ 레벨업 알림 함수
 async def check_and_send_levelup_notification(bot, member, guild, old_level, new_level):
     """
@@ -166,6 +281,19 @@ class XPLeaderboardCog(commands.Cog):
         self.xp_settings = load_xp_settings()
         self.levelup_channels = load_levelup_channels()
 
+    async def cog_load(self):
+        self.flush_xp_loop.start()
+
+    async def cog_unload(self):
+        """Cog 언로드(봇 종료 포함) 시 누적된 XP를 모두 반영"""
+        self.flush_xp_loop.cancel()
+        await xp_accumulator.flush_all()
+
+    @tasks.loop(seconds=XP_FLUSH_INTERVAL)
+    async def flush_xp_loop(self):
+        """누적된 XP를 주기적으로 DB에 반영"""
+        await xp_accumulator.flush_all()
+
     # XP 계산 함수
     def get_xp_for_next_level(self, user_id: str, guild_id: str) -> int:
         """다음 레벨까지 필요한 XP를 계산합니다."""
@@ -229,7 +357,8 @@ class XPLeaderboardCog(commands.Cog):
             return await interaction.followup.send(embed=embed)
         
         try:
-            # 레벨 정보 가져오기 로직
+            # 누적된 XP를 반영한 뒤 레벨/순위 조회
+            await xp_accumulator.flush_guild(guild_id)
             user_xp_info = self.get_user_level_info(user_id, guild_id)
             current_level = user_xp_info['level']
             total_xp = user_xp_info['total_xp']
@@ -239,11 +368,11 @@ class XPLeaderboardCog(commands.Cog):
             
             # 순위 계산
             db = get_guild_db_manager(guild_id)
-            rank_result = db.execute_query('''
+            rank_result = await db.fetch_one('''
                 SELECT COUNT(*) + 1 as rank
                 FROM user_xp 
                 WHERE guild_id = ? AND xp > ? 
-            ''', (guild_id, total_xp), 'one')
+            ''', (guild_id, total_xp))
             
             user_rank = rank_result['rank'] if rank_result else 0 # ser_rank 오타 수정
             progress_bar = self.create_progress_bar(progress_percentage)
@@ -276,7 +405,7 @@ class XPLeaderboardCog(commands.Cog):
         from database_manager import DatabaseManager
         guild_id = str(interaction.guild_id)
         db = get_guild_db_manager(guild_id)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -350,10 +479,6 @@ class XPLeaderboardCog(commands.Cog):
         # 문자열 반환
         return "⬛" * filled_blocks + "⬜" * empty_blocks
     
-    def cog_unload(self):
-        """Cog 언로드시 태스크 정리"""
-        pass
-    
     # ===== 레벨 계산 함수들 =====
     
     def calculate_xp_for_level(self, level: int) -> int:
@@ -363,12 +488,8 @@ class XPLeaderboardCog(commands.Cog):
         return (10 * level) ** 2 - 2
 
     def calculate_level_from_xp(self, xp: int) -> int:
-        """현재 XP를 기반으로 레벨을 계산합니다."""
-        if xp < 98:  # 레벨 1에 필요한 최소 XP는 98입니다.
-            return 0
-        # 수식 역산: level = sqrt((xp + 2) / 100)
-        level = math.floor(math.sqrt((xp + 2) / 100))
-        return int(level)
+        """현재 XP를 기반으로 레벨을 계산합니다. (레벨 1에 필요한 최소 XP는 98, level = sqrt((xp + 2) / 100))"""
+        return level_from_xp(xp)
     
     # ===== 사용자 관리 함수들 (등록 확인 제거) =====
     
@@ -378,7 +499,7 @@ class XPLeaderboardCog(commands.Cog):
         result = db.execute_query('''
             SELECT xp FROM user_xp WHERE user_id = ? AND guild_id = ?
         ''', (user_id, guild_id), 'one')
-        return result['xp'] if result else 0
+        return (result['xp'] if result else 0) + xp_accumulator.pending_xp(guild_id, user_id)
     
     def get_user_level(self, user_id: str, guild_id: str) -> int:
         """사용자 레벨 조회"""
@@ -462,6 +583,7 @@ class XPLeaderboardCog(commands.Cog):
         ''', (xp_amount, user_id, guild_id))
 
         self.update_user_level(user_id, guild_id)
+        xp_accumulator.invalidate(guild_id, user_id)
 
         # ✅ XP 지급 성공 시 터미널에 로그 출력
         new_xp = self.get_user_xp(user_id, guild_id)
@@ -475,6 +597,27 @@ class XPLeaderboardCog(commands.Cog):
         
         return True
     
+    async def grant_xp(self, member: discord.Member, xp_amount: int, source: str) -> bool:
+        """
+        ✅ 채팅/음성/명령어 XP 지급 (쓰기 지연 누적기 사용)
+        레벨업은 즉시 판정하여 알림과 역할 보상을 처리하고, DB 반영은 주기적으로 일괄 처리됩니다.
+        """
+        user_id = str(member.id)
+        guild_id = str(member.guild.id)
+        if not is_user_registered(user_id, guild_id):
+            return False
+
+        old_level, new_level, _ = await xp_accumulator.grant(guild_id, user_id, xp_amount)
+        if new_level > old_level:
+            await check_and_send_levelup_notification(self.bot, member, member.guild, old_level, new_level)
+            if ROLE_REWARD_AVAILABLE:
+                try:
+                    await role_reward_manager.check_and_assign_level_role(member, new_level, old_level)
+                    print(f"✨ {source} 레벨업 역할 지급 성공: {member.display_name} (Lv.{old_level} → Lv.{new_level})")
+                except Exception as e:
+                    print(f"❌ {source} 레벨업 역할 지급 오류: {e}")
+        return True
+
     # ===== 슬래시 명령어들 =====
     @app_commands.command(name="레벨순위", description="XP 리더보드를 확인합니다 (한 번에 최대 10개 임베드)")
     @app_commands.checks.has_permissions(administrator=True) # 서버 내 실제 권한 체크
@@ -484,7 +627,7 @@ class XPLeaderboardCog(commands.Cog):
         from database_manager import DatabaseManager
         guild_id = str(interaction.guild_id)
         db = get_guild_db_manager(guild_id)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -497,15 +640,16 @@ class XPLeaderboardCog(commands.Cog):
         try:
             guild_id = str(interaction.guild_id)
             db = get_guild_db_manager(guild_id)
+            await xp_accumulator.flush_guild(guild_id)
 
             # 전체 순위 데이터 가져오기
-            results = db.execute_query('''
+            results = await db.fetch_all('''
                 SELECT u.user_id, u.username, u.display_name, ux.level, ux.xp 
                 FROM users u
                 JOIN user_xp ux ON u.user_id = ux.user_id
                 WHERE ux.guild_id = ? AND ux.xp > 0
                 ORDER BY ux.level DESC, ux.xp DESC
-            ''', (guild_id,), 'all')
+            ''', (guild_id,))
             
             if not results:
                 return await interaction.followup.send("📊 해당 서버에 레벨 데이터가 없습니다.")
@@ -578,7 +722,7 @@ class XPLeaderboardCog(commands.Cog):
         from database_manager import DatabaseManager
         guild_id = str(interaction.guild_id)
         db = get_guild_db_manager(guild_id)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -590,6 +734,8 @@ class XPLeaderboardCog(commands.Cog):
         if not is_user_registered(user_id, guild_id):
             return await interaction.followup.send(f"❌ **{대상자.display_name}**님은 등록되지 않은 사용자입니다.", ephemeral=True)
 
+        # 누적된 XP를 먼저 반영해야 직접 수정한 값이 덮어써지지 않음
+        await xp_accumulator.flush_guild(guild_id)
         old_level = self.get_user_level(user_id, guild_id)
         db = get_guild_db_manager(guild_id)
         embed = discord.Embed(color=discord.Color.blue())
@@ -625,6 +771,8 @@ class XPLeaderboardCog(commands.Cog):
             embed.title, embed.description = "✅ 레벨 설정 완료", f"{대상자.mention}님의 레벨을 **Lv.{수량}**으로 설정했습니다."
             role_update_needed = True
 
+        xp_accumulator.invalidate(guild_id, user_id)
+
         # 역할 업데이트 및 알림 로직
         if role_update_needed:
             new_level = int(self.get_user_level(user_id, guild_id))
@@ -670,7 +818,7 @@ class XPLeaderboardCog(commands.Cog):
         from database_manager import DatabaseManager
         guild_id = str(interaction.guild_id)
         db = get_guild_db_manager(guild_id)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -723,7 +871,7 @@ class XPLeaderboardCog(commands.Cog):
         from database_manager import DatabaseManager
         guild_id = str(interaction.guild_id)
         db = get_guild_db_manager(guild_id)
-        if not db.get_user(str(interaction.user.id)):
+        if not db.is_registered(str(interaction.user.id)):
             if not interaction.response.is_done():
                 await interaction.response.send_message("❗ 먼저 `/등록` 명령어로 명단에 등록해주세요!", ephemeral=True)
             return
@@ -956,76 +1104,23 @@ class XPLeaderboardCog(commands.Cog):
             return
     
         user_id = str(message.author.id)
-        guild_id = str(message.guild.id)
         
-        # 🔒 등록 확인 - 등록되지 않은 사용자는 XP를 받지 않음
-        if not is_user_registered(user_id, guild_id):
-            return
-        
-        # 쿨다운 확인
+        # 쿨다운 확인 (메모리 조회이므로 등록 확인보다 먼저 수행)
         current_time = time.time()
         last_xp_time = self.last_chat_xp_time.get(user_id, 0)
         
         if current_time - last_xp_time < self.xp_settings["chat_cooldown"]:
             return
         
-        # 1. 레벨업 확인을 위한 이전 레벨 저장 (XP 지급 전에 실행되어야 함)
-        old_level = self.get_user_level(user_id, guild_id)
-        
-        # 2. XP 지급
-        xp_gained = self.xp_settings["chat_xp"]
-        success = await self.add_xp(user_id, guild_id, xp_gained)
-        
-        if not success:
-            return  # XP 지급 실패 시, 여기서 함수를 종료합니다.
-        
-        # 3. 쿨다운 업데이트
-        self.last_chat_xp_time[user_id] = current_time
-        
-        # 4. 레벨업 확인: XP 지급 성공 시에만 new_level을 계산합니다.
-        new_level = self.get_user_level(user_id, guild_id)
-        
-        # 5. 레벨업 처리
-        if new_level > old_level:
-            member = message.author
-            
-            # 5-1. 레벨업 알림 전송
-            await check_and_send_levelup_notification(self.bot, member, message.guild, old_level, new_level)
-            
-            # 5-2. ✅ 역할 지급 로직
-            if ROLE_REWARD_AVAILABLE:
-                try:
-                    await role_reward_manager.check_and_assign_level_role(member, new_level, old_level)
-                    print(f"✨ 채팅 레벨업 역할 지급 성공: {member.display_name} (Lv.{old_level} → Lv.{new_level})")
-                except Exception as e:
-                    print(f"❌ 채팅 레벨업 역할 지급 오류: {e}")
+        # 🔒 등록 확인 후 XP 누적 + 레벨업 즉시 처리 (등록되지 않은 사용자는 XP를 받지 않음)
+        success = await self.grant_xp(message.author, self.xp_settings["chat_xp"], "채팅")
+        if success:
+            self.last_chat_xp_time[user_id] = current_time
 
     async def process_command_xp(self, interaction: discord.Interaction):
         """명령어 사용 시 XP를 지급하는 공통 로직"""
-        user_id = str(interaction.user.id)
-        guild_id = str(interaction.guild.id)
-
-        # 1. 등록된 사용자인지 확인
-        if not is_user_registered(user_id, guild_id):
-            return
-
-        # 2. 이전 레벨 저장
-        old_level = self.get_user_level(user_id, guild_id)
-
-        # 3. XP 지급 (설정된 채팅 XP 값 사용)
         xp_amount = self.xp_settings.get("command_xp", 2)
-        success = await self.add_xp(user_id, guild_id, xp_amount)
-
-        if success:
-            # 4. 레벨업 확인 및 처리
-            new_level = self.get_user_level(user_id, guild_id)
-            if new_level > old_level:
-                await check_and_send_levelup_notification(self.bot, interaction.user, interaction.guild, old_level, new_level)
-                if ROLE_REWARD_AVAILABLE:
-                    try:
-                        await role_reward_manager.check_and_assign_level_role(interaction.user, new_level, old_level)
-                    except Exception as e:
-                        print(f"❌ 명령어 레벨업 역할 지급 오류: {e}")
+        await self.grant_xp(interaction.user, xp_amount, "명령어")
             
 # setup 함수 (확장 로드용)
 async def setup(bot: commands.Bot):
@@ -21,28 +21,14 @@ try:
 except ImportError:
     STATS_AVAILABLE = False
 
-# 포인트 매니저 연동 (잔액 확인 및 지급/차감 담당)
-try:
-    import point_manager
-    POINT_MANAGER_AVAILABLE = True
-except ImportError:
-    POINT_MANAGER_AVAILABLE = False
-
-    # 포인트 매니저 부재 시 작동할 모의 클래스
-    class MockPointManager:
-        @staticmethod
-        async def is_registered(bot, guild_id, user_id): return True
-        @staticmethod
-        async def get_point(bot, guild_id, user_id): return 10000
-        @staticmethod
-        async def add_point(bot, guild_id, user_id, amount): pass
-    point_manager = MockPointManager()
+# 포인트 서비스 연동 (배팅 홀드 시 차감 → 게임 종료 시 지급액 정산)
+from point_service import point_service
 
 # 게임 결과를 통계 시스템에 기록하는 함수
-def record_yabawi_game(user_id: str, username: str, bet: int, payout: int, is_win: bool):
+def record_yabawi_game(guild_id, user_id: str, username: str, bet: int, payout: int, is_win: bool):
     if STATS_AVAILABLE:
         try:
-            stats_manager.record_game(user_id, username, "yabawi", bet, payout, is_win)
+            stats_manager.record_game(user_id, username, "yabawi", bet, payout, is_win, guild_id=guild_id)
         except: pass
 
 class YabawiGameView(View):
@@ -64,7 +50,8 @@ class YabawiGameView(View):
         self.current_pot = base_bet                 # 현재 쌓인 보상 (승리 시 2배씩 증가)
         self.ended = False                          # 게임 종료 여부
         self.processing = False                     # 중복 클릭 방지용 플래그
-        self.initial_bet_deducted = False           # 배팅금 차감 여부
+        self.initial_bet_deducted = False           # 배팅금 홀드 여부
+        self.hold = None                            # 배팅 홀드 (연승 도전 내내 유지, 종료 시 정산)
         self.real_position = random.randint(0, 2)   # 공이 숨겨진 실제 위치 (0, 1, 2)
 
         # 3개의 컵(버튼) 생성
@@ -81,12 +68,12 @@ class YabawiGameView(View):
                 if self.wins > 0:
                     # 1승 이상이면 현재까지의 보상 지급
                     payout = int(self.current_pot * WINNER_RETENTION)
-                    await point_manager.add_point(self.bot, self.guild_id, self.user_id, payout)
-                    record_yabawi_game(self.user_id, self.user.display_name, self.base_bet, payout, True)
+                    await point_service.settle(self.hold, payout, f"야바위 {self.wins}연승 (시간 초과)")
+                    record_yabawi_game(self.hold.guild_id, self.user_id, self.user.display_name, self.base_bet, payout, True)
                     timeout_msg = f"⏰ 시간 초과! 현재까지의 보상 {payout:,}원이 지급되었습니다.\n*10%의 딜러비가 차감된 후 지급됩니다."
                 else:
-                    # 첫 판에서 잠수 시 원금 환불
-                    await point_manager.add_point(self.bot, self.guild_id, self.user_id, self.base_bet)
+                    # 첫 판에서 잠수 시 원금 환불 (홀드 때 차감된 배팅금 반환)
+                    await point_service.refund(self.hold)
                     timeout_msg = f"⏰ 시간 초과! 활동이 없어 {self.base_bet:,}원이 환불되었습니다."
             else:
                 timeout_msg = "⏰ 시간 초과로 게임이 종료되었습니다."
@@ -106,15 +93,14 @@ class YabawiGameView(View):
         """확률 판정 후 결과를 시각화하는 로직 (개선 버전)"""
         self.processing = True
         
-        # 1. 포인트 차감 로직 (기존과 동일)
+        # 1. 배팅 홀드 (첫 선택 시 한 번만)
         if not self.initial_bet_deducted:
-            current_balance = await point_manager.get_point(self.bot, self.guild_id, self.user_id)
-            if current_balance < self.base_bet:
+            self.hold = await point_service.reserve_bet(self.guild_id, self.user_id, self.base_bet, "야바위")
+            if not self.hold:
                 self.processing = False
                 active_games_by_user.discard(self.user_id)
                 return await interaction.response.send_message("❌ 잔액이 부족합니다!", ephemeral=True)
             
-            await point_manager.add_point(self.bot, self.guild_id, self.user_id, -self.base_bet)
             self.initial_bet_deducted = True
 
             # XP 시스템을 가져와서 실행 (실제 게임 시작 시점에 지급)
@@ -154,8 +140,8 @@ class YabawiGameView(View):
             
             if self.wins >= MAX_CHALLENGES:
                 final_payout = int(self.current_pot * WINNER_RETENTION)
-                await point_manager.add_point(self.bot, self.guild_id, self.user_id, final_payout)
-                record_yabawi_game(self.user_id, self.user.display_name, self.base_bet, final_payout, True)
+                await point_service.settle(self.hold, final_payout, f"야바위 {self.wins}연승")
+                record_yabawi_game(self.hold.guild_id, self.user_id, self.user.display_name, self.base_bet, final_payout, True)
                 
                 self.ended = True
                 active_games_by_user.discard(self.user_id)
@@ -175,7 +161,8 @@ class YabawiGameView(View):
         else:
             self.ended = True
             active_games_by_user.discard(self.user_id)
-            record_yabawi_game(self.user_id, self.user.display_name, self.base_bet, 0, False)
+            await point_service.settle(self.hold, 0, f"야바위 {self.wins + 1}단계 실패")
+            record_yabawi_game(self.hold.guild_id, self.user_id, self.user.display_name, self.base_bet, 0, False)
             
             embed = discord.Embed(title="💥 꽝!", description=f"틀렸습니다! 공은 다른 곳에 있었네요.\n{cups_display}", color=discord.Color.red())
             await interaction.response.edit_message(embed=embed, view=None)
@@ -198,10 +185,13 @@ class StopButton(discord.ui.Button):
         # [수정] 중복 클릭 방지 해제 (필요 시)
         view.processing = False 
         
+        if view.ended:
+            return await interaction.response.send_message("이미 종료된 게임입니다.", ephemeral=True)
+
         final_payout = int(view.current_pot * WINNER_RETENTION)
-        await point_manager.add_point(view.bot, view.guild_id, view.user_id, final_payout)
+        await point_service.settle(view.hold, final_payout, f"야바위 {view.wins}연승 수령")
         
-        record_yabawi_game(view.user_id, view.user.display_name, view.base_bet, final_payout, True)
+        record_yabawi_game(view.hold.guild_id, view.user_id, view.user.display_name, view.base_bet, final_payout, True)
         view.ended = True
         active_games_by_user.discard(view.user_id)
         